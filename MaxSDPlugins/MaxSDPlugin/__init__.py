@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""MaxSDPlugin 插件入口
+
+功能计划见上一级目录的 Readme.md。插件本体按功能拆成多个模块：
+    node_snapshot.py    节点属性快照：一次读完所有输入属性，本地修改，只把变化的值写回
+    property_schema.py  按节点定义共享的属性描述表，同定义的节点不再重复 getProperties
+    package_pool.py     用户包缓存池：用过的包按引用计数 + LRU 留在内存里，不再反复加载
+    graph_builder.py    graph 编辑命令缓冲：先记录、本地检查，再一次性提交（或离线写成 .sbs）
+    auto_layout.py      按连线分层自动排版节点，位置一次性批量写回
+    plugin_framework.py 轻量插件框架：启动时只登记菜单，模块、对话框、SD 查询到第一次使用才加载；启动耗时统计
+    job_runner.py       后台任务：批量文件处理不占用主线程，SD API 调用分批回到主线程执行
+    batch_lint.py       批量检查文件夹里的 .sbs（job_runner + utilities/sbs_lint），结果面板显示进度
+    sd_instrument.py    sd API 调用统计（按需开启）：次数、耗时直方图、调用位置，导出 JSON / Chrome trace
+
+SD 启动时调用 initializeSDPlugin()，关闭或卸载插件时调用 uninitializeSDPlugin()。
+这里只登记菜单，各功能模块在第一次点击菜单时才 import。
+设置环境变量 MAXSD_PROFILE_IMPORTS=1 时，从本插件加载开始统计之后每个模块的 import 耗时，
+菜单“启动耗时”里可以看到。
+"""
+
+import os
+import sys
+
+from MaxSDPlugin.plugin_framework import Plugin, install_import_timer, profiler
+
+if os.environ.get('MAXSD_PROFILE_IMPORTS'):
+    install_import_timer()
+
+
+def _print_startup_report():
+    print(profiler.report())
+
+
+def _create_stats_dock():
+    from MaxSDPlugin.sd_instrument import stats_panel
+    return stats_panel(plugin.main_window())
+
+
+def _stop_instrument():
+    # 只有用过统计功能时模块才会被 import
+    module = sys.modules.get('MaxSDPlugin.sd_instrument')
+    if module is not None:
+        module.disable()
+
+
+def _close_batch_panels():
+    module = sys.modules.get('MaxSDPlugin.batch_lint')
+    if module is not None:
+        module.close_panels()
+
+
+plugin = Plugin('MaxSDPlugin')
+_stats_dock = plugin.dialog(_create_stats_dock)
+plugin.action('自动排版当前 graph', 'MaxSDPlugin.auto_layout:layout_graph')
+plugin.action('批量检查文件夹...', 'MaxSDPlugin.batch_lint:lint_folder')
+plugin.action('sd API 统计', lambda: _stats_dock().show())
+plugin.action('启动耗时', _print_startup_report)
+plugin.on_unload(_stop_instrument)
+plugin.on_unload(_close_batch_panels)
+
+
+def initializeSDPlugin():
+    plugin.initialize()
+
+
+def uninitializeSDPlugin():
+    plugin.uninitialize()
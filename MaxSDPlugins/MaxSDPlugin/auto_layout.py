@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""在 SD 里自动排版当前 graph（或选中的节点）
+
+排版算法在仓库根目录的 utilities/graph_layout.py（分层 + 重心法 + 保序回归，近似线性时间），
+这里只负责从 SD 读出节点和连线、把算好的位置写回：
+- 读：每个节点一次 getIdentifier / getDefinition / getPosition，
+  连线只查可连接的输入端口（属性描述按定义共用，见 property_schema）；
+- 写：所有 setPosition 放在一个撤销组里，期间暂停主窗口刷新，位置没变的节点不写。
+
+需要仓库根目录在 sys.path 里（用到 utilities.graph_layout）。
+
+用法：
+    from MaxSDPlugin.auto_layout import layout_graph
+
+    moved = layout_graph()                       # 排版当前 graph
+    moved = layout_graph(nodes=selected_nodes)   # 只排版选中的节点（和未选中节点的连线忽略）
+"""
+
+import sd
+from sd.api.sdbasetypes import float2
+from sd.api.sdproperty import SDPropertyCategory
+
+from MaxSDPlugin.graph_builder import ui_updates_suspended
+from MaxSDPlugin.property_schema import SchemaRegistry
+
+try:
+    from sd.api.sdhistoryutils import SDHistoryUtils
+except ImportError:  # 较老的 SD 版本没有撤销组 API
+    SDHistoryUtils = None
+
+
+def read_topology(nodes, registry=None):
+    """读出 (identifiers, positions, edges)。edges 是 [(上游下标, 下游下标), ...]，只含 nodes 内部的连线。"""
+    registry = registry if registry is not None else SchemaRegistry()
+    identifiers = [node.getIdentifier() for node in nodes]
+    index_of = {identifier: i for i, identifier in enumerate(identifiers)}
+    positions = []
+    edges = []
+    for i, node in enumerate(nodes):
+        position = node.getPosition()
+        positions.append((position.x, position.y))
+        schema = registry.schema_for(node)
+        for info in schema.of_category(SDPropertyCategory.Input):
+            if not info.connectable:
+                continue
+            for connection in node.getPropertyConnections(info.prop):
+                source = index_of.get(connection.getOutputPropertyNode().getIdentifier())
+                if source is not None:
+                    edges.append((source, i))
+    return identifiers, positions, edges
+
+
+def layout_graph(graph=None, nodes=None, spacing_x=None, spacing_y=None, registry=None,
+                 undo_name='MaxSDPlugin: 自动排版'):
+    """排版 graph 的全部节点（或 nodes），返回移动的节点数。graph 和 nodes 都不给时用当前 graph。"""
+    from utilities.graph_layout import DEFAULT_SPACING_X, DEFAULT_SPACING_Y, layered_layout
+
+    if nodes is None:
+        if graph is None:
+            graph = sd.getContext().getSDApplication().getQtForPythonUIMgr().getCurrentGraph()
+        if graph is None:
+            print('[auto_layout] 没有打开的 graph')
+            return 0
+        nodes = graph.getNodes()
+    nodes = list(nodes)
+    if not nodes:
+        return 0
+    _identifiers, positions, edges = read_topology(nodes, registry)
+    origin = (min(p[0] for p in positions), min(p[1] for p in positions))
+    xs, ys = layered_layout(len(nodes), edges, order_key=[p[1] for p in positions], origin=origin,
+                            spacing_x=spacing_x or DEFAULT_SPACING_X, spacing_y=spacing_y or DEFAULT_SPACING_Y)
+    moves = [(node, x, y) for node, (old_x, old_y), x, y in zip(nodes, positions, xs, ys)
+             if abs(old_x - x) > 0.01 or abs(old_y - y) > 0.01]
+    if not moves:
+        return 0
+    if SDHistoryUtils is not None and undo_name:
+        with SDHistoryUtils.UndoGroup(undo_name), ui_updates_suspended():
+            _write(moves)
+    else:
+        with ui_updates_suspended():
+            _write(moves)
+    return len(moves)
+
+
+def _write(moves):
+    for node, x, y in moves:
+        node.setPosition(float2(x, y))
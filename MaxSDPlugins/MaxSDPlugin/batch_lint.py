@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""批量检查材质库：选一个文件夹，后台对里面所有 .sbs 跑 utilities/sbs_lint
+
+菜单“批量检查文件夹...”的实现，也是 job_runner 的实际用法：
+- 解析、检查 .sbs 放在 JobRunner 的线程池里，SD 界面不会卡住；
+- 检查出的问题在主线程里按批打印到 SD 的 Python 控制台（apply）；
+- 结果面板（results_panel）显示进度、可以取消，读不了的文件列在表格里。
+
+用法：
+    from MaxSDPlugin.batch_lint import lint_folder
+    lint_folder()                        # 弹出文件夹选择框
+    lint_folder('D:/materials')          # 直接检查这个文件夹
+
+需要仓库根目录在 sys.path 里（用到 utilities.sbs_lint）。
+"""
+
+from MaxSDPlugin.job_runner import Job, JobRunner, results_panel
+
+# 打开着的结果面板：不留引用的话，面板一创建就会被回收
+_panels = []
+
+
+def lint_job(paths, rule_ids=None, settings=None, report=print):
+    """创建检查任务。report(文本) 在主线程里逐条接收问题；每个文件的问题列表留在 handle.results 里。"""
+    from utilities import sbs_lint
+
+    def apply(batch):
+        for _path, findings in batch:
+            for f in findings:
+                report('[sbs_lint] %s: %s [%s] %s%s' % (f['path'], f['level'], f['rule'],
+                                                         ('%s: ' % f['graph']) if f['graph'] else '',
+                                                         f['message']))
+
+    return Job('批量检查 .sbs', paths, work=sbs_lint._check_job, apply=apply,
+               initializer=sbs_lint._init_worker, initargs=(rule_ids, settings))
+
+
+def lint_folder(folder=None, parent=None):
+    """检查 folder 下的全部 .sbs（None 时弹出选择框），打开结果面板，返回 JobHandle；取消选择时返回 None。"""
+    from utilities.sbs_files import iter_packages
+
+    if parent is None:
+        from MaxSDPlugin.plugin_framework import ui_mgr
+        parent = ui_mgr().getMainWindow()
+    if folder is None:
+        try:
+            from PySide2 import QtWidgets
+        except ImportError:
+            from PySide6 import QtWidgets
+        folder = QtWidgets.QFileDialog.getExistingDirectory(parent, '选择要检查的文件夹')
+        if not folder:
+            return None
+    paths = list(iter_packages([folder]))
+    if not paths:
+        print('[MaxSDPlugin] %s 里没有 .sbs 文件' % folder)
+        return None
+
+    handle = JobRunner().submit(lint_job(paths))
+
+    @handle.on_finished
+    def _summary(h):
+        findings = sum(len(result) for _path, result in h.results)
+        print('[MaxSDPlugin] 批量检查%s：%d 个文件，%d 个问题，%d 个文件失败，用时 %.1fs'
+              % ('已取消' if h.cancelled else '完成', h.completed, findings, len(h.errors), h.elapsed))
+
+    panel = results_panel(handle, parent=parent)
+    _panels.append(panel)
+    panel.finished.connect(lambda _code: _panels.remove(panel) if panel in _panels else None)
+    panel.show()
+    return handle
+
+
+def close_panels():
+    """卸载插件时调用：关闭面板（关闭时会取消还在运行的任务）。"""
+    for panel in list(_panels):
+        panel.close()
+    del _panels[:]
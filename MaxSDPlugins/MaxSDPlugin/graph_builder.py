@@ -0,0 +1,574 @@
+# -*- coding: utf-8 -*-
+"""graph 编辑命令缓冲：先在本地记录、检查，再一次性提交到 SD（或直接写成 .sbs）
+
+用脚本搭 graph 时，每个 newNode / setPosition / setPropertyValue / newPropertyConnectionFromId
+都要穿到 SD 里一次，并且每改一下 UI 就刷新一次、撤销记录多一条。
+
+GraphBuilder 把这些操作先记成一串命令（不碰 SD）：
+1. 记录：node() / instance() / output() 建节点，connect() 连线，参数和位置随节点一起记下；
+2. 检查（validate）：连线两端是否属于本缓冲、同一输入端口是否连了两次、是否成环、
+   参数值类型是否合理（有 SchemaRegistry 时按属性的真实类型检查）——都在本地完成；
+3. 提交（commit）：在一个撤销组里按顺序回放，回放期间暂停主窗口刷新；
+   属性对象按节点定义共用（property_schema），和默认值相同的参数不写；
+4. 离线（to_sbs）：同一串命令也可以直接输出成 .sbs 的 XML，不需要打开 SD。
+
+用法：
+    from MaxSDPlugin.graph_builder import GraphBuilder
+
+    builder = GraphBuilder()
+    color = builder.node('sbs::compositing::uniform', (0, 0), {'outputcolor': (1.0, 0.5, 0.0, 1.0)})
+    hsl = builder.node('sbs::compositing::hsl', (150, 0), {'hue': 0.6})
+    out = builder.output('basecolor', (300, 0))
+    builder.connect(color, hsl, 'input1')
+    builder.connect(hsl, out)
+    nodes = builder.commit(graph)                 # 在 SD 里回放，返回新建的 SDNode 列表
+    builder.save_sbs('generated.sbs', 'MyGraph')  # 或者直接写成包
+
+参数值用普通 Python 值：float / int / bool / str，多分量写 tuple。
+离线输出时没有属性类型可查，按 Python 类型推断（0.5 是 Float1，(1, 2) 是 Int2），浮点参数请写成小数。
+"""
+
+import importlib
+import itertools
+import os
+from contextlib import contextmanager
+
+import sd
+from sd.api.sdproperty import SDPropertyCategory
+
+from MaxSDPlugin.node_snapshot import to_python
+from MaxSDPlugin.property_schema import SchemaRegistry
+
+try:
+    from sd.api.sdhistoryutils import SDHistoryUtils
+except ImportError:  # 较老的 SD 版本没有撤销组 API
+    SDHistoryUtils = None
+
+
+ATOMIC_PREFIX = 'sbs::compositing::'
+OUTPUT_DEFINITION = ATOMIC_PREFIX + 'output'
+OUTPUT_INPUT_PORT = 'inputNodeOutput'
+FILTER_OUTPUT = 'unique_filter_output'
+DEFAULT_INPUT_PORT = 'input1'
+
+# SDType.getId() -> (值类模块名, 值类名, sdbasetypes 里的基础类型名，None 表示普通 Python 类型)
+_VALUE_TYPES = {
+    'float': ('sdvaluefloat', 'SDValueFloat', None),
+    'float2': ('sdvaluefloat2', 'SDValueFloat2', 'float2'),
+    'float3': ('sdvaluefloat3', 'SDValueFloat3', 'float3'),
+    'float4': ('sdvaluefloat4', 'SDValueFloat4', 'float4'),
+    'int': ('sdvalueint', 'SDValueInt', None),
+    'int2': ('sdvalueint2', 'SDValueInt2', 'int2'),
+    'int3': ('sdvalueint3', 'SDValueInt3', 'int3'),
+    'int4': ('sdvalueint4', 'SDValueInt4', 'int4'),
+    'bool': ('sdvaluebool', 'SDValueBool', None),
+    'string': ('sdvaluestring', 'SDValueString', None),
+    'ColorRGBA': ('sdvaluecolorrgba', 'SDValueColorRGBA', 'ColorRGBA'),
+}
+_value_classes = {}
+
+
+def _components(type_id):
+    if type_id == 'ColorRGBA':
+        return 4
+    return int(type_id[-1]) if type_id[-1].isdigit() else 1
+
+
+def infer_type(value):
+    """按 Python 值推断 SDType id；不支持的值返回 None。"""
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, (tuple, list)) and 2 <= len(value) <= 4:
+        if all(isinstance(v, int) and not isinstance(v, bool) for v in value):
+            return 'int%d' % len(value)
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            return 'float%d' % len(value)
+    return None
+
+
+def _compatible(value, type_id):
+    inferred = infer_type(value)
+    if inferred is None or type_id not in _VALUE_TYPES:
+        return inferred is not None
+    if type_id in ('bool', 'string'):
+        return inferred == type_id
+    if inferred in ('bool', 'string'):
+        return False
+    # 整数可以写给浮点属性，反过来不行
+    if inferred.startswith('float') and type_id.startswith('int'):
+        return False
+    return _components(inferred) == _components(type_id)
+
+
+def _sd_value(type_id, value):
+    """普通 Python 值 -> SDValue 对象。"""
+    spec = _value_classes.get(type_id)
+    if spec is None:
+        module_name, class_name, base_name = _VALUE_TYPES[type_id]
+        value_cls = getattr(importlib.import_module('sd.api.' + module_name), class_name)
+        base_cls = getattr(importlib.import_module('sd.api.sdbasetypes'), base_name) if base_name else None
+        spec = _value_classes[type_id] = (value_cls, base_cls)
+    value_cls, base_cls = spec
+    if base_cls is None:
+        if type_id == 'float':
+            value = float(value)
+        elif type_id == 'int':
+            value = int(value)
+        return value_cls.sNew(value)
+    cast = float if type_id.startswith('float') or type_id == 'ColorRGBA' else int
+    return value_cls.sNew(base_cls(*[cast(v) for v in value]))
+
+
+class NodeRef(object):
+    """缓冲里的一个节点。只在建它的 GraphBuilder 里有效。"""
+
+    __slots__ = ('builder', 'index', 'definition', 'position', 'params', 'resource',
+                 'package_path', 'identifier')
+
+    def __init__(self, builder, index, definition, position, params):
+        self.builder = builder
+        self.index = index
+        self.definition = definition
+        self.position = position
+        self.params = params
+        self.resource = None         # 实例节点：SD 资源对象（在线）
+        self.package_path = None     # 实例节点：资源所在的包文件（离线输出 / 用包缓存池加载）
+        self.identifier = None       # 输出节点：graph 输出的 identifier
+
+    @property
+    def is_output(self):
+        return self.definition == OUTPUT_DEFINITION
+
+    @property
+    def is_instance(self):
+        return not self.definition.startswith(ATOMIC_PREFIX)
+
+    def set(self, prop_id, value):
+        self.params[prop_id] = value
+        return self
+
+    def at(self, x, y):
+        self.position = (float(x), float(y))
+        return self
+
+    def __repr__(self):
+        return 'NodeRef(%d, %r)' % (self.index, self.definition)
+
+
+class Connection(object):
+    __slots__ = ('source', 'target', 'port', 'output')
+
+    def __init__(self, source, target, port, output):
+        self.source = source
+        self.target = target
+        self.port = port
+        self.output = output
+
+
+class GraphBuilder(object):
+    """graph 编辑命令缓冲。registry 用来检查参数类型、在提交时共用属性对象，不给就新建一个。"""
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else SchemaRegistry()
+        self.nodes = []
+        self.connections = []
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def node(self, definition_id, position=None, params=None):
+        """原子节点，例如 'sbs::compositing::blend'。"""
+        ref = NodeRef(self, len(self.nodes), definition_id,
+                      tuple(float(v) for v in position) if position else None, dict(params or {}))
+        self.nodes.append(ref)
+        return ref
+
+    def instance(self, resource, position=None, params=None, package_path=None):
+        """实例节点。resource 是 SD 资源对象，或 'pkg:///graph' 形式的 url（这时需要 package_path）。"""
+        url = resource if isinstance(resource, str) else resource.getUrl()
+        ref = self.node(url, position, params)
+        ref.resource = None if isinstance(resource, str) else resource
+        ref.package_path = package_path
+        return ref
+
+    def output(self, identifier, position=None):
+        """graph 输出节点。"""
+        ref = self.node(OUTPUT_DEFINITION, position)
+        ref.identifier = identifier
+        return ref
+
+    def connect(self, source, target, port=None, output=None):
+        """把 source 的输出 output 连到 target 的输入 port。
+
+        port 不写时：输出节点是 inputNodeOutput，其他节点是 input1；
+        output 不写时用 source 的第一个输出（原子节点只有一个）。
+        """
+        if port is None:
+            port = OUTPUT_INPUT_PORT if isinstance(target, NodeRef) and target.is_output else DEFAULT_INPUT_PORT
+        connection = Connection(source, target, port, output)
+        self.connections.append(connection)
+        return connection
+
+    def __len__(self):
+        return len(self.nodes) + len(self.connections)
+
+    def layout(self, spacing_x=None, spacing_y=None, origin=(0.0, 0.0)):
+        """按连线自动给所有节点排位置（utilities/graph_layout.py 的分层排版），在提交 / 输出之前调用。"""
+        from utilities.graph_layout import DEFAULT_SPACING_X, DEFAULT_SPACING_Y, layered_layout
+
+        edges = [(c.source.index, c.target.index) for c in self.connections
+                 if self._owns(c.source) and self._owns(c.target)]
+        xs, ys = layered_layout(len(self.nodes), edges, origin=origin,
+                                spacing_x=spacing_x or DEFAULT_SPACING_X,
+                                spacing_y=spacing_y or DEFAULT_SPACING_Y)
+        for ref, x, y in zip(self.nodes, xs, ys):
+            ref.position = (x, y)
+        return self
+
+    # ------------------------------------------------------------------
+    # 本地检查
+    # ------------------------------------------------------------------
+    def _owns(self, ref):
+        return isinstance(ref, NodeRef) and ref.builder is self and self.nodes[ref.index] is ref
+
+    def validate(self):
+        """检查整个缓冲，返回问题列表（空列表表示没问题）。不访问 SD。"""
+        problems = []
+        for ref in self.nodes:
+            schema = self.registry.find(ref.definition)
+            for prop_id, value in ref.params.items():
+                info = schema.get(prop_id) if schema is not None else None
+                if info is None:
+                    if schema is not None and schema.complete:
+                        problems.append('节点 %d (%s) 没有参数 %s' % (ref.index, ref.definition, prop_id))
+                    elif infer_type(value) is None:
+                        problems.append('节点 %d 参数 %s 的值 %r 不是支持的类型' % (ref.index, prop_id, value))
+                elif not _compatible(value, info.type_id):
+                    problems.append('节点 %d 参数 %s 需要 %s，得到 %r' % (ref.index, prop_id, info.type_id, value))
+            if ref.is_output and not ref.identifier:
+                problems.append('输出节点 %d 没有 identifier' % ref.index)
+        identifiers = [ref.identifier for ref in self.nodes if ref.is_output]
+        for identifier in set(identifiers):
+            if identifiers.count(identifier) > 1:
+                problems.append('graph 输出 %s 重复' % identifier)
+
+        used_ports = set()
+        children = {}
+        for i, connection in enumerate(self.connections):
+            if not self._owns(connection.source) or not self._owns(connection.target):
+                problems.append('连线 %d 的端点不是本缓冲里的节点（悬空连线）' % i)
+                continue
+            if connection.source is connection.target:
+                problems.append('连线 %d 把节点 %d 连到了自己' % (i, connection.source.index))
+                continue
+            if connection.source.is_output:
+                problems.append('连线 %d 从输出节点 %d 连出' % (i, connection.source.index))
+            key = (connection.target.index, connection.port)
+            if key in used_ports:
+                problems.append('节点 %d 的输入 %s 连了不止一次' % key)
+            used_ports.add(key)
+            schema = self.registry.find(connection.target.definition)
+            info = schema.get(connection.port) if schema is not None else None
+            if schema is not None and schema.complete and info is None:
+                problems.append('节点 %d (%s) 没有输入端口 %s'
+                                % (connection.target.index, connection.target.definition, connection.port))
+            children.setdefault(connection.source.index, []).append(connection.target.index)
+        if self._has_cycle(children):
+            problems.append('连线成环')
+        return problems
+
+    def _has_cycle(self, children):
+        indegree = [0] * len(self.nodes)
+        for targets in children.values():
+            for target in targets:
+                indegree[target] += 1
+        queue = [i for i, degree in enumerate(indegree) if degree == 0]
+        visited = 0
+        while queue:
+            index = queue.pop()
+            visited += 1
+            for target in children.get(index, ()):
+                indegree[target] -= 1
+                if indegree[target] == 0:
+                    queue.append(target)
+        return visited != len(self.nodes)
+
+    def _check(self):
+        problems = self.validate()
+        if problems:
+            raise ValueError('命令缓冲检查失败：\n  ' + '\n  '.join(problems))
+
+    # ------------------------------------------------------------------
+    # 在 SD 里回放
+    # ------------------------------------------------------------------
+    def commit(self, graph, undo_name='MaxSDPlugin: 生成节点', pool=None):
+        """检查并在 graph 里回放整个缓冲（一个撤销组），返回新建的 SDNode 列表（和 self.nodes 一一对应）。
+
+        检查不通过时抛出 ValueError，graph 不会被改动。注册表里还没有某个定义的 schema 时，
+        validate 查不了它的参数名，要等节点建出来才知道；这时回放中途出错（参数名不存在、连线失败等）
+        会删掉这次已经建出的节点再抛出异常，graph 同样保持原样。
+        实例节点只给了 url 时，用 pool（package_pool.PackagePool）加载 package_path 找资源。
+        """
+        self._check()
+        if SDHistoryUtils is not None and undo_name:
+            with SDHistoryUtils.UndoGroup(undo_name), ui_updates_suspended():
+                return self._replay(graph, pool)
+        with ui_updates_suspended():
+            return self._replay(graph, pool)
+
+    def _replay(self, graph, pool):
+        created = []
+        acquired = []
+        try:
+            try:
+                for ref in self.nodes:
+                    created.append(self._create(graph, ref, pool, acquired))
+            finally:
+                for path in acquired:
+                    pool.release(path)
+            # 实例节点的 url 可能和 SD 里资源的 url 不完全一样（?dependency=..），让注册表自己取
+            schemas = [self.registry.schema_for(sd_node, None if ref.is_instance else ref.definition)
+                       for ref, sd_node in zip(self.nodes, created)]
+            # 先核对全部参数名，再开始设值
+            for ref, schema in zip(self.nodes, schemas):
+                for prop_id in ref.params:
+                    info = schema.get(prop_id)
+                    if info is None or info.prop is None:
+                        raise ValueError('节点 %s 没有参数 %s' % (ref.definition, prop_id))
+            self._apply(created, schemas)
+        except Exception:
+            for sd_node in created:
+                graph.deleteNode(sd_node)
+            raise
+        return created
+
+    def _apply(self, created, schemas):
+        from sd.api.sdbasetypes import float2
+
+        for ref, sd_node, schema in zip(self.nodes, created, schemas):
+            if ref.position is not None:
+                sd_node.setPosition(float2(*ref.position))
+            for prop_id, value in ref.params.items():
+                info = schema.get(prop_id)
+                if info.default is not None and _same(info.default, value):
+                    continue
+                sd_node.setPropertyValue(info.prop, _sd_value(info.type_id, value))
+            if ref.is_output:
+                info = schema.get('identifier', SDPropertyCategory.Annotation)
+                if info is not None and info.prop is not None:
+                    sd_node.setPropertyValue(info.prop, _sd_value('string', ref.identifier))
+        for connection in self.connections:
+            source = connection.source
+            output = connection.output
+            if output is None:
+                outputs = schemas[source.index].ids(SDPropertyCategory.Output)
+                output = outputs[0] if outputs else FILTER_OUTPUT
+            created[source.index].newPropertyConnectionFromId(
+                output, created[connection.target.index], connection.port)
+
+    @staticmethod
+    def _create(graph, ref, pool, acquired):
+        if not ref.is_instance:
+            return graph.newNode(ref.definition)
+        resource = ref.resource
+        if resource is None:
+            if pool is None or ref.package_path is None:
+                raise ValueError('实例节点 %s 需要资源对象，或者 package_path + pool' % ref.definition)
+            pool.acquire(ref.package_path)
+            acquired.append(ref.package_path)
+            resource = pool.find_resource(ref.package_path, ref.definition)
+            if resource is None:
+                raise ValueError('包 %s 里没有 %s' % (ref.package_path, ref.definition))
+        return graph.newInstanceNode(resource)
+
+    # ------------------------------------------------------------------
+    # 离线输出 .sbs
+    # ------------------------------------------------------------------
+    def to_sbs(self, graph_identifier='generated', base_dir=None, first_uid=1000000001):
+        """把缓冲写成一个只含一个 graph 的 .sbs 包（bytes）。检查不通过时抛出 ValueError。
+
+        实例节点的依赖文件名写成相对 base_dir 的路径（sbs:// 开头的库文件原样保留）。
+        """
+        self._check()
+        uids = itertools.count(first_uid)
+        dependencies = {}       # 包文件 -> 依赖 uid
+        node_uids = [next(uids) for _ in self.nodes]
+        outputs = [{} for _ in self.nodes]       # 每个节点：输出 identifier -> compOutput uid
+        graph_outputs = []      # (identifier, uid)
+        for ref in self.nodes:
+            if ref.is_instance:
+                if not ref.package_path:
+                    raise ValueError('离线输出实例节点 %s 需要 package_path' % ref.definition)
+                dependencies.setdefault(ref.package_path, next(uids))
+            elif not ref.is_output:
+                outputs[ref.index][FILTER_OUTPUT] = next(uids)
+        for connection in self.connections:
+            names = outputs[connection.source.index]
+            if connection.source.is_instance:
+                if connection.output is None:
+                    raise ValueError('实例节点 %s 的连线需要写明 output（graph 输出的 identifier）'
+                                     % connection.source.definition)
+                if connection.output not in names:
+                    names[connection.output] = next(uids)
+            elif connection.output not in (None, FILTER_OUTPUT):
+                raise ValueError('原子节点只有一个输出，不能连 %s' % connection.output)
+
+        out = ['<?xml version="1.0" encoding="UTF-8"?><package><identifier v="Unsaved Package"/>'
+               '<formatVersion v="1.1.0.202302"/><updaterVersion v="1.1.0.202302"/>'
+               '<fileUID v="{00000000-0000-0000-0000-000000000000}"/><versionUID v="0"/><dependencies>']
+        for path, uid in dependencies.items():
+            out.append('<dependency><filename v="%s"/><uid v="%d"/><type v="package"/>'
+                       '<fileUID v="0"/><versionUID v="0"/></dependency>'
+                       % (_attr(_dependency_filename(path, base_dir)), uid))
+        out.append('</dependencies><content><graph><identifier v="%s"/><uid v="%d"/>'
+                   % (_attr(graph_identifier), next(uids)))
+        node_xml = []
+        for ref in self.nodes:
+            if ref.is_output:
+                output_uid = next(uids)
+                graph_outputs.append((ref.identifier, output_uid))
+            node_xml.append(self._node_xml(ref, node_uids, outputs, dependencies,
+                                           output_uid if ref.is_output else None))
+        if graph_outputs:
+            out.append('<graphOutputs>')
+            for identifier, uid in graph_outputs:
+                out.append('<graphoutput><identifier v="%s"/><uid v="%d"/></graphoutput>'
+                           % (_attr(identifier), uid))
+            out.append('</graphOutputs>')
+        out.append('<compNodes>%s</compNodes><baseParameters/><root><rootOutputs>' % ''.join(node_xml))
+        for _identifier, uid in graph_outputs:
+            out.append('<rootOutput><output v="%d"/><format v="0"/><usertag v=""/></rootOutput>' % uid)
+        out.append('</rootOutputs></root></graph></content></package>')
+        return ''.join(out).encode('utf-8')
+
+    def _node_xml(self, ref, node_uids, outputs, dependencies, output_uid):
+        out = ['<compNode><uid v="%d"/>' % node_uids[ref.index]]
+        incoming = [c for c in self.connections if c.target is ref]
+        if incoming:
+            out.append('<connections>')
+            for connection in incoming:
+                names = outputs[connection.source.index]
+                out.append('<connection><identifier v="%s"/><connRef v="%d"/><connRefOutput v="%d"/></connection>'
+                           % (_attr(connection.port), node_uids[connection.source.index],
+                              names[connection.output or FILTER_OUTPUT]))
+            out.append('</connections>')
+        x, y = ref.position or (0.0, 0.0)
+        out.append('<GUILayout><gpos v="%s %s 0"/></GUILayout>' % (_number(x), _number(y)))
+        if outputs[ref.index]:
+            out.append('<compOutputs>')
+            for uid in outputs[ref.index].values():
+                out.append('<compOutput><uid v="%d"/><comptype v="1"/></compOutput>' % uid)
+            out.append('</compOutputs>')
+        out.append('<compImplementation>')
+        if ref.is_output:
+            out.append('<compOutputBridge><output v="%d"/></compOutputBridge>' % output_uid)
+        elif ref.is_instance:
+            path = ref.definition.split('?', 1)[0]
+            out.append('<compInstance><path v="%s?dependency=%d"/>%s<outputBridgings>'
+                       % (_attr(path), dependencies[ref.package_path], self._params_xml(ref)))
+            for name, uid in outputs[ref.index].items():
+                out.append('<outputBridging><uid v="%d"/><identifier v="%s"/></outputBridging>' % (uid, _attr(name)))
+            out.append('</outputBridgings></compInstance>')
+        else:
+            out.append('<compFilter><filter v="%s"/>%s</compFilter>'
+                       % (_attr(ref.definition[len(ATOMIC_PREFIX):]), self._params_xml(ref)))
+        out.append('</compImplementation></compNode>')
+        return ''.join(out)
+
+    def _params_xml(self, ref):
+        if not ref.params:
+            return '<parameters/>'
+        schema = self.registry.find(ref.definition)
+        out = ['<parameters>']
+        for prop_id, value in ref.params.items():
+            info = schema.get(prop_id) if schema is not None else None
+            type_id = info.type_id if info is not None and info.type_id in _VALUE_TYPES else infer_type(value)
+            out.append('<parameter><name v="%s"/><relativeTo v="0"/><paramValue><%s v="%s"/></paramValue></parameter>'
+                       % (_attr(prop_id.lstrip('$')), _value_tag(type_id), _attr(_value_text(type_id, value))))
+        out.append('</parameters>')
+        return ''.join(out)
+
+    def save_sbs(self, path, graph_identifier='generated'):
+        """to_sbs 的结果写进 path（先写临时文件再替换）。"""
+        data = self.to_sbs(graph_identifier, os.path.dirname(os.path.abspath(path)))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+
+def _same(default, value):
+    value = tuple(value) if isinstance(value, list) else value
+    if isinstance(default, tuple) and isinstance(value, tuple):
+        return len(default) == len(value) and all(abs(a - b) < 1e-9 for a, b in zip(default, value))
+    return to_python(default) == value
+
+
+@contextmanager
+def ui_updates_suspended():
+    """在 with 块里暂停主窗口刷新（拿不到主窗口时什么都不做）。
+
+    批量改 graph 时（回放、排版）用它包起来，结束后只刷新一次::
+
+        with ui_updates_suspended():
+            ...
+    """
+    window = None
+    try:
+        window = sd.getContext().getSDApplication().getQtForPythonUIMgr().getMainWindow()
+    except Exception:
+        window = None
+    if window is None:
+        yield
+        return
+    window.setUpdatesEnabled(False)
+    try:
+        yield
+    finally:
+        window.setUpdatesEnabled(True)
+
+
+def _value_tag(type_id):
+    if type_id in ('float', 'int'):
+        return 'constantValue%s1' % type_id.capitalize()
+    if type_id == 'bool':
+        return 'constantValueBool'
+    if type_id == 'string':
+        return 'constantValueString'
+    if type_id == 'ColorRGBA':
+        return 'constantValueFloat4'
+    return 'constantValue%s%s' % (type_id[:-1].capitalize(), type_id[-1])
+
+
+def _value_text(type_id, value):
+    if type_id == 'string':
+        return value
+    if type_id == 'bool':
+        return '1' if value else '0'
+    values = value if isinstance(value, (tuple, list)) else (value,)
+    if type_id.startswith('int'):
+        return ' '.join('%d' % int(v) for v in values)
+    return ' '.join(_number(v) for v in values)
+
+
+def _number(value):
+    return '%.9g' % float(value)
+
+
+def _attr(text):
+    return (str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            .replace('"', '&quot;'))
+
+
+def _dependency_filename(path, base_dir):
+    # sbs://xxx.sbs 是 SD 自带库里的文件；其他包按 SD 保存时的习惯写成相对路径
+    if path.startswith('sbs://') or base_dir is None:
+        return path.replace('\\', '/')
+    return os.path.relpath(os.path.abspath(path), base_dir).replace('\\', '/')
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""后台任务：批量文件处理放到线程 / 进程池里，只有少量 SD API 调用回到主线程分批执行
+
+PluginBasics.py 和 TestDialogMenu 的菜单回调直接在 Qt 主线程里运行，批量任务跑多久 SD 就卡多久。
+SD 的 API 只能在主线程调用，但批处理的大部分时间其实花在纯文件操作上（解析、lint、生成变体），
+这些完全可以放到后台。
+
+JobRunner 的分工：
+- 后台（线程池或进程池）：对每个条目执行 job.work(条目)，比如解析一个 .sbs；
+  同时在途的条目数有上限，取消时不再提交新条目，已排队的直接取消；
+- 主线程：pump() 每次只花几毫秒，把后台完成的结果取出来，按 job.apply_chunk 个一批调用 job.apply(批)
+  （这里才调用 SD API），再通知进度监听者。在 SD 里由 QTimer 定时调用 pump，事件循环始终不被阻塞。
+- 结果面板（results_panel）：进度条、取消按钮、每个条目的状态表格，第一次打开时才 import Qt。
+
+用法：
+    from MaxSDPlugin.job_runner import Job, JobRunner, results_panel
+
+    def apply(batch):                    # 主线程里调用，batch 是 [(条目, 结果), ...]
+        for path, findings in batch:
+            ...                          # 需要 SD API 的部分
+    job = Job('检查材质库', paths, work=lint_one, apply=apply)
+    handle = JobRunner().submit(job)
+    results_panel(handle, parent=main_window).show()   # 面板自带 QTimer 驱动 pump
+
+不在 SD 里（命令行、测试）时，用 handle.wait() 代替 QTimer。
+work 要能被 pickle（模块级函数）才能用进程池（use_processes=True）。SD 内嵌的 Python 里，
+进程池需要用 python_executable 指定一个真正的 python.exe，否则子进程会启动 SD 本身。
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+STATE_PENDING = 'pending'
+STATE_RUNNING = 'running'
+STATE_CANCELLING = 'cancelling'
+STATE_CANCELLED = 'cancelled'
+STATE_DONE = 'done'
+
+_FINISHED = object()
+
+
+class Job(object):
+    """一个批处理任务的描述。
+
+    参数:
+        items: 要处理的条目（一般是文件路径）
+        work: 后台执行的函数 work(条目) -> 结果；抛出异常只算这个条目失败
+        apply: 主线程里执行的函数 apply([(条目, 结果), ...])，可以调用 SD API；None 表示不需要
+        apply_chunk: 每次 apply 的最大条目数
+        initializer / initargs: 每个后台线程 / 进程启动时执行一次（和 sbs_lint 等工具的 _init_worker 一样）
+    """
+
+    def __init__(self, name, items, work, apply=None, apply_chunk=32, initializer=None, initargs=()):
+        self.name = name
+        self.items = list(items)
+        self.work = work
+        self.apply = apply
+        self.apply_chunk = apply_chunk
+        self.initializer = initializer
+        self.initargs = initargs
+
+
+class JobHandle(object):
+    """提交后的任务：状态、进度、结果，以及取消。除了 cancel 之外的方法都应在主线程调用。"""
+
+    def __init__(self, job):
+        self.job = job
+        self.state = STATE_PENDING
+        self.total = len(job.items)
+        self.completed = 0
+        self.results = []          # [(条目, 结果)]
+        self.errors = []           # [(条目, 错误信息)]
+        self.started = None
+        self.finished = None
+        self._queue = queue.SimpleQueue()
+        self._cancel = threading.Event()
+        self._pending_apply = []
+        self._progress_listeners = []
+        self._finished_listeners = []
+
+    # ------------------------------------------------------------------
+    # 监听
+    # ------------------------------------------------------------------
+    def on_progress(self, callback):
+        """callback(handle, 新完成的 [(条目, 是否成功, 结果或错误)])，在主线程调用。
+
+        work 成功但 apply 失败的条目会先以成功、再以失败各出现一次。
+        """
+        self._progress_listeners.append(callback)
+        return callback
+
+    def on_finished(self, callback):
+        """callback(handle)，任务结束（完成或取消）时在主线程调用一次。"""
+        self._finished_listeners.append(callback)
+        return callback
+
+    # ------------------------------------------------------------------
+    # 控制
+    # ------------------------------------------------------------------
+    def cancel(self):
+        """请求取消：不再提交新条目，排队的条目丢弃，正在执行的条目做完为止。任何线程都可以调用。"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def active(self):
+        return self.state in (STATE_PENDING, STATE_RUNNING, STATE_CANCELLING)
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    def pump(self, budget=0.008):
+        """在主线程调用：最多花 budget 秒取结果、执行 apply、通知进度。返回任务是否还在进行。"""
+        if not self.active:
+            return False
+        deadline = time.perf_counter() + budget
+        fresh = []
+        done = False
+        while time.perf_counter() < deadline:
+            try:
+                message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if message is _FINISHED:
+                done = True
+                break
+            item, ok, value = message
+            self.completed += 1
+            fresh.append(message)
+            if ok:
+                entry = (item, value)
+                self.results.append(entry)
+                if self.job.apply is not None:
+                    self._pending_apply.append(entry)
+            else:
+                self.errors.append((item, value))
+            if len(self._pending_apply) >= self.job.apply_chunk:
+                self._apply(fresh)
+        if self._cancel.is_set() and self.state == STATE_RUNNING:
+            self.state = STATE_CANCELLING
+        if done:
+            while self._pending_apply:
+                self._apply(fresh)
+        elif self._pending_apply and time.perf_counter() < deadline:
+            self._apply(fresh)
+        if fresh:
+            for callback in self._progress_listeners:
+                callback(self, fresh)
+        if done:
+            self.state = STATE_CANCELLED if self._cancel.is_set() else STATE_DONE
+            self.finished = time.perf_counter()
+            for callback in self._finished_listeners:
+                callback(self)
+            return False
+        return True
+
+    def _apply(self, fresh):
+        batch, self._pending_apply = self._pending_apply[:self.job.apply_chunk], \
+            self._pending_apply[self.job.apply_chunk:]
+        if not batch:
+            return
+        try:
+            self.job.apply(batch)
+        except Exception as e:
+            # 这一批改算失败：从 results 移到 errors，同一个条目不会既算成功又算失败
+            message = 'apply 失败: %s' % e
+            failed = {id(entry) for entry in batch}
+            self.results = [entry for entry in self.results if id(entry) not in failed]
+            for item, _result in batch:
+                self.errors.append((item, message))
+                fresh.append((item, False, message))
+
+    def wait(self, poll=0.01):
+        """不在 Qt 事件循环里时（命令行 / 测试）：一直 pump 到任务结束。"""
+        while self.pump(budget=poll):
+            time.sleep(poll)
+        return self
+
+
+class JobRunner(object):
+    """线程池（默认）或进程池执行 Job。每个 submit 用自己的池，任务结束后池就关闭。"""
+
+    def __init__(self, max_workers=None, use_processes=False, python_executable=None, max_in_flight=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        self.python_executable = python_executable
+        self.max_in_flight = max_in_flight or self.max_workers * 4
+
+    def _executor(self, job):
+        if self.use_processes:
+            if self.python_executable:
+                import multiprocessing
+                multiprocessing.set_executable(self.python_executable)
+            return ProcessPoolExecutor(max_workers=self.max_workers, initializer=job.initializer,
+                                       initargs=job.initargs)
+        return ThreadPoolExecutor(max_workers=self.max_workers, initializer=job.initializer,
+                                  initargs=job.initargs, thread_name_prefix='MaxSDJob')
+
+    def submit(self, job):
+        """在后台开始执行，立即返回 JobHandle。"""
+        handle = JobHandle(job)
+        handle.state = STATE_RUNNING
+        handle.started = time.perf_counter()
+        thread = threading.Thread(target=self._dispatch, args=(handle,), name='MaxSDJobDispatch', daemon=True)
+        thread.start()
+        return handle
+
+    def _dispatch(self, handle):
+        # 分发线程：按在途上限逐个提交条目，结果通过队列交给主线程
+        job = handle.job
+        slots = threading.Semaphore(self.max_in_flight)
+        futures = []
+
+        def done(future, item):
+            if future.cancelled():
+                pass
+            else:
+                error = future.exception()
+                if error is None:
+                    handle._queue.put((item, True, future.result()))
+                else:
+                    handle._queue.put((item, False, '%s: %s' % (type(error).__name__, error)))
+            slots.release()
+
+        try:
+            with self._executor(job) as pool:
+                for item in job.items:
+                    while not slots.acquire(timeout=0.05):
+                        if handle._cancel.is_set():
+                            break
+                    if handle._cancel.is_set():
+                        break
+                    future = pool.submit(job.work, item)
+                    future.add_done_callback(lambda f, item=item: done(f, item))
+                    futures.append(future)
+                if handle._cancel.is_set():
+                    for future in futures:
+                        future.cancel()
+        except Exception as e:
+            handle._queue.put((None, False, '任务启动失败: %s' % e))
+        finally:
+            handle._queue.put(_FINISHED)
+
+
+# ----------------------------------------------------------------------
+# 结果面板（Qt，第一次打开时才 import）
+# ----------------------------------------------------------------------
+def results_panel(handle, parent=None, interval_ms=30):
+    """创建任务面板（QDialog）：进度条、状态、取消按钮、失败条目表格。面板里的 QTimer 负责调用 pump。"""
+    try:
+        from PySide2 import QtCore, QtWidgets
+    except ImportError:
+        from PySide6 import QtCore, QtWidgets
+
+    dialog = QtWidgets.QDialog(parent)
+    dialog.setWindowTitle(handle.job.name)
+    layout = QtWidgets.QVBoxLayout(dialog)
+    status = QtWidgets.QLabel('准备中...')
+    progress = QtWidgets.QProgressBar()
+    progress.setRange(0, max(handle.total, 1))
+    table = QtWidgets.QTableWidget(0, 2)
+    table.setHorizontalHeaderLabels(['条目', '结果'])
+    table.horizontalHeader().setStretchLastSection(True)
+    cancel = QtWidgets.QPushButton('取消')
+    cancel.clicked.connect(handle.cancel)
+    for widget in (status, progress, table, cancel):
+        layout.addWidget(widget)
+
+    def show_progress(h, fresh):
+        progress.setValue(h.completed)
+        status.setText('%d / %d，失败 %d，%.1fs' % (h.completed, h.total, len(h.errors), h.elapsed))
+        for item, ok, value in fresh:
+            if ok:
+                continue
+            row = table.rowCount()
+            table.insertRow(row)
+            table.setItem(row, 0, QtWidgets.QTableWidgetItem(str(item)))
+            table.setItem(row, 1, QtWidgets.QTableWidgetItem(str(value)))
+
+    def show_finished(h):
+        timer.stop()
+        cancel.setEnabled(False)
+        word = '已取消' if h.state == STATE_CANCELLED else '完成'
+        status.setText('%s：%d / %d，失败 %d，用时 %.1fs' % (word, h.completed, h.total, len(h.errors), h.elapsed))
+
+    handle.on_progress(show_progress)
+    handle.on_finished(show_finished)
+    timer = QtCore.QTimer(dialog)
+    timer.timeout.connect(lambda: handle.pump())
+    timer.start(interval_ms)
+    dialog.finished.connect(lambda _code: handle.cancel())
+    return dialog
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""节点属性快照：一次读完、本地修改、只把变化的值写回
+
+Part1 教程（方法5 ~ 方法9）里改一个属性要这样写：
+    prop = node.getPropertyFromId('hue', SDPropertyCategory.Input)
+    node.setPropertyValue(prop, SDValueFloat.sNew(0.5))
+每个调用都要从 Python 穿到 SD 的 C++ 里再回来。脚本要处理几千个节点时，
+几乎所有时间都花在这些来回上，而且很多 setPropertyValue 设的其实是原来的值，还会触发重新计算。
+
+本模块把读写分成三步：
+1. 读（NodeSnapshot.read）：对一组节点各走一遍，把输入属性的值转换成普通 Python 值
+   （float / int / bool / str，float2 / float4 / ColorRGBA 等转成 tuple），连同属性对象一起缓存。
+2. 改（snapshot.set / state['hue'] = 0.7）：只改快照里的值，不碰 SD。读也直接读快照。
+3. 提交（snapshot.commit）：只对“值真的变了”的属性调用 setPropertyValue，
+   并且放进一个撤销组里，Ctrl+Z 一次就能全部撤销。
+
+用法：
+    from MaxSDPlugin.node_snapshot import NodeSnapshot
+
+    nodes = ui_mgr.getCurrentGraphSelectedNodes()
+    snapshot = NodeSnapshot.read(nodes, prop_ids=('hue', 'saturation', 'luminosity'))
+    for state in snapshot:
+        state['hue'] = min(state['hue'] + 0.1, 1.0)
+    print(snapshot.dirty())          # [(节点 identifier, 属性 id, 旧值, 新值), ...]
+    snapshot.commit('批量调整 Hue')  # 返回实际写回的属性个数
+
+离线测试时可以把 MaxSDPlugins/fake_sd 加进 sys.path，用假的 sd 模块运行（见 benchmarks/）。
+"""
+
+from sd.api.sdproperty import SDPropertyCategory
+
+try:
+    from sd.api.sdhistoryutils import SDHistoryUtils
+except ImportError:  # 较老的 SD 版本没有撤销组 API
+    SDHistoryUtils = None
+
+
+_PLAIN_TYPES = (bool, int, float, str)
+# 基础向量类型的分量名，按顺序尝试
+_FIELD_SETS = (('x', 'y', 'z', 'w'), ('r', 'g', 'b', 'a'))
+_fields_cache = {}
+
+
+def _fields_of(base_cls, raw):
+    fields = _fields_cache.get(base_cls)
+    if fields is None:
+        for candidates in _FIELD_SETS:
+            fields = tuple(name for name in candidates if hasattr(raw, name))
+            if fields:
+                break
+        _fields_cache[base_cls] = fields
+    return fields
+
+
+def to_python(raw):
+    """SD 基础值 -> 普通 Python 值（向量类型转成 tuple）。"""
+    if raw is None or isinstance(raw, _PLAIN_TYPES):
+        return raw
+    fields = _fields_of(type(raw), raw)
+    if not fields:
+        return raw
+    return tuple(getattr(raw, name) for name in fields)
+
+
+def from_python(value, base_cls):
+    """普通 Python 值 -> SD 基础值（按读取时记下的基础类型还原）。"""
+    if base_cls in _PLAIN_TYPES:
+        return base_cls(value)
+    if isinstance(value, (tuple, list)):
+        return base_cls(*value)
+    return value
+
+
+class PropertySlot(object):
+    """快照里的一个属性：属性对象、值类型、读取时的值和当前（可能被修改过的）值。"""
+
+    __slots__ = ('prop', 'value_cls', 'base_cls', 'original', 'value')
+
+    def __init__(self, prop, value_cls, base_cls, value):
+        self.prop = prop
+        self.value_cls = value_cls
+        self.base_cls = base_cls
+        self.original = value
+        self.value = value
+
+    @property
+    def dirty(self):
+        return self.value != self.original
+
+
+class NodeState(object):
+    """一个节点的快照。可以像 dict 一样按属性 id 读写：state['hue'] = 0.7"""
+
+    def __init__(self, node, identifier, definition_id, slots):
+        self.node = node
+        self.identifier = identifier
+        self.definition_id = definition_id
+        self.slots = slots
+
+    def __getitem__(self, prop_id):
+        return self.slots[prop_id].value
+
+    def __setitem__(self, prop_id, value):
+        slot = self.slots.get(prop_id)
+        if slot is None:
+            raise KeyError('节点 %s 没有可写的输入属性 %r' % (self.identifier, prop_id))
+        if isinstance(slot.original, tuple):
+            value = tuple(value)
+            if len(value) != len(slot.original):
+                raise ValueError('属性 %s 需要 %d 个分量' % (prop_id, len(slot.original)))
+        slot.value = value
+
+    def __contains__(self, prop_id):
+        return prop_id in self.slots
+
+    def get(self, prop_id, default=None):
+        slot = self.slots.get(prop_id)
+        return slot.value if slot is not None else default
+
+    def values(self):
+        return {prop_id: slot.value for prop_id, slot in self.slots.items()}
+
+    def dirty_ids(self):
+        return [prop_id for prop_id, slot in self.slots.items() if slot.dirty]
+
+
+class NodeSnapshot(object):
+    """一组节点的属性快照。"""
+
+    def __init__(self, states):
+        self.states = states
+        self._by_identifier = {state.identifier: state for state in states}
+
+    @classmethod
+    def read(cls, nodes, prop_ids=None, registry=None):
+        """读取节点的输入属性。
+
+        prop_ids 为 None 时读取全部输入属性；给出 id 列表时只读这些（节点没有的 id 跳过），
+        调用次数更少。没有值的属性（比如图像输入端口）不进快照。
+        registry 是 property_schema.SchemaRegistry：给出时同定义的节点共用属性描述，
+        不再对每个节点 getProperties / getPropertyFromId。
+        """
+        if registry is not None:
+            from MaxSDPlugin.property_schema import schema_key   # property_schema 反过来依赖本模块
+        states = []
+        for node in nodes:
+            definition_id = node.getDefinition().getId()
+            if registry is not None:
+                schema = registry.schema_for(node, schema_key(node, definition_id))
+                if prop_ids is None:
+                    props = [(info.id, info.prop) for info in schema.of_category(SDPropertyCategory.Input)]
+                else:
+                    props = [(prop_id, getattr(schema.get(prop_id), 'prop', None)) for prop_id in prop_ids]
+            elif prop_ids is None:
+                props = [(prop.getId(), prop) for prop in node.getProperties(SDPropertyCategory.Input)]
+            else:
+                props = [(prop_id, node.getPropertyFromId(prop_id, SDPropertyCategory.Input))
+                         for prop_id in prop_ids]
+            slots = {}
+            for prop_id, prop in props:
+                if prop is None:
+                    continue
+                sd_value = node.getPropertyValue(prop)
+                if sd_value is None:
+                    continue
+                raw = sd_value.get()
+                slots[prop_id] = PropertySlot(prop, type(sd_value), type(raw), to_python(raw))
+            states.append(NodeState(node, node.getIdentifier(), definition_id, slots))
+        return cls(states)
+
+    def __iter__(self):
+        return iter(self.states)
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, key):
+        """按节点 identifier 或下标取 NodeState。"""
+        if isinstance(key, int):
+            return self.states[key]
+        return self._by_identifier[key]
+
+    def get(self, identifier, prop_id, default=None):
+        state = self._by_identifier.get(identifier)
+        return state.get(prop_id, default) if state is not None else default
+
+    def set(self, identifier, prop_id, value):
+        self._by_identifier[identifier][prop_id] = value
+
+    def dirty(self):
+        """所有改过的属性：[(节点 identifier, 属性 id, 旧值, 新值), ...]"""
+        result = []
+        for state in self.states:
+            for prop_id in state.dirty_ids():
+                slot = state.slots[prop_id]
+                result.append((state.identifier, prop_id, slot.original, slot.value))
+        return result
+
+    def commit(self, undo_name='MaxSDPlugin: 批量修改属性'):
+        """把变化的值写回 SD，返回写回的属性个数。写完后快照的“原值”更新为新值。"""
+        pending = [(state, slot) for state in self.states
+                   for slot in state.slots.values() if slot.dirty]
+        if not pending:
+            return 0
+        if SDHistoryUtils is not None and undo_name:
+            with SDHistoryUtils.UndoGroup(undo_name):
+                self._write(pending)
+        else:
+            self._write(pending)
+        return len(pending)
+
+    @staticmethod
+    def _write(pending):
+        for state, slot in pending:
+            sd_value = slot.value_cls.sNew(from_python(slot.value, slot.base_cls))
+            state.node.setPropertyValue(slot.prop, sd_value)
+            slot.original = slot.value
+
+    def discard(self):
+        """放弃所有没提交的修改。"""
+        for state in self.states:
+            for slot in state.slots.values():
+                slot.value = slot.original
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""用户包缓存池：加载过的 .sbs / .sbsar 留在内存里，按引用计数 + LRU 卸载
+
+Part1 教程方法2、方法3 每次要用一个外部包都这样写：
+    pkg = pkg_mgr.loadUserPackage(path)
+    res = pkg.findResourceFromUrl('Substance_graph')
+    graph.newInstanceNode(res)
+    pkg_mgr.unloadUserPackage(pkg)
+批量工具往几百个 graph 里插同一个 .sbsar 时，这个包就被加载、卸载几百次，
+加载一个大 .sbsar 要几百毫秒，时间几乎都花在这里。
+
+PackagePool 的做法：
+- acquire / release 带引用计数：正在用的包（引用数 > 0）永远不会被卸载；
+- 用完的包不马上卸载，留在池里，下次同一路径直接返回；
+- 超出预算（包个数 max_packages，或文件大小之和 max_bytes，SD 不提供包的内存占用，用文件大小估算）时，
+  按最近最少使用（LRU）的顺序卸载没有引用的包；
+- findResourceFromUrl 的结果按包缓存；
+- 用户自己在 SD 里打开的包（不是池加载的）直接复用，池不会卸载它；
+- stats() 给出加载次数、命中次数和估计省下的时间（命中次数 x 平均加载耗时）。
+
+用法：
+    from MaxSDPlugin.package_pool import PackagePool
+
+    pool = PackagePool(max_packages=8)
+    for graph in graphs:
+        with pool.package(sbsar_path) as pkg:
+            graph.newInstanceNode(pool.find_resource(sbsar_path, 'Substance_graph'))
+    print(pool.stats())    # {'loads': 1, 'hits': 199, 'saved_seconds': 59.7, ...}
+    pool.clear()           # 卸载池加载的所有包
+"""
+
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import sd
+
+
+class PooledPackage(object):
+    """池里的一个包：SD 包对象、引用计数、资源缓存。owned 为 False 表示包不是池加载的。"""
+
+    __slots__ = ('path', 'package', 'refs', 'size', 'owned', 'resources')
+
+    def __init__(self, path, package, size, owned):
+        self.path = path
+        self.package = package
+        self.refs = 0
+        self.size = size
+        self.owned = owned
+        self.resources = {}
+
+
+def _normalize(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class PackagePool(object):
+    """按路径缓存已加载的用户包。max_packages / max_bytes 为 None 表示不限制。"""
+
+    def __init__(self, pkg_mgr=None, max_packages=8, max_bytes=None):
+        if pkg_mgr is None:
+            pkg_mgr = sd.getContext().getSDApplication().getPackageMgr()
+        self.pkg_mgr = pkg_mgr
+        self.max_packages = max_packages
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()      # 规范化路径 -> PooledPackage，末尾是最近使用的
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.resource_hits = 0
+        self.resource_misses = 0
+        self.load_seconds = 0.0
+
+    # ------------------------------------------------------------------
+    # 引用计数
+    # ------------------------------------------------------------------
+    def acquire(self, path):
+        """返回 path 对应的 SD 包并增加一次引用；用完必须 release(path)。加载失败抛出 RuntimeError。"""
+        key = _normalize(path)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            entry = self._open(path, key)
+            self._entries[key] = entry
+        entry.refs += 1
+        self._evict()
+        return entry.package
+
+    def release(self, path):
+        """归还一次引用。引用数为 0 的包留在池里，超出预算时才卸载。"""
+        entry = self._entries.get(_normalize(path))
+        if entry is None or entry.refs == 0:
+            raise ValueError('包没有被 acquire: %s' % path)
+        entry.refs -= 1
+        self._evict()
+
+    @contextmanager
+    def package(self, path):
+        """with pool.package(path) as pkg: ...  退出时自动 release。"""
+        package = self.acquire(path)
+        try:
+            yield package
+        finally:
+            self.release(path)
+
+    def find_resource(self, path, url):
+        """包里的资源（findResourceFromUrl 的结果按包缓存）。包必须已经 acquire。"""
+        entry = self._entries.get(_normalize(path))
+        if entry is None or entry.refs == 0:
+            raise ValueError('查找资源前需要先 acquire 包: %s' % path)
+        if url in entry.resources:
+            self.resource_hits += 1
+            return entry.resources[url]
+        self.resource_misses += 1
+        resource = entry.package.findResourceFromUrl(url)
+        entry.resources[url] = resource
+        return resource
+
+    # ------------------------------------------------------------------
+    # 加载 / 卸载
+    # ------------------------------------------------------------------
+    def _open(self, path, key):
+        # SD 里已经打开的同一个包直接复用，不由池卸载
+        for package in self.pkg_mgr.getUserPackages():
+            file_path = package.getFilePath()
+            if file_path and _normalize(file_path) == key:
+                return PooledPackage(path, package, 0, False)
+        started = time.perf_counter()
+        package = self.pkg_mgr.loadUserPackage(path)
+        elapsed = time.perf_counter() - started
+        if package is None:
+            raise RuntimeError('加载包失败: %s' % path)
+        self.loads += 1
+        self.load_seconds += elapsed
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        return PooledPackage(path, package, size, True)
+
+    def _over_budget(self):
+        if self.max_packages is not None and len(self._entries) > self.max_packages:
+            return True
+        if self.max_bytes is not None:
+            return sum(entry.size for entry in self._entries.values()) > self.max_bytes
+        return False
+
+    def _evict(self):
+        # 从最久没用的开始，只卸载没有引用的包；都在用时允许暂时超出预算
+        while self._over_budget():
+            victim = next((key for key, entry in self._entries.items() if entry.refs == 0), None)
+            if victim is None:
+                return
+            self._unload(self._entries.pop(victim))
+            self.evictions += 1
+
+    def _unload(self, entry):
+        if entry.owned:
+            self.pkg_mgr.unloadUserPackage(entry.package)
+
+    def clear(self):
+        """卸载池里所有没有引用的包，返回卸载的个数。插件卸载（uninitializeSDPlugin）时调用。"""
+        idle = [key for key, entry in self._entries.items() if entry.refs == 0]
+        for key in idle:
+            self._unload(self._entries.pop(key))
+        return len(idle)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def stats(self):
+        average = self.load_seconds / self.loads if self.loads else 0.0
+        return {'packages': len(self._entries), 'in_use': sum(1 for e in self._entries.values() if e.refs),
+                'loads': self.loads, 'hits': self.hits, 'evictions': self.evictions,
+                'resource_hits': self.resource_hits, 'resource_misses': self.resource_misses,
+                'load_seconds': self.load_seconds, 'saved_seconds': self.hits * average}
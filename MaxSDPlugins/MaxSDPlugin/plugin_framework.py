@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""轻量插件框架：启动时只登记菜单，对话框、重量级 import、SD 查询都推迟到第一次使用
+
+Part1 的 __init__.py 和 SubstanceDesignerPart2 在 import 时就做了很多事：
+sd.getContext()、getCurrentGraph()、创建 QDialog、import QtUiTools……
+SD 启动时会依次 import 每个插件，这些开销全部算在启动时间里，装的插件越多启动越慢，
+而用户这次打开 SD 可能根本不会点这些菜单。
+
+这里的做法：
+- Plugin.action(文字, 'module:function')：菜单项在 initializeSDPlugin 时创建（很便宜），
+  回调写成字符串，第一次点击时才 import 对应模块；
+- lazy(factory) / plugin.dialog(factory)：对话框等对象第一次用到时才创建，之后复用；
+- app() / ui_mgr() / pkg_mgr()：SD 对象第一次用到时才查询，之后缓存；
+- profiler：记录每个插件的 import 耗时、initializeSDPlugin 耗时、每个菜单回调第一次执行的耗时，
+  report() 按耗时排序打印；install_import_timer() 还能统计每个模块（含嵌套 import）的 import 耗时。
+
+用法（插件包的 __init__.py）：
+    from MaxSDPlugin.plugin_framework import Plugin
+
+    plugin = Plugin('MyPlugin', menu_title='My Plugin')
+    plugin.action('自动排版', 'MyPlugin.layout:run')
+    plugin.action('打开设置', lambda: settings_dialog().show())
+    settings_dialog = plugin.dialog(lambda: SettingsDialog(plugin.main_window()))
+
+    def initializeSDPlugin():
+        plugin.initialize()
+
+    def uninitializeSDPlugin():
+        plugin.uninitialize()
+
+离线测量各个插件的启动开销见 benchmarks/profile_startup.py。
+"""
+
+import importlib
+import importlib.abc
+import sys
+import time
+from contextlib import contextmanager
+
+import sd
+
+
+_NOT_LOADED = object()
+
+
+def _import_qt_widgets():
+    # SD 版本不同，内置的可能是 PySide2 或 PySide6；QAction 在 PySide6 里挪到了 QtGui
+    try:
+        from PySide2 import QtWidgets
+        return QtWidgets, QtWidgets.QAction
+    except ImportError:
+        pass
+    try:
+        from PySide6 import QtGui, QtWidgets
+        return QtWidgets, QtGui.QAction
+    except ImportError:
+        return None, None
+
+
+class Lazy(object):
+    """第一次调用时执行 factory()，之后一直返回同一个结果；reset() 后下次再重新创建。"""
+
+    __slots__ = ('factory', '_value')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._value = _NOT_LOADED
+
+    def __call__(self):
+        if self._value is _NOT_LOADED:
+            self._value = self.factory()
+        return self._value
+
+    @property
+    def loaded(self):
+        return self._value is not _NOT_LOADED
+
+    def reset(self):
+        self._value = _NOT_LOADED
+
+
+def lazy(factory):
+    return Lazy(factory)
+
+
+def lazy_import(module_name):
+    """lazy_import('PySide2.QtUiTools')() 第一次调用时才 import。"""
+    return Lazy(lambda: importlib.import_module(module_name))
+
+
+# SD 对象：第一次用到时才查询
+app = Lazy(lambda: sd.getContext().getSDApplication())
+ui_mgr = Lazy(lambda: app().getQtForPythonUIMgr())
+pkg_mgr = Lazy(lambda: app().getPackageMgr())
+
+
+def resolve(target):
+    """'package.module:attr' -> 对象（会 import 模块）；可调用对象原样返回。"""
+    if callable(target):
+        return target
+    module_name, sep, attr = target.partition(':')
+    if not sep:
+        raise ValueError('回调应写成 "模块:函数"，得到 %r' % target)
+    obj = importlib.import_module(module_name)
+    for name in attr.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+# ----------------------------------------------------------------------
+# 启动耗时统计
+# ----------------------------------------------------------------------
+class StartupProfiler(object):
+    """{插件名: {阶段: 秒}}，阶段有 import / initialize / first:<菜单文字> 等。"""
+
+    def __init__(self):
+        self.phases = {}
+        self.imports = {}        # 模块名 -> (自身耗时, 含嵌套 import 的总耗时)
+
+    def record(self, plugin, phase, seconds):
+        self.phases.setdefault(plugin, {})[phase] = seconds
+
+    @contextmanager
+    def timed(self, plugin, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(plugin, phase, time.perf_counter() - started)
+
+    def startup_seconds(self, plugin):
+        phases = self.phases.get(plugin, {})
+        return phases.get('import', 0.0) + phases.get('initialize', 0.0)
+
+    def report(self, top_imports=10):
+        """返回报告文本：每个插件的启动耗时（import + initialize），以及最慢的模块 import。"""
+        lines = ['%-24s %10s %12s %10s' % ('插件', 'import', 'initialize', '合计')]
+        for plugin in sorted(self.phases, key=self.startup_seconds, reverse=True):
+            phases = self.phases[plugin]
+            lines.append('%-24s %9.1fms %11.1fms %9.1fms'
+                         % (plugin, phases.get('import', 0.0) * 1000, phases.get('initialize', 0.0) * 1000,
+                            self.startup_seconds(plugin) * 1000))
+            for phase, seconds in sorted(phases.items()):
+                if phase.startswith('first:'):
+                    lines.append('    第一次使用 %-20s %.1fms' % (phase[len('first:'):], seconds * 1000))
+        if self.imports and top_imports:
+            lines.append('最慢的 import（自身 / 含嵌套）：')
+            slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+            for name, (own, total) in slowest[:top_imports]:
+                lines.append('    %-40s %7.1fms %8.1fms' % (name, own * 1000, total * 1000))
+        return '\n'.join(lines)
+
+
+profiler = StartupProfiler()
+
+
+class _TimingLoader(importlib.abc.Loader):
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer._enter()
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer._leave(module.__name__, time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        # get_source / is_package 等其他方法交给原 loader
+        return getattr(self.loader, name)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """放在 sys.meta_path 最前面，统计之后每个模块 import 的耗时（类似 python -X importtime）。"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._children = []      # 栈：每层嵌套 import 的子模块总耗时
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimingLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _enter(self):
+        self._children.append(0.0)
+
+    def _leave(self, name, total):
+        children = self._children.pop()
+        self.profiler.imports[name] = (total - children, total)
+        if self._children:
+            self._children[-1] += total
+
+
+def install_import_timer():
+    """开始统计模块 import 耗时（越早调用，统计到的插件越多）。返回 ImportTimer，用 remove_import_timer 移除。"""
+    timer = ImportTimer(profiler)
+    sys.meta_path.insert(0, timer)
+    return timer
+
+
+def remove_import_timer(timer):
+    if timer in sys.meta_path:
+        sys.meta_path.remove(timer)
+
+
+# ----------------------------------------------------------------------
+# 插件
+# ----------------------------------------------------------------------
+class Action(object):
+    __slots__ = ('label', 'target', 'shortcut', 'qt_action', 'used')
+
+    def __init__(self, label, target, shortcut=None):
+        self.label = label
+        self.target = target
+        self.shortcut = shortcut
+        self.qt_action = None
+        self.used = False
+
+
+class Plugin(object):
+    """一个插件：一个顶级菜单 + 若干延迟加载的菜单项。创建本对象本身几乎没有开销。"""
+
+    def __init__(self, name, menu_title=None):
+        self.name = name
+        self.menu_title = menu_title or name
+        self.menu_id = '%s#menu' % name
+        self.actions = []
+        self._lazies = []
+        self._unload_callbacks = []
+        self._menu = None
+
+    def action(self, label, target, shortcut=None):
+        """登记菜单项。target 是可调用对象或 'module:function'（第一次点击时才 import）。"""
+        action = Action(label, target, shortcut)
+        self.actions.append(action)
+        return action
+
+    def dialog(self, factory):
+        """延迟创建的对象（一般是对话框），卸载插件时会被 close 并丢弃。"""
+        value = Lazy(factory)
+        self._lazies.append(value)
+        return value
+
+    def on_unload(self, callback):
+        self._unload_callbacks.append(callback)
+        return callback
+
+    def main_window(self):
+        return ui_mgr().getMainWindow()
+
+    def run(self, action):
+        """执行菜单项；第一次执行的耗时（含 import）记进 profiler。出错时打印，不让异常冒到 Qt 里。"""
+        started = time.perf_counter()
+        try:
+            resolve(action.target)()
+        except Exception as e:
+            print('[%s] %s 执行失败: %s' % (self.name, action.label, e))
+        finally:
+            if not action.used:
+                action.used = True
+                profiler.record(self.name, 'first:%s' % action.label, time.perf_counter() - started)
+
+    def initialize(self):
+        """在 initializeSDPlugin 里调用：只创建菜单和菜单项。"""
+        with profiler.timed(self.name, 'initialize'):
+            self._create_menu()
+        # 装了 import 计时器时，插件包自己的 import 耗时（含嵌套）也记下来
+        imported = profiler.imports.get(self.name)
+        if imported is not None:
+            profiler.record(self.name, 'import', imported[1])
+
+    def _create_menu(self):
+        QtWidgets, QAction = _import_qt_widgets()
+        if QtWidgets is None:
+            print('[%s] 未检测到 PySide，不创建菜单' % self.name)
+            return
+        window = self.main_window()
+        if window is None:
+            print('[%s] 主窗口不可用，不创建菜单' % self.name)
+            return
+        manager = ui_mgr()
+        if manager.findMenuFromObjectName(self.menu_id) is not None:
+            manager.deleteMenu(self.menu_id)      # 重新加载插件时去掉旧菜单
+        menu_bar = window.menuBar()
+        self._menu = QtWidgets.QMenu(self.menu_title, menu_bar)
+        self._menu.setObjectName(self.menu_id)
+        menu_bar.addMenu(self._menu)
+        for action in self.actions:
+            qt_action = QAction(action.label, self._menu)
+            if action.shortcut:
+                qt_action.setShortcut(action.shortcut)
+            qt_action.triggered.connect(lambda _checked=False, a=action: self.run(a))
+            self._menu.addAction(qt_action)
+            action.qt_action = qt_action
+
+    def uninitialize(self):
+        """在 uninitializeSDPlugin 里调用：关闭已创建的对话框、移除菜单、执行 on_unload 回调。"""
+        for value in self._lazies:
+            if value.loaded:
+                close = getattr(value(), 'close', None)
+                if close is not None:
+                    try:
+                        close()
+                    except Exception as e:
+                        print('[%s] 关闭窗口失败: %s' % (self.name, e))
+                value.reset()
+        for callback in self._unload_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print('[%s] 卸载回调失败: %s' % (self.name, e))
+        if self._menu is not None:
+            try:
+                ui_mgr().deleteMenu(self.menu_id)
+            except Exception as e:
+                print('[%s] 移除菜单失败: %s' % (self.name, e))
+            self._menu = None
+        for action in self.actions:
+            action.qt_action = None
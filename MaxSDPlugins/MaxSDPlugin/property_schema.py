@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""按节点定义共享的属性描述表（schema 注册表）
+
+一个 graph 里 500 个 hsl 节点的属性列表完全一样（hue / saturation / luminosity ...），
+但一般的脚本对每个节点都要重新 getProperties、逐个 getId / getType，同样的信息问了 500 遍。
+
+SchemaRegistry 以 node.getDefinition().getId()（如 sbs::compositing::hsl）为键，
+第一次遇到某个定义时把它的属性 id、类别、类型、默认值记下来，之后同定义的节点直接从内存取。
+实例节点（RGBA_Merge 这类）在 SD 里全都是同一个定义 sbs::compositing::sbscompgraph_instance，
+端口却取决于实例化的是哪个 graph，所以改用 getReferencedResource().getUrl()（如 pkg:///rgba_merge?dependency=..）
+作键，见 schema_key。
+SD 里同一定义的节点按属性 id 匹配属性对象，所以缓存的 SDProperty 可以直接拿去给别的节点
+getPropertyValue / setPropertyValue。
+
+跨会话复用：save() 把在 SD 里读到的 schema 写成 JSON，下次启动 load() 之后，
+schema_for 第一次遇到某个定义时只取一遍属性对象和 id（和缓存的 id 完全一致才用），
+类型、是否可连接、默认值都用缓存的，不再逐个查询。
+
+还可以离线预热（warm_from_package）：读 .sbs 里的 compImplementation，
+- graph 的曝光参数（paraminput）给出输入参数的 schema（id、类型、默认值），键为 pkg:///<graph identifier>，
+  查找时实例节点的 url 去掉 ?dependency=.. 后就是这个键；
+- compFilter 节点的 <parameter> 只列出被改过的参数，得到的是“部分” schema（没有默认值）。
+预热的结果只给离线工具用（lookup / graph_builder 的离线检查）：.sbs 里没有输出端口、
+图像输入能不能连接等信息，在 SD 里 schema_for 仍会完整读取一次。
+hits / misses 计数可以用来确认缓存是否生效。
+
+用法：
+    from MaxSDPlugin.property_schema import SchemaRegistry
+
+    registry = SchemaRegistry()
+    for node in graph.getNodes():
+        schema = registry.schema_for(node)
+        print(schema.definition_id, schema.ids())
+    print(registry.stats())     # {'definitions': 5, 'hits': 495, 'misses': 5, ...}
+
+    snapshot = NodeSnapshot.read(nodes, registry=registry)   # 快照读取也可以用注册表
+"""
+
+import json
+import os
+import tempfile
+
+from sd.api.sdproperty import SDPropertyCategory
+
+from MaxSDPlugin.node_snapshot import to_python
+
+
+CATEGORIES = (SDPropertyCategory.Input, SDPropertyCategory.Output, SDPropertyCategory.Annotation)
+
+# SD 里所有实例节点共用的定义 id
+INSTANCE_DEFINITION = 'sbs::compositing::sbscompgraph_instance'
+
+# .sbs 里的值标签 -> SDType.getId()
+_TAG_TYPES = {
+    'constantValueFloat1': 'float', 'constantValueFloat2': 'float2',
+    'constantValueFloat3': 'float3', 'constantValueFloat4': 'float4',
+    'constantValueInt1': 'int', 'constantValueInt2': 'int2',
+    'constantValueInt3': 'int3', 'constantValueInt4': 'int4',
+    'constantValueBool': 'bool', 'constantValueString': 'string',
+}
+
+
+class PropertyInfo(object):
+    """一个属性的描述。prop 是 SD 的属性对象，离线预热得到的描述里为 None。"""
+
+    __slots__ = ('id', 'category', 'type_id', 'connectable', 'default', 'prop')
+
+    def __init__(self, prop_id, category, type_id, connectable=False, default=None, prop=None):
+        self.id = prop_id
+        self.category = category
+        self.type_id = type_id
+        self.connectable = connectable
+        self.default = default
+        self.prop = prop
+
+    def to_dict(self):
+        return {'id': self.id, 'category': self.category, 'type': self.type_id,
+                'connectable': self.connectable,
+                'default': list(self.default) if isinstance(self.default, tuple) else self.default}
+
+    @classmethod
+    def from_dict(cls, data):
+        default = data.get('default')
+        return cls(data['id'], data['category'], data['type'], data.get('connectable', False),
+                   tuple(default) if isinstance(default, list) else default)
+
+
+class PropertySchema(object):
+    """一个节点定义的全部属性描述。
+
+    complete 为 False 表示只是离线得到的部分属性。source：
+    - 'sd'：在 SD 里读到的，带有可以直接使用的 SDProperty 对象；
+    - 'cache'：以前在 SD 里读到、从 save() 的文件加载的，没有 SDProperty，在 SD 里用时补上；
+    - 'sbs'：离线预热得到的，只给离线工具用。
+    """
+
+    def __init__(self, definition_id, properties, complete=True, source='sd'):
+        self.definition_id = definition_id
+        self.properties = properties        # [PropertyInfo, ...]
+        self.complete = complete
+        self.source = source
+        self._by_key = {(info.category, info.id): info for info in properties}
+
+    def get(self, prop_id, category=SDPropertyCategory.Input):
+        return self._by_key.get((category, prop_id))
+
+    def ids(self, category=SDPropertyCategory.Input):
+        return [info.id for info in self.properties if info.category == category]
+
+    def of_category(self, category):
+        return [info for info in self.properties if info.category == category]
+
+    def defaults(self, category=SDPropertyCategory.Input):
+        return {info.id: info.default for info in self.properties
+                if info.category == category and info.default is not None}
+
+    def to_dict(self):
+        return {'definition': self.definition_id, 'complete': self.complete, 'source': self.source,
+                'properties': [info.to_dict() for info in self.properties]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['definition'], [PropertyInfo.from_dict(p) for p in data['properties']],
+                   data.get('complete', False), data.get('source', 'cache'))
+
+
+def _definition_key(definition_id):
+    # 实例节点的 url 带有本包的依赖 uid（pkg:///rgba_merge?dependency=1551510705），离线预热时按 graph 名登记
+    return definition_id.split('?', 1)[0]
+
+
+def schema_key(node, definition_id=None):
+    """节点在注册表里的键：一般是定义 id；实例节点改用被实例化资源的 url。
+
+    definition_id 是已经读到的 node.getDefinition().getId()，给出时省一次调用。
+    """
+    if definition_id is None:
+        definition_id = node.getDefinition().getId()
+    if definition_id == INSTANCE_DEFINITION:
+        resource = node.getReferencedResource()
+        if resource is not None:
+            return resource.getUrl()
+    return definition_id
+
+
+def _parse_value(tag, text):
+    type_id = _TAG_TYPES.get(tag)
+    if type_id is None or text is None:
+        return None
+    if type_id == 'string':
+        return text
+    parts = text.split()
+    if type_id == 'bool':
+        return text.strip() not in ('0', 'false', '')
+    try:
+        if type_id.startswith('float'):
+            values = tuple(float(p) for p in parts)
+        else:
+            values = tuple(int(float(p)) for p in parts)
+    except ValueError:
+        return None
+    return values[0] if len(values) == 1 else values
+
+
+class SchemaRegistry(object):
+    """定义 id（实例节点是资源 url）-> PropertySchema 的缓存，带命中 / 未命中计数。"""
+
+    def __init__(self):
+        self.schemas = {}
+        self.hits = 0
+        self.misses = 0
+        self.warmed = 0
+
+    # ------------------------------------------------------------------
+    # 在线（SD 里）
+    # ------------------------------------------------------------------
+    def schema_for(self, node, key=None):
+        """返回节点定义的 schema（带 SDProperty 对象）。
+
+        第一次见到的定义从 SD 读取；load() 加载的 schema 只补上 SDProperty（算命中）；
+        离线预热的 schema 不用，和第一次见到一样完整读取。
+        key 是 schema_key(node) 的结果，不给时现算。
+        """
+        if key is None:
+            key = schema_key(node)
+        schema = self.schemas.get(key)
+        if schema is not None and schema.source == 'sd':
+            self.hits += 1
+            return schema
+        if schema is not None and schema.source == 'cache' and schema.complete:
+            attached = self._attach(node, schema)
+            if attached is not None:
+                self.hits += 1
+                self.schemas[key] = attached
+                return attached
+        self.misses += 1
+        schema = self._read(node, key)
+        self.schemas[key] = schema
+        return schema
+
+    @staticmethod
+    def _attach(node, cached):
+        """给加载的 schema 补上 SDProperty。节点实际的属性 id 和缓存的不完全一致时
+        （比如 SD 升级后定义多了参数）返回 None，由调用方重新完整读取。"""
+        properties = []
+        for category in CATEGORIES:
+            infos = {info.id: info for info in cached.of_category(category)}
+            count = 0
+            for prop in node.getProperties(category):
+                info = infos.get(prop.getId())
+                if info is None:
+                    return None
+                count += 1
+                properties.append(PropertyInfo(info.id, category, info.type_id, info.connectable,
+                                               info.default, prop))
+            if count != len(infos):
+                return None
+        return PropertySchema(cached.definition_id, properties)
+
+    @staticmethod
+    def _read(node, definition_id):
+        properties = []
+        for category in CATEGORIES:
+            for prop in node.getProperties(category):
+                default = prop.getDefaultValue()
+                properties.append(PropertyInfo(
+                    prop.getId(), category, prop.getType().getId(), prop.isConnectable(),
+                    to_python(default.get()) if default is not None else None, prop))
+        return PropertySchema(definition_id, properties)
+
+    def find(self, key):
+        """只查缓存，不计数：先按原样找，实例节点的 url 再去掉 ?dependency=.. 找离线预热的。"""
+        return self.schemas.get(key) or self.schemas.get(_definition_key(key))
+
+    def lookup(self, definition_id):
+        """只查缓存，不访问 SD（离线工具用）。找不到返回 None。"""
+        schema = self.find(definition_id)
+        if schema is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return schema
+
+    def stats(self):
+        complete = sum(1 for s in self.schemas.values() if s.complete)
+        total = self.hits + self.misses
+        return {'definitions': len(self.schemas), 'complete': complete, 'hits': self.hits,
+                'misses': self.misses, 'hit_rate': self.hits / float(total) if total else 0.0,
+                'warmed': self.warmed}
+
+    # ------------------------------------------------------------------
+    # 离线预热
+    # ------------------------------------------------------------------
+    def warm_from_package(self, path):
+        """读 .sbs 预热注册表，返回新登记的定义数。已经在 SD 里读到的定义不会被覆盖。
+
+        需要仓库根目录在 sys.path 里（用到 utilities.sbs_stream 的流式读取）。
+        """
+        from utilities.sbs_stream import NODE_FILTER, iter_events
+
+        graph_params = {}
+        filter_params = {}
+        for event in iter_events(path, kinds={'paraminput', 'compnode'}):
+            if event.kind == 'paraminput':
+                tag, text = event.default if event.default else (None, None)
+                graph_params.setdefault(event.graph, []).append(PropertyInfo(
+                    event.identifier, SDPropertyCategory.Input, _TAG_TYPES.get(tag, 'SDTypeTexture'),
+                    False, _parse_value(tag, text)))
+            elif event.node_kind == NODE_FILTER:
+                seen = filter_params.setdefault(event.definition, {})
+                for name, (tag, _value) in event.params.items():
+                    if tag in _TAG_TYPES and name not in seen:
+                        seen[name] = PropertyInfo(name, SDPropertyCategory.Input, _TAG_TYPES[tag])
+
+        added = 0
+        for graph, properties in graph_params.items():
+            added += self._register(PropertySchema('pkg:///%s' % graph, properties, True, 'sbs'))
+        for definition_id, params in filter_params.items():
+            existing = self.schemas.get(definition_id)
+            if existing is not None and not existing.complete:
+                # 合并多次预热看到的参数
+                for info in existing.properties:
+                    params.setdefault(info.id, info)
+            added += self._register(PropertySchema(definition_id, list(params.values()), False, 'sbs'))
+        self.warmed += added
+        return added
+
+    def _register(self, schema):
+        existing = self.schemas.get(schema.definition_id)
+        # 在 SD 里读到的（包括加载的）不被离线预热覆盖
+        if existing is not None and (existing.source == 'sd' or (existing.source == 'cache'
+                                                                 and schema.source == 'sbs')):
+            return 0
+        self.schemas[schema.definition_id] = schema
+        return 0 if existing is not None else 1
+
+    # ------------------------------------------------------------------
+    # 持久化（下次启动 SD 时直接加载，不必再预热）
+    # ------------------------------------------------------------------
+    def save(self, path):
+        """原子写入：同目录下的唯一临时文件 -> os.replace（和 sbs_files.atomic_write 一样），
+        几个 SD 同时保存也不会互相覆盖出半个文件。"""
+        payload = {'schemas': [schema.to_dict() for schema in self.schemas.values()]}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(path)[1], dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def load(self, path):
+        """从 save() 写出的文件加载。SD 属性对象不会保存，在 SD 里第一次用到时只补上属性对象。"""
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+        for data in payload.get('schemas', ()):
+            schema = PropertySchema.from_dict(data)
+            if schema.source == 'sd':
+                schema.source = 'cache'
+            self._register(schema)
+        return self
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""sd API 调用统计（按需开启）：调用次数、累计耗时、耗时分布直方图，按方法和调用位置统计
+
+脚本慢的时候，很难分清时间花在 Python 里，还是花在 getProperties / getPropertyFromId /
+setPropertyValue / getNodes / loadUserPackage 这些穿进 SD 的调用上。
+
+enable() 把常用 sd.api 类（SDNode、SDSBSCompGraph、SDPackageMgr ……）的方法替换成带计时的版本，
+disable() 换回原来的方法——关闭时调用的就是原方法本身，没有任何额外开销。
+- 每个方法：次数、总耗时、最小 / 最大、按 2 的幂分桶（微秒）的耗时直方图；
+- 每个调用位置（call_sites=True）：哪个文件哪一行调用了哪个方法、多少次、多少时间；
+- 只统计最外层的 sd 调用（SD 内部再调用的其他 API 不重复计时）；
+- 导出：to_dict() / save_json()，或 Chrome trace（chrome://tracing、Perfetto 可以直接打开）；
+- stats_panel()：SD 里的停靠面板，表格显示统计结果，可以刷新、清零、导出。
+
+用法：
+    from MaxSDPlugin import sd_instrument
+
+    sd_instrument.enable(call_sites=True, trace=True)
+    run_my_script()
+    sd_instrument.disable()
+    print(sd_instrument.report())
+    sd_instrument.save_chrome_trace('D:/trace.json')
+
+    with sd_instrument.instrumented():     # 也可以只统计一段代码
+        ...
+"""
+
+import functools
+import importlib
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+
+# 默认替换的类：(模块名, 类名)。当前 SD 版本没有的类自动跳过。
+DEFAULT_TARGETS = (
+    ('sd.api.sdnode', 'SDNode'),
+    ('sd.api.sbs.sdsbscompnode', 'SDSBSCompNode'),
+    ('sd.api.sdgraph', 'SDGraph'),
+    ('sd.api.sbs.sdsbscompgraph', 'SDSBSCompGraph'),
+    ('sd.api.sdproperty', 'SDProperty'),
+    ('sd.api.sdpackage', 'SDPackage'),
+    ('sd.api.sdpackagemgr', 'SDPackageMgr'),
+    ('sd.api.sdapplication', 'SDApplication'),
+    ('sd.api.qtforpythonuimgrwrapper', 'QtForPythonUIMgrWrapper'),
+    ('sd.api.sdvalue', 'SDValue'),
+    ('sd.api.sdhistoryutils', 'SDHistoryUtils'),
+)
+
+HISTOGRAM_BUCKETS = 24        # 第 k 桶：耗时 < 2^k 微秒，最后一桶放更慢的
+DEFAULT_MAX_EVENTS = 200000   # Chrome trace 最多记录的调用数，防止内存无限增长
+
+
+class MethodStats(object):
+    __slots__ = ('name', 'count', 'total', 'min', 'max', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = int(seconds * 1e6).bit_length()
+        self.histogram[bucket if bucket < HISTOGRAM_BUCKETS else HISTOGRAM_BUCKETS - 1] += 1
+
+    def percentile(self, fraction):
+        """按直方图估算的分位数（秒，取桶的上界）。"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= target:
+                return (1 << bucket) / 1e6
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'total': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'min': self.min if self.count else 0.0, 'max': self.max,
+                'p50': self.percentile(0.5), 'p99': self.percentile(0.99),
+                'histogram_us': {'<%d' % (1 << k): n for k, n in enumerate(self.histogram) if n}}
+
+
+class _State(object):
+    def __init__(self):
+        self.enabled = False
+        self.originals = []          # [(类, 属性名, 原始属性)]
+        self.methods = {}            # 方法名 -> MethodStats
+        self.sites = {}              # (方法名, 文件, 行号, 函数) -> [次数, 总耗时]
+        self.events = []             # [(方法名, 开始, 耗时, 调用位置)]
+        self.call_sites = False
+        self.trace = False
+        self.max_events = DEFAULT_MAX_EVENTS
+        self.depth = 0
+        self.started = None
+        self.wall = 0.0
+
+
+_state = _State()
+
+
+def _wrap(name, func):
+    state = _state
+    methods = state.methods
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if state.depth:
+            return func(*args, **kwargs)
+        state.depth = 1
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            state.depth = 0
+            stats = methods.get(name)
+            if stats is None:
+                stats = methods[name] = MethodStats(name)
+            stats.add(elapsed)
+            site = None
+            if state.call_sites or state.trace:
+                frame = sys._getframe(1)
+                code = frame.f_code
+                site = (code.co_filename, frame.f_lineno, code.co_name)
+                if state.call_sites:
+                    entry = state.sites.get((name,) + site)
+                    if entry is None:
+                        entry = state.sites[(name,) + site] = [0, 0.0]
+                    entry[0] += 1
+                    entry[1] += elapsed
+            if state.trace and len(state.events) < state.max_events:
+                state.events.append((name, started, elapsed, site))
+    return wrapper
+
+
+def _patch_class(cls):
+    for attr, value in list(vars(cls).items()):
+        if attr.startswith('__'):
+            continue
+        name = '%s.%s' % (cls.__name__, attr)
+        if isinstance(value, staticmethod):
+            patched = staticmethod(_wrap(name, value.__func__))
+        elif isinstance(value, classmethod):
+            patched = classmethod(_wrap(name, value.__func__))
+        elif callable(value) and not isinstance(value, type):
+            patched = _wrap(name, value)
+        else:
+            continue
+        _state.originals.append((cls, attr, value))
+        setattr(cls, attr, patched)
+
+
+def enable(targets=DEFAULT_TARGETS, call_sites=False, trace=False, max_events=DEFAULT_MAX_EVENTS):
+    """开始统计。targets 是 (模块名, 类名) 列表；已经开启时只更新选项。返回实际替换的类名列表。"""
+    _state.call_sites = call_sites
+    _state.trace = trace
+    _state.max_events = max_events
+    if _state.enabled:
+        return []
+    patched = []
+    for module_name, class_name in targets:
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError):
+            continue
+        _patch_class(cls)
+        patched.append(class_name)
+    _state.enabled = True
+    _state.started = time.perf_counter()
+    return patched
+
+
+def disable():
+    """恢复所有原始方法。统计数据保留，可以继续 report / 导出。"""
+    if not _state.enabled:
+        return
+    for cls, attr, value in reversed(_state.originals):
+        setattr(cls, attr, value)
+    _state.originals = []
+    _state.enabled = False
+    _state.wall += time.perf_counter() - _state.started
+    _state.started = None
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def reset():
+    """清空统计数据（不改变开启状态）。"""
+    _state.methods.clear()
+    _state.sites.clear()
+    del _state.events[:]
+    _state.wall = 0.0
+    if _state.enabled:
+        _state.started = time.perf_counter()
+
+
+@contextmanager
+def instrumented(**options):
+    """with instrumented(call_sites=True): ...  退出时关闭（之前已经开启的保持开启）。"""
+    was_enabled = _state.enabled
+    enable(**options)
+    try:
+        yield _state
+    finally:
+        if not was_enabled:
+            disable()
+
+
+# ----------------------------------------------------------------------
+# 结果
+# ----------------------------------------------------------------------
+def wall_seconds():
+    return _state.wall + (time.perf_counter() - _state.started if _state.started else 0.0)
+
+
+def to_dict():
+    total_sd = sum(stats.total for stats in _state.methods.values())
+    wall = wall_seconds()
+    sites = [{'method': key[0], 'file': key[1], 'line': key[2], 'function': key[3],
+              'count': count, 'total': total}
+             for key, (count, total) in sorted(_state.sites.items(), key=lambda item: -item[1][1])]
+    return {'wall': wall, 'sd_total': total_sd, 'python_total': max(wall - total_sd, 0.0),
+            'methods': {name: stats.to_dict() for name, stats in
+                        sorted(_state.methods.items(), key=lambda item: -item[1].total)},
+            'call_sites': sites}
+
+
+def save_json(path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(to_dict(), f, ensure_ascii=False, indent=1)
+
+
+def save_chrome_trace(path):
+    """导出 Chrome trace（需要 enable(trace=True)）。时间单位是微秒。"""
+    if not _state.events:
+        print('[sd_instrument] 没有记录调用事件，需要 enable(trace=True)')
+    origin = _state.events[0][1] if _state.events else 0.0
+    pid = os.getpid()
+    events = []
+    for name, started, elapsed, site in _state.events:
+        event = {'name': name, 'cat': 'sd', 'ph': 'X', 'pid': pid, 'tid': 0,
+                 'ts': (started - origin) * 1e6, 'dur': elapsed * 1e6}
+        if site is not None:
+            event['args'] = {'site': '%s:%d (%s)' % site}
+        events.append(event)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def report(top=20):
+    """文本报告：最耗时的方法和调用位置。"""
+    data = to_dict()
+    lines = ['统计时长 %.3fs，其中 sd 调用 %.3fs，Python %.3fs'
+             % (data['wall'], data['sd_total'], data['python_total']),
+             '%-44s %8s %10s %9s %9s %9s' % ('方法', '次数', '总耗时', '平均', 'p99', '最大')]
+    for name, stats in list(data['methods'].items())[:top]:
+        lines.append('%-44s %8d %9.1fms %7.1fus %7.0fus %7.1fms'
+                     % (name, stats['count'], stats['total'] * 1000, stats['mean'] * 1e6,
+                        stats['p99'] * 1e6, stats['max'] * 1000))
+    if data['call_sites']:
+        lines.append('最耗时的调用位置：')
+        for site in data['call_sites'][:top]:
+            lines.append('    %s:%d %s() -> %s  %d 次 %.1fms'
+                         % (os.path.basename(site['file']), site['line'], site['function'], site['method'],
+                            site['count'], site['total'] * 1000))
+    return '\n'.join(lines)
+
+
+# ----------------------------------------------------------------------
+# 停靠面板（Qt，第一次打开时才 import）
+# ----------------------------------------------------------------------
+def stats_panel(parent=None):
+    """创建统计面板（QDockWidget）：方法表格 + 开关 / 刷新 / 清零 / 导出按钮。"""
+    try:
+        from PySide2 import QtCore, QtWidgets
+    except ImportError:
+        from PySide6 import QtCore, QtWidgets
+
+    dock = QtWidgets.QDockWidget('sd API 统计', parent)
+    body = QtWidgets.QWidget()
+    layout = QtWidgets.QVBoxLayout(body)
+    summary = QtWidgets.QLabel()
+    columns = ['方法', '次数', '总耗时(ms)', '平均(us)', 'p99(us)', '最大(ms)']
+    table = QtWidgets.QTableWidget(0, len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.setSortingEnabled(True)
+    buttons = QtWidgets.QHBoxLayout()
+    toggle = QtWidgets.QPushButton()
+    refresh = QtWidgets.QPushButton('刷新')
+    clear = QtWidgets.QPushButton('清零')
+    export = QtWidgets.QPushButton('导出 trace...')
+    for button in (toggle, refresh, clear, export):
+        buttons.addWidget(button)
+    layout.addWidget(summary)
+    layout.addWidget(table)
+    layout.addLayout(buttons)
+    dock.setWidget(body)
+
+    def fill():
+        data = to_dict()
+        summary.setText('统计时长 %.2fs，sd 调用 %.2fs，Python %.2fs'
+                        % (data['wall'], data['sd_total'], data['python_total']))
+        toggle.setText('停止统计' if is_enabled() else '开始统计')
+        table.setSortingEnabled(False)
+        table.setRowCount(len(data['methods']))
+        for row, (name, stats) in enumerate(data['methods'].items()):
+            values = [name, stats['count'], stats['total'] * 1000, stats['mean'] * 1e6,
+                      stats['p99'] * 1e6, stats['max'] * 1000]
+            for column, value in enumerate(values):
+                cell = QtWidgets.QTableWidgetItem()
+                if isinstance(value, str):
+                    cell.setText(value)
+                else:
+                    cell.setData(QtCore.Qt.DisplayRole, round(value, 1) if isinstance(value, float) else value)
+                table.setItem(row, column, cell)
+        table.setSortingEnabled(True)
+
+    def on_toggle():
+        if is_enabled():
+            disable()
+        else:
+            enable(call_sites=True, trace=True)
+        fill()
+
+    def on_clear():
+        reset()
+        fill()
+
+    def on_export():
+        path, _filter = QtWidgets.QFileDialog.getSaveFileName(dock, '导出 Chrome trace', 'sd_trace.json',
+                                                              'JSON (*.json)')
+        if path:
+            save_chrome_trace(path)
+            save_json(os.path.splitext(path)[0] + '_stats.json')
+
+    toggle.clicked.connect(on_toggle)
+    refresh.clicked.connect(fill)
+    clear.clicked.connect(on_clear)
+    export.clicked.connect(on_export)
+    fill()
+    if parent is not None and hasattr(parent, 'addDockWidget'):
+        parent.addDockWidget(QtCore.Qt.RightDockWidgetArea, dock)
+    return dock
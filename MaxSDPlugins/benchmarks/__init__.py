@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""MaxSDPlugin 的离线性能测试（用 fake_sd 里的假 sd 模块，不需要打开 SD）
+
+在 MaxSDPlugins 目录下运行，例如：
+    cd MaxSDPlugins
+    python -m benchmarks.bench_node_snapshot
+
+导入本包时会把 fake_sd 加进 sys.path，之后 `import sd` 拿到的就是假模块；
+仓库根目录也会加进去，离线预热等功能要用到 utilities。
+"""
+
+import os
+import sys
+
+_PLUGINS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in (os.path.join(_PLUGINS_DIR, 'fake_sd'), os.path.dirname(_PLUGINS_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
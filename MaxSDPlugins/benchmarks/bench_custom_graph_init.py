@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""对比：custom_graph 插件原来的 CustomGraph.init（遍历全部模块和类型）vs 带注册缓存的版本
+
+场景：data/mdl/custom_graph 下有 --files 个 .mdl 文件，每个导出 --exports 个函数（公司内部的大型节点库）；
+SD 里另外还装了 --other-modules 个无关的 MDL 模块，mdl::<builtins> 里有几百个类型。
+每次 API 调用有 --latency 秒的延迟（模拟跨进宿主程序的开销）。
+
+测四种情况：
+- 新会话，没有缓存（第一次安装）；
+- 新会话，有缓存（日常启动：模块按 id 直接取、内置类型按缓存的 id 取，不再遍历）；
+- 同一会话里重新加载插件，什么都没改（全部跳过）；
+- 同一会话里重新加载插件，改了一个 .mdl（只替换这个模块的定义）。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_custom_graph_init
+    python -m benchmarks.bench_custom_graph_init --files 500 --latency 50e-6
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import sd
+from sd import _host
+from sd.api.mdl.sdmdlgraphdefinition import SDMDLGraphDefinition
+from sd.api.sdmodulemgr import SDModuleMgr
+
+from benchmarks import _PLUGINS_DIR
+
+sys.path.insert(0, os.path.join(os.path.dirname(_PLUGINS_DIR), 'OfficialSDInsertPlugins'))
+from custom_graph.custom_graph import BASE_TYPES, CustomGraph  # noqa: E402
+
+
+def original_init(mdl_root):
+    # 对照：改动前 CustomGraph.init 的做法（每次启动遍历全部模块、全部内置类型，所有定义先删再加）
+    sd_app = sd.getContext().getSDApplication()
+    sd_app.getModuleMgr().addRootPath('mdl', mdl_root)
+    manager = sd_app.getSDGraphDefinitionMgr()
+    graph_definition = manager.getGraphDefinitionFromId('custom_graph')
+    if not graph_definition:
+        graph_definition = SDMDLGraphDefinition.sNew('custom_graph')
+        graph_definition.getId()
+        graph_definition.setLabel('Custom Graph')
+        graph_definition.setIconFile('custom_graph_icon.png')
+        manager.addGraphDefinition(graph_definition)
+    selected_definitions = []
+    selected_types = []
+    for module in sd_app.getModuleMgr().getModules():
+        module_id = module.getId()
+        if not module_id.startswith('mdl::'):
+            continue
+        if module_id == 'mdl::<builtins>':
+            for sd_type in module.getTypes():
+                type_id = sd_type.getId()
+                if type_id in BASE_TYPES or type_id.startswith('matrix<'):
+                    selected_types.append(sd_type)
+            continue
+        if module_id.startswith('mdl::custom_graph'):
+            selected_definitions.extend(module.getDefinitions())
+    for sd_type in selected_types:
+        graph_definition.getId(), sd_type.getId()           # 原来的 logger.debug 格式化
+        graph_definition.addType(sd_type)
+    for definition in selected_definitions:
+        existing = graph_definition.getDefinitionFromId(definition.getId())
+        if existing:
+            graph_definition.removeDefinition(existing)
+        graph_definition.getId(), definition.getId()
+        graph_definition.addDefinition(definition)
+
+
+def write_library(root, files, exports):
+    directory = os.path.join(root, 'custom_graph')
+    os.makedirs(directory)
+    for i in range(files):
+        with open(os.path.join(directory, 'lib_%03d.mdl' % i), 'w') as f:
+            f.write('mdl 1.4;\n\n')
+            for j in range(exports):
+                f.write('export float node_%d_%d(float x, float y)\n{\n    return x * %d.0 + y;\n}\n\n' % (i, j, j))
+
+
+def _new_session():
+    sd._context = None          # 新的 SD 进程：graph 定义、模块都要重新注册
+
+
+def _timed(func):
+    _host.reset()
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started, _host.total_calls()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help='custom_graph 下的 .mdl 文件数')
+    parser.add_argument('--exports', type=int, default=10, help='每个 .mdl 导出的函数数')
+    parser.add_argument('--other-modules', type=int, default=500, help='SD 里其他无关的 MDL 模块数')
+    parser.add_argument('--latency', type=float, default=20e-6, help='每次 API 调用的延迟（秒）')
+    args = parser.parse_args(argv)
+
+    SDModuleMgr.extra_modules = args.other_modules
+    tmp = tempfile.mkdtemp(prefix='bench_custom_graph_')
+    try:
+        mdl_root = os.path.join(tmp, 'mdl')
+        cache = os.path.join(tmp, 'registration_cache.json')
+        write_library(mdl_root, args.files, args.exports)
+        _host.set_latency(args.latency)
+        print('%d 个 .mdl x %d 个定义, 其他模块 %d 个, 每次 API 调用 %.0f 微秒'
+              % (args.files, args.exports, args.other_modules, args.latency * 1e6))
+
+        def run(label, func, new_session=True):
+            if new_session:
+                _new_session()
+            elapsed, calls = _timed(func)
+            print('%-30s %7.3fs  %6d 次 API 调用' % (label, elapsed, calls))
+
+        init = lambda: CustomGraph.init(aCacheFile=cache, aMdlRootPath=mdl_root)
+        run('原来的 init（每次启动）', lambda: original_init(mdl_root))
+        run('新会话，没有缓存', init)
+        run('新会话，有缓存', init)
+        run('同一会话重新加载，无改动', init, new_session=False)
+        with open(os.path.join(mdl_root, 'custom_graph', 'lib_000.mdl'), 'a') as f:
+            f.write('export float node_extra(float x)\n{\n    return x;\n}\n')
+        run('同一会话重新加载，改了 1 个文件', init, new_session=False)
+        print()
+        print(CustomGraph.timingReport())
+    finally:
+        _host.set_latency(0.0)
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""对比：逐个调用 newNode / setPropertyValue / 连线 vs 命令缓冲一次提交
+
+场景：搭 --blocks 组 “uniform -> hsl -> levels -> blend(和上一组混合)” 的节点链，每个节点都设位置，
+hsl / levels 设几个参数（其中一部分和默认值相同，实际脚本里很常见）。
+用假 sd 模块模拟宿主开销：每次 API 调用 --latency，改动 graph 的调用（新建节点、设值、连线、设位置）
+还要刷新 UI、记录撤销，按 --edit-weight 倍计算。
+命令缓冲在一个撤销组里回放，所以“改动”的代价按不刷新 UI 算（权重 1）。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_graph_builder
+    python -m benchmarks.bench_graph_builder --blocks 500 --sbs /tmp/generated.sbs
+"""
+
+import argparse
+import time
+
+import sd
+from sd import _host
+from sd.api.sbs.sdsbscompgraph import SDSBSCompGraph
+from sd.api.sdbasetypes import float2, float4
+from sd.api.sdproperty import SDPropertyCategory
+from sd.api.sdvaluefloat import SDValueFloat
+from sd.api.sdvaluefloat4 import SDValueFloat4
+
+from MaxSDPlugin.graph_builder import GraphBuilder
+
+_EDITS = ('SDSBSCompGraph__newNode', 'SDNode__setPropertyValue', 'SDNode__setPosition',
+          'SDNode__newPropertyConnectionFromId')
+
+
+def _block_params(i):
+    return {
+        'uniform': {'outputcolor': (i % 7 / 7.0, 0.5, 0.25, 1.0)},
+        'hsl': {'hue': 0.5 if i % 2 else 0.1 * (i % 10), 'saturation': 0.5, 'luminosity': 0.6},
+        'levels': {'levelinlow': (0.0, 0.0, 0.0, 0.0), 'levelinhigh': (0.9, 0.9, 0.9, 1.0)},
+    }
+
+
+def naive(graph, blocks):
+    previous = None
+    for i in range(blocks):
+        params = _block_params(i)
+        chain = []
+        for column, name in enumerate(('uniform', 'hsl', 'levels', 'blend')):
+            node = graph.newNode('sbs::compositing::' + name)
+            node.setPosition(float2(column * 150.0, i * 150.0))
+            for prop_id, value in params.get(name, {}).items():
+                prop = node.getPropertyFromId(prop_id, SDPropertyCategory.Input)
+                sd_value = SDValueFloat4.sNew(float4(*value)) if isinstance(value, tuple) else SDValueFloat.sNew(value)
+                node.setPropertyValue(prop, sd_value)
+            chain.append(node)
+        uniform, hsl, levels, blend = chain
+        uniform.newPropertyConnectionFromId('unique_filter_output', hsl, 'input1')
+        hsl.newPropertyConnectionFromId('unique_filter_output', levels, 'input1')
+        levels.newPropertyConnectionFromId('unique_filter_output', blend, 'source')
+        if previous is not None:
+            previous.newPropertyConnectionFromId('unique_filter_output', blend, 'destination')
+        previous = blend
+
+
+def build(blocks):
+    builder = GraphBuilder()
+    previous = None
+    for i in range(blocks):
+        params = _block_params(i)
+        chain = [builder.node('sbs::compositing::' + name, (column * 150.0, i * 150.0), params.get(name))
+                 for column, name in enumerate(('uniform', 'hsl', 'levels', 'blend'))]
+        uniform, hsl, levels, blend = chain
+        builder.connect(uniform, hsl)
+        builder.connect(hsl, levels)
+        builder.connect(levels, blend, 'source')
+        if previous is not None:
+            builder.connect(previous, blend, 'destination')
+        previous = blend
+    builder.connect(previous, builder.output('basecolor', (600.0, blocks * 150.0)))
+    return builder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blocks', type=int, default=250)
+    parser.add_argument('--latency', type=float, default=20e-6, help='每次 API 调用的模拟延迟（秒）')
+    parser.add_argument('--edit-weight', type=float, default=10, help='改动 graph 的调用的延迟倍数')
+    parser.add_argument('--sbs', help='顺便把命令缓冲离线写成这个 .sbs')
+    args = parser.parse_args(argv)
+
+    package = sd.getContext().getSDApplication().getPackageMgr().newUserPackage()
+    print('%d 组节点（%d 个节点）, 每次 API 调用延迟 %.0f 微秒, 改动 graph x%g'
+          % (args.blocks, args.blocks * 4, args.latency * 1e6, args.edit_weight))
+
+    graph = SDSBSCompGraph.sNew(package)
+    _host.set_latency(args.latency, **{name: args.edit_weight for name in _EDITS})
+    _host.reset()
+    started = time.perf_counter()
+    naive(graph, args.blocks)
+    print('%-10s %8.3fs  API 调用 %7d' % ('逐个调用', time.perf_counter() - started, _host.total_calls()))
+
+    graph = SDSBSCompGraph.sNew(package)
+    _host.set_latency(args.latency)
+    _host.reset()
+    started = time.perf_counter()
+    builder = build(args.blocks)
+    built = time.perf_counter()
+    builder.commit(graph)
+    print('%-10s %8.3fs  API 调用 %7d  （记录+检查 %.3fs）'
+          % ('命令缓冲', time.perf_counter() - started, _host.total_calls(), built - started))
+    _host.set_latency(0)
+
+    if args.sbs:
+        started = time.perf_counter()
+        size = builder.save_sbs(args.sbs, 'generated')
+        print('离线写出 %s: %d 字节, %.3fs' % (args.sbs, size, time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""对比：在主线程里直接跑批处理 vs JobRunner 后台执行，主线程（UI 事件循环）还能不能及时响应
+
+场景：lint --packages 个合成 .sbs（utilities/sbs_lint），每个包的结果在主线程里调一次假 SD API
+（新建一个节点，代表“把结果标到 graph 上”）。
+用一个每 16 毫秒执行一次的循环模拟 Qt 事件循环，记录相邻两次“刷新”之间的最大间隔：
+间隔越大，用户越能感觉到 SD 卡住。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_job_runner
+    python -m benchmarks.bench_job_runner --packages 1000 --processes
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import sd
+from sd.api.sbs.sdsbscompgraph import SDSBSCompGraph
+
+from utilities import sbs_lint
+from utilities.benchmarks.synthetic import write_package
+
+from MaxSDPlugin.job_runner import Job, JobRunner
+
+FRAME = 0.016
+
+
+def _apply_factory(graph):
+    def apply(batch):
+        for _path, findings in batch:
+            if findings:
+                graph.newNode('sbs::compositing::uniform')
+    return apply
+
+
+def run_blocking(paths, graph):
+    # 菜单回调直接在主线程里跑：整个过程中事件循环一次都转不了
+    sbs_lint._init_worker(None, None)
+    apply = _apply_factory(graph)
+    started = time.perf_counter()
+    for path in paths:
+        apply([(path, sbs_lint._check_job(path))])
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+def run_background(paths, graph, use_processes, workers):
+    job = Job('lint', paths, work=sbs_lint._check_job, apply=_apply_factory(graph),
+              initializer=sbs_lint._init_worker, initargs=(None, None))
+    handle = JobRunner(max_workers=workers, use_processes=use_processes).submit(job)
+    worst = 0.0
+    last = time.perf_counter()
+    while handle.pump(budget=0.004):
+        time.sleep(FRAME)                # 事件循环里的其他工作（重绘、鼠标事件……）
+        now = time.perf_counter()
+        worst = max(worst, now - last)
+        last = now
+    assert handle.completed == len(paths), (handle.completed, handle.errors[:3])
+    return handle.elapsed, worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=1000)
+    parser.add_argument('--nodes', type=int, default=60, help='每个合成包的节点数')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--processes', action='store_true', help='同时测进程池')
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='bench_jobs_')
+    try:
+        paths = []
+        for i in range(args.packages):
+            path = os.path.join(tmp, 'pkg_%04d.sbs' % i)
+            write_package(path, graphs=1, nodes_per_graph=args.nodes, seed=i)
+            paths.append(path)
+        graph = SDSBSCompGraph.sNew(sd.getContext().getSDApplication().getPackageMgr().newUserPackage())
+        print('%d 个包, 每个 %d 个节点, 模拟事件循环每 %.0f 毫秒一帧' % (args.packages, args.nodes, FRAME * 1000))
+        modes = [('主线程直接执行', lambda: run_blocking(paths, graph)),
+                 ('JobRunner 线程池', lambda: run_background(paths, graph, False, args.workers))]
+        if args.processes:
+            modes.append(('JobRunner 进程池', lambda: run_background(paths, graph, True, args.workers)))
+        for label, func in modes:
+            elapsed, worst = func()
+            print('%-18s 总耗时 %6.2fs  主线程最长卡顿 %7.1fms' % (label, elapsed, worst * 1000))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""对比：逐个 getPropertyFromId / getPropertyValue / setPropertyValue vs 节点快照（可选共享 schema）
+
+场景：把 graph 里所有 hsl 节点的 hue / saturation / luminosity 限制到 [0.2, 0.8]。
+大约一半的值本来就在范围内（实际脚本里很常见：重复运行、只有部分节点需要改）。
+用假 sd 模块模拟宿主开销：每次 API 调用 --latency（默认 20 微秒），
+setPropertyValue 还要记录撤销、让下游失效，按 --write-weight 倍计算（默认 10 倍）。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_node_snapshot
+    python -m benchmarks.bench_node_snapshot --nodes 20000 --latency 0.00005
+"""
+
+import argparse
+import random
+import time
+
+from benchmarks import fake_graph
+from sd import _host
+from sd.api.sdproperty import SDPropertyCategory
+from sd.api.sdvaluefloat import SDValueFloat
+
+from MaxSDPlugin.node_snapshot import NodeSnapshot
+from MaxSDPlugin.property_schema import SchemaRegistry
+
+_IDS = ('hue', 'saturation', 'luminosity')
+_HSL = 'sbs::compositing::hsl'
+
+
+def _clamp(value):
+    return min(max(value, 0.2), 0.8)
+
+
+def _prepare(n):
+    graph = fake_graph.build_graph(n)
+    rng = random.Random(1)
+    for node in graph.getNodes():
+        if node.getDefinition().getId() != _HSL:
+            continue
+        for prop_id in _IDS:
+            value = rng.uniform(0.2, 0.8) if rng.random() < 0.5 else rng.choice((0.05, 0.95))
+            prop = node.getPropertyFromId(prop_id, SDPropertyCategory.Input)
+            node.setPropertyValue(prop, SDValueFloat.sNew(value))
+    return graph
+
+
+def naive(nodes):
+    # Part1 教程的写法：每个属性 getPropertyFromId -> getPropertyValue -> setPropertyValue
+    for node in nodes:
+        for prop_id in _IDS:
+            prop = node.getPropertyFromId(prop_id, SDPropertyCategory.Input)
+            value = node.getPropertyValue(prop).get()
+            node.setPropertyValue(prop, SDValueFloat.sNew(_clamp(value)))
+
+
+def snapshot(nodes):
+    snap = NodeSnapshot.read(nodes, prop_ids=_IDS)
+    for state in snap:
+        for prop_id in _IDS:
+            state[prop_id] = _clamp(state[prop_id])
+    return snap.commit('bench')
+
+
+def snapshot_with_schema(nodes):
+    # 同定义的节点共用属性描述，不再对每个节点 getPropertyFromId
+    registry = SchemaRegistry()
+    snap = NodeSnapshot.read(nodes, prop_ids=_IDS, registry=registry)
+    for state in snap:
+        for prop_id in _IDS:
+            state[prop_id] = _clamp(state[prop_id])
+    return snap.commit('bench')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=20e-6, help='每次 API 调用的模拟延迟（秒）')
+    parser.add_argument('--write-weight', type=float, default=10, help='setPropertyValue 的延迟倍数')
+    args = parser.parse_args(argv)
+
+    print('%d 个节点, 每次 API 调用延迟 %.0f 微秒, setPropertyValue x%g'
+          % (args.nodes, args.latency * 1e6, args.write_weight))
+    for label, func in (('逐个设置', naive), ('节点快照', snapshot),
+                        ('快照+schema', snapshot_with_schema)):
+        _host.set_latency(0)
+        graph = _prepare(args.nodes)
+        nodes = [node for node in graph.getNodes() if node.getDefinition().getId() == _HSL]
+        _host.set_latency(args.latency, SDNode__setPropertyValue=args.write_weight)
+        _host.reset()
+        started = time.perf_counter()
+        func(nodes)
+        elapsed = time.perf_counter() - started
+        print('%-10s %8.3fs  API 调用 %8d  setPropertyValue %6d'
+              % (label, elapsed, _host.total_calls(), _host.calls['SDNode.setPropertyValue']))
+    _host.set_latency(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""对比：每次 loadUserPackage / unloadUserPackage vs 包缓存池
+
+场景：往 --graphs 个 graph 里各插一个同一 .sbsar（轮流用 --packages 个不同的包）的实例节点。
+假 SDPackageMgr 每次加载包睡 --load-delay 秒（真实 SD 里一个大 .sbsar 要几百毫秒）。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_package_pool
+    python -m benchmarks.bench_package_pool --graphs 500 --packages 12 --max-packages 8
+"""
+
+import argparse
+import os
+import time
+
+import sd
+from sd import _host
+from sd.api.sbs.sdsbscompgraph import SDSBSCompGraph
+from sd.api.sdpackagemgr import SDPackageMgr
+
+from MaxSDPlugin.package_pool import PackagePool
+
+
+def naive(pkg_mgr, graphs, paths):
+    # Part1 教程方法3 的写法：用一次加载一次
+    for i, graph in enumerate(graphs):
+        path = paths[i % len(paths)]
+        pkg = pkg_mgr.loadUserPackage(path)
+        res = pkg.findResourceFromUrl(os.path.splitext(os.path.basename(path))[0])
+        graph.newInstanceNode(res)
+        pkg_mgr.unloadUserPackage(pkg)
+
+
+def pooled(pkg_mgr, graphs, paths, max_packages):
+    pool = PackagePool(pkg_mgr, max_packages=max_packages)
+    for i, graph in enumerate(graphs):
+        path = paths[i % len(paths)]
+        with pool.package(path):
+            graph.newInstanceNode(pool.find_resource(path, os.path.splitext(os.path.basename(path))[0]))
+    pool.clear()
+    return pool.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--graphs', type=int, default=200)
+    parser.add_argument('--packages', type=int, default=4, help='轮流使用的不同包个数')
+    parser.add_argument('--max-packages', type=int, default=8, help='池里最多保留的包个数')
+    parser.add_argument('--load-delay', type=float, default=0.01, help='每次加载包的模拟耗时（秒）')
+    args = parser.parse_args(argv)
+
+    pkg_mgr = sd.getContext().getSDApplication().getPackageMgr()
+    graphs = [SDSBSCompGraph.sNew(pkg_mgr.newUserPackage()) for _ in range(args.graphs)]
+    paths = [os.path.abspath('library/material_%02d.sbsar' % i) for i in range(args.packages)]
+    SDPackageMgr.load_delay = args.load_delay
+    print('%d 个 graph, %d 个不同的包, 每次加载 %.0f 毫秒'
+          % (args.graphs, args.packages, args.load_delay * 1000))
+
+    _host.reset()
+    started = time.perf_counter()
+    naive(pkg_mgr, graphs, paths)
+    print('%-10s %8.3fs  loadUserPackage %5d'
+          % ('逐次加载', time.perf_counter() - started, _host.calls['SDPackageMgr.loadUserPackage']))
+
+    _host.reset()
+    started = time.perf_counter()
+    stats = pooled(pkg_mgr, graphs, paths, args.max_packages)
+    print('%-10s %8.3fs  loadUserPackage %5d  命中 %d  淘汰 %d  估计省下 %.2fs'
+          % ('包缓存池', time.perf_counter() - started, _host.calls['SDPackageMgr.loadUserPackage'],
+             stats['hits'], stats['evictions'], stats['saved_seconds']))
+    SDPackageMgr.load_delay = 0.0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""sd_instrument 的开销：不开启 / 开启 / 开启 + 调用位置 + trace / 关闭之后
+
+用 bench_node_snapshot 的场景（读 + 改 + 写回 hsl 节点的三个属性），不加模拟延迟，
+这样测到的差别就是统计本身的开销。关闭之后的耗时应该和从未开启时一样。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.bench_sd_instrument
+    python -m benchmarks.bench_sd_instrument --nodes 20000 --trace /tmp/sd_trace.json
+"""
+
+import argparse
+import time
+
+from sd import _host
+
+from benchmarks.bench_node_snapshot import _HSL, _prepare, snapshot
+from MaxSDPlugin import sd_instrument
+
+
+def _run(nodes, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        snapshot(nodes)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--trace', help='把 trace 导出到这个文件')
+    args = parser.parse_args(argv)
+
+    _host.set_latency(0)
+    graph = _prepare(args.nodes)
+    nodes = [node for node in graph.getNodes() if node.getDefinition().getId() == _HSL]
+    print('%d 个 hsl 节点, 每种情况取 %d 次中最快的一次' % (len(nodes), args.repeat))
+
+    baseline = _run(nodes, args.repeat)
+    print('%-20s %8.3fs' % ('未开启', baseline))
+    sd_instrument.enable()
+    elapsed = _run(nodes, args.repeat)
+    print('%-20s %8.3fs  (+%.0f%%)' % ('开启', elapsed, (elapsed / baseline - 1) * 100))
+    sd_instrument.enable(call_sites=True, trace=True)
+    elapsed = _run(nodes, args.repeat)
+    print('%-20s %8.3fs  (+%.0f%%)' % ('开启+调用位置+trace', elapsed, (elapsed / baseline - 1) * 100))
+    sd_instrument.disable()
+    elapsed = _run(nodes, args.repeat)
+    print('%-20s %8.3fs  (+%.0f%%)' % ('关闭之后', elapsed, (elapsed / baseline - 1) * 100))
+    print()
+    print(sd_instrument.report(top=8))
+    if args.trace:
+        sd_instrument.save_chrome_trace(args.trace)
+        print('trace 已写入 %s' % args.trace)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""在假 sd 里搭测试用的 graph。"""
+
+import random
+
+import sd
+from sd.api.sbs.sdsbscompgraph import SDSBSCompGraph
+
+_CHAIN = ('sbs::compositing::uniform', 'sbs::compositing::hsl', 'sbs::compositing::levels',
+          'sbs::compositing::grayscaleconversion', 'sbs::compositing::blend')
+
+
+def build_graph(n, seed=0):
+    """n 个节点的链式 graph（uniform -> hsl -> levels -> ...），设为当前 graph 并返回。"""
+    rng = random.Random(seed)
+    app = sd.getContext().getSDApplication()
+    package = app.getPackageMgr().newUserPackage()
+    graph = SDSBSCompGraph.sNew(package)
+    previous = None
+    for i in range(n):
+        node = graph.newNode(_CHAIN[i % len(_CHAIN)])
+        if previous is not None and i % len(_CHAIN) != 0:
+            port = 'source' if _CHAIN[i % len(_CHAIN)].endswith('blend') else 'input1'
+            previous.newPropertyConnectionFromId('unique_filter_output', node, port)
+        previous = node
+        node.setPosition(sd.api.sdbasetypes.float2(rng.uniform(-2000, 2000), rng.uniform(-2000, 2000)))
+    app.getQtForPythonUIMgr().setCurrentGraph(graph)
+    return graph
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""离线测量插件的启动开销：import 耗时 + initializeSDPlugin 耗时（用假 sd 模块）
+
+对每个插件（目录或 .py 文件）：
+1. 在 import 计时器下 import（统计它自己和它 import 的每个模块的耗时）；
+2. 调用 initializeSDPlugin()，计时；
+3. 调用 uninitializeSDPlugin() 清理。
+import 失败的插件（比如这里没有装 PySide2）会列出错误，不影响其他插件。
+
+假 sd 里没有主窗口，所以插件不会真的创建菜单；
+在 import 阶段就做 getContext / getCurrentGraph / 建窗口的插件，这部分开销会如实算进 import。
+
+运行（在 MaxSDPlugins 目录下）：
+    python -m benchmarks.profile_startup
+    python -m benchmarks.profile_startup ../OfficialExamples/PluginBasics.py MaxSDPlugin
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from MaxSDPlugin.plugin_framework import install_import_timer, profiler, remove_import_timer
+
+_REPO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PLUGINS = [
+    os.path.join(_REPO, 'MaxSDPlugins', 'MaxSDPlugin'),
+    os.path.join(_REPO, 'OfficialExamples', 'PluginBasics.py'),
+    os.path.join(_REPO, 'Bilibili_HuangJuanLr', 'SubstanceDesignerPart1'),
+]
+
+
+def _load(path):
+    """按 SD 的方式 import 插件：目录当作包（模块名是目录名），.py 当作单个模块。"""
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        name = os.path.basename(path.rstrip(os.sep))
+        location = os.path.join(path, '__init__.py')
+        search = [path]
+    else:
+        name = os.path.splitext(os.path.basename(path))[0]
+        location = path
+        search = None
+    # 已经 import 过的（比如本脚本自己用到的 MaxSDPlugin）先移走，重新计时
+    for module_name in [m for m in sys.modules if m == name or m.startswith(name + '.')]:
+        del sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(name, location, submodule_search_locations=search)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    parent = os.path.dirname(path)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    spec.loader.exec_module(module)
+    return name, module
+
+
+def profile(paths):
+    """返回 [(插件名, import 秒, initialize 秒, 错误), ...]。"""
+    results = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(os.path.abspath(path).rstrip(os.sep)))[0]
+        timer = install_import_timer()
+        started = time.perf_counter()
+        try:
+            name, module = _load(path)
+        except Exception as e:
+            results.append((name, time.perf_counter() - started, 0.0, '%s: %s' % (type(e).__name__, e)))
+            continue
+        finally:
+            remove_import_timer(timer)
+        imported = time.perf_counter() - started
+        profiler.record(name, 'import', imported)
+        error = ''
+        started = time.perf_counter()
+        try:
+            initialize = getattr(module, 'initializeSDPlugin', None)
+            if initialize is None:
+                error = '没有 initializeSDPlugin'
+            else:
+                initialize()
+        except Exception as e:
+            error = '%s: %s' % (type(e).__name__, e)
+        initialized = time.perf_counter() - started
+        profiler.record(name, 'initialize', initialized)
+        uninitialize = getattr(module, 'uninitializeSDPlugin', None)
+        if uninitialize is not None:
+            try:
+                uninitialize()
+            except Exception as e:
+                error = error or 'uninitialize %s: %s' % (type(e).__name__, e)
+        results.append((name, imported, initialized, error))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('plugins', nargs='*', help='插件目录或 .py 文件，默认是仓库里的几个插件')
+    parser.add_argument('--top', type=int, default=10, help='列出最慢的前 N 个模块 import')
+    args = parser.parse_args(argv)
+
+    results = profile(args.plugins or DEFAULT_PLUGINS)
+    print('%-24s %10s %12s  %s' % ('插件', 'import', 'initialize', '错误'))
+    for name, imported, initialized, error in sorted(results, key=lambda r: r[1] + r[2], reverse=True):
+        print('%-24s %9.1fms %11.1fms  %s' % (name, imported * 1000, initialized * 1000, error))
+    print()
+    print(profiler.report(args.top))
+
+
+if __name__ == '__main__':
+    main()
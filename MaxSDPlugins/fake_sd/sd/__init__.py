@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""本地假的 `sd` 模块：在 Substance Designer 之外运行 / 压测 MaxSDPlugin 的代码
+
+只实现了 MaxSDPlugin 用到的那部分 API，接口名字和参数与 SD 13 的 Python API 保持一致。
+每一次 API 调用都会经过 sd._host.crossing 计数，还可以设置“每次调用的延迟”，
+用来模拟真实 SD 里 Python 调用穿过宿主程序（C++）的开销。
+
+用法（在仓库根目录）：
+    import sys
+    sys.path.insert(0, 'MaxSDPlugins/fake_sd')     # 让 `import sd` 找到这里
+    import sd
+    from sd import _host
+    _host.set_latency(20e-6)                       # 每次 API 调用 20 微秒
+    graph = sd.getContext().getSDApplication().getQtForPythonUIMgr().getCurrentGraph()
+    print(_host.calls.most_common(5))
+
+注意：这个目录只用于离线测试，不要把它加到 SD 的插件路径里。
+"""
+
+from sd.context import Context
+
+_context = None
+
+
+def getContext():
+    global _context
+    if _context is None:
+        _context = Context()
+    return _context
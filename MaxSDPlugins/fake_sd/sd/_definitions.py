@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""假节点的属性表：定义 id -> [(属性 id, 值类型名, 默认基础值, 可连接), ...]
+
+值类型名对应 sd.api 里的 SDValueXxx 类，None 表示没有值的图像输入端口。
+"""
+
+from sd.api.sdbasetypes import float2, float4, int2
+
+_BASE = [
+    ('$outputsize', 'SDValueInt2', int2(0, 0), False),
+    ('$format', 'SDValueInt', 0, False),
+    ('$pixelsize', 'SDValueFloat2', float2(1.0, 1.0), False),
+    ('$tiling', 'SDValueInt', 3, False),
+    ('$randomseed', 'SDValueInt', 0, False),
+]
+
+DEFINITIONS = {
+    'sbs::compositing::uniform': [
+        ('colorswitch', 'SDValueBool', True, False),
+        ('outputcolor', 'SDValueFloat4', float4(0.0, 0.0, 0.0, 1.0), False),
+    ],
+    'sbs::compositing::hsl': [
+        ('input1', None, None, True),
+        ('hue', 'SDValueFloat', 0.5, False),
+        ('saturation', 'SDValueFloat', 0.5, False),
+        ('luminosity', 'SDValueFloat', 0.5, False),
+    ],
+    'sbs::compositing::levels': [
+        ('input1', None, None, True),
+        ('levelinlow', 'SDValueFloat4', float4(0.0, 0.0, 0.0, 0.0), False),
+        ('levelinmid', 'SDValueFloat4', float4(0.5, 0.5, 0.5, 0.5), False),
+        ('levelinhigh', 'SDValueFloat4', float4(1.0, 1.0, 1.0, 1.0), False),
+        ('leveloutlow', 'SDValueFloat4', float4(0.0, 0.0, 0.0, 0.0), False),
+        ('levelouthigh', 'SDValueFloat4', float4(1.0, 1.0, 1.0, 1.0), False),
+    ],
+    'sbs::compositing::blend': [
+        ('source', None, None, True),
+        ('destination', None, None, True),
+        ('opacity', None, None, True),
+        ('opacitymult', 'SDValueFloat', 1.0, False),
+        ('blendingmode', 'SDValueInt', 0, False),
+    ],
+    'sbs::compositing::grayscaleconversion': [
+        ('input1', None, None, True),
+        ('channelsweights', 'SDValueFloat4', float4(0.33, 0.33, 0.33, 0.0), False),
+    ],
+    'sbs::compositing::output': [
+        ('inputNodeOutput', None, None, True),
+    ],
+}
+
+# 实例节点：SD 里所有实例节点的定义 id 都是它，端口由被实例化的 graph 决定
+INSTANCE_DEFINITION = 'sbs::compositing::sbscompgraph_instance'
+
+# 被实例化的 graph identifier -> 它的输入端口
+INSTANCES = {
+    'RGBA_Merge': [
+        ('R', None, None, True),
+        ('G', None, None, True),
+        ('B', None, None, True),
+        ('A', None, None, True),
+    ],
+}
+
+# 没登记的定义（或 graph）只有一个通用输入
+_FALLBACK = [('input1', None, None, True)]
+
+
+def input_properties(definition_id, resource_url=None):
+    if definition_id == INSTANCE_DEFINITION:
+        graph = (resource_url or '').split('pkg:///', 1)[-1].split('?', 1)[0]
+        return list(INSTANCES.get(graph, _FALLBACK)) + _BASE
+    specs = DEFINITIONS.get(definition_id, _FALLBACK)
+    if definition_id == 'sbs::compositing::output':
+        return list(specs)
+    return list(specs) + _BASE
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""模拟“跨进宿主程序”的开销：调用计数 + 可选的固定延迟。"""
+
+import functools
+import time
+from collections import Counter
+
+# {'SDNode.getPropertyValue': 次数, ...}
+calls = Counter()
+latency = 0.0
+# 个别方法的额外延迟倍数，例如 setPropertyValue 在真实 SD 里还要记录撤销、让下游节点失效
+weights = {}
+
+
+def set_latency(seconds, **method_weights):
+    """设置每次 API 调用的延迟（秒）。0 表示不延迟，只计数。
+
+    method_weights 给个别方法设倍数，方法名里的点换成双下划线：
+        set_latency(20e-6, SDNode__setPropertyValue=10)
+    """
+    global latency
+    latency = seconds
+    weights.clear()
+    for name, weight in method_weights.items():
+        weights[name.replace('__', '.')] = weight
+
+
+def reset():
+    calls.clear()
+
+
+def total_calls():
+    return sum(calls.values())
+
+
+def crossing(func):
+    """装饰 API 方法：计数，并按 latency 忙等（sleep 的精度不够微秒级）。"""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        if latency:
+            deadline = time.perf_counter() + latency * weights.get(name, 1)
+            while time.perf_counter() < deadline:
+                pass
+        return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDMDLGraphDefinition(object):
+    def __init__(self, definition_id):
+        self._id = definition_id
+        self._label = ''
+        self._icon = ''
+        self._types = []
+        self._definitions = {}
+
+    @staticmethod
+    @crossing
+    def sNew(definition_id):
+        return SDMDLGraphDefinition(definition_id)
+
+    @crossing
+    def getId(self):
+        return self._id
+
+    @crossing
+    def setLabel(self, label):
+        self._label = label
+
+    @crossing
+    def setIconFile(self, path):
+        self._icon = path
+
+    @crossing
+    def addType(self, sd_type):
+        self._types.append(sd_type)
+
+    @crossing
+    def getDefinitionFromId(self, definition_id):
+        return self._definitions.get(definition_id)
+
+    @crossing
+    def addDefinition(self, definition):
+        self._definitions[definition._id] = definition
+
+    @crossing
+    def removeDefinition(self, definition):
+        self._definitions.pop(definition._id, None)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+
+
+class QtForPythonUIMgrWrapper(object):
+    def __init__(self):
+        self._graph = None
+        self._selection = []
+
+    @crossing
+    def getCurrentGraph(self):
+        return self._graph
+
+    @crossing
+    def getCurrentGraphSelectedNodes(self):
+        return SDArray(self._selection)
+
+    @crossing
+    def getMainWindow(self):
+        return None
+
+    # 下面两个是假模块专用的测试辅助方法，真实 API 里没有
+    def setCurrentGraph(self, graph):
+        self._graph = graph
+
+    def setSelectedNodes(self, nodes):
+        self._selection = list(nodes)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from sd._definitions import INSTANCE_DEFINITION
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+from sd.api.sbs.sdsbscompnode import SDSBSCompNode
+
+
+class SDSBSCompGraph(object):
+    def __init__(self, package=None, identifier='graph'):
+        self._package = package
+        self._identifier = identifier
+        self._nodes = []
+        self._next_uid = 1000000
+
+    @classmethod
+    @crossing
+    def sNew(cls, package):
+        graph = cls(package)
+        if package is not None:
+            package._resources.append(graph)
+        return graph
+
+    @crossing
+    def getIdentifier(self):
+        return self._identifier
+
+    @crossing
+    def setIdentifier(self, identifier):
+        self._identifier = identifier
+
+    @crossing
+    def getPackage(self):
+        return self._package
+
+    @crossing
+    def getNodes(self):
+        return SDArray(self._nodes)
+
+    @crossing
+    def getNodeFromId(self, identifier):
+        for node in self._nodes:
+            if node._identifier == identifier:
+                return node
+        return None
+
+    def _new(self, definition_id, resource=None):
+        self._next_uid += 1
+        node = SDSBSCompNode(self, str(self._next_uid), definition_id, resource)
+        self._nodes.append(node)
+        return node
+
+    @crossing
+    def newNode(self, definition_id):
+        return self._new(definition_id)
+
+    @crossing
+    def newInstanceNode(self, resource):
+        # 和真实 SD 一样：所有实例节点共用一个定义 id，被实例化的 graph 要用 getReferencedResource 取
+        return self._new(INSTANCE_DEFINITION, resource)
+
+    @crossing
+    def deleteNode(self, node):
+        self._nodes.remove(node)
+        for other in self._nodes:
+            for input_id, (source, _output_id) in list(other._inputs.items()):
+                if source is node:
+                    del other._inputs[input_id]
+
+    @crossing
+    def getOutputNodes(self):
+        return SDArray(n for n in self._nodes
+                       if n._definition._id == 'sbs::compositing::output')
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+from sd.api.sdnode import SDNode
+
+
+class SDSBSCompNode(SDNode):
+    @crossing
+    def getReferencedResource(self):
+        """实例节点返回被实例化的资源，其他节点返回 None。"""
+        return self._resource
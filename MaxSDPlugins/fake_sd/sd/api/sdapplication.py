@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+from sd.api.sdgraphdefinitionmgr import SDGraphDefinitionMgr
+from sd.api.sdmodulemgr import SDModuleMgr
+from sd.api.sdpackagemgr import SDPackageMgr
+from sd.api.qtforpythonuimgrwrapper import QtForPythonUIMgrWrapper
+
+
+class SDApplication(object):
+    def __init__(self):
+        self._pkg_mgr = SDPackageMgr()
+        self._ui_mgr = QtForPythonUIMgrWrapper()
+        self._module_mgr = SDModuleMgr()
+        self._graph_definition_mgr = SDGraphDefinitionMgr()
+
+    @crossing
+    def getPackageMgr(self):
+        return self._pkg_mgr
+
+    @crossing
+    def getQtForPythonUIMgr(self):
+        return self._ui_mgr
+
+    @crossing
+    def getModuleMgr(self):
+        return self._module_mgr
+
+    @crossing
+    def getSDGraphDefinitionMgr(self):
+        return self._graph_definition_mgr
+
+    @crossing
+    def getVersion(self):
+        return '13.0.0 (fake)'
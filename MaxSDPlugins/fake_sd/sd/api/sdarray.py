@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDArray(list):
+    """SD 的数组类型；真实 API 里可以迭代，也有 getSize / getItem。"""
+
+    @crossing
+    def getSize(self):
+        return len(self)
+
+    @crossing
+    def getItem(self, index):
+        return self[index]
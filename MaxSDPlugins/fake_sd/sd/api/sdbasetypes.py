@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""float2 / float4 / int2 / ColorRGBA 等基础类型。"""
+
+
+class _Vector(object):
+    _fields = ()
+
+    def __init__(self, *values):
+        values = values + (0,) * (len(self._fields) - len(values))
+        for name, value in zip(self._fields, values):
+            setattr(self, name, value)
+
+    def _astuple(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._astuple() == other._astuple()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(repr(v) for v in self._astuple()))
+
+
+class float2(_Vector):
+    _fields = ('x', 'y')
+
+
+class float3(_Vector):
+    _fields = ('x', 'y', 'z')
+
+
+class float4(_Vector):
+    _fields = ('x', 'y', 'z', 'w')
+
+
+class int2(_Vector):
+    _fields = ('x', 'y')
+
+
+class int3(_Vector):
+    _fields = ('x', 'y', 'z')
+
+
+class int4(_Vector):
+    _fields = ('x', 'y', 'z', 'w')
+
+
+class ColorRGBA(_Vector):
+    _fields = ('r', 'g', 'b', 'a')
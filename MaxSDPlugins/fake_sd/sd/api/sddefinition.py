@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDDefinition(object):
+    def __init__(self, definition_id):
+        self._id = definition_id
+
+    @crossing
+    def getId(self):
+        return self._id
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDGraphDefinitionMgr(object):
+    def __init__(self):
+        self._definitions = {}
+
+    @crossing
+    def getGraphDefinitionFromId(self, definition_id):
+        return self._definitions.get(definition_id)
+
+    @crossing
+    def addGraphDefinition(self, graph_definition):
+        self._definitions[graph_definition._id] = graph_definition
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDHistoryUtils(object):
+    # 记录已经提交的撤销组名字，方便测试检查
+    groups = []
+
+    class UndoGroup(object):
+        def __init__(self, name):
+            self.name = name
+
+        @crossing
+        def __enter__(self):
+            return self
+
+        @crossing
+        def __exit__(self, *exc):
+            SDHistoryUtils.groups.append(self.name)
+            return False
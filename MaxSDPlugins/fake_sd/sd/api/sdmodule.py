@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+
+
+class SDModule(object):
+    def __init__(self, module_id, types=(), definitions=()):
+        self._id = module_id
+        self._types = list(types)
+        self._definitions = list(definitions)
+        self._types_by_id = {t._id: t for t in self._types}
+        self._definitions_by_id = {d._id: d for d in self._definitions}
+
+    @crossing
+    def getId(self):
+        return self._id
+
+    @crossing
+    def getTypes(self):
+        return SDArray(self._types)
+
+    @crossing
+    def getTypeFromId(self, type_id):
+        return self._types_by_id.get(type_id)
+
+    @crossing
+    def getDefinitions(self):
+        return SDArray(self._definitions)
+
+    @crossing
+    def getDefinitionFromId(self, definition_id):
+        return self._definitions_by_id.get(definition_id)
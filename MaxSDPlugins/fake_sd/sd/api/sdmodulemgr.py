@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+from sd.api.sddefinition import SDDefinition
+from sd.api.sdmodule import SDModule
+from sd.api.sdproperty import SDType
+
+_EXPORT = re.compile(r'^\s*export\s+[\w:<>]+\s+(\w+)\s*\(', re.M)
+
+# mdl::<builtins> 里的类型（真实 SD 里有几百个，这里用基础类型 + 矩阵 + 凑数的结构体代替）
+_BUILTIN_TYPES = ([base + suffix for base in ('bool', 'int', 'float', 'double') for suffix in ('', '2', '3', '4')]
+                  + ['string', 'mdl::texture_2d', 'mdl::texture_3d', 'mdl::texture_cube']
+                  + ['matrix<%s%dx%d>' % (base, r, c) for base in ('float', 'double')
+                     for r in (2, 3, 4) for c in (2, 3, 4)])
+
+
+class SDModuleMgr(object):
+    # 模拟公司内部的大型 MDL 节点库：额外的模块数、每个模块的定义数、builtins 里凑数的类型数
+    extra_modules = 0
+    definitions_per_module = 20
+    extra_builtin_types = 300
+
+    def __init__(self):
+        self._roots = []
+        self._modules = None
+
+    @crossing
+    def addRootPath(self, kind, path):
+        if (kind, path) not in self._roots:
+            self._roots.append((kind, path))
+            self._modules = None
+
+    @crossing
+    def getModules(self):
+        return SDArray(self._scan())
+
+    @crossing
+    def getModuleFromId(self, module_id):
+        for module in self._scan():
+            if module._id == module_id:
+                return module
+        return None
+
+    def _scan(self):
+        # 和 SD 一样：根路径下每个 .mdl 文件是一个模块，id 是 mdl::目录::文件名
+        if self._modules is not None:
+            return self._modules
+        types = [SDType(type_id) for type_id in _BUILTIN_TYPES]
+        types.extend(SDType('mdl::_struct_%d' % i) for i in range(self.extra_builtin_types))
+        modules = [SDModule('mdl::<builtins>', types=types)]
+        for i in range(self.extra_modules):
+            module_id = 'mdl::studio_lib::module_%d' % i
+            modules.append(SDModule(module_id, definitions=[
+                SDDefinition('%s::node_%d' % (module_id, j)) for j in range(self.definitions_per_module)]))
+        for kind, root in self._roots:
+            if kind != 'mdl':
+                continue
+            for directory, _dirs, files in os.walk(root):
+                for name in sorted(files):
+                    if not name.endswith('.mdl'):
+                        continue
+                    rel = os.path.relpath(os.path.join(directory, name[:-4]), root)
+                    module_id = 'mdl::' + '::'.join(rel.split(os.sep))
+                    with open(os.path.join(directory, name)) as f:
+                        exports = _EXPORT.findall(f.read())
+                    modules.append(SDModule(module_id, definitions=[
+                        SDDefinition('%s::%s' % (module_id, export)) for export in exports]))
+        self._modules = modules
+        return modules
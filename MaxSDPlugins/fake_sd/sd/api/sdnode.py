@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import importlib
+
+from sd._definitions import input_properties
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+from sd.api.sdbasetypes import float2
+from sd.api.sddefinition import SDDefinition
+from sd.api.sdproperty import SDProperty, SDPropertyCategory
+
+
+# 值类型名 -> SDType.getId() 的返回值
+_TYPE_IDS = {'SDValueFloat': 'float', 'SDValueFloat2': 'float2', 'SDValueFloat3': 'float3',
+             'SDValueFloat4': 'float4', 'SDValueInt': 'int', 'SDValueInt2': 'int2',
+             'SDValueBool': 'bool', 'SDValueString': 'string', 'SDValueColorRGBA': 'ColorRGBA'}
+
+
+def _value_class(name):
+    return getattr(importlib.import_module('sd.api.' + name.lower()), name)
+
+
+class SDConnection(object):
+    def __init__(self, input_node, input_prop, output_node, output_prop):
+        self._input = (input_node, input_prop)
+        self._output = (output_node, output_prop)
+
+    @crossing
+    def getInputProperty(self):
+        return self._input[1]
+
+    @crossing
+    def getInputPropertyNode(self):
+        return self._input[0]
+
+    @crossing
+    def getOutputProperty(self):
+        return self._output[1]
+
+    @crossing
+    def getOutputPropertyNode(self):
+        return self._output[0]
+
+
+class SDNode(object):
+    def __init__(self, graph, identifier, definition_id, resource=None):
+        self._graph = graph
+        self._identifier = identifier
+        self._definition = SDDefinition(definition_id)
+        self._position = float2(0.0, 0.0)
+        self._props = {SDPropertyCategory.Input: [], SDPropertyCategory.Output: [],
+                       SDPropertyCategory.Annotation: []}
+        self._values = {}
+        self._resource = resource
+        resource_url = resource.getUrl() if resource is not None else None
+        for prop_id, value_type, default, connectable in input_properties(definition_id, resource_url):
+            default_value = _value_class(value_type)(default) if value_type else None
+            prop = SDProperty(prop_id, SDPropertyCategory.Input, _TYPE_IDS.get(value_type, 'SDTypeTexture'),
+                              connectable, default=default_value)
+            self._props[SDPropertyCategory.Input].append(prop)
+            if value_type:
+                self._values[prop_id] = _value_class(value_type)(default)
+        output = 'unique_filter_output' if definition_id.startswith('sbs::') else 'output'
+        if definition_id != 'sbs::compositing::output':
+            self._props[SDPropertyCategory.Output].append(
+                SDProperty(output, SDPropertyCategory.Output, 'SDTypeTexture', True))
+        # 本节点输入端口上的连接：{属性 id: (上游节点, 上游属性 id)}
+        self._inputs = {}
+
+    def _find(self, prop_id, category):
+        for prop in self._props[category]:
+            if prop._id == prop_id:
+                return prop
+        return None
+
+    @crossing
+    def getIdentifier(self):
+        return self._identifier
+
+    @crossing
+    def getDefinition(self):
+        return self._definition
+
+    @crossing
+    def getProperties(self, category):
+        return SDArray(self._props[category])
+
+    @crossing
+    def getPropertyFromId(self, prop_id, category):
+        return self._find(prop_id, category)
+
+    @crossing
+    def getPropertyValue(self, prop):
+        return self._values.get(prop._id)
+
+    @crossing
+    def getPropertyValueFromId(self, prop_id, category):
+        return self._values.get(prop_id)
+
+    @crossing
+    def setPropertyValue(self, prop, value):
+        if prop._id not in self._values:
+            raise ValueError('属性 %s 不能设置值' % prop._id)
+        self._values[prop._id] = value
+
+    @crossing
+    def getPosition(self):
+        return float2(self._position.x, self._position.y)
+
+    @crossing
+    def setPosition(self, position):
+        self._position = float2(position.x, position.y)
+
+    @crossing
+    def newPropertyConnectionFromId(self, output_prop_id, target_node, target_prop_id):
+        """把本节点的输出 output_prop_id 连到 target_node 的输入 target_prop_id。"""
+        output_prop = self._find(output_prop_id, SDPropertyCategory.Output)
+        input_prop = target_node._find(target_prop_id, SDPropertyCategory.Input)
+        if output_prop is None or input_prop is None or not input_prop._connectable:
+            raise ValueError('无法连接 %s -> %s' % (output_prop_id, target_prop_id))
+        target_node._inputs[target_prop_id] = (self, output_prop_id)
+        return SDConnection(target_node, input_prop, self, output_prop)
+
+    @crossing
+    def getPropertyConnections(self, prop):
+        if prop._category == SDPropertyCategory.Input:
+            source = self._inputs.get(prop._id)
+            if source is None:
+                return SDArray()
+            node, output_id = source
+            return SDArray([SDConnection(self, prop, node,
+                                         node._find(output_id, SDPropertyCategory.Output))])
+        result = SDArray()
+        for node in self._graph._nodes:
+            for input_id, (source, output_id) in node._inputs.items():
+                if source is self and output_id == prop._id:
+                    result.append(SDConnection(node, node._find(input_id, SDPropertyCategory.Input),
+                                               self, prop))
+        return result
+
+    @crossing
+    def deletePropertyConnections(self, prop):
+        self._inputs.pop(prop._id, None)
+
+    def __repr__(self):
+        return 'SDNode(%r, %r)' % (self._identifier, self._definition._id)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import os
+
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+
+
+class SDResource(object):
+    def __init__(self, package, identifier):
+        self._package = package
+        self._identifier = identifier
+
+    @crossing
+    def getIdentifier(self):
+        return self._identifier
+
+    @crossing
+    def getUrl(self):
+        return 'pkg:///%s' % self._identifier
+
+    @crossing
+    def getPackage(self):
+        return self._package
+
+
+class SDPackage(object):
+    def __init__(self, file_path=''):
+        self._file_path = file_path
+        self._resources = []
+
+    @crossing
+    def getFilePath(self):
+        return self._file_path
+
+    @crossing
+    def getChildrenResources(self, include_children):
+        return SDArray(self._resources)
+
+    @crossing
+    def findResourceFromUrl(self, url):
+        identifier = url.split('pkg:///', 1)[-1].split('?', 1)[0]
+        for resource in self._resources:
+            if resource._identifier == identifier:
+                return resource
+        # 假包：按文件名约定，包里有一个同名 graph
+        if identifier == os.path.splitext(os.path.basename(self._file_path))[0]:
+            resource = SDResource(self, identifier)
+            self._resources.append(resource)
+            return resource
+        return None
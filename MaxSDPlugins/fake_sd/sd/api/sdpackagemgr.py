@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import time
+
+from sd._host import crossing
+from sd.api.sdarray import SDArray
+from sd.api.sdpackage import SDPackage
+
+
+class SDPackageMgr(object):
+    # 模拟加载一个包的耗时（秒），真实 SD 里加载一个大 .sbsar 要几百毫秒
+    load_delay = 0.0
+
+    def __init__(self):
+        self._packages = []
+
+    @crossing
+    def getPackages(self):
+        return SDArray(self._packages)
+
+    @crossing
+    def getUserPackages(self):
+        return SDArray(self._packages)
+
+    @crossing
+    def newUserPackage(self):
+        package = SDPackage()
+        self._packages.append(package)
+        return package
+
+    @crossing
+    def loadUserPackage(self, file_path, *args):
+        if self.load_delay:
+            time.sleep(self.load_delay)
+        package = SDPackage(file_path)
+        self._packages.append(package)
+        return package
+
+    @crossing
+    def unloadUserPackage(self, package):
+        self._packages.remove(package)
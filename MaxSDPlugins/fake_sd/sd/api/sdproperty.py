@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDPropertyCategory(object):
+    Annotation = 0
+    Input = 1
+    Output = 2
+
+
+class SDType(object):
+    def __init__(self, type_id):
+        self._id = type_id
+
+    @crossing
+    def getId(self):
+        return self._id
+
+
+class SDProperty(object):
+    def __init__(self, prop_id, category, type_id, connectable=False, label=None, default=None):
+        self._id = prop_id
+        self._default = default
+        self._category = category
+        self._type = SDType(type_id)
+        self._connectable = connectable
+        self._label = label or prop_id
+
+    @crossing
+    def getId(self):
+        return self._id
+
+    @crossing
+    def getCategory(self):
+        return self._category
+
+    @crossing
+    def getType(self):
+        return self._type
+
+    @crossing
+    def getLabel(self):
+        return self._label
+
+    @crossing
+    def getDefaultValue(self):
+        return self._default
+
+    @crossing
+    def isConnectable(self):
+        return self._connectable
+
+    def __repr__(self):
+        return 'SDProperty(%r)' % self._id
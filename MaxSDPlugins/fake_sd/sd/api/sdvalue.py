@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+
+
+class SDValue(object):
+    """值对象的基类：sNew(基础值) 创建，get() 取出基础值。"""
+
+    def __init__(self, value):
+        self._value = value
+
+    @classmethod
+    @crossing
+    def sNew(cls, value):
+        return cls(value)
+
+    @crossing
+    def get(self):
+        return self._value
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self._value)
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from sd.api.sdvalue import SDValue
+
+
+class SDValueEnum(SDValue):
+    pass
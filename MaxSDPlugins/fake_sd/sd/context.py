@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from sd._host import crossing
+from sd.api.sdapplication import SDApplication
+
+
+class Context(object):
+    def __init__(self):
+        self._app = SDApplication()
+
+    @crossing
+    def getSDApplication(self):
+        return self._app
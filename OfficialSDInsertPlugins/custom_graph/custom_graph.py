@@ -12,6 +12,11 @@
 
 import sd
 import os
+import json
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
 
 from sd.api.mdl.sdmdlgraphdefinition import *
 
@@ -19,91 +24,276 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# Types taken from the MDL 'builtin' module
+BASE_TYPES = ['bool', 'bool2', 'bool3', 'bool4',
+              'int', 'int2', 'int3', 'int4',
+              'float', 'float2', 'float3', 'float4',
+              'double', 'double2', 'double3', 'double4',
+              'string', 'mdl::texture_2d']
+BUILTINS_MODULE_ID = 'mdl::<builtins>'
+# All definitions from the modules starting with this prefix are added to the graph definition
+MODULE_PREFIX = 'mdl::custom_graph'
+CACHE_VERSION = 3
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.custom_graph', 'registration_cache.json')
+
+
+# .mdl files registered by this process: {graph definition id: {file path: entry}}
+# Only this state decides whether a module can be skipped: the cache file is shared by
+# every SD instance on the machine and says nothing about what this process registered
+_registeredFiles = {}
+
+
+def isSelectedType(aSDTypeId):
+    return aSDTypeId in BASE_TYPES or aSDTypeId.startswith('matrix<')
+
+
+def mdlModuleId(aMdlRootPath, aMdlFilePath):
+    """data/mdl/custom_graph/custom_graph_nodes.mdl -> 'mdl::custom_graph::custom_graph_nodes'"""
+    relPath = os.path.relpath(os.path.splitext(aMdlFilePath)[0], aMdlRootPath)
+    return 'mdl::' + '::'.join(relPath.split(os.sep))
+
+
+def fileSignature(aFilePath):
+    st = os.stat(aFilePath)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def hashFile(aFilePath):
+    with open(aFilePath, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class RegistrationCache:
+    """
+    Persistent cache (JSON file) of the builtin type-id index:
+    - 'types': ids of the builtin types selected last time (valid for one SD version)
+    Which modules are registered is process state (_registeredFiles), not stored here.
+    """
+    def __init__(self, aPath):
+        self.path = aPath
+        self.data = {}
+        try:
+            with open(aPath, 'r') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if self.data.get('version') != CACHE_VERSION:
+            self.data = {'version': CACHE_VERSION, 'types': {}}
+        self._saved = json.dumps(self.data, sort_keys=True)
+
+    def save(self):
+        text = json.dumps(self.data, sort_keys=True)
+        if text == self._saved:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmpPath = tempfile.mkstemp(prefix='.tmp_', suffix='.json', dir=directory)
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmpPath, self.path)
+            self._saved = text
+        except OSError as e:
+            logger.warning('Cannot write registration cache "%s": %s' % (self.path, e))
+
+
+class PhaseTimer:
+    def __init__(self):
+        self.phases = []
+        self.counters = {}
+
+    @contextmanager
+    def phase(self, aName):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((aName, time.perf_counter() - start))
+
+    def count(self, aName, aValue=1):
+        self.counters[aName] = self.counters.get(aName, 0) + aValue
+
+    def report(self):
+        total = sum(seconds for _name, seconds in self.phases)
+        lines = ['CustomGraph.init: %.1f ms' % (total * 1000)]
+        for name, seconds in self.phases:
+            lines.append('  %-18s %8.1f ms' % (name, seconds * 1000))
+        if self.counters:
+            lines.append('  ' + ', '.join('%s=%d' % item for item in sorted(self.counters.items())))
+        return '\n'.join(lines)
+
+
 class CustomGraph:
+    # Timings of the last init() call, see timingReport()
+    lastTimer = None
+
     @staticmethod
-    def init(aSDGraphDefinitionId = 'custom_graph'):
+    def init(aSDGraphDefinitionId = 'custom_graph', aCacheFile = DEFAULT_CACHE_FILE, aMdlRootPath = None):
+        timer = PhaseTimer()
+        CustomGraph.lastTimer = timer
         context = sd.getContext()
         sdApp = context.getSDApplication()
+        cache = RegistrationCache(aCacheFile)
+        # Formatting debug messages calls the SD API, skip it when debug logging is off
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        with timer.phase('addRootPath'):
+            # Add MDL Root path
+            currentScriptAbsPath = os.path.abspath(os.path.split(__file__)[0])
+            mdlRootPath = aMdlRootPath or os.path.join(currentScriptAbsPath, 'data', 'mdl')
+            sdModuleMgr = sdApp.getModuleMgr()
+            sdModuleMgr.addRootPath('mdl', mdlRootPath)
+
+        with timer.phase('graphDefinition'):
+            # Create new Graph definition
+            graphDefinitionMgr = sdApp.getSDGraphDefinitionMgr()
+            assert(graphDefinitionMgr)
+
+            # Add Graph Definition if not already exist
+            sdGraphDefinitionId = aSDGraphDefinitionId
+            sdGraphDefinition = graphDefinitionMgr.getGraphDefinitionFromId(sdGraphDefinitionId)
+            created = not sdGraphDefinition
+            if created:
+                sdGraphDefinition = SDMDLGraphDefinition.sNew(sdGraphDefinitionId)
+                assert(sdGraphDefinition)
+                assert(sdGraphDefinition.getId() == sdGraphDefinitionId)
+                sdGraphDefinition.setLabel('Custom Graph')
+                sdGraphDefinition.setIconFile(os.path.join(currentScriptAbsPath, 'custom_graph_icon.png'))
+                # Add the new graph definition
+                graphDefinitionMgr.addGraphDefinition(sdGraphDefinition)
+            else:
+                assert(sdGraphDefinition.getId() == sdGraphDefinitionId)
+
+        # A graph definition created just now has nothing registered, whatever this process did before
+        if created:
+            _registeredFiles[sdGraphDefinitionId] = {}
+        registered = _registeredFiles.setdefault(sdGraphDefinitionId, {})
+
+        with timer.phase('hashModules'):
+            # Content hash of each .mdl file, only files with a new mtime / size since they were
+            # registered are read
+            mdlFiles = {}
+            for root, _dirs, files in os.walk(mdlRootPath):
+                for name in sorted(files):
+                    if name.endswith('.mdl'):
+                        filePath = os.path.join(root, name)
+                        moduleId = mdlModuleId(mdlRootPath, filePath)
+                        if moduleId.startswith(MODULE_PREFIX):
+                            signature = fileSignature(filePath)
+                            entry = registered.get(filePath)
+                            if entry and entry['signature'] == signature:
+                                contentHash = entry['hash']
+                            else:
+                                contentHash = hashFile(filePath)
+                            mdlFiles[filePath] = (moduleId, signature, contentHash)
+            timer.count('mdlFiles', len(mdlFiles))
+
+        # Modules are looked up by id; the full module list is only walked if a lookup fails
+        moduleIndex = {}
+
+        def getModule(aModuleId):
+            sdModule = None
+            if hasattr(sdModuleMgr, 'getModuleFromId'):
+                sdModule = sdModuleMgr.getModuleFromId(aModuleId)
+            if not sdModule:
+                if not moduleIndex:
+                    timer.count('moduleListScans')
+                    for module in sdModuleMgr.getModules():
+                        moduleIndex[module.getId()] = module
+                sdModule = moduleIndex.get(aModuleId)
+            return sdModule
+
+        # The types are attached to the graph definition when it is created
+        if created:
+            with timer.phase('types'):
+                selectedTypes = CustomGraph._selectTypes(getModule(BUILTINS_MODULE_ID), cache, sdApp, timer)
+                for sdType in selectedTypes:
+                    if debug:
+                        logger.debug('[%s] Adding Type "%s"' % (sdGraphDefinition.getId(), sdType.getId()))
+                    sdGraphDefinition.addType(sdType)
 
-        # Add MDL Root path
-        currentScriptAbsPath = os.path.abspath(os.path.split(__file__)[0])
-        mdlRootPath = os.path.join(currentScriptAbsPath, 'data', 'mdl')
-        sdApp.getModuleMgr().addRootPath('mdl', mdlRootPath)
-
-        # Create new Graph definition
-        graphDefinitionMgr = sdApp.getSDGraphDefinitionMgr()
-        assert(graphDefinitionMgr)
-
-        # Add Graph Definition if not already exist
-        sdGraphDefinitionId = aSDGraphDefinitionId
-        sdGraphDefinition = graphDefinitionMgr.getGraphDefinitionFromId(sdGraphDefinitionId)
-        if not sdGraphDefinition:
-            sdGraphDefinition = SDMDLGraphDefinition.sNew(sdGraphDefinitionId)
-            assert(sdGraphDefinition)
-            assert(sdGraphDefinition.getId() == sdGraphDefinitionId)
-            sdGraphDefinition.setLabel('Custom Graph')
-            sdGraphDefinition.setIconFile(os.path.join(os.path.abspath(os.path.split(__file__)[0]), 'custom_graph_icon.png'))
-            # Add the new graph definition
-            graphDefinitionMgr.addGraphDefinition(sdGraphDefinition)
-        else:
-            assert(sdGraphDefinition.getId() == sdGraphDefinitionId)
-
-        # Add some Node definition to the graph definition
-        sdModuleMgr = sdApp.getModuleMgr()
-        sdModules = sdModuleMgr.getModules()
-        selectedDefinitions = []
+        with timer.phase('definitions'):
+            # Files removed from data/mdl: remove their definitions
+            for filePath in [path for path in registered if path not in mdlFiles]:
+                CustomGraph._removeDefinitions(sdGraphDefinition, registered[filePath]['definitions'], timer)
+                del registered[filePath]
+
+            for filePath, (moduleId, signature, contentHash) in sorted(mdlFiles.items()):
+                entry = registered.get(filePath)
+                if entry and entry['hash'] == contentHash:
+                    # Unchanged module already registered in this session
+                    entry['signature'] = signature
+                    timer.count('modulesSkipped')
+                    continue
+                sdModule = getModule(moduleId)
+                if not sdModule:
+                    logger.warning('[%s] MDL module "%s" not found' % (sdGraphDefinition.getId(), moduleId))
+                    continue
+                definitionIds = []
+                for definition in sdModule.getDefinitions():
+                    definitionId = definition.getId()
+                    # A graph definition created just now has no definitions to replace
+                    existingNodeDefinition = None if created else sdGraphDefinition.getDefinitionFromId(definitionId)
+                    if existingNodeDefinition:
+                        sdGraphDefinition.removeDefinition(existingNodeDefinition)
+
+                    if debug:
+                        logger.debug('[%s] Adding Definition "%s"' % (sdGraphDefinition.getId(), definitionId))
+                    sdGraphDefinition.addDefinition(definition)
+                    definitionIds.append(definitionId)
+                timer.count('modulesRegistered')
+                timer.count('definitionsAdded', len(definitionIds))
+                # Definitions that disappeared from a changed module
+                if entry:
+                    addedIds = set(definitionIds)
+                    stale = [i for i in entry['definitions'] if i not in addedIds]
+                    CustomGraph._removeDefinitions(sdGraphDefinition, stale, timer)
+                registered[filePath] = {'signature': signature, 'hash': contentHash, 'module': moduleId,
+                                        'definitions': definitionIds}
+
+        with timer.phase('saveCache'):
+            cache.save()
+        logger.info(timer.report())
+
+    @staticmethod
+    def _selectTypes(aBuiltinsModule, aCache, aSDApp, aTimer):
+        if not aBuiltinsModule:
+            return []
+        # Prebuilt id index: the ids selected last time with the same SD version are looked up directly
+        version = aSDApp.getVersion()
+        cachedIds = aCache.data['types'].get(version)
+        if cachedIds and hasattr(aBuiltinsModule, 'getTypeFromId'):
+            selectedTypes = [aBuiltinsModule.getTypeFromId(typeId) for typeId in cachedIds]
+            if all(selectedTypes):
+                aTimer.count('typesFromIndex', len(selectedTypes))
+                return selectedTypes
+
+        # Add some base types and the matrices
         selectedTypes = []
-        for sdModule in sdModules:
-            sdModuleId = sdModule.getId()
-
-            # Discard non 'mdl' modules
-            if not sdModuleId.startswith('mdl::'):
-                continue
-
-            # Add some definitions from the MDL 'builtin' module
-            if sdModuleId == 'mdl::<builtins>':
-                # Add some base types
-                baseTypes = ['bool', 'bool2', 'bool3', 'bool4',
-                             'int', 'int2', 'int3', 'int4',
-                             'float', 'float2', 'float3', 'float4',
-                             'double', 'double2', 'double3', 'double4',
-                             'string', 'mdl::texture_2d']
-                for sdType in sdModule.getTypes():
-                    sdTypeId = sdType.getId()
-                    logger.debug(sdTypeId)
-                    if sdTypeId in baseTypes:
-                        # Add some base Types
-                        selectedTypes.append(sdType)
-                    elif sdTypeId.startswith('matrix<'):
-                        # Add matrices
-                        selectedTypes.append(sdType)
-
-                continue
-
-
-            # Add all definitions from the MDL module 'mtlx'
-            if sdModuleId.startswith('mdl::custom_graph'):
-                for sdDefinition in sdModule.getDefinitions():
-                    selectedDefinitions.append(sdDefinition)
-                continue
-
-        # Add the selected types
-        for sdType in selectedTypes:
-            # existingNodeDefinition = sdGraphDefinition.getNodeDefinitionFromId(definition.getId())
-            # if existingNodeDefinition:
-            #     sdGraphDefinition.removeNodeDefinition(existingNodeDefinition)
-
-            logger.debug('[%s] Adding Type "%s"' % (sdGraphDefinition.getId(), sdType.getId()))
-            sdGraphDefinition.addType(sdType)
-
-        # Add the selected node definitions
-        for definition in selectedDefinitions:
-            existingNodeDefinition = sdGraphDefinition.getDefinitionFromId(definition.getId())
+        for sdType in aBuiltinsModule.getTypes():
+            sdTypeId = sdType.getId()
+            logger.debug(sdTypeId)
+            if isSelectedType(sdTypeId):
+                selectedTypes.append(sdType)
+        aTimer.count('typesScanned', len(selectedTypes))
+        aCache.data['types'] = {version: [sdType.getId() for sdType in selectedTypes]}
+        return selectedTypes
+
+    @staticmethod
+    def _removeDefinitions(aSDGraphDefinition, aDefinitionIds, aTimer):
+        for definitionId in aDefinitionIds:
+            existingNodeDefinition = aSDGraphDefinition.getDefinitionFromId(definitionId)
             if existingNodeDefinition:
-                sdGraphDefinition.removeDefinition(existingNodeDefinition)
+                logger.debug('[%s] Removing Definition "%s"' % (aSDGraphDefinition.getId(), definitionId))
+                aSDGraphDefinition.removeDefinition(existingNodeDefinition)
+                aTimer.count('definitionsRemoved')
 
-            logger.debug('[%s] Adding Definition "%s"' % (sdGraphDefinition.getId(), definition.getId()))
-            sdGraphDefinition.addDefinition(definition)
+    @staticmethod
+    def timingReport():
+        """Phase timings of the last init() call"""
+        if CustomGraph.lastTimer is None:
+            return 'CustomGraph.init has not run'
+        return CustomGraph.lastTimer.report()
 
     @staticmethod
     def uninit():
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""utilities：离线处理 .sbs 包的工具脚本
+
+这里的模块只依赖 Python 标准库，不需要 import sd，
+所以既可以在 SD 自带的 Python 里运行，也可以在普通命令行 / 构建机上批量运行。
+
+在仓库根目录用 `python -m utilities.<模块名> --help` 查看各个工具的用法。
+"""
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""批量把 RGBA_Merge “processor” graph 注入 / 更新到整个包库（多进程）
+
+BatchMergeGraphSample.sbs 里的 processor graph 是我们给每个材质都要加的固定结构：
+basecolor / metalic / smoothness / Detail / ao 五个输入，后面接 sbs://rgba_merge.sbs 的 RGBA_Merge 实例。
+以前是一个包一个包手动拷，这个脚本把它变成批处理：
+
+1. 从模板包里读出 processor graph 的原始 XML 字节（借助 sbs_index，只切那一段）。
+2. 对每个目标包：
+   - 找到（或添加）它对 sbs://rgba_merge.sbs 的 <dependency>，把模板里的依赖 uid 换成目标包自己的；
+   - 算出“应该是什么样”的 graph 字节，和包里现有 processor 的字节做哈希对比，一样就跳过；
+   - 不一样就替换那一段字节（没有就插到 </content> 前），其余字节原样保留。
+3. 写文件时先写临时文件再 os.replace，中途失败也不会留下写了一半的包。
+4. 用进程池把文件分给所有 CPU 核，每完成一个文件打印一行进度。
+
+命令行用法：
+    python -m utilities.batch_rgba_merge D:/Materials --dry-run
+    python -m utilities.batch_rgba_merge D:/Materials --workers 16
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utilities import sbs_index
+from utilities.sbs_files import atomic_write, iter_packages
+
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'SDFiles', 'Bilibili_HuangJuanLr', 'BatchMergeGraphSample.sbs')
+GRAPH_IDENTIFIER = 'processor'
+MERGE_DEPENDENCY = 'sbs://rgba_merge.sbs'
+
+# 处理结果
+STATUS_INSERTED = 'inserted'
+STATUS_UPDATED = 'updated'
+STATUS_SKIPPED = 'identical'
+STATUS_FAILED = 'failed'
+
+_GRAPH_UID_RE = re.compile(br'^(<graph><identifier v="[^"]*"/><uid v=")([^"]*)(")')
+
+
+def content_hash(data):
+    """graph 字节的内容哈希，用来判断“是否已经一模一样”。"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class MergeTemplate(object):
+    """从模板包中提取出的 processor graph 和它依赖的 rgba_merge <dependency>。
+
+    只保存 bytes，可以直接传给子进程。
+    """
+
+    def __init__(self, graph_bytes, dependency_bytes, dependency_uid):
+        match = _GRAPH_UID_RE.match(graph_bytes)
+        if match is None:
+            raise ValueError('模板 graph 的开头不是 <graph><identifier/><uid/> 结构')
+        self.graph_bytes = graph_bytes
+        self.graph_uid = match.group(2).decode('utf-8')
+        self.dependency_bytes = dependency_bytes
+        self.dependency_uid = dependency_uid
+
+    @classmethod
+    def from_package(cls, template_path, identifier=GRAPH_IDENTIFIER):
+        index = sbs_index.build_index(template_path, save=False)
+        graph = index.find_graph(identifier)
+        if graph is None:
+            raise ValueError('模板包 %s 中没有 graph: %s' % (template_path, identifier))
+        dependency = None
+        for entry in index.dependencies:
+            if entry['filename'] == MERGE_DEPENDENCY:
+                dependency = entry
+                break
+        if dependency is None:
+            raise ValueError('模板包 %s 没有依赖 %s' % (template_path, MERGE_DEPENDENCY))
+        with open(template_path, 'rb') as f:
+            data = f.read()
+        return cls(data[graph['start']:graph['end']],
+                   data[dependency['start']:dependency['end']],
+                   dependency['uid'])
+
+    def render(self, dependency_uid, graph_uid=None):
+        """生成放进目标包的 graph 字节：替换依赖 uid，必要时替换 graph 自己的 uid。"""
+        data = self.graph_bytes
+        if dependency_uid != self.dependency_uid:
+            data = data.replace(('?dependency=%s"' % self.dependency_uid).encode('utf-8'),
+                                ('?dependency=%s"' % dependency_uid).encode('utf-8'))
+        if graph_uid is not None:
+            data = _GRAPH_UID_RE.sub(lambda m: m.group(1) + graph_uid.encode('utf-8') + m.group(3),
+                                     data, count=1)
+        return data
+
+
+def _new_uid(used):
+    # SD 的 uid 是 10 位左右的十进制数，这里随机取一个包里没用过的
+    while True:
+        uid = str(random.randint(1000000000, 2147483647))
+        if uid not in used:
+            return uid
+
+
+def apply_template(path, template, dry_run=False):
+    """处理单个包，返回 (path, 状态, 说明)。在子进程里运行。"""
+    try:
+        index = sbs_index.build_index(path, save=False)
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        # 1. 找到目标包里的 rgba_merge 依赖；没有的话准备把模板里的那条加进去
+        dependency_uid = None
+        for entry in index.dependencies:
+            if entry['filename'] == MERGE_DEPENDENCY:
+                dependency_uid = entry['uid']
+                break
+        insert_dependency = dependency_uid is None
+        if insert_dependency:
+            used = set(e['uid'] for e in index.dependencies)
+            dependency_uid = template.dependency_uid
+            if dependency_uid in used:
+                dependency_uid = _new_uid(used)
+
+        # 2. 生成应有的 graph 字节并和现有的做哈希对比
+        existing = index.find_graph(GRAPH_IDENTIFIER)
+        if existing is not None:
+            wanted = template.render(dependency_uid, existing['uid'])
+            current = data[existing['start']:existing['end']]
+            if not insert_dependency and content_hash(current) == content_hash(wanted):
+                return path, STATUS_SKIPPED, ''
+            data = data[:existing['start']] + wanted + data[existing['end']:]
+            status = STATUS_UPDATED
+        else:
+            used = set(g['uid'] for g in index.graphs)
+            graph_uid = None
+            if template.graph_uid in used:
+                graph_uid = _new_uid(used)
+            wanted = template.render(dependency_uid, graph_uid)
+            data = _insert_graph(data, wanted)
+            status = STATUS_INSERTED
+
+        # 3. 依赖要插在 graph 之前的位置，所以放在最后处理，不影响上面的偏移
+        if insert_dependency:
+            dependency = template.dependency_bytes.replace(
+                ('<uid v="%s"/>' % template.dependency_uid).encode('utf-8'),
+                ('<uid v="%s"/>' % dependency_uid).encode('utf-8'))
+            data = _insert_dependency(data, dependency)
+
+        if not dry_run:
+            atomic_write(path, data)
+        return path, status, ''
+    except (OSError, ValueError) as e:
+        return path, STATUS_FAILED, str(e)
+
+
+def _insert_graph(data, graph_bytes):
+    end = data.rfind(b'</content>')
+    if end >= 0:
+        return data[:end] + graph_bytes + data[end:]
+    empty = data.rfind(b'<content/>')
+    if empty < 0:
+        raise ValueError('找不到 <content>')
+    return data[:empty] + b'<content>' + graph_bytes + b'</content>' + data[empty + len(b'<content/>'):]
+
+
+def _insert_dependency(data, dependency_bytes):
+    # <dependencies> 只出现在包头部分，<content> 之前
+    limit = data.find(b'<content')
+    end = data.find(b'</dependencies>', 0, limit)
+    if end >= 0:
+        return data[:end] + dependency_bytes + data[end:]
+    empty = data.find(b'<dependencies/>', 0, limit)
+    if empty >= 0:
+        return (data[:empty] + b'<dependencies>' + dependency_bytes + b'</dependencies>'
+                + data[empty + len(b'<dependencies/>'):])
+    # 旧包可能完全没有 <dependencies>：放在 <content> 前面
+    return data[:limit] + b'<dependencies>' + dependency_bytes + b'</dependencies>' + data[limit:]
+
+
+# ----------------------------------------------------------------------
+# 进程池
+# ----------------------------------------------------------------------
+_worker_template = None
+
+
+def _init_worker(template):
+    # 每个子进程启动时收到一次模板，之后每个任务只需要传文件路径
+    global _worker_template
+    _worker_template = template
+
+
+def _run_one(path, dry_run):
+    return apply_template(path, _worker_template, dry_run)
+
+
+def run_batch(paths, template, workers=None, dry_run=False, progress=True):
+    """并行处理所有包，返回 {状态: 数量}。"""
+    paths = list(paths)
+    counts = {STATUS_INSERTED: 0, STATUS_UPDATED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+    if not paths:
+        return counts
+    workers = workers or os.cpu_count() or 1
+    total = len(paths)
+    width = len(str(total))
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template,)) as pool:
+        futures = [pool.submit(_run_one, path, dry_run) for path in paths]
+        for done, future in enumerate(as_completed(futures), 1):
+            path, status, message = future.result()
+            counts[status] += 1
+            if progress:
+                line = '[%*d/%d] %-9s %s' % (width, done, total, status, path)
+                print(line + ('  (%s)' % message if message else ''))
+    elapsed = time.perf_counter() - started
+    if progress:
+        print('[batch_rgba_merge] %d 个文件, 用时 %.2fs, %d 进程: %s%s'
+              % (total, elapsed, workers,
+                 ', '.join('%s=%d' % item for item in sorted(counts.items())),
+                 '（dry-run，未写入）' if dry_run else ''))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量注入 / 更新 RGBA_Merge processor graph')
+    parser.add_argument('paths', nargs='+', help='.sbs 文件或包含 .sbs 的目录')
+    parser.add_argument('--template', default=DEFAULT_TEMPLATE, help='提供 processor graph 的模板包')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认等于 CPU 核数')
+    parser.add_argument('--dry-run', action='store_true', help='只报告会做什么，不写文件')
+    args = parser.parse_args(argv)
+
+    try:
+        template = MergeTemplate.from_package(args.template)
+    except (OSError, ValueError) as e:
+        print('[batch_rgba_merge] 模板读取失败: %s' % e)
+        return 1
+    template_path = os.path.abspath(args.template)
+    paths = [p for p in iter_packages(args.paths) if os.path.abspath(p) != template_path]
+    counts = run_batch(paths, template, args.workers, args.dry_run)
+    return 1 if counts[STATUS_FAILED] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
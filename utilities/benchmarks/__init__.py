@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""utilities 的性能测试脚本。
+
+每个脚本都可以单独运行，例如：
+    python -m utilities.benchmarks.bench_sbs_index
+生成的临时包放在系统临时目录里，跑完自动删除。
+"""
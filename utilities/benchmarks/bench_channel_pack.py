@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""通道打包：整张读入再打包 vs mmap 按图块打包（用时、内存峰值），以及多套贴图的进程池并行
+
+合成贴图：--sets 套，每套四张 --size x --size 的 8 位 TGA（metallic / smoothness / detail / ao，
+左下角原点，和大多数 DCC 导出的一样；其中 ao 存成三个通道相同的 RGB）。
+通道布局从 BatchMergeGraphSample.sbs 读取。打包结果逐字节和对照实现比较。
+
+运行：
+    python -m utilities.benchmarks.bench_channel_pack
+    python -m utilities.benchmarks.bench_channel_pack --size 4096 --sets 16
+"""
+
+import argparse
+import os
+import random
+import shutil
+import struct
+import tempfile
+import time
+import tracemalloc
+
+from utilities import channel_pack
+
+FILES = {'metalic': 'Metallic', 'smoothness': 'Smoothness', 'Detail': 'Detail', 'ao': 'AO'}
+
+
+def write_tga(path, size, seed, channels=1):
+    rng = random.Random(seed)
+    row = bytes(rng.getrandbits(8) for _ in range(size))
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<BBBHHBHHHHBB', 0, 0, 3 if channels == 1 else 2, 0, 0, 0, 0, 0,
+                            size, size, channels * 8, 0))
+        for y in range(size):
+            shift = y % size
+            line = row[shift:] + row[:shift]
+            if channels == 3:
+                line = bytes(b for value in line for b in (value, value, value))
+            f.write(line)
+
+
+def naive_pack(sources, layout, target):
+    # 对照：每张贴图整张读进内存、翻转成从上到下，再逐像素拼起来
+    planes = {}
+    for identifier, path in sources.items():
+        with open(path, 'rb') as f:
+            data = f.read()
+        width, height, bits = struct.unpack('<HHB', data[12:17])
+        c = bits // 8
+        pixels = data[18:18 + width * height * c]
+        rows = [pixels[y * width * c:(y + 1) * width * c:c] for y in range(height)]
+        planes[identifier] = b''.join(reversed(rows))
+    order = channel_pack.TgaWriter.ORDER
+    k = len(layout.components)
+    out = bytearray(width * height * k)
+    for channel in layout.components:
+        out[order[channel]::k] = planes[layout.channels[channel]]
+    with open(target, 'wb') as f:
+        f.write(struct.pack('<BBBHHBHHHHBB', 0, 0, 2, 0, 0, 0, 0, 0, width, height, k * 8, 0x28))
+        f.write(out)
+
+
+def _measure(func):
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=2048)
+    parser.add_argument('--sets', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    layout = channel_pack.find_layout(channel_pack.DEFAULT_PACKAGE)
+    workdir = tempfile.mkdtemp(prefix='channel_pack_bench_')
+    try:
+        src = os.path.join(workdir, 'src')
+        os.makedirs(src)
+        for i in range(args.sets):
+            for j, (identifier, suffix) in enumerate(sorted(FILES.items())):
+                write_tga(os.path.join(src, 'Set%02d_%s.tga' % (i, suffix)), args.size, i * 10 + j,
+                          channels=3 if identifier == 'ao' else 1)
+        sets = channel_pack.find_texture_sets([src], layout)
+        assert len(sets) == args.sets and all(len(s) == 4 for s in sets.values()), sets
+        print('%d 套 x 4 张 %dx%d 贴图, 布局 %s' % (args.sets, args.size, args.size,
+                                               ', '.join('%s=%s' % (c, layout.channels[c]) for c in layout.components)))
+
+        key, sources = next(iter(sets.items()))
+        expected = os.path.join(workdir, 'expected.tga')
+        options = channel_pack.PackOptions(out_dir=os.path.join(workdir, 'out'), force=True)
+        numpy_label = '按图块, numpy' if channel_pack._numpy() is not None else '按图块（未安装 numpy，用 bytes 切片）'
+        rows = [('整张读入', lambda: naive_pack(sources, layout, expected)),
+                (numpy_label, lambda: channel_pack.pack_set(key, sources, layout, options))]
+        if channel_pack._numpy() is not None:
+            plain = channel_pack.PackOptions(out_dir=options.out_dir, force=True, use_numpy=False)
+            rows.append(('按图块, bytes 切片', lambda: channel_pack.pack_set(key, sources, layout, plain)))
+        for label, func in rows:
+            elapsed, peak = _measure(func)
+            print('单套 %-34s %6.2fs  内存峰值 %7.1f MB' % (label, elapsed, peak / 1e6))
+            if func is not rows[0][1]:
+                with open(expected, 'rb') as a, open(channel_pack.output_path(key, layout, options.out_dir, 'tga'),
+                                                     'rb') as b:
+                    assert a.read() == b.read(), '%s 和对照结果不一致' % label
+
+        for workers in (1, args.workers):
+            started = time.perf_counter()
+            counts = channel_pack.run_batch(sets, layout, options, workers, progress=False)
+            assert counts[channel_pack.STATUS_PACKED] == args.sets, counts
+            print('全部 %d 套, %-8s 进程  %6.2fs' % (args.sets, workers or 'CPU 核数', time.perf_counter() - started))
+        started = time.perf_counter()
+        skip = channel_pack.PackOptions(out_dir=options.out_dir)
+        counts = channel_pack.run_batch(sets, layout, skip, args.workers, progress=False)
+        print('再跑一次（已是最新） %6.2fs  跳过 %d 套' % (time.perf_counter() - started, counts[channel_pack.STATUS_SKIPPED]))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
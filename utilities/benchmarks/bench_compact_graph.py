@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""CompactGraph 的内存和速度测试：1 万 / 10 万 / 100 万节点
+
+两部分：
+1. 直接用 API 构建合成图（不经过 XML），测 freeze 时间、实际内存和邻居查询速度。
+2. 对不超过 --dom-limit 的规模，生成同样节点数的 .sbs，
+   分别用 xml.dom.minidom 和 compact_graph.load_graphs 读取，用 tracemalloc 比较内存。
+   DOM 太大时不实际构建（100 万节点的 DOM 需要十几 GB），按已测规模的单节点开销估算。
+
+运行：
+    python -m utilities.benchmarks.bench_compact_graph
+    python -m utilities.benchmarks.bench_compact_graph --dom-limit 100000   # 实测 10 万节点的 DOM，很慢
+"""
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from xml.dom import minidom
+
+from utilities.benchmarks.synthetic import write_package
+from utilities.compact_graph import CompactGraph, load_graphs
+
+
+_DEFINITIONS = ['sbs::compositing::hsl', 'sbs::compositing::levels', 'sbs::compositing::blend',
+                'sbs::compositing::uniform', 'pkg:///rgba_merge?dependency=1551510705']
+
+
+def build_synthetic(n, seed=0):
+    """直接构建一个 n 节点的合成图：主链 + 每 3 个节点一条随机回连。"""
+    rng = random.Random(seed)
+    g = CompactGraph('synthetic')
+    base = 1000000000
+    for i in range(n):
+        g.add_node(base + i, _DEFINITIONS[i % len(_DEFINITIONS)], 'filter',
+                   (i % 256) * 150.0, (i // 256) * 150.0)
+        if i:
+            g.add_connection(i, 'input1', base + i - 1, base + i - 1)
+            if i % 3 == 0:
+                src = rng.randrange(max(i - 64, 0), i)
+                g.add_connection(i, 'input2', base + src, base + src)
+    return g
+
+
+def _measure(func):
+    """返回 (结果, 结果存活时占用的字节数)。"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def _mb(nbytes):
+    return nbytes / float(1 << 20)
+
+
+def bench_api(sizes):
+    print('== 直接构建（不经过 XML）==')
+    print('%10s %10s %10s %12s %14s %16s' % ('节点', '连接', 'freeze', '内存', '字节/节点', '邻居查询/秒'))
+    for n in sizes:
+        g = build_synthetic(n)
+        started = time.perf_counter()
+        g.freeze()
+        freeze_time = time.perf_counter() - started
+        footprint = g.memory_footprint()
+
+        rng = random.Random(1)
+        picks = [rng.randrange(n) for _ in range(200000)]
+        started = time.perf_counter()
+        total = 0
+        for i in picks:
+            total += len(g.predecessors(i)) + len(g.successors(i))
+        query_time = time.perf_counter() - started
+        print('%10d %10d %9.2fs %10.1fMB %14.1f %16.0f'
+              % (n, g.edge_count, freeze_time, _mb(footprint), footprint / float(n),
+                 len(picks) / query_time))
+        del g
+
+
+def bench_vs_dom(sizes, dom_limit, workdir):
+    print('== 与 DOM 对比（同一个 .sbs 文件）==')
+    print('%10s %10s %12s %12s %8s' % ('节点', '文件', 'DOM', 'Compact', '倍数'))
+    per_node_dom = None
+    for n in sizes:
+        path = os.path.join(workdir, 'graph_%d.sbs' % n)
+        write_package(path, graphs=1, nodes_per_graph=n)
+        size = os.path.getsize(path)
+        graphs, compact_bytes = _measure(lambda: load_graphs(path))
+        del graphs
+        if n <= dom_limit:
+            dom, dom_bytes = _measure(lambda: minidom.parse(path))
+            dom.unlink()
+            del dom
+            per_node_dom = dom_bytes / float(n)
+            dom_text = '%10.1fMB' % _mb(dom_bytes)
+        elif per_node_dom is not None:
+            dom_bytes = per_node_dom * n
+            dom_text = '~%9.1fMB' % _mb(dom_bytes)
+        else:
+            dom_bytes = None
+            dom_text = '%12s' % '-'
+        ratio = '%7.1fx' % (dom_bytes / compact_bytes) if dom_bytes else '-'
+        print('%10d %8.1fMB %s %10.1fMB %8s' % (n, _mb(size), dom_text, _mb(compact_bytes), ratio))
+        os.remove(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--dom-limit', type=int, default=10000,
+                        help='超过这个节点数就不实际构建 DOM，只做估算')
+    parser.add_argument('--skip-xml', action='store_true', help='只跑直接构建部分')
+    args = parser.parse_args(argv)
+
+    bench_api(args.sizes)
+    if args.skip_xml:
+        return
+    workdir = tempfile.mkdtemp(prefix='compact_graph_bench_')
+    try:
+        bench_vs_dom(args.sizes, args.dom_limit, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
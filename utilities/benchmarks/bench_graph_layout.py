@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""graph_layout 的速度测试：1 千 / 1 万 / 5 万节点
+
+用分层的宽 DAG（每层约 √n 个节点，每个节点从前两层随机接 1~3 个输入，
+有很多源节点和分叉），只测排版本身（不含读写 .sbs），
+并检查同一列里相邻节点的间距都不小于行高（没有重叠）。
+主链那样的图每列只有一个节点，重叠检查恒为 0，没有意义。
+--sbs 时再生成同样规模的假包，测“读取 + 排版 + 写回”的总耗时。
+
+运行：
+    python -m utilities.benchmarks.bench_graph_layout
+    python -m utilities.benchmarks.bench_graph_layout --sizes 50000 --sbs
+"""
+
+import argparse
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utilities.benchmarks.bench_compact_graph import _DEFINITIONS
+from utilities.benchmarks.synthetic import write_package
+from utilities.compact_graph import CompactGraph
+from utilities.graph_layout import DEFAULT_SPACING_Y, layout_compact_graph, relayout_package
+
+
+def build_wide(n, seed=0):
+    """构建一个 n 节点的宽 DAG：每层约 √n 个节点，每个节点从前两层随机接 1~3 个输入。"""
+    rng = random.Random(seed)
+    width = max(int(n ** 0.5), 8)
+    g = CompactGraph('wide')
+    base = 1000000000
+    for i in range(n):
+        layer = i // width
+        g.add_node(base + i, _DEFINITIONS[i % len(_DEFINITIONS)], 'filter',
+                   layer * 150.0, rng.random() * width * 150.0)
+        if layer:
+            low = max(layer - 2, 0) * width
+            high = layer * width
+            for k in range(rng.randint(1, 3)):
+                src = rng.randrange(low, high)
+                g.add_connection(i, 'input%d' % (k + 1), base + src, base + src)
+    return g
+
+
+def _float32_step(value):
+    """value 附近 float32 能表示的最小间隔（CompactGraph 的坐标按 float32 存）。"""
+    return math.ldexp(1.0, math.frexp(abs(value))[1] - 24) if value else 0.0
+
+
+def _overlaps(graph):
+    columns = {}
+    for i in range(len(graph)):
+        columns.setdefault(graph.xs[i], []).append(graph.ys[i])
+    count = 0
+    for ys in columns.values():
+        ys.sort()
+        # 坐标很大时 float32 的舍入误差会超过 0.01，容差按两端各一个最小间隔算
+        count += sum(1 for a, b in zip(ys, ys[1:])
+                     if b - a < DEFAULT_SPACING_Y - max(0.01, 2 * _float32_step(b)))
+    return len(columns), max(len(ys) for ys in columns.values()), count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--sbs', action='store_true', help='同时测 .sbs 读取 + 排版 + 写回')
+    args = parser.parse_args(argv)
+
+    for n in args.sizes:
+        graph = build_wide(n).freeze()
+        started = time.perf_counter()
+        layout_compact_graph(graph)
+        elapsed = time.perf_counter() - started
+        columns, tallest, overlaps = _overlaps(graph)
+        print('%7d 节点 %7d 连线  排版 %.3fs  %d 列（最多 %d 个节点）  重叠 %d'
+              % (n, graph.edge_count, elapsed, columns, tallest, overlaps))
+
+    if args.sbs:
+        tmp = tempfile.mkdtemp(prefix='bench_layout_')
+        try:
+            for n in args.sizes:
+                path = os.path.join(tmp, 'layout_%d.sbs' % n)
+                write_package(path, graphs=1, nodes_per_graph=n)
+                started = time.perf_counter()
+                relayout_package(path)
+                print('%7d 节点  .sbs 读取 + 排版 + 写回 %.3fs' % (n, time.perf_counter() - started))
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""对比：逐样本解释执行 MDL 语法树 / 编译成 Python 内核逐样本执行 / numpy 内核整块执行
+
+节点图：sampleNodeAdd 和 sampleNodeMult（custom_graph_nodes.mdl）交替串成 --depth 个节点，
+输入是 --samples 个随机 (u, v)。三种方式的结果必须一致。没有安装 numpy 时跳过 numpy 那一行。
+
+运行：
+    python -m utilities.benchmarks.bench_mdl_eval
+    python -m utilities.benchmarks.bench_mdl_eval --samples 4000000 --depth 16
+"""
+
+import argparse
+import random
+import time
+from array import array
+
+from utilities import mdl_eval
+
+
+def interpret(library, function, args):
+    # 对照：不编译，每个样本都遍历一遍语法树
+    env = dict(zip((param for _type, param, _default in function.params), args))
+
+    def value(node):
+        kind = node[0]
+        if kind == 'num':
+            return node[1]
+        if kind == 'var':
+            return env[node[1]]
+        if kind == 'bin':
+            a, b = value(node[2]), value(node[3])
+            return {'+': a + b, '-': a - b, '*': a * b}[node[1]] if node[1] != '/' else a / b
+        if kind == 'call':
+            return interpret(library, library.find(node[1]), [value(arg) for arg in node[2]])
+        raise ValueError('对照解释器不支持 %s' % kind)
+
+    for statement in function.body:
+        if statement[0] == 'return':
+            return value(statement[1])
+        env[statement[2 if statement[0] == 'declare' else 1]] = value(statement[-2])
+    raise ValueError('没有 return')
+
+
+def build_graph(library, depth):
+    graph = mdl_eval.NodeGraph(library)
+    u, v = graph.input('u'), graph.input('v')
+    current = u
+    for i in range(depth):
+        function = 'sampleNodeAdd' if i % 2 == 0 else 'sampleNodeMult'
+        current = graph.node(function, x=current, y=v if i % 2 == 0 else 0.5)
+    graph.output(current)
+    return graph
+
+
+def interpret_graph(library, graph, us, vs):
+    values = {}
+    out = array('d')
+    for u, v in zip(us, vs):
+        values['u'], values['v'] = u, v
+        for name, definition, args in graph.nodes:
+            params = [args[param] for _type, param, _default in definition.params]
+            values[name] = interpret(library, definition,
+                                     [values[p.name] if isinstance(p, mdl_eval.NodeGraph.Ref) else p for p in params])
+        out.append(values[graph.nodes[-1][0]])
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=1000000)
+    parser.add_argument('--depth', type=int, default=8, help='节点数')
+    args = parser.parse_args(argv)
+
+    library = mdl_eval.load_library()
+    graph = build_graph(library, args.depth)
+    rng = random.Random(0)
+    us = array('d', (rng.random() for _ in range(args.samples)))
+    vs = array('d', (rng.random() for _ in range(args.samples)))
+    print('%d 个节点, %d 个样本' % (args.depth, args.samples))
+
+    def report(label, func, n):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        print('%-26s %7.3fs  %8.2f M 样本/秒' % (label, elapsed, n / elapsed / 1e6))
+        return result
+
+    # 解释执行很慢，只跑十分之一的样本
+    n = max(args.samples // 10, 1)
+    slow = report('逐样本解释语法树（1/10）', lambda: interpret_graph(library, graph, us[:n], vs[:n]), n)
+    kernel = graph.compile('python')
+    compiled = report('编译内核，python 后端',
+                      lambda: mdl_eval.evaluate(kernel, {'u': us, 'v': vs}), args.samples)
+    assert mdl_eval.compare(compiled[:n], slow)[0] == 0
+
+    try:
+        kernel = graph.compile('numpy')
+    except ValueError:
+        print('%-26s 未安装 numpy，跳过' % '编译内核，numpy 后端')
+        return
+    np = kernel.ops.numpy
+    inputs = {'u': np.frombuffer(us, dtype=np.float64), 'v': np.frombuffer(vs, dtype=np.float64)}
+    vectorized = report('编译内核，numpy 后端', lambda: mdl_eval.evaluate(kernel, inputs), args.samples)
+    bad, worst = mdl_eval.compare(vectorized[:10000], compiled[:10000])
+    print('numpy 与 python 后端对照：%d 个不一致，最大误差 %g' % (bad, worst))
+
+
+if __name__ == '__main__':
+    main()
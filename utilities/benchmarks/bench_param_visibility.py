@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""visibleIf：逐个预设解释语法树 vs 编译成 Python 函数 vs numpy 向量化，以及检查 / 完整预设矩阵的耗时
+
+合成材质包：一个 graph，--toggles 个开关（bool）、--modes 个下拉框（0/1/2），
+其余 --params 个 float 参数按开关 / 下拉框 / 另一个参数的值显示（带嵌套和数值比较）。
+另外故意放三个有问题的参数：永远隐藏、只有控制参数被隐藏时才显示、条件恒为真，检查必须把它们找出来。
+预设表是 --presets 行随机值的 CSV。没有安装 numpy 时跳过 numpy 那一行。
+
+运行：
+    python -m utilities.benchmarks.bench_param_visibility
+    python -m utilities.benchmarks.bench_param_visibility --params 600 --presets 200000
+"""
+
+import argparse
+import csv
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utilities import param_visibility
+from utilities.sbs_variations import iter_csv_chunks
+
+_PARAM = ('<paraminput><identifier v="%s"/><uid v="%d"/><attributes><label v="%s"/></attributes>%s'
+          '<type v="%d"/><defaultValue><%s v="%s"/></defaultValue><defaultWidget><name v="%s"/>'
+          '<options>%s</options></defaultWidget></paraminput>')
+_OPTION = '<option><name v="%s"/><value v="%s"/></option>'
+
+
+def _attr(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _param(identifier, uid, visible_if, kind, default):
+    condition = '<visibleIf v="%s"/>' % _attr(visible_if) if visible_if else ''
+    if kind == 'bool':
+        return _PARAM % (identifier, uid, identifier, condition, 4, 'constantValueBool', default, 'togglebutton', '')
+    if kind == 'mode':
+        options = _OPTION % ('parameters', '0;Off;1;Simple;2;Detailed')
+        return _PARAM % (identifier, uid, identifier, condition, 16, 'constantValueInt1', default, 'combobox',
+                         options)
+    options = _OPTION % ('max', '1') + _OPTION % ('min', '0')
+    return _PARAM % (identifier, uid, identifier, condition, 256, 'constantValueFloat1', default, 'slider', options)
+
+
+def write_package(path, toggles, modes, params, seed=0):
+    """写出合成包，返回 {identifier: 类型}。"""
+    rng = random.Random(seed)
+    kinds = {}
+    pieces = []
+    uid = [1000]
+
+    def add(identifier, kind, default, visible_if=None):
+        uid[0] += 1
+        kinds[identifier] = kind
+        pieces.append(_param(identifier, uid[0], visible_if, kind, default))
+
+    for i in range(toggles):
+        # 后一半开关本身也受前面开关控制（嵌套）
+        add('use_%d' % i, 'bool', '1' if i % 2 else '0',
+            'input["use_%d"]' % (i - toggles // 2) if i >= toggles // 2 else None)
+    for i in range(modes):
+        add('mode_%d' % i, 'mode', '0', 'input["use_%d"]' % i if i < toggles else None)
+    templates = [
+        'input["use_{t}"]',
+        'input["use_{t}"] && input["mode_{m}"] == {v}',
+        '!input["use_{t}"] || input["mode_{m}"] >= {w}',
+        'input["mode_{m}"] != 0 && input["amount_{p}"] > 0.5',
+        'input["use_{t}"] ? input["mode_{m}"] == {v} : input["amount_{p}"] < 0.25',
+    ]
+    for i in range(params):
+        template = templates[i % len(templates)] if i else templates[0]
+        condition = template.format(t=rng.randrange(toggles), m=rng.randrange(modes), v=rng.randrange(3),
+                                    w=rng.randrange(1, 3), p=rng.randrange(i) if i else 0)
+        add('amount_%d' % i, 'float', '%.3g' % rng.random(), condition)
+    add('broken_never', 'float', '0.5', 'input["mode_0"] == 1 && input["mode_0"] == 2')
+    add('broken_switch', 'bool', '0', 'input["mode_0"] == 0')
+    add('broken_unreachable', 'float', '0.5', 'input["broken_switch"] && input["mode_0"] == 1')
+    add('broken_always', 'float', '0.5', 'input["use_0"] || !input["use_0"]')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?><package><identifier v="Visibility"/>'
+                '<formatVersion v="1.1.0.202302"/><content><graph><identifier v="material"/><uid v="1"/>'
+                '<paraminputs>%s</paraminputs><compNodes/></graph></content></package>' % ''.join(pieces))
+    return kinds
+
+
+def write_presets(path, kinds, rows, seed=1):
+    rng = random.Random(seed)
+    names = list(kinds)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['name'] + names)
+        for row in range(rows):
+            cells = ['preset_%d' % row]
+            for name in names:
+                kind = kinds[name]
+                if rng.random() < 0.5:
+                    cells.append('')
+                elif kind == 'bool':
+                    cells.append(rng.choice(('0', '1')))
+                elif kind == 'mode':
+                    cells.append(str(rng.randrange(3)))
+                else:
+                    cells.append('%.3f' % rng.random())
+            writer.writerow(cells)
+
+
+def interpret(node, values):
+    # 对照：不编译，每个预设、每个参数都遍历一遍语法树（相当于在界面里逐个点开）
+    kind = node[0]
+    if kind in ('num', 'str'):
+        return node[1]
+    if kind == 'ref':
+        value = values[node[1]]
+        return value if node[2] is None else value[node[2]]
+    if kind == 'un':
+        value = interpret(node[2], values)
+        return (not value) if node[1] == '!' else -value
+    if kind == 'cond':
+        return interpret(node[2] if interpret(node[1], values) else node[3], values)
+    op = node[1]
+    if op == '&&':
+        return interpret(node[2], values) and interpret(node[3], values)
+    if op == '||':
+        return interpret(node[2], values) or interpret(node[3], values)
+    a, b = interpret(node[2], values), interpret(node[3], values)
+    return {'==': a == b, '!=': a != b, '<': a < b, '>': a > b, '<=': a <= b, '>=': a >= b,
+            '+': a + b, '-': a - b, '*': a * b}[op]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--toggles', type=int, default=8)
+    parser.add_argument('--modes', type=int, default=4)
+    parser.add_argument('--params', type=int, default=300)
+    parser.add_argument('--presets', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='param_visibility_bench_')
+    try:
+        package = os.path.join(workdir, 'material.sbs')
+        presets = os.path.join(workdir, 'presets.csv')
+        kinds = write_package(package, args.toggles, args.modes, args.params)
+        write_presets(presets, kinds, args.presets)
+
+        started = time.perf_counter()
+        (program,) = param_visibility.load_programs(package)
+        compile_time = time.perf_counter() - started
+        started = time.perf_counter()
+        issues = program.check()
+        check_time = time.perf_counter() - started
+        print('%d 个参数, %d 个带 visibleIf；读包 + 编译 %.1f ms，检查 %.1f ms，%d 个问题'
+              % (len(program.specs), len(program.conditional), compile_time * 1000, check_time * 1000, len(issues)))
+        for issue in issues:
+            print('    %-7s %-20s %s' % (issue.level, issue.identifier, issue.message))
+        found = {(issue.level, issue.identifier) for issue in issues}
+        assert ('error', 'broken_never') in found
+        assert ('warning', 'broken_unreachable') in found
+        assert ('warning', 'broken_always') in found
+
+        rows = []
+        for columns, table in iter_csv_chunks(presets, chunk_size=args.presets):
+            rows.extend(program.rows_from_table(program.bind(columns), table)[0])
+        print('%d 个预设' % len(rows))
+
+        def report(label, func):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            print('%-24s %8.1f ms  %10.0f 个预设/秒' % (label, elapsed * 1000, len(rows) / elapsed))
+            return result
+
+        trees = [program.trees[identifier] for identifier in program.conditional]
+        names = [spec.identifier for spec in program.specs]
+        def interpret_all():
+            result = []
+            for row in rows:
+                values = dict(zip(names, row))
+                result.append(tuple(bool(interpret(tree, values)) for tree in trees))
+            return result
+
+        slow = report('逐个预设解释语法树', interpret_all)
+        fast = report('编译成 Python 函数', lambda: program.evaluate(rows))
+        assert slow == fast
+
+        try:
+            vector = param_visibility.VisibilityProgram(program.graph, program.specs, 'numpy')
+        except ValueError:
+            print('%-24s 未安装 numpy，跳过' % 'numpy 向量化')
+        else:
+            columns = vector.columns(rows)
+            result = report('numpy 向量化（已转成列）', lambda: vector.evaluate_columns(columns, len(rows)))
+            assert [tuple(bool(x) for x in row) for row in result.tolist()] == fast
+
+        started = time.perf_counter()
+        total = 0
+        for chunk in program.iter_matrix():
+            program.evaluate(chunk)
+            total += len(chunk)
+        print('完整预设矩阵 %d 种组合  %8.1f ms' % (total, (time.perf_counter() - started) * 1000))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
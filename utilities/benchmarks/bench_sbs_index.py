@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""对比：打开一个 graph 时“全量流式解析” vs “sidecar 索引 + mmap 切片解析”
+
+生成一个有 500 个 graph 的假包，目标 graph（processor）放在最后，
+这是全量解析最吃亏的情况。
+
+运行：
+    python -m utilities.benchmarks.bench_sbs_index
+    python -m utilities.benchmarks.bench_sbs_index --graphs 2000 --nodes 40
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from utilities import sbs_index
+from utilities.benchmarks.synthetic import write_package
+from utilities.sbs_stream import iter_events
+
+
+def _best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def full_parse(path, identifier):
+    """不用索引：从头流式解析，直到读完目标 graph。"""
+    nodes = []
+    inside = False
+    for event in iter_events(path, kinds={'graph_start', 'compnode', 'graph_end'}):
+        if event.kind == 'graph_start':
+            inside = event.identifier == identifier
+        elif event.kind == 'compnode' and inside:
+            nodes.append(event)
+        elif event.kind == 'graph_end' and inside:
+            break
+    return nodes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--graphs', type=int, default=500)
+    parser.add_argument('--nodes', type=int, default=40, help='每个 graph 的节点数')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='sbs_index_bench_')
+    try:
+        path = os.path.join(workdir, 'synthetic.sbs')
+        write_package(path, graphs=args.graphs, nodes_per_graph=args.nodes)
+        size_mb = os.path.getsize(path) / (1 << 20)
+        print('假包: %d 个 graph x %d 节点, %.1f MB' % (args.graphs, args.nodes, size_mb))
+
+        build_time, index = _best_of(lambda: sbs_index.build_index(path), 1)
+        index_size = os.path.getsize(sbs_index.index_path_for(path))
+        print('建索引（一次性）: %.3fs, 索引文件 %.1f KB' % (build_time, index_size / 1024.0))
+
+        full_time, full_nodes = _best_of(lambda: full_parse(path, 'processor'), args.repeat)
+
+        def indexed():
+            loaded = sbs_index.load_index(path)
+            return sbs_index.read_graph_events(path, 'processor', kinds={'compnode'}, index=loaded)
+
+        indexed_time, indexed_nodes = _best_of(indexed, args.repeat)
+        assert len(full_nodes) == len(indexed_nodes) == args.nodes
+
+        print('全量解析打开 processor : %8.2f ms' % (full_time * 1000))
+        print('索引 + mmap 切片解析   : %8.2f ms（含读取并校验索引）' % (indexed_time * 1000))
+        print('加速比: %.1fx' % (full_time / indexed_time))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""对比：1 条规则 / 全部规则单次读取 / 每条规则各读一遍
+
+运行：
+    python -m utilities.benchmarks.bench_sbs_lint
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from utilities import sbs_lint
+from utilities.benchmarks.synthetic import write_package
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--graphs', type=int, default=20)
+    parser.add_argument('--nodes', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='sbs_lint_bench_')
+    try:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(workdir, 'pkg_%03d.sbs' % i)
+            write_package(path, graphs=args.graphs, nodes_per_graph=args.nodes, seed=i)
+            paths.append(path)
+        all_ids = sorted(sbs_lint.RULES)
+        print('%d 个包, 每个 %d 个 graph x %d 节点, 规则 %d 条'
+              % (args.files, args.graphs, args.nodes, len(all_ids)))
+
+        one, _ = _timed(lambda: sbs_lint.lint_paths(paths, ['dangling-connection'], workers=1))
+        together, _ = _timed(lambda: sbs_lint.lint_paths(paths, all_ids, workers=1))
+        separate, _ = _timed(lambda: [sbs_lint.lint_paths(paths, [rule_id], workers=1)
+                                      for rule_id in all_ids])
+        print('1 条规则                : %.3fs' % one)
+        print('全部规则，单次读取      : %.3fs' % together)
+        print('全部规则，每条各读一遍  : %.3fs' % separate)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""倒排索引：建索引、增量更新、查询耗时，对比每次查询都 grep 全部包
+
+生成 --packages 个假包（每个 --graphs 个 graph、每个 graph --nodes 个节点），
+每隔 --every 个包给一个 graph 额外加一个曝光参数 roughness_remap，模拟“很少出现的参数”。
+grep 的对照只比较字节子串（比索引的结果更粗糙），依然要把所有包从磁盘读一遍。
+
+运行：
+    python -m utilities.benchmarks.bench_sbs_search
+    python -m utilities.benchmarks.bench_sbs_search --packages 10000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from utilities import sbs_search
+from utilities.benchmarks.synthetic import write_package
+from utilities.sbs_files import iter_packages
+
+RARE = 'roughness_remap'
+
+
+def add_rare_param(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    extra = ('<paraminput><identifier v="%s"/><uid v="1"/><attributes><label v="Remap"/></attributes>'
+             '<type v="256"/></paraminput>' % RARE)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text.replace('<paraminputs>', '<paraminputs>' + extra, 1))
+
+
+def grep(root, needle):
+    found = set()
+    for path in iter_packages([root]):
+        with open(path, 'rb') as f:
+            if needle in f.read():
+                found.add(path)
+    return found
+
+
+def _best_ms(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--packages', type=int, default=2000)
+    parser.add_argument('--graphs', type=int, default=3)
+    parser.add_argument('--nodes', type=int, default=30)
+    parser.add_argument('--every', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp(prefix='sbs_search_bench_')
+    try:
+        for i in range(args.packages):
+            path = os.path.join(root, 'lib_%02d' % (i % 50), 'pkg_%05d.sbs' % i)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_package(path, graphs=args.graphs, nodes_per_graph=args.nodes, dependencies=2, seed=i)
+            if i % args.every == 0:
+                add_rare_param(path)
+        size = sum(os.path.getsize(p) for p in iter_packages([root]))
+        print('%d 个包, 共 %.1f MB' % (args.packages, size / 1e6))
+
+        index = sbs_search.SearchIndex(root)
+        started = time.perf_counter()
+        index.update(args.workers)
+        stats = index.stats()
+        print('建索引          %7.2fs  %d 个词, %d 条倒排记录, 索引 %.1f MB'
+              % (time.perf_counter() - started, stats['terms'], stats['postings'],
+                 os.path.getsize(index.db_path) / 1e6))
+        started = time.perf_counter()
+        unchanged = index.update(args.workers)[1]
+        print('无变化时同步    %7.2fs  未变化 %d 个' % (time.perf_counter() - started, unchanged))
+        changed = list(iter_packages([root]))[:10]
+        for path in changed:
+            write_package(path, graphs=args.graphs, nodes_per_graph=args.nodes + 1, dependencies=2, seed=1)
+        started = time.perf_counter()
+        rescanned = index.update(args.workers)[0]
+        print('改了 10 个包    %7.2fs  重新扫描 %d 个' % (time.perf_counter() - started, rescanned))
+        index.close()
+
+        index = sbs_search.SearchIndex(root)
+        where = sbs_search.parse_where('outputcolor.a=1')
+        queries = [
+            ('少见参数 --param %s' % RARE, lambda: index.package_counts('param', RARE)),
+            ('实例 --instance rgba_merge.sbs', lambda: index.package_counts('instance', 'rgba_merge.sbs')),
+            ('graph --graph processor', lambda: index.package_counts('graph', 'processor')),
+            ('通配 --node "*::blend" --count', lambda: index.package_counts('def', '*::blend')),
+            ('参数值 uniform outputcolor.a=1（前 200 条）',
+             lambda: list(index.search('value', 'sbs::compositing::uniform#outputcolor', where, limit=200))),
+        ]
+        for label, func in queries:
+            ms, result = _best_ms(func)
+            print('%-44s %8.2f ms  %d 条' % (label, ms, len(result)))
+        ms, rare = _best_ms(lambda: grep(root, RARE.encode()), repeat=1)
+        print('%-44s %8.2f ms  %d 个包' % ('对照：grep 全部包找 %s' % RARE, ms, len(rare)))
+        assert len(rare) == len(index.package_counts('param', RARE))
+        index.close()
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""日志分析：导入吞吐量、内存峰值（流式 vs 整个文件读进内存），以及汇总库查询 vs 每次重新扫描日志
+
+合成日志：--machines 台机器，每台一个 log.txt，约 --lines 行。每台机器的安装路径不同，
+错误从 --errors 种 traceback 里随机挑，插件随机加载成功 / 失败。去重后应该正好是 --errors 种错误。
+
+运行：
+    python -m utilities.benchmarks.bench_sd_log
+    python -m utilities.benchmarks.bench_sd_log --machines 300 --lines 50000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from utilities import sd_log
+
+PLUGINS = ['PluginBasics', 'node_align_tools', 'MaxSDPlugin', 'SubstanceDesignerPart1', 'custom_graph']
+
+
+def write_log(path, machine, lines, errors, seed):
+    rng = random.Random(seed)
+    home = 'C:/Users/artist%03d/Documents/Adobe/Adobe Substance 3D Designer/python/sdplugins' % machine
+    seq = 0
+    out = []
+
+    def emit(level, channel, text):
+        nonlocal seq
+        seq += rng.randint(1, 3)
+        out.append('[%s][%d][%s]%s\n' % (level, seq, channel, text))
+
+    emit('MSG', 'Python', 'Python SDK Version: 3.9.9')
+    while len(out) < lines:
+        roll = rng.random()
+        if roll < 0.9:
+            emit('MSG', rng.choice(('Graph', 'Python', 'Baker', 'Engine')), 'message %d' % rng.randint(0, 10 ** 6))
+        elif roll < 0.97:
+            emit('MSG', 'Python', "Loaded plugin '%s'" % rng.choice(PLUGINS))
+        else:
+            k = rng.randrange(errors)
+            emit('ERR', 'Python', 'Traceback (most recent call last):')
+            for depth in range(1 + k % 3):
+                emit('ERR', 'Python', '  File "%s\\plugin_%d\\module_%d.py", line %d, in func_%d'
+                     % (home, k, depth, 10 + depth, depth))
+                emit('ERR', 'Python', 'value = call_something()')
+            emit('ERR', 'Python', 'AttributeError')
+            emit('ERR', 'Python', "'NoneType' object has no attribute 'attr_%d'" % k)
+            emit('WRN', 'Python', "Failed to load plugin 'plugin_%d', error: 'Failed to load. Check console for details.'"
+                 % k)
+    with open(path, 'w') as f:
+        f.writelines(out)
+
+
+def naive_summary(paths):
+    # 对照：每次查询都把全部日志读进内存，重新拼 traceback
+    counts = {}
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        parser = sd_log.LogParser()
+        for line_no, line in enumerate(lines, 1):
+            for event in parser.feed(line, line_no):
+                if isinstance(event, sd_log.Failure):
+                    counts[event.fingerprint] = counts.get(event.fingerprint, 0) + 1
+    return counts
+
+
+def _peak(func):
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        return elapsed, tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--machines', type=int, default=100)
+    parser.add_argument('--lines', type=int, default=20000, help='每个日志的行数')
+    parser.add_argument('--errors', type=int, default=40, help='不同错误的种数')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='sd_log_bench_')
+    try:
+        paths = []
+        for i in range(args.machines):
+            path = os.path.join(workdir, 'PC-%03d' % i, 'log.txt')
+            os.makedirs(os.path.dirname(path))
+            write_log(path, i, args.lines, args.errors, seed=i)
+            paths.append(path)
+        size = sum(os.path.getsize(p) for p in paths)
+        print('%d 台机器 x %d 行, 共 %.1f MB' % (args.machines, args.lines, size / 1e6))
+
+        store = sd_log.LogStore(os.path.join(workdir, sd_log.DB_NAME))
+        started = time.perf_counter()
+        _read, _unchanged, events, _errors = store.ingest([workdir])
+        elapsed = time.perf_counter() - started
+        print('导入              %6.2fs  %8.0f 行/秒  %d 个事件' % (elapsed, args.machines * args.lines / elapsed, events))
+
+        # 单个大文件的内存峰值：流式解析 vs 整个文件读进内存
+        big = paths[0]
+        for path in paths[1:10]:
+            with open(path) as src, open(big, 'a') as dst:
+                shutil.copyfileobj(src, dst)
+        stream_time, stream_peak, _ = _peak(lambda: sum(1 for _ in sd_log.iter_events(big)))
+        naive_time, naive_peak, _ = _peak(lambda: naive_summary([big]))
+        print('单个 %.1f MB 日志  流式 %.2fs 峰值 %.2f MB   整个读入 %.2fs 峰值 %.2f MB'
+              % (os.path.getsize(big) / 1e6, stream_time, stream_peak / 1e6, naive_time, naive_peak / 1e6))
+
+        started = time.perf_counter()
+        again = store.ingest([workdir])
+        print('增量导入        %6.3fs  读取追加内容 %d 个, 未变化 %d 个' % (time.perf_counter() - started, again[0], again[1]))
+
+        started = time.perf_counter()
+        failures = store.failures(limit=1000)
+        plugins = store.plugins()
+        query = time.perf_counter() - started
+        started = time.perf_counter()
+        counts = naive_summary(paths)
+        rescan = time.perf_counter() - started
+        print('汇总查询          %6.3fs  （每次重新扫描全部日志 %.2fs）' % (query, rescan))
+        print('去重后 %d 种错误（期望 %d），%d 个插件' % (len(failures), args.errors, len(plugins)))
+        assert len(failures) == args.errors == len(counts), (len(failures), len(counts))
+        store.close()
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""生成用于性能测试的“假” .sbs 包
+
+结构仿照 SDFiles/Bilibili_HuangJuanLr/BatchMergeGraphSample.sbs：
+每个 graph 有一个输入节点、一串 compFilter 节点（hsl / levels / blend 轮流出现）、
+一个 RGBA_Merge 的 compInstance 和一个输出节点。
+
+生成时边拼边写文件，所以即使生成 100 万个节点也不会占用太多内存。
+"""
+
+import random
+
+_FILTERS = ('hsl', 'levels', 'blend', 'grayscaleconversion', 'uniform')
+
+_HEADER = ('<?xml version="1.0" encoding="UTF-8"?><package><identifier v="Synthetic"/>'
+           '<formatVersion v="1.1.0.202302"/><updaterVersion v="1.1.0.202302"/>'
+           '<fileUID v="{%s}"/><versionUID v="0"/>')
+
+_DEPENDENCY = ('<dependency><filename v="sbs://%s.sbs"/><uid v="%d"/><type v="package"/>'
+               '<fileUID v="0"/><versionUID v="0"/></dependency>')
+
+_PARAMINPUT = ('<paraminput><identifier v="%s"/><uid v="%d"/><attributes><label v="%s"/></attributes>'
+               '<type v="256"/><defaultValue><constantValueFloat1 v="0.5"/></defaultValue>'
+               '<defaultWidget><name v="slider"/><options><option><name v="max"/><value v="1"/></option>'
+               '<option><name v="min"/><value v="0"/></option></options></defaultWidget></paraminput>')
+
+
+def _node(uid, out_uid, pos, body, connections=''):
+    return ('<compNode><uid v="%d"/>%s<GUILayout><gpos v="%g %g 0"/></GUILayout>'
+            '<compOutputs><compOutput><uid v="%d"/><comptype v="1"/></compOutput></compOutputs>'
+            '<compImplementation>%s</compImplementation></compNode>'
+            % (uid, connections, pos[0], pos[1], out_uid, body))
+
+
+def _connections(items):
+    if not items:
+        return ''
+    return '<connections>%s</connections>' % ''.join(
+        '<connection><identifier v="%s"/><connRef v="%d"/><connRefOutput v="%d"/></connection>'
+        % item for item in items)
+
+
+def _filter_body(name, rng):
+    if name == 'uniform':
+        color = '%.3g %.3g %.3g 1' % (rng.random(), rng.random(), rng.random())
+        return ('<compFilter><filter v="uniform"/><parameters><parameter><name v="outputcolor"/>'
+                '<relativeTo v="0"/><paramValue><constantValueFloat4 v="%s"/></paramValue>'
+                '</parameter></parameters></compFilter>' % color)
+    return ('<compFilter><filter v="%s"/><parameters><parameter><name v="opacitymult"/>'
+            '<relativeTo v="0"/><paramValue><constantValueFloat1 v="%.3g"/></paramValue>'
+            '</parameter></parameters></compFilter>' % (name, rng.random()))
+
+
+def iter_graph_xml(identifier, graph_uid, nodes, next_uid, rng, dependency_uid=None):
+    """逐段产出一个 graph 的 XML 文本。
+
+    next_uid 是一个只有一个元素的列表 [int]，多个 graph 共用它来分配不重复的 uid。
+    """
+    def new_uid():
+        next_uid[0] += 1
+        return next_uid[0]
+
+    yield '<graph><identifier v="%s"/><uid v="%d"/><paraminputs>' % (identifier, graph_uid)
+    for name in ('hue', 'saturation', 'luminosity'):
+        yield _PARAMINPUT % (name, new_uid(), name.capitalize())
+    output_uid = new_uid()
+    yield ('</paraminputs><graphOutputs><graphoutput><identifier v="basecolor"/><uid v="%d"/>'
+           '<usages><usage><components v="RGBA"/><name v="baseColor"/></usage></usages>'
+           '</graphoutput></graphOutputs><compNodes>' % output_uid)
+
+    entry_uid = new_uid()
+    first, first_out = new_uid(), new_uid()
+    yield _node(first, first_out, (-2000, 0),
+                '<compInputBridge><entry v="%d"/></compInputBridge>' % entry_uid)
+    produced = [(first, first_out)]
+    body_nodes = max(nodes - 3, 0)
+    for i in range(body_nodes):
+        uid, out_uid = new_uid(), new_uid()
+        name = _FILTERS[i % len(_FILTERS)]
+        if name == 'uniform':
+            links = []
+        elif name == 'blend':
+            a = produced[-1]
+            b = produced[rng.randrange(len(produced))]
+            links = [('source', a[0], a[1]), ('destination', b[0], b[1])]
+        else:
+            a = produced[-1]
+            links = [('input1', a[0], a[1])]
+        pos = (-1800 + (i % 64) * 150, (i // 64) * 150)
+        yield _node(uid, out_uid, pos, _filter_body(name, rng), _connections(links))
+        produced.append((uid, out_uid))
+        # 只在最近的节点里挑连接，保持内存有界
+        if len(produced) > 64:
+            del produced[:32]
+
+    last = produced[-1]
+    if dependency_uid is not None and nodes >= 2:
+        uid, out_uid = new_uid(), new_uid()
+        links = [(channel, last[0], last[1]) for channel in 'RGBA']
+        body = ('<compInstance><path v="pkg:///rgba_merge?dependency=%d"/><parameters/>'
+                '<outputBridgings><outputBridging><uid v="%d"/><identifier v="RGBA_Merge"/>'
+                '</outputBridging></outputBridgings></compInstance>' % (dependency_uid, out_uid))
+        yield _node(uid, out_uid, (0, 300), body, _connections(links))
+        last = (uid, out_uid)
+    uid = new_uid()
+    yield ('<compNode><uid v="%d"/>%s<GUILayout><gpos v="200 0 0"/></GUILayout><compImplementation>'
+           '<compOutputBridge><output v="%d"/></compOutputBridge></compImplementation></compNode>'
+           % (uid, _connections([('inputNodeOutput', last[0], last[1])]), output_uid))
+    yield ('</compNodes><baseParameters/><root><rootOutputs><rootOutput><output v="%d"/>'
+           '<format v="0"/><usertag v=""/></rootOutput></rootOutputs></root></graph>' % output_uid)
+
+
+def write_package(path, graphs=1, nodes_per_graph=20, dependencies=1, seed=0):
+    """写出一个假包，返回写入的总节点数。
+
+    参数:
+        graphs: graph 数量
+        nodes_per_graph: 每个 graph 的节点数（含输入 / 输出 / RGBA_Merge 节点）
+        dependencies: <dependency> 数量，第一个固定是 sbs://rgba_merge.sbs
+    """
+    rng = random.Random(seed)
+    next_uid = [1000000]
+    dep_uids = [1551510705 + i for i in range(dependencies)]
+    total_nodes = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(_HEADER % ('00000000-0000-0000-0000-%012d' % seed))
+        f.write('<dependencies>')
+        for i, dep_uid in enumerate(dep_uids):
+            f.write(_DEPENDENCY % ('rgba_merge' if i == 0 else 'library_%d' % i, dep_uid))
+        f.write('</dependencies><content>')
+        for g in range(graphs):
+            identifier = 'processor' if g == graphs - 1 else 'graph_%d' % g
+            next_uid[0] += 1
+            dep = dep_uids[0] if dep_uids else None
+            for piece in iter_graph_xml(identifier, next_uid[0], nodes_per_graph, next_uid, rng, dep):
+                f.write(piece)
+            total_nodes += nodes_per_graph
+        f.write('</content></package>')
+    return total_nodes
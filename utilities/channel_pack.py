@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+"""离线通道打包：按包里 RGBA_Merge graph 的连线把几张单通道贴图打包成一张（给 Unity 用的 Mask 贴图）
+
+BatchMergeGraphSample.sbs 的 processor graph 里，RGBA_Merge 实例把几个输入打包进 R/G/B/A，
+再从 Mask 输出（Usage = mask，通道 RGBA）导出。几千套 4K / 8K 贴图都要在 SD 里走一遍太慢，
+这里在 SD 之外做同样的打包：
+
+1. 通道布局从包里读出来，而不是写死在代码里：从输出节点往上游找到 RGBA_Merge 实例，
+   它的 R/G/B/A 端口再往上游经过 grayscaleconversion，找到对应的输入节点和曝光参数 identifier。
+   样例包读出来是 R=metalic、G=ao、B=Detail、A=smoothness。
+2. 校验：打包的通道必须和输出的 Usage 通道（RGBA / RGB）一一对应。通道对不上
+   （比如 Usage 是 RGB 却接了 A，或者 Usage 要求的通道没有接）直接报错，避免导进 Unity 以后通道错位。
+3. 读：源贴图用 mmap 映射，每次只取一条图块（--tile-rows 行），内存占用是几条图块，和贴图大小无关。
+   只支持能直接映射的未压缩格式：TGA（8 位灰度 / RGB / RGBA，非 RLE）和 .npy（需要 numpy）。
+4. 打包：装了 numpy 时用 numpy 整条图块向量化（灰度转换、反相、交错写入）；
+   没有 numpy 时用 bytes 的步长切片（out[i::4] = 通道），同样是 C 速度，
+   只是彩色源贴图需要加权灰度转换时必须有 numpy（三个通道相同的“灰度存成 RGB”不需要）。
+5. 写：按图块顺序流式写出 TGA 或 PNG（zlib 逐块压缩），先写临时文件再 os.replace。
+6. 多套贴图用进程池并行，每完成一套打印一行进度；输出比所有源贴图都新时跳过（--force 强制重写）。
+
+贴图文件按 “套名_贴图名.tga” 查找，贴图名按参数 identifier 和常见别名匹配（metallic / metalness、
+occlusion、gloss……），也可以用 --map 指定；缺少的贴图可以用 --fill 填常数。
+
+命令行用法：
+    python -m utilities.channel_pack --layout                                 只打印从包里读出的通道布局
+    python -m utilities.channel_pack D:/Export -o D:/Unity/Textures
+    python -m utilities.channel_pack D:/Export --format png --fill Detail=0 --workers 8
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utilities.sbs_stream import iter_events
+
+
+DEFAULT_PACKAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'SDFiles', 'Bilibili_HuangJuanLr', 'BatchMergeGraphSample.sbs')
+TILE_ROWS = 256
+CHANNELS = 'RGBA'
+# 没有设置 channelsweights 时，grayscaleconversion 按三个通道平均
+DEFAULT_GRAY_WEIGHTS = (1.0 / 3, 1.0 / 3, 1.0 / 3)
+# 贴图文件名的常见写法（都按小写比较）
+ALIASES = {
+    'metalic': ('metallic', 'metalness', 'metal'),
+    'metallic': ('metalic', 'metalness', 'metal'),
+    'smoothness': ('smooth', 'glossiness', 'gloss'),
+    'ao': ('ambientocclusion', 'ambient_occlusion', 'occlusion'),
+    'detail': ('detailmask', 'detail_mask'),
+    'roughness': ('rough',),
+}
+SOURCE_EXTENSIONS = ('.tga', '.npy')
+
+STATUS_PACKED = 'packed'
+STATUS_SKIPPED = 'up-to-date'
+STATUS_FAILED = 'failed'
+
+_INVERT = bytes(range(255, -1, -1))
+
+# channels: {'R': 参数 identifier, ...}；components: Usage 的通道字符串，比如 'RGBA'
+ChannelLayout = namedtuple('ChannelLayout', 'graph output usage components channels')
+
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+# ----------------------------------------------------------------------
+# 从包里读通道布局
+# ----------------------------------------------------------------------
+def read_layouts(path):
+    """找出包里所有“输出节点 <- 按 R/G/B/A 端口打包的实例节点”结构，返回 [ChannelLayout, ...]。"""
+    layouts = []
+    nodes = params = outputs = None
+    for event in iter_events(path, kinds={'graph_start', 'paraminput', 'graphoutput', 'compnode', 'graph_end'}):
+        if event.kind == 'graph_start':
+            nodes, params, outputs = {}, {}, {}
+        elif event.kind == 'paraminput':
+            params[event.uid] = event.identifier
+        elif event.kind == 'graphoutput':
+            outputs[event.uid] = event
+        elif event.kind == 'compnode':
+            nodes[event.uid] = event
+        else:
+            for node in nodes.values():
+                if node.node_kind != 'output' or node.bridge not in outputs or not node.connections:
+                    continue
+                source = nodes.get(node.connections[0][1])
+                ports = {port: ref for port, ref, _out in source.connections} if source else {}
+                if source is None or source.node_kind != 'instance' or not ports or set(ports) - set(CHANNELS):
+                    continue
+                output = outputs[node.bridge]
+                usage, components = output.usages[0] if output.usages else ('', CHANNELS)
+                channels = {port: _trace_input(nodes, params, ref) for port, ref in ports.items()}
+                layouts.append(ChannelLayout(event.identifier, output.identifier, usage, components, channels))
+    return layouts
+
+
+def _trace_input(nodes, params, uid):
+    # 往上游走过 grayscaleconversion，直到输入节点；别的滤镜这里没法复现
+    seen = set()
+    while uid not in seen:
+        seen.add(uid)
+        node = nodes.get(uid)
+        if node is None:
+            raise ValueError('连接指向不存在的节点 %s' % uid)
+        if node.node_kind == 'input':
+            return params.get(node.bridge, node.uid)
+        name = node.definition.rsplit('::', 1)[-1]
+        if name != 'grayscaleconversion' or len(node.connections) != 1:
+            raise ValueError('通道上游有无法离线复现的节点 %s（%s）' % (node.uid, node.definition))
+        uid = node.connections[0][1]
+    raise ValueError('通道上游有环')
+
+
+def find_layout(path, graph=None, output=None):
+    """按 graph / 输出 identifier 选一个布局，并校验它和输出的 Usage 通道一致。"""
+    layouts = [layout for layout in read_layouts(path)
+               if (graph is None or layout.graph == graph) and (output is None or layout.output == output)]
+    if not layouts:
+        raise ValueError('%s 里没有找到按 R/G/B/A 打包的输出' % path)
+    if len(layouts) > 1:
+        raise ValueError('有多个打包输出，请用 --graph / --output 指定: %s'
+                         % ', '.join('%s/%s' % (l.graph, l.output) for l in layouts))
+    layout = layouts[0]
+    check_layout(layout)
+    return layout
+
+
+def check_layout(layout):
+    """打包的通道必须正好是 Usage 里的通道：多了少了导进 Unity 都会错位。"""
+    components = layout.components.upper()
+    if components not in ('RGB', 'RGBA'):
+        raise ValueError('输出 %s 的 Usage 通道是 %s，只支持 RGB / RGBA' % (layout.output, layout.components))
+    extra = sorted(set(layout.channels) - set(components))
+    missing = [c for c in components if c not in layout.channels]
+    if extra or missing:
+        raise ValueError('输出 %s（Usage %s %s）和打包的通道不一致：%s%s'
+                         % (layout.output, layout.usage, components,
+                            '多出 %s ' % ''.join(extra) if extra else '',
+                            '缺少 %s' % ''.join(missing) if missing else ''))
+
+
+# ----------------------------------------------------------------------
+# 源贴图（mmap，按图块读取）
+# ----------------------------------------------------------------------
+class TgaSource(object):
+    """未压缩 TGA（类型 2 真彩色 / 3 灰度，8 位每通道）。像素按 BGR(A) 存放。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError('%s 是空文件' % path)
+        header = self._map[:18]
+        if len(header) < 18:
+            self.close()
+            raise ValueError('%s 不是 TGA 文件' % path)
+        id_length, colormap_type, image_type = header[0], header[1], header[2]
+        self.width, self.height, bits, descriptor = struct.unpack('<HHBB', header[12:18])
+        if image_type not in (2, 3) or colormap_type != 0 or bits not in (8, 24, 32):
+            self.close()
+            raise ValueError('%s：只支持未压缩的 8 位灰度 / RGB / RGBA TGA（类型 %d, %d 位）'
+                             % (path, image_type, bits))
+        self.channels = bits // 8
+        self.top_down = bool(descriptor & 0x20)
+        self.offset = 18 + id_length
+        self.row_bytes = self.width * self.channels
+        if self.offset + self.row_bytes * self.height > len(self._map):
+            self.close()
+            raise ValueError('%s 文件不完整' % path)
+
+    def rows(self, y0, y1):
+        """第 y0..y1 行（从上往下数）的原始字节。"""
+        if self.top_down:
+            start = self.offset + y0 * self.row_bytes
+            return self._map[start:start + (y1 - y0) * self.row_bytes]
+        # 左下角原点：文件里是从下往上存的，把这几行倒过来
+        start = self.offset + (self.height - y1) * self.row_bytes
+        data = self._map[start:start + (y1 - y0) * self.row_bytes]
+        size = self.row_bytes
+        return b''.join(data[i - size:i] for i in range(len(data), 0, -size))
+
+    def gray(self, y0, y1, np, weights):
+        data = self.rows(y0, y1)
+        if self.channels == 1:
+            return np.frombuffer(data, dtype=np.uint8) if np is not None else data
+        c = self.channels
+        if np is not None:
+            pixels = np.frombuffer(data, dtype=np.uint8).reshape(-1, c)
+            return _weighted(np, pixels[:, 2], pixels[:, 1], pixels[:, 0], weights)
+        r, g, b = data[2::c], data[1::c], data[0::c]
+        if r == g == b:
+            return r
+        raise ValueError('%s 是彩色贴图，灰度转换需要安装 numpy' % self.path)
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class NpySource(object):
+    """.npy 数组（H x W 或 H x W x C，uint8 或 0..1 浮点），numpy 以 mmap_mode='r' 打开。"""
+
+    def __init__(self, path, np):
+        if np is None:
+            raise ValueError('读取 .npy 贴图需要安装 numpy')
+        self.path = path
+        self._array = np.load(path, mmap_mode='r')
+        if self._array.ndim not in (2, 3):
+            raise ValueError('%s 不是二维贴图（形状 %s）' % (path, self._array.shape))
+        self.height, self.width = self._array.shape[:2]
+        self.channels = 1 if self._array.ndim == 2 else self._array.shape[2]
+
+    def gray(self, y0, y1, np, weights):
+        band = np.asarray(self._array[y0:y1])
+        if band.dtype != np.uint8:
+            band = np.clip(np.rint(band.astype(np.float32) * 255.0), 0, 255).astype(np.uint8)
+        if band.ndim == 2 or band.shape[2] == 1:
+            return band.reshape(-1)
+        pixels = band.reshape(-1, band.shape[2])
+        return _weighted(np, pixels[:, 0], pixels[:, 1], pixels[:, 2], weights)
+
+    def close(self):
+        self._array = None
+
+
+def _weighted(np, r, g, b, weights):
+    if np.array_equal(r, g) and np.array_equal(g, b):
+        return r
+    wr, wg, wb = weights
+    value = r * np.float32(wr) + g * np.float32(wg) + b * np.float32(wb)
+    return np.clip(np.rint(value), 0, 255).astype(np.uint8)
+
+
+def open_source(path, np=None):
+    if path.lower().endswith('.npy'):
+        return NpySource(path, np)
+    return TgaSource(path)
+
+
+# ----------------------------------------------------------------------
+# 输出（流式写）
+# ----------------------------------------------------------------------
+class _Writer(object):
+    """先写同目录的临时文件，close() 时 os.replace 成正式文件；abort() 丢弃。"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(path)[1], dir=directory)
+        self._file = os.fdopen(fd, 'wb')
+
+    def close(self):
+        self._finish()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+    def _finish(self):
+        pass
+
+
+class TgaWriter(_Writer):
+    # TGA 的像素字节顺序是 BGR(A)：R/G/B/A 分别写到第 2/1/0/3 个字节
+    ORDER = {'R': 2, 'G': 1, 'B': 0, 'A': 3}
+
+    def __init__(self, path, width, height, channels):
+        _Writer.__init__(self, path)
+        descriptor = 0x20 | (8 if channels == 4 else 0)        # 左上角原点 + alpha 位数
+        self._file.write(struct.pack('<BBBHHBHHHHBB', 0, 0, 2, 0, 0, 0, 0, 0, width, height,
+                                     channels * 8, descriptor))
+
+    def write(self, data):
+        self._file.write(data)
+
+
+class PngWriter(_Writer):
+    ORDER = {'R': 0, 'G': 1, 'B': 2, 'A': 3}
+
+    def __init__(self, path, width, height, channels, level=6):
+        _Writer.__init__(self, path)
+        self._row_bytes = width * channels
+        self._compressor = zlib.compressobj(level)
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        color_type = {3: 2, 4: 6}[channels]
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)) + kind + data
+                         + struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xffffffff))
+
+    def write(self, data):
+        # 每行前面加过滤类型 0（不过滤）
+        size = self._row_bytes
+        view = memoryview(data)
+        rows = bytearray()
+        for start in range(0, len(view), size):
+            rows += b'\x00'
+            rows += view[start:start + size]
+        compressed = self._compressor.compress(bytes(rows))
+        if compressed:
+            self._chunk(b'IDAT', compressed)
+
+    def _finish(self):
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+
+
+# ----------------------------------------------------------------------
+# 打包一套贴图
+# ----------------------------------------------------------------------
+def _match(stem, names):
+    lower = stem.lower()
+    for name in sorted(names, key=len, reverse=True):
+        if lower.endswith('_' + name):
+            return stem[:-len(name) - 1]
+    return None
+
+
+def find_texture_sets(paths, layout, mapping=None):
+    """在目录里按文件名找出每套贴图：{套名: {参数 identifier: 文件路径}}，按套名排序。"""
+    mapping = {k.lower(): v.lower() for k, v in (mapping or {}).items()}
+    wanted = {}
+    for identifier in set(layout.channels.values()):
+        key = identifier.lower()
+        names = {mapping[key]} if key in mapping else {key}.union(ALIASES.get(key, ()))
+        wanted[identifier] = names
+    sets = {}
+    for path in paths:
+        files = []
+        if os.path.isdir(path):
+            for root, _dirs, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in sorted(names))
+        else:
+            files.append(path)
+        for file_path in files:
+            stem, ext = os.path.splitext(os.path.basename(file_path))
+            if ext.lower() not in SOURCE_EXTENSIONS:
+                continue
+            for identifier, names in wanted.items():
+                name = _match(stem, names)
+                if name:
+                    key = os.path.join(os.path.dirname(file_path), name)
+                    sets.setdefault(key, {})[identifier] = file_path
+                    break
+    return dict(sorted(sets.items()))
+
+
+def output_path(set_key, layout, out_dir, fmt):
+    name = '%s_%s.%s' % (os.path.basename(set_key), layout.output, fmt)
+    return os.path.join(out_dir or os.path.dirname(set_key), name)
+
+
+class PackOptions(object):
+    """打包参数（会传给子进程）。"""
+
+    def __init__(self, out_dir=None, fmt='tga', tile_rows=TILE_ROWS, fill=None, invert=(), force=False,
+                 png_level=6, weights=DEFAULT_GRAY_WEIGHTS, use_numpy=True):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.tile_rows = tile_rows
+        self.fill = dict(fill or {})          # {参数 identifier: 0..255}
+        self.invert = set(invert)             # 这些参数取反（比如源贴图是 roughness）
+        self.force = force
+        self.png_level = png_level
+        self.weights = weights
+        self.use_numpy = use_numpy
+
+
+def pack_set(set_key, sources, layout, options):
+    """打包一套贴图，返回 (套名, 状态, 说明, 秒数)。"""
+    started = time.perf_counter()
+    np = _numpy() if options.use_numpy else None
+    target = output_path(set_key, layout, options.out_dir, options.fmt)
+    opened = {}
+    writer = None
+    try:
+        missing = [i for i in set(layout.channels.values()) if i not in sources and i not in options.fill]
+        if missing:
+            raise ValueError('缺少贴图: %s' % ', '.join(sorted(missing)))
+        if not options.force and os.path.exists(target):
+            newest = max(os.path.getmtime(p) for p in sources.values()) if sources else 0
+            if os.path.getmtime(target) >= newest:
+                return set_key, STATUS_SKIPPED, target, time.perf_counter() - started
+        for identifier, path in sources.items():
+            if identifier in layout.channels.values():
+                opened[identifier] = open_source(path, np)
+        if not opened:
+            raise ValueError('没有源贴图，无法确定尺寸')
+        sizes = {(s.width, s.height) for s in opened.values()}
+        if len(sizes) != 1:
+            raise ValueError('源贴图尺寸不一致: %s' % ', '.join('%dx%d' % size for size in sorted(sizes)))
+        width, height = sizes.pop()
+        components = layout.components.upper()
+        k = len(components)
+        if options.out_dir:
+            os.makedirs(options.out_dir, exist_ok=True)
+        if options.fmt == 'png':
+            writer = PngWriter(target, width, height, k, options.png_level)
+        else:
+            writer = TgaWriter(target, width, height, k)
+
+        for y0 in range(0, height, options.tile_rows):
+            y1 = min(y0 + options.tile_rows, height)
+            n = (y1 - y0) * width
+            planes = {}
+            for identifier in set(layout.channels.values()):
+                if identifier in opened:
+                    plane = opened[identifier].gray(y0, y1, np, options.weights)
+                    if identifier in options.invert:
+                        plane = 255 - plane if np is not None else plane.translate(_INVERT)
+                else:
+                    value = int(options.fill[identifier])
+                    plane = np.full(n, value, dtype=np.uint8) if np is not None else bytes((value,)) * n
+                planes[identifier] = plane
+            if np is not None:
+                band = np.empty((n, k), dtype=np.uint8)
+                for channel in components:
+                    band[:, writer.ORDER[channel]] = planes[layout.channels[channel]]
+                writer.write(band.tobytes())
+            else:
+                band = bytearray(n * k)
+                for channel in components:
+                    band[writer.ORDER[channel]::k] = planes[layout.channels[channel]]
+                writer.write(band)
+        writer.close()
+        writer = None
+        return set_key, STATUS_PACKED, '%dx%d -> %s' % (width, height, target), time.perf_counter() - started
+    except (OSError, ValueError) as e:
+        return set_key, STATUS_FAILED, str(e), time.perf_counter() - started
+    finally:
+        if writer is not None:
+            writer.abort()
+        for source in opened.values():
+            source.close()
+
+
+# ----------------------------------------------------------------------
+# 进程池
+# ----------------------------------------------------------------------
+_worker_args = None
+
+
+def _init_worker(layout, options):
+    global _worker_args
+    _worker_args = (layout, options)
+
+
+def _run_one(set_key, sources):
+    layout, options = _worker_args
+    return pack_set(set_key, sources, layout, options)
+
+
+def run_batch(texture_sets, layout, options, workers=None, progress=True):
+    """并行打包所有贴图套，返回 {状态: 数量}。"""
+    counts = {STATUS_PACKED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+    if not texture_sets:
+        return counts
+    total = len(texture_sets)
+    width = len(str(total))
+    started = time.perf_counter()
+    if workers == 1 or total == 1:
+        _init_worker(layout, options)
+        results = (_run_one(key, sources) for key, sources in texture_sets.items())
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(layout, options))
+        results = (f.result() for f in as_completed(
+            [pool.submit(_run_one, key, sources) for key, sources in texture_sets.items()]))
+    try:
+        for done, (key, status, message, seconds) in enumerate(results, 1):
+            counts[status] += 1
+            if progress:
+                print('[%*d/%d] %-10s %s  %.2fs  %s' % (width, done, total, status, key, seconds, message))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if progress:
+        print('[channel_pack] %d 套贴图, 用时 %.2fs: %s'
+              % (total, time.perf_counter() - started, ', '.join('%s=%d' % item for item in sorted(counts.items()))))
+    return counts
+
+
+def _pairs(values, convert=str):
+    result = {}
+    for item in values or ():
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError('应写成 名字=值: %r' % item)
+        result[key] = convert(value)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按 RGBA_Merge graph 的通道布局离线打包贴图')
+    parser.add_argument('paths', nargs='*', help='贴图目录或文件')
+    parser.add_argument('--package', default=DEFAULT_PACKAGE, help='提供通道布局的 .sbs')
+    parser.add_argument('--graph', help='graph identifier（包里有多个打包输出时）')
+    parser.add_argument('--output', help='输出 identifier（包里有多个打包输出时）')
+    parser.add_argument('--layout', action='store_true', help='只打印通道布局')
+    parser.add_argument('-o', '--out-dir', help='输出目录，默认和源贴图同目录')
+    parser.add_argument('--format', choices=('tga', 'png'), default='tga')
+    parser.add_argument('--map', action='append', metavar='IDENTIFIER=NAME', help='贴图文件名后缀，如 ao=occ')
+    parser.add_argument('--fill', action='append', metavar='IDENTIFIER=VALUE', help='缺少贴图时填的常数 0..255')
+    parser.add_argument('--invert', action='append', default=[], metavar='IDENTIFIER', help='取反（roughness -> smoothness）')
+    parser.add_argument('--tile-rows', type=int, default=TILE_ROWS, help='每个图块的行数')
+    parser.add_argument('--png-level', type=int, default=6, help='PNG 压缩级别 0..9')
+    parser.add_argument('--no-numpy', action='store_true', help='不用 numpy（用于对照）')
+    parser.add_argument('--force', action='store_true', help='输出已是最新也重写')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认等于 CPU 核数')
+    args = parser.parse_args(argv)
+
+    try:
+        layout = find_layout(args.package, args.graph, args.output)
+        fill = _pairs(args.fill, int)
+        mapping = _pairs(args.map)
+    except (OSError, ValueError) as e:
+        print('[channel_pack] %s' % e)
+        return 1
+    print('[channel_pack] %s/%s（Usage %s %s）: %s'
+          % (layout.graph, layout.output, layout.usage, layout.components,
+             ', '.join('%s=%s' % (c, layout.channels[c]) for c in layout.components)))
+    if args.layout or not args.paths:
+        return 0
+    texture_sets = find_texture_sets(args.paths, layout, mapping)
+    options = PackOptions(args.out_dir, args.format, args.tile_rows, fill, args.invert, args.force,
+                          args.png_level, use_numpy=not args.no_numpy)
+    counts = run_batch(texture_sets, layout, options, args.workers)
+    return 1 if counts[STATUS_FAILED] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
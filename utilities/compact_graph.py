@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""紧凑的图模型：用 array（类型化数组）存节点和连接，给离线分析工具打底
+
+用 DOM 或者“每个节点一个 dict”来存 compNode / connection，每个节点要占几 KB；
+几十万节点的大图就是好几个 GB。其实分析工具关心的只有：
+    节点 uid、定义路径（如 sbs::compositing::hsl）、节点类型、GUI 位置（SD API 里 getPosition() 的 float2）、
+    以及谁连到谁。
+
+这里把它们拆成一列一列的 array（Python 标准库 array 模块，底层是连续的 C 数组）：
+    uids       array('q')  64 位整数
+    defs       array('I')  定义路径在 definitions 列表里的下标（相同字符串只存一份，即“驻留/intern”）
+    kinds      array('B')  节点类型编号
+    xs / ys    array('f')  GUI 位置，和 SD 的 float2 一样是 32 位浮点
+连接用 CSR（压缩稀疏行）格式存：第 i 个节点的输入连接在 in_src[in_offsets[i]:in_offsets[i+1]]，
+所以查询某个节点的上游 / 下游节点只是一次数组切片。
+
+算上上下游 CSR 和 uid 查找表，每个节点大约 70 字节；同一个节点在 minidom 里要 10 KB 以上。
+benchmarks/bench_compact_graph.py 会实际测量 1 万 / 10 万 / 100 万节点的内存和速度。
+
+用法：
+    graphs = load_graphs('a.sbs')              # {graph identifier: CompactGraph}
+    g = graphs['processor']
+    i = g.index_of(1551511154)                 # uid -> 节点下标
+    print(g.definition(i), g.position(i))
+    for j in g.predecessors(i):
+        print('上游', g.uid(j))
+"""
+
+import bisect
+import sys
+from array import array
+
+from utilities import sbs_index
+from utilities.sbs_stream import (NODE_FILTER, NODE_INPUT, NODE_INSTANCE, NODE_OUTPUT,
+                                  iter_bytes_events, iter_events)
+
+
+# 节点类型 <-> 编号（存进 array('B')）
+KIND_CODES = {NODE_FILTER: 0, NODE_INSTANCE: 1, NODE_INPUT: 2, NODE_OUTPUT: 3}
+KIND_NAMES = {code: name for name, code in KIND_CODES.items()}
+KIND_OTHER = 255
+
+_NO_OUTPUT = -1
+
+
+class StringPool(object):
+    """字符串驻留池：相同字符串只存一次，数组里只存它的编号。"""
+
+    __slots__ = ('strings', '_ids')
+
+    def __init__(self):
+        self.strings = []
+        self._ids = {}
+
+    def intern(self, text):
+        ident = self._ids.get(text)
+        if ident is None:
+            ident = len(self.strings)
+            self._ids[text] = ident
+            self.strings.append(text)
+        return ident
+
+    def __getitem__(self, ident):
+        return self.strings[ident]
+
+    def __len__(self):
+        return len(self.strings)
+
+    def nbytes(self):
+        total = sys.getsizeof(self.strings) + sys.getsizeof(self._ids)
+        return total + sum(sys.getsizeof(s) for s in self.strings)
+
+
+def _array_bytes(arr):
+    return arr.buffer_info()[1] * arr.itemsize
+
+
+class CompactGraph(object):
+    """一个 graph 的紧凑表示。
+
+    先用 add_node / add_connection 填数据，再调用 freeze() 建立查询结构。
+    freeze 之后仍然可以改节点位置（set_position），但不能再加节点和连接。
+    """
+
+    __slots__ = ('identifier', 'definitions', 'ports', 'uids', 'defs', 'kinds', 'xs', 'ys',
+                 '_e_dst', '_e_src_uid', '_e_port', '_e_out',
+                 'in_offsets', 'in_src', 'in_port', 'in_out',
+                 'out_offsets', 'out_dst',
+                 '_sorted_uids', '_sorted_index', 'dangling', 'frozen')
+
+    def __init__(self, identifier=None, definitions=None, ports=None):
+        self.identifier = identifier
+        # 同一个包里的多个 graph 可以共用一个字符串池
+        self.definitions = definitions if definitions is not None else StringPool()
+        self.ports = ports if ports is not None else StringPool()
+        self.uids = array('q')
+        self.defs = array('I')
+        self.kinds = array('B')
+        self.xs = array('f')
+        self.ys = array('f')
+        # 未整理的连接（freeze 时转换成 CSR）
+        self._e_dst = array('I')
+        self._e_src_uid = array('q')
+        self._e_port = array('I')
+        self._e_out = array('q')
+        self.in_offsets = self.in_src = self.in_port = self.in_out = None
+        self.out_offsets = self.out_dst = None
+        self._sorted_uids = self._sorted_index = None
+        self.dangling = 0
+        self.frozen = False
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+    def add_node(self, uid, definition, kind=NODE_FILTER, x=0.0, y=0.0):
+        """添加节点，返回节点下标。"""
+        if self.frozen:
+            raise RuntimeError('graph 已经 freeze，不能再添加节点')
+        self.uids.append(int(uid))
+        self.defs.append(self.definitions.intern(definition or ''))
+        self.kinds.append(KIND_CODES.get(kind, KIND_OTHER))
+        self.xs.append(x)
+        self.ys.append(y)
+        return len(self.uids) - 1
+
+    def add_connection(self, dst_index, port, src_uid, src_output_uid=None):
+        """记录一条连接：节点 dst_index 的输入 port 连接到 uid 为 src_uid 的节点。
+
+        上游节点可能在文件里排在后面，所以这里只记 uid，freeze 时再换成下标。
+        """
+        if self.frozen:
+            raise RuntimeError('graph 已经 freeze，不能再添加连接')
+        self._e_dst.append(dst_index)
+        self._e_src_uid.append(int(src_uid))
+        self._e_port.append(self.ports.intern(port or ''))
+        self._e_out.append(int(src_output_uid) if src_output_uid is not None else _NO_OUTPUT)
+
+    def add_event(self, event):
+        """直接吃 sbs_stream 的 CompNode 事件。"""
+        x, y = event.pos if event.pos is not None else (0.0, 0.0)
+        index = self.add_node(event.uid, event.definition, event.node_kind, x, y)
+        for port, ref, ref_output in event.connections:
+            if ref is not None:
+                self.add_connection(index, port, ref, ref_output)
+        return index
+
+    def freeze(self):
+        """建立 uid 查找表和上下游 CSR 结构。"""
+        if self.frozen:
+            return self
+        n = len(self.uids)
+        uids = self.uids
+
+        # uid -> 下标：按 uid 排序后二分查找，比 dict 省很多内存
+        order = sorted(range(n), key=uids.__getitem__)
+        self._sorted_uids = array('q', (uids[i] for i in order))
+        self._sorted_index = array('I', order)
+        del order
+
+        # 把连接里的上游 uid 换成下标，找不到的算“悬空连接”丢掉
+        e_dst, e_src_uid, e_port, e_out = self._e_dst, self._e_src_uid, self._e_port, self._e_out
+        m = len(e_dst)
+        src = array('I', [0]) * m
+        keep = 0
+        for k in range(m):
+            s = self.index_of(e_src_uid[k])
+            if s is None:
+                continue
+            src[keep] = s
+            e_dst[keep] = e_dst[k]
+            e_port[keep] = e_port[k]
+            e_out[keep] = e_out[k]
+            keep += 1
+        self.dangling = m - keep
+        del src[keep:], e_dst[keep:], e_port[keep:], e_out[keep:]
+
+        # 计数排序建 CSR：输入方向按 dst 分组，输出方向按 src 分组
+        self.in_offsets, in_order = _csr(e_dst, n)
+        self.in_src = array('I', (src[k] for k in in_order))
+        self.in_port = array('I', (e_port[k] for k in in_order))
+        self.in_out = array('q', (e_out[k] for k in in_order))
+        self.out_offsets, out_order = _csr(src, n)
+        self.out_dst = array('I', (e_dst[k] for k in out_order))
+
+        self._e_dst = self._e_src_uid = self._e_port = self._e_out = None
+        self.frozen = True
+        return self
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self.uids)
+
+    @property
+    def edge_count(self):
+        return len(self.in_src) if self.frozen else len(self._e_dst)
+
+    def index_of(self, uid):
+        """uid -> 节点下标，不存在返回 None（需要先 freeze）。"""
+        sorted_uids = self._sorted_uids
+        uid = int(uid)
+        k = bisect.bisect_left(sorted_uids, uid)
+        if k < len(sorted_uids) and sorted_uids[k] == uid:
+            return self._sorted_index[k]
+        return None
+
+    def uid(self, index):
+        return self.uids[index]
+
+    def definition(self, index):
+        return self.definitions[self.defs[index]]
+
+    def kind(self, index):
+        return KIND_NAMES.get(self.kinds[index])
+
+    def position(self, index):
+        return self.xs[index], self.ys[index]
+
+    def set_position(self, index, x, y):
+        self.xs[index] = x
+        self.ys[index] = y
+
+    def predecessors(self, index):
+        """上游节点下标（连到这个节点输入上的节点）。"""
+        return self.in_src[self.in_offsets[index]:self.in_offsets[index + 1]]
+
+    def successors(self, index):
+        """下游节点下标。"""
+        return self.out_dst[self.out_offsets[index]:self.out_offsets[index + 1]]
+
+    def inputs(self, index):
+        """[(输入端口名, 上游节点下标, 上游输出 uid 或 None), ...]"""
+        start, end = self.in_offsets[index], self.in_offsets[index + 1]
+        ports = self.ports
+        return [(ports[self.in_port[k]], self.in_src[k],
+                 self.in_out[k] if self.in_out[k] != _NO_OUTPUT else None)
+                for k in range(start, end)]
+
+    def nodes_of_kind(self, kind):
+        code = KIND_CODES[kind]
+        return [i for i, value in enumerate(self.kinds) if value == code]
+
+    def memory_footprint(self):
+        """本对象实际占用的字节数（数组 + 字符串池）。"""
+        arrays = [self.uids, self.defs, self.kinds, self.xs, self.ys]
+        if self.frozen:
+            arrays += [self.in_offsets, self.in_src, self.in_port, self.in_out,
+                       self.out_offsets, self.out_dst, self._sorted_uids, self._sorted_index]
+        else:
+            arrays += [self._e_dst, self._e_src_uid, self._e_port, self._e_out]
+        return sum(_array_bytes(a) for a in arrays) + self.definitions.nbytes() + self.ports.nbytes()
+
+
+def _csr(keys, n):
+    """计数排序：返回 (offsets, order)。order 里是按 key 分组后的原始下标。"""
+    offsets = array('I', [0]) * (n + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array('I', offsets[:n]) if n else array('I')
+    order = array('I', [0]) * len(keys)
+    for k, key in enumerate(keys):
+        order[cursor[key]] = k
+        cursor[key] += 1
+    return offsets, order
+
+
+# ----------------------------------------------------------------------
+# 从 .sbs 加载
+# ----------------------------------------------------------------------
+def _build(events, wanted=None):
+    graphs = {}
+    definitions = StringPool()
+    ports = StringPool()
+    current = None
+    for event in events:
+        kind = event.kind
+        if kind == 'compnode':
+            if current is not None:
+                current.add_event(event)
+        elif kind == 'graph_start':
+            if wanted is None or event.identifier == wanted:
+                current = CompactGraph(event.identifier, definitions, ports)
+        elif kind == 'graph_end':
+            if current is not None:
+                graphs[current.identifier] = current.freeze()
+            current = None
+    return graphs
+
+
+def load_graphs(path):
+    """流式读取整个包，返回 {graph identifier: CompactGraph}。同一个包的 graph 共用字符串池。"""
+    return _build(iter_events(path, kinds={'graph_start', 'compnode', 'graph_end'}))
+
+
+def load_graph(path, identifier):
+    """借助 sidecar 索引只解析一个 graph。找不到时抛出 KeyError。"""
+    data = sbs_index.read_graph_bytes(path, identifier)
+    graphs = _build(iter_bytes_events(data, kinds={'graph_start', 'compnode', 'graph_end'}))
+    if not graphs:
+        raise KeyError('包 %s 中没有 graph: %s' % (path, identifier))
+    return next(iter(graphs.values()))
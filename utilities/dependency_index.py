@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""整个包库的依赖索引 + 清理无效依赖（MaxSDPlugins 计划：清理无效的依赖）
+
+每个 .sbs 包的开头有一组 <dependency>（filename / uid / fileUID），
+包里的 compInstance 等元素通过 `pkg:///xxx?dependency=<uid>` 引用它们。
+日积月累，很多包里留下了“声明了但没人引用”的依赖，打开包时 SD 还要去找这些文件。
+
+本工具做三件事：
+1. 建立一个持久化的依赖索引（JSON 文件，默认放在库根目录 .sbs_dependencies.json）：
+   每个包声明了哪些依赖、每个依赖 uid 被引用了几次。
+2. 增量更新：只有 mtime 或文件大小变化的包才重新扫描，删除的包从索引里移除。
+   夜间任务跑一遍，大部分包都不用重新读。
+3. 查询与清理：
+   --who-uses sbs://rgba_merge.sbs   哪些包依赖这个文件
+   --unused                          列出所有从未被引用的依赖
+   --missing                         列出引用了但没有声明的依赖 uid（真正“坏掉”的引用）
+   --remove-unused [--dry-run]       批量删除未引用的依赖（按字节范围剪掉，其余字节不动）
+
+命令行用法：
+    python -m utilities.dependency_index D:/Materials --unused
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities.sbs_files import atomic_write, iter_packages
+from utilities.sbs_stream import iter_events
+
+
+DB_NAME = '.sbs_dependencies.json'
+DB_VERSION = 1
+
+
+def scan_package(path):
+    """流式扫描一个包，返回它的依赖记录（可以直接存进 JSON）。"""
+    st = os.stat(path)
+    dependencies = []
+    refs = {}
+    for event in iter_events(path, kinds={'dependency', 'dependency_ref'}):
+        if event.kind == 'dependency_ref':
+            if event.dep_uid:
+                refs[event.dep_uid] = refs.get(event.dep_uid, 0) + 1
+        else:
+            dependencies.append({'uid': event.uid, 'filename': event.filename,
+                                 'fileUID': event.file_uid, 'start': event.start, 'end': event.end})
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+            'dependencies': dependencies, 'refs': refs}
+
+
+def _scan_job(args):
+    # 进程池里运行：出错时返回错误信息而不是抛异常，避免一个坏文件中断整批
+    rel_path, abs_path = args
+    try:
+        return rel_path, scan_package(abs_path), None
+    except (OSError, ValueError) as e:
+        return rel_path, None, str(e)
+
+
+class DependencyIndex(object):
+    """持久化的跨包依赖索引。
+
+    packages 的结构：
+        {相对路径: {'mtime_ns', 'size', 'dependencies': [...], 'refs': {dep_uid: 次数}}}
+    """
+
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(self.root, DB_NAME)
+        self.packages = {}
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+    def load(self):
+        try:
+            with open(self.db_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == DB_VERSION:
+            self.packages = data.get('packages', {})
+        return self
+
+    def save(self):
+        payload = json.dumps({'version': DB_VERSION, 'packages': self.packages},
+                             separators=(',', ':'), ensure_ascii=False)
+        atomic_write(self.db_path, payload.encode('utf-8'))
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+    def update(self, workers=None):
+        """同步磁盘上的包：新增 / 变化的重新扫描，删除的移出索引。
+
+        返回 (重新扫描数, 未变化数, 删除数, [(路径, 错误), ...])
+        """
+        seen = set()
+        jobs = []
+        unchanged = 0
+        for abs_path in iter_packages([self.root]):
+            rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, '/')
+            seen.add(rel_path)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            old = self.packages.get(rel_path)
+            if old and old['mtime_ns'] == st.st_mtime_ns and old['size'] == st.st_size:
+                unchanged += 1
+                continue
+            jobs.append((rel_path, abs_path))
+
+        removed = [p for p in self.packages if p not in seen]
+        for rel_path in removed:
+            del self.packages[rel_path]
+
+        errors = []
+        if len(jobs) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_scan_job, jobs, chunksize=16))
+        else:
+            results = [_scan_job(job) for job in jobs]
+        for rel_path, record, error in results:
+            if error is not None:
+                errors.append((rel_path, error))
+                self.packages.pop(rel_path, None)
+            else:
+                self.packages[rel_path] = record
+        return len(jobs) - len(errors), unchanged, len(removed), errors
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def who_uses(self, filename):
+        """返回声明了某个依赖文件（例如 sbs://rgba_merge.sbs）的包，以及其中实际引用的次数。"""
+        result = []
+        for rel_path, record in sorted(self.packages.items()):
+            for dep in record['dependencies']:
+                if dep['filename'] == filename:
+                    result.append((rel_path, record['refs'].get(dep['uid'], 0)))
+        return result
+
+    def dependents(self):
+        """反向表：依赖文件名 -> 声明它的包列表。"""
+        table = {}
+        for rel_path, record in self.packages.items():
+            for dep in record['dependencies']:
+                table.setdefault(dep['filename'], []).append(rel_path)
+        return table
+
+    def unused(self):
+        """所有声明了但一次都没被引用的依赖：[(包, 依赖记录), ...]"""
+        result = []
+        for rel_path, record in sorted(self.packages.items()):
+            refs = record['refs']
+            for dep in record['dependencies']:
+                if dep['uid'] not in refs:
+                    result.append((rel_path, dep))
+        return result
+
+    def missing(self):
+        """被引用但没有声明的依赖 uid：[(包, uid, 次数), ...]"""
+        result = []
+        for rel_path, record in sorted(self.packages.items()):
+            declared = set(dep['uid'] for dep in record['dependencies'])
+            for uid, count in sorted(record['refs'].items()):
+                if uid not in declared:
+                    result.append((rel_path, uid, count))
+        return result
+
+    # ------------------------------------------------------------------
+    # 清理
+    # ------------------------------------------------------------------
+    def remove_unused(self, dry_run=False):
+        """删除所有未引用的依赖，返回 [(包, 删除的依赖文件名列表), ...]。
+
+        删除前会重新扫描这个包，确认索引里记录的字节范围仍然有效。
+        """
+        by_package = {}
+        for rel_path, _dep in self.unused():
+            by_package.setdefault(rel_path, None)
+        changed = []
+        for rel_path in by_package:
+            abs_path = os.path.join(self.root, rel_path)
+            record = scan_package(abs_path)
+            doomed = [dep for dep in record['dependencies'] if dep['uid'] not in record['refs']]
+            if not doomed:
+                self.packages[rel_path] = record
+                continue
+            changed.append((rel_path, [dep['filename'] for dep in doomed]))
+            if dry_run:
+                continue
+            with open(abs_path, 'rb') as f:
+                data = f.read()
+            # 从后往前剪，前面的偏移不受影响
+            for dep in sorted(doomed, key=lambda d: d['start'], reverse=True):
+                data = data[:dep['start']] + data[dep['end']:]
+            atomic_write(abs_path, data)
+            self.packages[rel_path] = scan_package(abs_path)
+        return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='跨包依赖索引与无效依赖清理')
+    parser.add_argument('root', help='包库根目录')
+    parser.add_argument('--db', help='索引文件路径，默认 <root>/%s' % DB_NAME)
+    parser.add_argument('--workers', type=int, default=None, help='重新扫描时的进程数')
+    parser.add_argument('--who-uses', metavar='FILENAME', help='例如 sbs://rgba_merge.sbs')
+    parser.add_argument('--unused', action='store_true', help='列出未被引用的依赖')
+    parser.add_argument('--missing', action='store_true', help='列出引用了但未声明的依赖 uid')
+    parser.add_argument('--remove-unused', action='store_true', help='删除未被引用的依赖')
+    parser.add_argument('--dry-run', action='store_true', help='配合 --remove-unused，只报告不写文件')
+    args = parser.parse_args(argv)
+
+    index = DependencyIndex(args.root, args.db).load()
+    started = time.perf_counter()
+    rescanned, unchanged, removed, errors = index.update(args.workers)
+    print('[dependency_index] 重新扫描 %d, 未变化 %d, 已删除 %d, 用时 %.2fs'
+          % (rescanned, unchanged, removed, time.perf_counter() - started))
+    for rel_path, error in errors:
+        print('[dependency_index] 扫描失败 %s: %s' % (rel_path, error))
+
+    if args.who_uses:
+        for rel_path, count in index.who_uses(args.who_uses):
+            print('%s  (引用 %d 次)' % (rel_path, count))
+    if args.unused:
+        for rel_path, dep in index.unused():
+            print('%s  未引用: %s (uid %s)' % (rel_path, dep['filename'], dep['uid']))
+    if args.missing:
+        for rel_path, uid, count in index.missing():
+            print('%s  缺少依赖声明: uid %s (引用 %d 次)' % (rel_path, uid, count))
+    if args.remove_unused:
+        for rel_path, filenames in index.remove_unused(args.dry_run):
+            print('%s %s: %s' % ('将删除' if args.dry_run else '已删除', rel_path, ', '.join(filenames)))
+    index.save()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
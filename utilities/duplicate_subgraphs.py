@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""跨包重复子图检测（规范化哈希）
+
+美术经常把同一组节点（比如 HSL 调色链接 RGBA_Merge）复制到几百个包里。
+本工具在整个库里找出这些重复的节点簇，方便把它们提成共用的库 graph。
+
+规范化哈希：
+- 一个“子图”指某个节点和它的全部上游节点（上游锥，cone）。
+- 节点自身的标签 = 定义路径 + 排好序的参数值；uid 和 GUI 位置都不参与。
+  参数是动态值（dynamicValue，函数图）时，参数值换成函数图内容（去掉 GUI 布局）的哈希，
+  否则所有用了函数图的同名参数都会被当成相同。
+  实例节点的定义路径里带的是本包内的依赖 uid（pkg:///rgba_merge?dependency=1551510705），
+  每个包都不一样，所以先换成依赖的文件名（sbs://rgba_merge.sbs）。
+- 按拓扑顺序（上游先算）逐个节点计算：
+      哈希(节点) = H(标签, 排好序的 [(输入端口名, 上游节点哈希, 上游输出序号), ...])
+  所以两个子图只要结构和参数完全一样，哈希就一样，和节点 uid、摆放位置、在文件里的顺序都无关。
+  这个哈希就是上游锥的规范 id（hash-consing）：不需要为每个节点存一份上游节点集合，
+  内存和时间都是 O(节点 + 连接)。锥的节点数同样自底向上累加，是把锥展开成树的节点数
+  （一个上游被用了两次就算两次），只用来过滤和排序。
+- 另外算一个只看定义路径、不看参数值的“形状哈希”。形状相同但参数不同的子图算“近似重复”。
+
+报告时只列“最大”的重复：如果某个簇的每一次出现都只被同一种更大的子图使用，
+它就被那个更大的簇包含了，不再单独列出。
+
+为了能在几万个包上跑：
+- 扫描走进程池，每个包一个任务；
+- 结果存进库根目录的 SQLite 文件 .sbs_subgraphs.sqlite（持久化哈希库），
+  只有 mtime / 大小变化的包才重新扫描，分组统计直接交给 SQLite 做。
+
+命令行用法：
+    python -m utilities.duplicate_subgraphs D:/Materials
+    python -m utilities.duplicate_subgraphs D:/Materials --min-nodes 5 --min-packages 3 --near
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities.sbs_files import iter_packages
+from utilities.sbs_index import mapped_package
+from utilities.sbs_stream import iter_events, parse_dependency_uid
+
+
+DB_NAME = '.sbs_subgraphs.sqlite'
+DB_VERSION = 2
+# 小于这个节点数的子图不入库（单个节点、两个节点的“重复”没有意义，还会把库撑大）
+MIN_STORED_NODES = 3
+# 展开成树的节点数在菱形连接很多时会指数增长，到这里就不再往上加
+MAX_CONE_NODES = (1 << 31) - 1
+
+# <parameter><name v="..."/>...<dynamicValue>函数图</dynamicValue>
+_DYNAMIC = re.compile(rb'<parameter>\s*<name v="([^"]*)"\s*/>(?:(?!</parameter>).)*?'
+                      rb'<dynamicValue>(.*?)</dynamicValue>', re.S)
+_GUI = re.compile(rb'<GUILayout>.*?</GUILayout>|<GUILayout\s*/>', re.S)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS packages (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS cones (
+    path TEXT, graph TEXT, root_uid TEXT, definition TEXT, nodes INTEGER,
+    hash TEXT, shape TEXT, consumer_hash TEXT, consumer_shape TEXT);
+CREATE INDEX IF NOT EXISTS cones_path ON cones (path);
+CREATE INDEX IF NOT EXISTS cones_hash ON cones (hash);
+CREATE INDEX IF NOT EXISTS cones_shape ON cones (shape);
+"""
+
+
+def _hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def canonical_definition(definition, dependencies):
+    """把定义路径里的 ?dependency=<uid> 换成依赖文件名。"""
+    uid = parse_dependency_uid(definition)
+    if uid is None or uid not in dependencies:
+        return definition
+    return '%s?%s' % (definition.split('?', 1)[0], dependencies[uid])
+
+
+def dynamic_signatures(node_bytes):
+    """节点字节里每个动态值参数的函数图哈希：{参数名: 哈希}。函数图里节点的 GUI 布局不参与。"""
+    return {m.group(1).decode('utf-8'): hashlib.blake2b(_GUI.sub(b'', m.group(2)), digest_size=8).hexdigest()
+            for m in _DYNAMIC.finditer(node_bytes)}
+
+
+def _node_label(definition, event, data=None):
+    params = event.params
+    dynamic = {}
+    if data is not None and any(value[0] == 'dynamicValue' for value in params.values() if value):
+        dynamic = dynamic_signatures(data[event.start:event.end])
+    parts = []
+    for name, value in sorted(params.items()):
+        tag, text = value if value else (None, None)
+        if tag == 'dynamicValue':
+            text = dynamic.get(name)
+        parts.append('%s=%s:%s' % (name, tag, text))
+    return '%s|%s' % (definition, ';'.join(parts))
+
+
+def hash_graph(nodes, dependencies=None, min_nodes=MIN_STORED_NODES, data=None):
+    """计算一个 graph 里每个节点上游锥的规范化哈希。
+
+    nodes 是这个 graph 的 CompNode 事件列表，dependencies 是 {依赖 uid: 文件名}，
+    data 是整个包的字节（mmap 也行），给出时动态值参数按函数图内容区分。返回元组列表：
+        (根节点 uid, 根节点定义, 锥的节点数, 哈希, 形状哈希, 唯一下游的哈希, 唯一下游的形状哈希)
+    节点有多个（或没有）下游时，最后两项为 None。处在环里的节点无法排出拓扑序，直接跳过。
+    """
+    n = len(nodes)
+    index = {event.uid: i for i, event in enumerate(nodes)}
+    # 上游输出 uid -> 它在节点输出列表里的序号（uid 不稳定，序号稳定）
+    output_slot = {}
+    for event in nodes:
+        for slot, (output_uid, _comptype) in enumerate(event.outputs):
+            output_slot[output_uid] = slot
+
+    inputs = [[] for _ in range(n)]
+    consumers = [set() for _ in range(n)]
+    indegree = [0] * n
+    for i, event in enumerate(nodes):
+        for port, ref, ref_output in event.connections:
+            j = index.get(ref)
+            if j is None:
+                continue
+            inputs[i].append((port or '', j, output_slot.get(ref_output, -1)))
+            consumers[j].add(i)
+            indegree[i] += 1
+
+    successors = [[] for _ in range(n)]
+    for i in range(n):
+        for _port, j, _slot in inputs[i]:
+            successors[j].append(i)
+    queue = [i for i in range(n) if indegree[i] == 0]
+    head = 0
+    while head < len(queue):
+        v = queue[head]
+        head += 1
+        for w in successors[v]:
+            indegree[w] -= 1
+            if indegree[w] == 0:
+                queue.append(w)
+
+    dependencies = dependencies or {}
+    definitions = [canonical_definition(event.definition, dependencies) for event in nodes]
+    exact = [None] * n
+    shape = [None] * n
+    sizes = [0] * n
+    for v in queue:
+        event = nodes[v]
+        exact_parts = sorted('%s<%s/%d' % (port, exact[j], slot) for port, j, slot in inputs[v])
+        shape_parts = sorted('%s<%s/%d' % (port, shape[j], slot) for port, j, slot in inputs[v])
+        exact[v] = _hash('N%s(%s)' % (_node_label(definitions[v], event, data), ','.join(exact_parts)))
+        shape[v] = _hash('S%s(%s)' % (definitions[v], ','.join(shape_parts)))
+        sizes[v] = min(MAX_CONE_NODES, 1 + sum(sizes[j] for _port, j, _slot in inputs[v]))
+
+    rows = []
+    for v in queue:
+        size = sizes[v]
+        if size < min_nodes:
+            continue
+        consumer_hash = consumer_shape = None
+        if len(consumers[v]) == 1:
+            (c,) = consumers[v]
+            consumer_hash, consumer_shape = exact[c], shape[c]
+        rows.append((nodes[v].uid, definitions[v], size, exact[v], shape[v],
+                     consumer_hash, consumer_shape))
+    return rows
+
+
+def scan_package(path, min_nodes=MIN_STORED_NODES):
+    """流式读取一个包，返回 [(graph, 根 uid, 定义, 节点数, 哈希, 形状, 下游哈希, 下游形状), ...]。"""
+    rows = []
+    dependencies = {}
+    nodes = None
+    kinds = {'dependency', 'graph_start', 'compnode', 'graph_end'}
+    with mapped_package(path) as data:
+        for event in iter_events(path, kinds=kinds):
+            if event.kind == 'compnode':
+                nodes.append(event)
+            elif event.kind == 'graph_start':
+                nodes = []
+            elif event.kind == 'dependency':
+                dependencies[event.uid] = event.filename
+            else:
+                for row in hash_graph(nodes, dependencies, min_nodes, data):
+                    rows.append((event.identifier,) + row)
+                nodes = None
+    return rows
+
+
+def _scan_job(args):
+    # 进程池里运行：出错时返回错误信息而不是抛异常，避免一个坏文件中断整批
+    rel_path, abs_path = args
+    try:
+        st = os.stat(abs_path)
+        return rel_path, st.st_mtime_ns, st.st_size, scan_package(abs_path), None
+    except (OSError, ValueError) as e:
+        return rel_path, None, None, None, str(e)
+
+
+class SubgraphStore(object):
+    """持久化的子图哈希库（SQLite）。"""
+
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(self.root, DB_NAME)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.executescript(_SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != DB_VERSION:
+            # 哈希规则变了，旧数据全部作废
+            self.db.executescript('DELETE FROM packages; DELETE FROM cones;')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(DB_VERSION),))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+    def update(self, workers=None):
+        """同步磁盘上的包：新增 / 变化的重新扫描，删除的移出哈希库。
+
+        返回 (重新扫描数, 未变化数, 删除数, [(路径, 错误), ...])
+        """
+        known = {path: (mtime_ns, size) for path, mtime_ns, size
+                 in self.db.execute('SELECT path, mtime_ns, size FROM packages')}
+        seen = set()
+        jobs = []
+        unchanged = 0
+        for abs_path in iter_packages([self.root]):
+            rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, '/')
+            seen.add(rel_path)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            if known.get(rel_path) == (st.st_mtime_ns, st.st_size):
+                unchanged += 1
+                continue
+            jobs.append((rel_path, abs_path))
+
+        removed = [path for path in known if path not in seen]
+        with self.db:
+            for rel_path in removed:
+                self._forget(rel_path)
+
+        errors = []
+        if len(jobs) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self._store_results(pool.map(_scan_job, jobs, chunksize=16), errors)
+        else:
+            self._store_results((_scan_job(job) for job in jobs), errors)
+        return len(jobs) - len(errors), unchanged, len(removed), errors
+
+    def _forget(self, rel_path):
+        self.db.execute('DELETE FROM packages WHERE path = ?', (rel_path,))
+        self.db.execute('DELETE FROM cones WHERE path = ?', (rel_path,))
+
+    def _store_results(self, results, errors):
+        # 一边收结果一边写库，每 200 个包提交一次，中途中断时已完成的部分不会丢
+        pending = 0
+        for rel_path, mtime_ns, size, rows, error in results:
+            self._forget(rel_path)
+            if error is not None:
+                errors.append((rel_path, error))
+            else:
+                self.db.execute('INSERT INTO packages VALUES (?, ?, ?)', (rel_path, mtime_ns, size))
+                self.db.executemany('INSERT INTO cones VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                    ((rel_path,) + row for row in rows))
+            pending += 1
+            if pending >= 200:
+                self.db.commit()
+                pending = 0
+        self.db.commit()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def clusters(self, min_nodes=5, min_packages=2, near=False, limit=50):
+        """重复子图簇，按“可省下的节点数”从大到小排列。
+
+        near=False：完全相同（哈希相同）的簇；near=True：形状相同但参数有差异的簇。
+        返回 [{'key', 'nodes', 'packages', 'count', 'variants', 'definition', 'occurrences'}, ...]
+        """
+        key, consumer = ('shape', 'consumer_shape') if near else ('hash', 'consumer_hash')
+        having = 'COUNT(DISTINCT path) >= ? AND NOT (COUNT(%s) = COUNT(*) AND COUNT(DISTINCT %s) = 1)' \
+                 % (consumer, consumer)
+        if near:
+            having += ' AND COUNT(DISTINCT hash) > 1'
+        query = ('SELECT %s, MAX(nodes), COUNT(DISTINCT path), COUNT(*), COUNT(DISTINCT hash), '
+                 'MIN(definition) FROM cones WHERE nodes >= ? GROUP BY %s HAVING %s '
+                 'ORDER BY MAX(nodes) * (COUNT(*) - 1) DESC LIMIT ?') % (key, key, having)
+        result = []
+        for value, nodes, packages, count, variants, definition in self.db.execute(
+                query, (min_nodes, min_packages, limit)).fetchall():
+            occurrences = self.db.execute(
+                'SELECT path, graph, root_uid FROM cones WHERE %s = ? ORDER BY path, graph' % key,
+                (value,)).fetchall()
+            result.append({'key': value, 'nodes': nodes, 'packages': packages, 'count': count,
+                           'variants': variants, 'definition': definition,
+                           'occurrences': occurrences})
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='跨包重复子图检测（规范化哈希）')
+    parser.add_argument('root', help='包库根目录')
+    parser.add_argument('--db', help='哈希库路径，默认 <root>/%s' % DB_NAME)
+    parser.add_argument('--workers', type=int, default=None, help='重新扫描时的进程数')
+    parser.add_argument('--min-nodes', type=int, default=5, help='只报告不少于这么多节点的子图')
+    parser.add_argument('--min-packages', type=int, default=2, help='至少出现在这么多个包里')
+    parser.add_argument('--near', action='store_true', help='报告形状相同但参数不同的近似重复')
+    parser.add_argument('--limit', type=int, default=50, help='最多列出多少个簇')
+    args = parser.parse_args(argv)
+
+    store = SubgraphStore(args.root, args.db)
+    try:
+        started = time.perf_counter()
+        rescanned, unchanged, removed, errors = store.update(args.workers)
+        print('[duplicate_subgraphs] 重新扫描 %d, 未变化 %d, 已删除 %d, 用时 %.2fs'
+              % (rescanned, unchanged, removed, time.perf_counter() - started))
+        for rel_path, error in errors:
+            print('[duplicate_subgraphs] 扫描失败 %s: %s' % (rel_path, error))
+
+        clusters = store.clusters(args.min_nodes, args.min_packages, args.near, args.limit)
+        if not clusters:
+            print('没有找到重复子图')
+        for cluster in clusters:
+            extra = '，%d 种参数变体' % cluster['variants'] if args.near else ''
+            print('%s  %d 个节点，出现 %d 次 / %d 个包%s，末端节点 %s'
+                  % (cluster['key'], cluster['nodes'], cluster['count'], cluster['packages'],
+                     extra, cluster['definition']))
+            for path, graph, root_uid in cluster['occurrences']:
+                print('    %s :: %s  (末端节点 uid %s)' % (path, graph, root_uid))
+    finally:
+        store.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""graph 结构分析：无用节点、环、最长依赖链（全部 O(节点 + 连接)）
+
+在 compact_graph 的基础上做三种分析：
+1. 无用节点（unreachable）：从所有输出节点（compOutputBridge）沿连接往上游走一遍，
+   走不到的节点对任何输出都没有贡献，只会拖慢包的加载。
+2. 环（cycles）：用 Tarjan 强连通分量算法找出互相依赖的节点组。SD 不允许环，出现说明包坏了。
+3. 最长依赖链：按拓扑顺序做一次动态规划，找出“一个接一个必须串行计算”的最长节点链，
+   这是重材质 cooking 慢的主要原因。
+
+每种分析只把每个节点、每条连接各看一次，所以可以在整个库上每次保存时都跑。
+
+--prune 模式会把无用节点从包里删掉（按字节范围剪掉 <compNode>，其余字节不动，原子写入）。
+graph 的输入节点（compInputBridge）即使没用也保留，避免改变 graph 的参数接口。
+没有任何输出节点的 graph（还没做完的、只当子图被实例化的旧包等）不判断无用节点，也不剪，只给出警告。
+
+命令行用法：
+    python -m utilities.graph_analysis SDFiles/Bilibili_HuangJuanLr/BatchMergeGraphSample.sbs
+    python -m utilities.graph_analysis D:/Materials --prune --dry-run
+"""
+
+import argparse
+import sys
+from array import array
+from collections import namedtuple
+
+from utilities.compact_graph import KIND_CODES, load_graphs
+from utilities.sbs_files import atomic_write, iter_packages
+from utilities.sbs_stream import NODE_INPUT, NODE_OUTPUT, iter_events
+
+
+GraphReport = namedtuple('GraphReport', 'identifier nodes edges unreachable cycles longest_chain')
+
+
+def reaches_output(graph):
+    """返回 bytearray：第 i 个节点能走到某个输出节点则为 1。"""
+    n = len(graph)
+    seen = bytearray(n)
+    output_code = KIND_CODES[NODE_OUTPUT]
+    stack = [i for i in range(n) if graph.kinds[i] == output_code]
+    for i in stack:
+        seen[i] = 1
+    in_offsets, in_src = graph.in_offsets, graph.in_src
+    while stack:
+        i = stack.pop()
+        for k in range(in_offsets[i], in_offsets[i + 1]):
+            j = in_src[k]
+            if not seen[j]:
+                seen[j] = 1
+                stack.append(j)
+    return seen
+
+
+def has_outputs(graph):
+    output_code = KIND_CODES[NODE_OUTPUT]
+    return any(kind == output_code for kind in graph.kinds)
+
+
+def unreachable_nodes(graph):
+    """走不到任何输出的节点下标列表。graph 没有输出节点时无从判断，返回空列表。"""
+    if not has_outputs(graph):
+        return []
+    seen = reaches_output(graph)
+    return [i for i in range(len(graph)) if not seen[i]]
+
+
+def find_cycles(graph):
+    """Tarjan 强连通分量（非递归版，大图不会爆栈）。
+
+    返回环的列表，每个环是节点下标列表；只包含 2 个以上节点的分量，或者自己连自己的节点。
+    """
+    n = len(graph)
+    out_offsets, out_dst = graph.out_offsets, graph.out_dst
+    index = array('l', [-1]) * n
+    low = array('l', [0]) * n
+    on_stack = bytearray(n)
+    stack = []
+    cycles = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        # 调用栈里保存 (节点, 下一条要看的出边位置)
+        work = [(root, out_offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            v, k = work[-1]
+            if k < out_offsets[v + 1]:
+                work[-1] = (v, k + 1)
+                w = out_dst[k]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, out_offsets[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[v] < low[parent]:
+                    low[parent] = low[v]
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component.append(w)
+                    if w == v:
+                        break
+                if len(component) > 1 or v in graph.successors(v):
+                    cycles.append(component)
+    return cycles
+
+
+def longest_chain(graph):
+    """最长依赖链（按节点数计），返回从最上游到最下游的节点下标列表。
+
+    用 Kahn 拓扑排序 + 动态规划；处在环里的节点不会进入拓扑序，自然被跳过。
+    """
+    n = len(graph)
+    in_offsets, out_offsets, out_dst = graph.in_offsets, graph.out_offsets, graph.out_dst
+    indegree = array('l', (in_offsets[i + 1] - in_offsets[i] for i in range(n)))
+    depth = array('l', [1]) * n
+    parent = array('l', [-1]) * n
+    queue = [i for i in range(n) if indegree[i] == 0]
+    best = -1
+    head = 0
+    while head < len(queue):
+        v = queue[head]
+        head += 1
+        if best < 0 or depth[v] > depth[best]:
+            best = v
+        for k in range(out_offsets[v], out_offsets[v + 1]):
+            w = out_dst[k]
+            if depth[v] + 1 > depth[w]:
+                depth[w] = depth[v] + 1
+                parent[w] = v
+            indegree[w] -= 1
+            if indegree[w] == 0:
+                queue.append(w)
+    chain = []
+    while best >= 0:
+        chain.append(best)
+        best = parent[best]
+    chain.reverse()
+    return chain
+
+
+def analyze_graph(graph):
+    return GraphReport(graph.identifier, len(graph), graph.edge_count, unreachable_nodes(graph),
+                       find_cycles(graph), longest_chain(graph))
+
+
+def analyze_package(path):
+    """分析包里的每个 graph，返回 [(CompactGraph, GraphReport), ...]。"""
+    return [(graph, analyze_graph(graph)) for graph in load_graphs(path).values()]
+
+
+def prune_unreachable(path, dry_run=False):
+    """删除包里所有无用节点（输入节点除外），返回 {graph: 删除的节点 uid 列表}。"""
+    doomed = {}
+    for graph, report in analyze_package(path):
+        if len(graph) and not has_outputs(graph):
+            print('[graph_analysis] %s :: %s 没有输出节点，跳过（否则会删掉全部节点）' % (path, graph.identifier))
+            continue
+        input_code = KIND_CODES[NODE_INPUT]
+        uids = set(str(graph.uid(i)) for i in report.unreachable if graph.kinds[i] != input_code)
+        if uids:
+            doomed[graph.identifier] = uids
+    if not doomed:
+        return {}
+    # 再流式读一遍拿到这些节点的字节范围
+    ranges = []
+    for event in iter_events(path, kinds={'compnode'}):
+        if event.uid in doomed.get(event.graph, ()):
+            ranges.append((event.start, event.end))
+    if not dry_run:
+        with open(path, 'rb') as f:
+            data = f.read()
+        pieces = []
+        cursor = 0
+        for start, end in sorted(ranges):
+            pieces.append(data[cursor:start])
+            cursor = end
+        pieces.append(data[cursor:])
+        atomic_write(path, b''.join(pieces))
+    return {identifier: sorted(uids) for identifier, uids in doomed.items()}
+
+
+def _print_report(path, graph, report, verbose):
+    print('%s :: %s  节点 %d, 连接 %d, 无用节点 %d, 环 %d, 最长链 %d'
+          % (path, report.identifier, report.nodes, report.edges, len(report.unreachable),
+             len(report.cycles), len(report.longest_chain)))
+    if report.nodes and not has_outputs(graph):
+        print('    警告：没有输出节点，无用节点分析已跳过')
+    if not verbose:
+        return
+    for cycle in report.cycles:
+        print('    环: %s' % ' -> '.join(str(graph.uid(i)) for i in cycle))
+    if report.unreachable:
+        print('    无用节点: %s' % ', '.join(str(graph.uid(i)) for i in report.unreachable))
+    if report.longest_chain:
+        print('    最长链:')
+        for i in report.longest_chain:
+            print('        %s  %s' % (graph.uid(i), graph.definition(i)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='graph 结构分析：无用节点 / 环 / 最长依赖链')
+    parser.add_argument('paths', nargs='+', help='.sbs 文件或目录')
+    parser.add_argument('-v', '--verbose', action='store_true', help='列出具体节点')
+    parser.add_argument('--prune', action='store_true', help='删除无用节点并写回文件')
+    parser.add_argument('--dry-run', action='store_true', help='配合 --prune，只报告不写文件')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for path in iter_packages(args.paths):
+        try:
+            if args.prune:
+                removed = prune_unreachable(path, args.dry_run)
+                for identifier, uids in sorted(removed.items()):
+                    print('%s :: %s  %s %d 个无用节点' % (path, identifier,
+                                                      '将删除' if args.dry_run else '已删除', len(uids)))
+                continue
+            for graph, report in analyze_package(path):
+                _print_report(path, graph, report, args.verbose)
+                failed = failed or bool(report.cycles)
+        except (OSError, ValueError) as e:
+            print('[graph_analysis] 跳过 %s: %s' % (path, e))
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
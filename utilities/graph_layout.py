@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""分层自动排版（Sugiyama 风格）：给脚本生成的 graph 重新排节点位置
+
+脚本里 newNode 出来的节点都堆在同一个 float2 位置上，批量生成的 graph（比如 RGBA_Merge 处理图）
+打开以后根本没法看。这里按连线拓扑重新算 GUI 位置：
+1. 去环：先做拓扑排序（Kahn），成环的剩余节点按下标接在后面，指向“前面”的连线在排版时忽略；
+2. 分层：按到输出的最长路径分层（越靠近输出越靠右），输入节点会贴着用到它的节点，而不是全挤在最左边；
+3. 层内排序：重心法（barycenter），左右来回扫几遍，减少连线交叉；
+4. 坐标：x = 层号 * 列宽；y 取上游（或下游）节点 y 的平均值，再用保序回归（PAV）
+   在“同层相邻节点至少隔一个行高”的约束下找离理想位置最近的解，保证不重叠。
+每一步都是 O(节点数 + 连线数)（层内排序多一个 log），长连线不插虚拟节点，5 万节点的图一秒以内排完。
+
+离线使用时只改每个 compNode 的 <GUILayout><gpos v="x y z"/> 的 v 值（按字节范围替换，其他字节不变，原子写入）。
+SD 里用 MaxSDPlugin/auto_layout.py（一次性批量 setPosition，放在一个撤销组里）。
+
+命令行用法：
+    python -m utilities.graph_layout a.sbs                    排版包里所有 graph
+    python -m utilities.graph_layout a.sbs --graph processor --dry-run
+    python -m utilities.graph_layout D:/Materials --spacing 180 140
+"""
+
+import argparse
+import re
+import sys
+import time
+
+from utilities.sbs_files import atomic_write, iter_packages
+from utilities.sbs_index import mapped_package
+from utilities.sbs_patch import apply_spans
+from utilities.sbs_stream import iter_events
+
+
+DEFAULT_SPACING_X = 160.0
+DEFAULT_SPACING_Y = 128.0
+DEFAULT_SWEEPS = 4
+
+_GPOS_RE = re.compile(br'<GUILayout><gpos v="([^"]*)"')
+_IMPLEMENTATION = b'<compImplementation'
+
+
+# ----------------------------------------------------------------------
+# 排版核心（只用节点下标和连线，不依赖 SD 或 XML）
+# ----------------------------------------------------------------------
+def _topological_order(n, succ, pred):
+    indegree = [len(p) for p in pred]
+    queue = [i for i in range(n) if not indegree[i]]
+    order = []
+    head = 0
+    while head < len(queue):
+        i = queue[head]
+        head += 1
+        order.append(i)
+        for j in succ[i]:
+            indegree[j] -= 1
+            if not indegree[j]:
+                queue.append(j)
+    if len(order) < n:
+        # 成环：剩下的节点按下标接在后面
+        placed = bytearray(n)
+        for i in order:
+            placed[i] = 1
+        order.extend(i for i in range(n) if not placed[i])
+    return order
+
+
+def _dfs_order(n, pred, sinks):
+    """从输出往上游深度优先编号，连在一起的节点编号相近（没有原始位置时作为初始层内顺序）。"""
+    rank = [-1] * n
+    counter = 0
+    for root in sinks + list(range(n)):
+        if rank[root] >= 0:
+            continue
+        stack = [root]
+        while stack:
+            i = stack.pop()
+            if rank[i] >= 0:
+                continue
+            rank[i] = counter
+            counter += 1
+            stack.extend(reversed(pred[i]))
+    return rank
+
+
+def _place(ideal, gap):
+    """保序回归（PAV）：在 y[k+1] - y[k] >= gap 的约束下，找离 ideal 平方距离最小的 y。"""
+    # 变换成“单调不减”问题：z[k] = ideal[k] - k * gap
+    blocks = []      # [(总和, 个数)]
+    for k, value in enumerate(ideal):
+        total, count = value - k * gap, 1
+        while blocks and blocks[-1][0] * count >= total * blocks[-1][1]:
+            prev_total, prev_count = blocks.pop()
+            total += prev_total
+            count += prev_count
+        blocks.append((total, count))
+    result = []
+    k = 0
+    for total, count in blocks:
+        mean = total / count
+        for _ in range(count):
+            result.append(mean + k * gap)
+            k += 1
+    return result
+
+
+def layered_layout(n, edges, order_key=None, spacing_x=DEFAULT_SPACING_X, spacing_y=DEFAULT_SPACING_Y,
+                   sweeps=DEFAULT_SWEEPS, origin=(0.0, 0.0)):
+    """分层排版，返回 (xs, ys) 两个长度为 n 的列表。
+
+    参数:
+        edges: [(上游下标, 下游下标), ...]
+        order_key: 每个节点的初始层内排序键（一般是原来的 y），None 时按从输出出发的深度优先顺序
+        sweeps: 重心法来回扫的次数
+        origin: 排版结果左上角的位置
+    """
+    succ = [[] for _ in range(n)]
+    pred = [[] for _ in range(n)]
+    for src, dst in edges:
+        if src != dst:
+            succ[src].append(dst)
+            pred[dst].append(src)
+    order = _topological_order(n, succ, pred)
+    topo = [0] * n
+    for position, i in enumerate(order):
+        topo[i] = position
+    # 只保留顺着拓扑序的连线（去环）
+    succ = [[j for j in succ[i] if topo[j] > topo[i]] for i in range(n)]
+    pred = [[j for j in pred[i] if topo[j] < topo[i]] for i in range(n)]
+
+    # 分层：到输出的最长路径，越靠近输出越靠右
+    height = [0] * n
+    for i in reversed(order):
+        best = -1
+        for j in succ[i]:
+            if height[j] > best:
+                best = height[j]
+        height[i] = best + 1
+    depth = max(height) + 1 if n else 0
+    layer_of = [depth - 1 - h for h in height]
+
+    if order_key is None:
+        order_key = _dfs_order(n, pred, [i for i in range(n) if not succ[i]])
+    layers = [[] for _ in range(depth)]
+    for i in sorted(range(n), key=lambda i: (order_key[i], i)):
+        layers[layer_of[i]].append(i)
+    rank = [0.0] * n
+    for layer in layers:
+        for k, i in enumerate(layer):
+            rank[i] = float(k)
+
+    # 重心法：按邻居的层内位置平均值重排，左右交替
+    for sweep in range(sweeps):
+        forward = sweep % 2 == 0
+        neighbours = pred if forward else succ
+        for layer in (layers[1:] if forward else reversed(layers[:-1])):
+            keys = {}
+            for i in layer:
+                near = neighbours[i]
+                keys[i] = sum(rank[j] for j in near) / len(near) if near else rank[i]
+            layer.sort(key=lambda i: (keys[i], rank[i]))
+            for k, i in enumerate(layer):
+                rank[i] = float(k)
+
+    # 坐标：先从左到右按上游对齐，再从右到左按下游对齐
+    ys = [0.0] * n
+    for layer in layers:
+        ideal = []
+        for i in layer:
+            near = pred[i]
+            ideal.append(sum(ys[j] for j in near) / len(near) if near else rank[i] * spacing_y)
+        for i, y in zip(layer, _place(ideal, spacing_y)):
+            ys[i] = y
+    for layer in reversed(layers[:-1]):
+        ideal = []
+        for i in layer:
+            near = succ[i]
+            ideal.append(sum(ys[j] for j in near) / len(near) if near else ys[i])
+        for i, y in zip(layer, _place(ideal, spacing_y)):
+            ys[i] = y
+
+    top = min(ys) if n else 0.0
+    ys = [y - top + origin[1] for y in ys]
+    xs = [layer_of[i] * spacing_x + origin[0] for i in range(n)]
+    return xs, ys
+
+
+def layout_compact_graph(graph, **options):
+    """给 compact_graph.CompactGraph 排版（直接改它的 xs / ys），返回 graph。"""
+    n = len(graph)
+    edges = [(src, dst) for dst in range(n) for src in graph.predecessors(dst)]
+    origin = (min(graph.xs), min(graph.ys)) if n else (0.0, 0.0)
+    options.setdefault('origin', origin)
+    xs, ys = layered_layout(n, edges, order_key=list(graph.ys), **options)
+    for i in range(n):
+        graph.set_position(i, xs[i], ys[i])
+    return graph
+
+
+# ----------------------------------------------------------------------
+# 离线：改写 .sbs 里的 gpos
+# ----------------------------------------------------------------------
+class _GraphNodes(object):
+    __slots__ = ('identifier', 'uids', 'spans', 'positions', 'connections')
+
+    def __init__(self, identifier):
+        self.identifier = identifier
+        self.uids = []
+        self.spans = []          # 每个节点的 (start, end)
+        self.positions = []
+        self.connections = []    # (下游下标, 上游 uid)
+
+
+def _collect(path, wanted):
+    graphs = []
+    current = None
+    for event in iter_events(path, kinds={'graph_start', 'compnode', 'graph_end'}):
+        if event.kind == 'graph_start':
+            current = _GraphNodes(event.identifier) if wanted is None or event.identifier in wanted else None
+        elif event.kind == 'graph_end':
+            if current is not None:
+                graphs.append(current)
+            current = None
+        elif current is not None:
+            index = len(current.uids)
+            current.uids.append(event.uid)
+            current.spans.append((event.start, event.end))
+            current.positions.append(event.pos if event.pos is not None else (0.0, 0.0))
+            for _port, ref, _output in event.connections:
+                if ref is not None:
+                    current.connections.append((index, ref))
+    return graphs
+
+
+def _format_gpos(old, x, y):
+    # 保留第三个分量（z），数字写法和 SD 一致（整数不带小数点）
+    parts = old.split()
+    rest = ' '.join(parts[2:]) if len(parts) > 2 else '0'
+    return ('%g %g %s' % (round(x, 3), round(y, 3), rest)).encode('ascii')
+
+
+def relayout_package(path, graphs=None, dry_run=False, **options):
+    """排版一个包里的 graph（graphs 为 None 表示全部），返回 [(graph identifier, 节点数, 移动的节点数), ...]。"""
+    wanted = set(graphs) if graphs else None
+    report = []
+    spans = []
+    collected = _collect(path, wanted)
+    with mapped_package(path) as data:
+        for graph in collected:
+            n = len(graph.uids)
+            index_of = {uid: i for i, uid in enumerate(graph.uids)}
+            edges = [(index_of[ref], dst) for dst, ref in graph.connections if ref in index_of]
+            xs0 = [p[0] for p in graph.positions]
+            ys0 = [p[1] for p in graph.positions]
+            origin = (min(xs0), min(ys0)) if n else (0.0, 0.0)
+            xs, ys = layered_layout(n, edges, order_key=ys0, origin=origin, **options)
+            moved = 0
+            for i, (start, end) in enumerate(graph.spans):
+                match = _GPOS_RE.search(data, start, end)
+                if match is None:
+                    continue
+                implementation = data.find(_IMPLEMENTATION, start, end)
+                if implementation >= 0 and match.start() > implementation:
+                    continue        # 这是参数函数图里的节点位置，不是本节点的
+                new = _format_gpos(match.group(1).decode('ascii'), xs[i], ys[i])
+                if new != match.group(1):
+                    spans.append((match.start(1), match.end(1), new))
+                    moved += 1
+            report.append((graph.identifier, n, moved))
+        if not spans or dry_run:
+            return report
+        spans.sort()
+        patched = apply_spans(data, spans)
+    # mmap 关闭之后再替换文件
+    atomic_write(path, patched)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按连线拓扑自动排版 .sbs 里的节点')
+    parser.add_argument('paths', nargs='+', help='.sbs 文件或目录')
+    parser.add_argument('--graph', action='append', help='只排版这个 graph，可重复')
+    parser.add_argument('--spacing', nargs=2, type=float, metavar=('X', 'Y'),
+                        default=(DEFAULT_SPACING_X, DEFAULT_SPACING_Y), help='列宽和行高')
+    parser.add_argument('--sweeps', type=int, default=DEFAULT_SWEEPS, help='减少交叉的来回扫描次数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计，不写文件')
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for path in iter_packages(args.paths):
+        started = time.perf_counter()
+        try:
+            report = relayout_package(path, args.graph, args.dry_run, spacing_x=args.spacing[0],
+                                      spacing_y=args.spacing[1], sweeps=args.sweeps)
+        except (OSError, ValueError) as e:
+            print('[graph_layout] %s 失败: %s' % (path, e))
+            failed += 1
+            continue
+        for identifier, nodes, moved in report:
+            print('[graph_layout] %s / %s: %d 个节点, 移动 %d 个' % (path, identifier, nodes, moved))
+        print('[graph_layout] %s 用时 %.3fs%s' % (path, time.perf_counter() - started,
+                                                '（dry-run，未写入）' if args.dry_run else ''))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
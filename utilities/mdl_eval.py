@@ -0,0 +1,1054 @@
+# -*- coding: utf-8 -*-
+"""MDL 节点函数的离线参考求值器：把 .mdl 里导出的简单函数和用它们搭的节点图编译成向量化内核
+
+custom_graph 插件（OfficialSDInsertPlugins/custom_graph）把 data/mdl 里导出的函数
+（sampleNodeAdd、sampleNodeMult……）注册成 SD 的节点，以后还会越加越多。
+以前只能在 SD 里看预览图判断结果对不对。这里不经过 SD：
+
+1. 解析：读 data/mdl 下的 .mdl，解析其中的函数（MDL 的一个子集，见下）；
+2. 编译：每个函数翻译成一个 Python 函数，运算全部通过 ops 命名空间完成。
+   ops 有两套实现：numpy（装了 numpy 时默认使用，一次算整个数组 / 图块）和 python（math 模块，逐个样本）。
+   生成的代码完全一样，所以两套后端的结果可以互相对照；
+3. 节点图：NodeGraph 把若干函数节点连起来（输入可以是图的输入、常数或别的节点），
+   编译成一个融合的内核：按拓扑顺序逐个节点对整个数组求值，中间结果只在内核里存在；
+4. 求值：evaluate() 把几百万个样本按图块（tile_size 个一块）送进内核，内存占用和样本数无关；
+   grid() 生成图片每个像素的 (u, v)，可以直接出预览图（PGM 灰度图，不需要任何图片库）。
+
+支持的 MDL 子集：
+    mdl 1.x; / import ...; / using ...;           忽略
+    [export] float|int|bool 函数名(类型 参数 [= 默认值], ...) { 语句 }
+    语句：  return 表达式;   类型 变量 = 表达式;   变量 = 表达式;   变量 += / -= / *= / /= 表达式;
+    表达式：+ - * / %、比较、&& || !、?:、括号、数字 / true / false、调用其他函数、
+           math:: 函数（abs min max clamp lerp saturate sin cos tan asin acos atan atan2 sqrt pow exp
+           log log2 log10 floor ceil round frac fmod step smoothstep sign radians degrees）、float() / int()
+不支持的写法（if / for、向量类型、结构体……）会报 MdlError 并指出行号。
+
+命令行用法：
+    python -m utilities.mdl_eval --list
+    python -m utilities.mdl_eval --function sampleNodeMult --preview mult.pgm --size 256
+    python -m utilities.mdl_eval --graph graph.json --samples 1000000
+    python -m utilities.mdl_eval --graph graph.json --record expected.json      记录参考结果
+    python -m utilities.mdl_eval --graph graph.json --expect expected.json      回归测试
+graph.json 的格式：
+    {"inputs": {"u": 0.0, "v": 0.0},
+     "nodes": {"add": {"function": "sampleNodeAdd", "args": {"x": "@u", "y": "@v"}},
+               "mult": {"function": "sampleNodeMult", "args": {"x": "@add", "y": 0.5}}},
+     "output": "mult"}
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from array import array
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'OfficialSDInsertPlugins', 'custom_graph', 'data', 'mdl')
+TILE_SIZE = 1 << 16
+SCALAR_TYPES = ('float', 'double', 'int', 'bool')
+
+
+class MdlError(ValueError):
+    """.mdl 里有不支持或写错的语法。"""
+
+
+# ----------------------------------------------------------------------
+# 词法 / 语法分析
+# ----------------------------------------------------------------------
+_TOKEN = re.compile(r'''
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\.)*")
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?[fFdD]?)
+  | (?P<name>(?:::)?[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*)
+  | (?P<op>\[\[|\]\]|&&|\|\||==|!=|<=|>=|\+=|-=|\*=|/=|[-+*/%<>!?:=(){},;.\[\]])
+''', re.S | re.X)
+
+
+def tokenize(text):
+    """返回 [(种类, 文本, 行号), ...]，最后是 ('eof', '', 行号)。"""
+    tokens = []
+    pos = 0
+    line = 1
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise MdlError('第 %d 行：无法识别的字符 %r' % (line, text[pos]))
+        kind = m.lastgroup
+        if kind != 'skip':
+            tokens.append((kind, m.group(), line))
+        line += m.group().count('\n')
+        pos = m.end()
+    tokens.append(('eof', '', line))
+    return tokens
+
+
+class MdlFunction(object):
+    """解析出的一个函数。params 是 [(类型, 名字, 默认值表达式或 None)]，body 是语句列表。"""
+
+    def __init__(self, name, return_type, params, body, exported, module, line):
+        self.name = name
+        self.return_type = return_type
+        self.params = params
+        self.body = body
+        self.exported = exported
+        self.module = module
+        self.line = line
+
+    @property
+    def qualified_name(self):
+        """和 SD 里节点定义的 id 一致：mdl::custom_graph::custom_graph_nodes::sampleNodeAdd"""
+        return '%s::%s' % (self.module, self.name)
+
+    @property
+    def py_name(self):
+        """生成的 Python 函数名，由完整 id 得到（不同模块的同名函数不会互相覆盖）：f_a__scale"""
+        name = self.qualified_name
+        if name.startswith('mdl::'):
+            name = name[len('mdl::'):]
+        return 'f_' + re.sub(r'\W', '_', name.replace('::', '__'))
+
+    def __repr__(self):
+        return '%s %s(%s)' % (self.return_type, self.name, ', '.join('%s %s' % p[:2] for p in self.params))
+
+
+class _Parser(object):
+    # 二元运算符优先级（数字越大越先算）
+    BINARY = {'||': 1, '&&': 2, '==': 3, '!=': 3, '<': 4, '>': 4, '<=': 4, '>=': 4,
+              '+': 5, '-': 5, '*': 6, '/': 6, '%': 6}
+
+    def __init__(self, text, module):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.module = module
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def error(self, message, token=None):
+        token = token or self.peek()
+        return MdlError('%s 第 %d 行：%s（在 %r 附近）' % (self.module, token[2], message, token[1]))
+
+    def expect(self, text):
+        token = self.next()
+        if token[1] != text:
+            raise self.error('这里应该是 %r' % text, token)
+        return token
+
+    def accept(self, text):
+        if self.peek()[1] == text:
+            self.pos += 1
+            return True
+        return False
+
+    def skip_annotations(self):
+        while self.accept('[['):
+            depth = 1
+            while depth:
+                token = self.next()
+                if token[0] == 'eof':
+                    raise self.error('注解没有结束')
+                depth += {'[[': 1, ']]': -1}.get(token[1], 0)
+
+    def parse_module(self):
+        functions = []
+        while self.peek()[0] != 'eof':
+            word = self.peek()[1]
+            if word in ('mdl', 'import', 'using'):
+                while self.next()[1] != ';':
+                    if self.peek()[0] == 'eof':
+                        raise self.error('缺少 ;')
+                continue
+            exported = self.accept('export')
+            functions.append(self.parse_function(exported))
+        return functions
+
+    def parse_type(self):
+        while self.peek()[1] in ('uniform', 'varying', 'const'):
+            self.next()
+        token = self.next()
+        if token[1] not in SCALAR_TYPES:
+            raise self.error('只支持 float / double / int / bool 类型', token)
+        return 'float' if token[1] == 'double' else token[1]
+
+    def parse_function(self, exported):
+        line = self.peek()[2]
+        return_type = self.parse_type()
+        name = self.next()
+        if name[0] != 'name':
+            raise self.error('这里应该是函数名', name)
+        self.expect('(')
+        params = []
+        while not self.accept(')'):
+            if params:
+                self.expect(',')
+            param_type = self.parse_type()
+            param = self.next()
+            if param[0] != 'name':
+                raise self.error('这里应该是参数名', param)
+            default = self.parse_expression() if self.accept('=') else None
+            self.skip_annotations()
+            params.append((param_type, param[1], default))
+        self.skip_annotations()
+        body = self.parse_block()
+        return MdlFunction(name[1], return_type, params, body, exported, self.module, line)
+
+    def parse_block(self):
+        self.expect('{')
+        body = []
+        while not self.accept('}'):
+            body.append(self.parse_statement())
+        return body
+
+    def parse_statement(self):
+        token = self.peek()
+        if token[1] == 'return':
+            self.next()
+            value = self.parse_expression()
+            self.expect(';')
+            return ('return', value, token[2])
+        if token[1] in SCALAR_TYPES or token[1] == 'const':
+            var_type = self.parse_type()
+            name = self.next()
+            if name[0] != 'name':
+                raise self.error('这里应该是变量名', name)
+            self.expect('=')
+            value = self.parse_expression()
+            self.expect(';')
+            return ('declare', var_type, name[1], value, token[2])
+        if token[0] == 'name' and self.peek(1)[1] in ('=', '+=', '-=', '*=', '/='):
+            self.next()
+            op = self.next()[1]
+            value = self.parse_expression()
+            self.expect(';')
+            if op != '=':
+                value = ('bin', op[0], ('var', token[1]), value)
+            return ('assign', token[1], value, token[2])
+        raise self.error('不支持的语句（只支持 return / 变量声明 / 赋值，分支请改用 ?:）')
+
+    def parse_expression(self):
+        condition = self.parse_binary(1)
+        if self.accept('?'):
+            yes = self.parse_expression()
+            self.expect(':')
+            no = self.parse_expression()
+            return ('cond', condition, yes, no)
+        return condition
+
+    def parse_binary(self, level):
+        left = self.parse_unary()
+        while True:
+            op = self.peek()[1]
+            precedence = self.BINARY.get(op) if self.peek()[0] == 'op' else None
+            if precedence is None or precedence < level:
+                return left
+            self.next()
+            left = ('bin', op, left, self.parse_binary(precedence + 1))
+
+    def parse_unary(self):
+        if self.peek()[1] in ('-', '!', '+'):
+            op = self.next()[1]
+            operand = self.parse_unary()
+            return operand if op == '+' else ('un', op, operand)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.next()
+        kind, text = token[0], token[1]
+        if kind == 'number':
+            is_float = any(c in text for c in '.eEfFdD')
+            return ('num', float(text.rstrip('fFdD')) if is_float else int(text), 'float' if is_float else 'int')
+        if text in ('true', 'false'):
+            return ('num', text == 'true', 'bool')
+        if text == '(':
+            value = self.parse_expression()
+            self.expect(')')
+            return value
+        if kind == 'name' or text in SCALAR_TYPES:
+            if self.accept('('):
+                args = []
+                while not self.accept(')'):
+                    if args:
+                        self.expect(',')
+                    args.append(self.parse_expression())
+                return ('call', text, args, token[2])
+            return ('var', text)
+        raise self.error('不支持的表达式', token)
+
+
+def parse_mdl(text, module='mdl::module'):
+    """解析 .mdl 源码，返回 [MdlFunction, ...]。"""
+    return _Parser(text, module).parse_module()
+
+
+# ----------------------------------------------------------------------
+# 运算后端
+# ----------------------------------------------------------------------
+def _py_div(a, b):
+    # 和 GPU 一样：除以 0 得到 inf / nan，而不是抛异常
+    try:
+        return a / b
+    except ZeroDivisionError:
+        return math.nan if a == 0 or a != a else math.copysign(math.inf, a)
+
+
+def _py_to_int(x):
+    # 向 0 截断；nan / inf 没有对应的整数，和 numpy 后端一样取 0
+    return int(x) if math.isfinite(x) else 0
+
+
+def _py_idiv(a, b):
+    return _py_to_int(_py_div(a, b))
+
+
+def _py_domain(func):
+    """包装 math 函数：定义域以外（asin(2)、sin(inf) 等）返回 nan，不抛 ValueError。"""
+    def call(*args):
+        try:
+            return func(*args)
+        except ValueError:
+            return math.nan
+    return call
+
+
+def _py_rounding(func):
+    """floor / ceil：结果是 float；nan / inf 原样返回（math.floor 会抛异常）。"""
+    def call(x):
+        return float(func(x)) if math.isfinite(x) else x
+    return call
+
+
+def _py_exp(x):
+    try:
+        return math.exp(x)
+    except OverflowError:
+        return math.inf
+
+
+def _py_pow(a, b):
+    odd = float(b).is_integer() and b % 2 == 1
+    try:
+        return math.pow(a, b)
+    except ValueError:
+        # 0 的负数次方是 inf（-0 的负奇数次方是 -inf）；负数的非整数次方是 nan
+        if a == 0:
+            return math.copysign(math.inf, a) if odd else math.inf
+        return math.nan
+    except OverflowError:
+        return -math.inf if a < 0 and odd else math.inf
+
+
+def _py_min(a, b):
+    # 和 numpy.minimum 一样，有 nan 就是 nan（内置 min 的结果取决于参数顺序）
+    return a if a <= b or a != a else b
+
+
+def _py_max(a, b):
+    return a if a >= b or a != a else b
+
+
+_py_floor = _py_rounding(math.floor)
+
+
+def _py_smoothstep(a, b, x):
+    t = _py_min(_py_max(_py_div(x - a, b - a), 0.0), 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+class PythonOps(object):
+    """逐样本求值（没有 numpy 时使用，也用来和 numpy 结果对照）。
+
+    和 numpy 一样，出界的输入得到 nan / inf，不抛异常：一个样本出界不会中断整批求值。
+    """
+
+    name = 'python'
+    vectorized = False
+    div = staticmethod(_py_div)
+    idiv = staticmethod(_py_idiv)
+    fmod = staticmethod(_py_domain(lambda a, b: math.fmod(a, b) if b else math.nan))
+    where = staticmethod(lambda c, a, b: a if c else b)
+    logical_and = staticmethod(lambda a, b: bool(a) and bool(b))
+    logical_or = staticmethod(lambda a, b: bool(a) or bool(b))
+    logical_not = staticmethod(lambda a: not a)
+    to_float = staticmethod(float)
+    to_int = staticmethod(_py_to_int)
+    abs = staticmethod(abs)
+    min = staticmethod(_py_min)
+    max = staticmethod(_py_max)
+    clamp = staticmethod(lambda x, a, b: _py_min(_py_max(x, a), b))
+    saturate = staticmethod(lambda x: _py_min(_py_max(x, 0.0), 1.0))
+    lerp = staticmethod(lambda a, b, t: a + (b - a) * t)
+    step = staticmethod(lambda edge, x: 1.0 if x >= edge else 0.0)
+    smoothstep = staticmethod(_py_smoothstep)
+    sign = staticmethod(lambda x: (x > 0) - (x < 0) if x == x else x)
+    frac = staticmethod(lambda x: x - _py_floor(x))
+    round = staticmethod(lambda x: _py_floor(x + 0.5))
+    sqrt = staticmethod(lambda x: math.sqrt(x) if x >= 0 else math.nan)
+    log = staticmethod(lambda x: math.log(x) if x > 0 else (-math.inf if x == 0 else math.nan))
+    log2 = staticmethod(lambda x: math.log2(x) if x > 0 else (-math.inf if x == 0 else math.nan))
+    log10 = staticmethod(lambda x: math.log10(x) if x > 0 else (-math.inf if x == 0 else math.nan))
+    pow = staticmethod(_py_pow)
+    sin, cos, tan = (staticmethod(_py_domain(math.sin)), staticmethod(_py_domain(math.cos)),
+                     staticmethod(_py_domain(math.tan)))
+    asin, acos, atan = (staticmethod(_py_domain(math.asin)), staticmethod(_py_domain(math.acos)),
+                        staticmethod(math.atan))
+    atan2, exp = staticmethod(math.atan2), staticmethod(_py_exp)
+    floor, ceil = staticmethod(_py_floor), staticmethod(_py_rounding(math.ceil))
+    radians, degrees = staticmethod(math.radians), staticmethod(math.degrees)
+
+
+def _numpy_ops():
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    class NumpyOps(object):
+        """整个数组一次算完。"""
+
+        name = 'numpy'
+        vectorized = True
+        numpy = np
+
+        @staticmethod
+        def div(a, b):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.true_divide(a, b)
+
+        @staticmethod
+        def to_int(x):
+            # nan / inf 取 0（直接 astype 的结果没有定义）
+            x = np.asarray(x)
+            return np.trunc(np.where(np.isfinite(x), x, 0)).astype(np.int64)
+
+        @staticmethod
+        def idiv(a, b):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return NumpyOps.to_int(np.true_divide(a, b))
+
+        @staticmethod
+        def smoothstep(a, b, x):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = np.clip(np.true_divide(np.subtract(x, a), np.subtract(b, a)), 0.0, 1.0)
+            return t * t * (3.0 - 2.0 * t)
+
+        fmod = staticmethod(np.fmod)
+        where = staticmethod(np.where)
+        logical_and = staticmethod(np.logical_and)
+        logical_or = staticmethod(np.logical_or)
+        logical_not = staticmethod(np.logical_not)
+        to_float = staticmethod(lambda x: np.asarray(x, dtype=np.float64))
+        abs = staticmethod(np.abs)
+        min = staticmethod(np.minimum)
+        max = staticmethod(np.maximum)
+        clamp = staticmethod(np.clip)
+        saturate = staticmethod(lambda x: np.clip(x, 0.0, 1.0))
+        lerp = staticmethod(lambda a, b, t: a + (b - a) * t)
+        step = staticmethod(lambda edge, x: np.where(np.greater_equal(x, edge), 1.0, 0.0))
+        sign = staticmethod(np.sign)
+        frac = staticmethod(lambda x: x - np.floor(x))
+        round = staticmethod(lambda x: np.floor(np.add(x, 0.5)))
+        sqrt, log, log2, log10 = (staticmethod(np.sqrt), staticmethod(np.log), staticmethod(np.log2),
+                                  staticmethod(np.log10))
+        pow = staticmethod(np.power)
+        sin, cos, tan = staticmethod(np.sin), staticmethod(np.cos), staticmethod(np.tan)
+        asin, acos, atan = staticmethod(np.arcsin), staticmethod(np.arccos), staticmethod(np.arctan)
+        atan2, exp = staticmethod(np.arctan2), staticmethod(np.exp)
+        floor, ceil = staticmethod(np.floor), staticmethod(np.ceil)
+        radians, degrees = staticmethod(np.radians), staticmethod(np.degrees)
+
+    return NumpyOps
+
+
+def get_ops(backend=None):
+    """backend: None（有 numpy 就用 numpy）、'numpy' 或 'python'。"""
+    if backend in (None, 'numpy'):
+        ops = _numpy_ops()
+        if ops is not None:
+            return ops
+        if backend == 'numpy':
+            raise ValueError('numpy 后端需要安装 numpy')
+    elif backend != 'python':
+        raise ValueError('未知的后端 %r' % backend)
+    return PythonOps
+
+
+# math:: 函数 -> (参数个数, 返回类型；None 表示和第一个参数相同)
+BUILTINS = {
+    'abs': (1, None), 'min': (2, None), 'max': (2, None), 'clamp': (3, None), 'lerp': (3, 'float'),
+    'saturate': (1, 'float'), 'sin': (1, 'float'), 'cos': (1, 'float'), 'tan': (1, 'float'),
+    'asin': (1, 'float'), 'acos': (1, 'float'), 'atan': (1, 'float'), 'atan2': (2, 'float'),
+    'sqrt': (1, 'float'), 'pow': (2, 'float'), 'exp': (1, 'float'), 'log': (1, 'float'),
+    'log2': (1, 'float'), 'log10': (1, 'float'), 'floor': (1, 'float'), 'ceil': (1, 'float'),
+    'round': (1, 'float'), 'frac': (1, 'float'), 'fmod': (2, 'float'), 'step': (2, 'float'),
+    'smoothstep': (3, 'float'), 'sign': (1, None), 'radians': (1, 'float'), 'degrees': (1, 'float'),
+}
+
+
+def _builtin_name(name):
+    name = name.lstrip(':')
+    if name.startswith('math::'):
+        name = name[len('math::'):]
+    return name if name in BUILTINS else None
+
+
+# ----------------------------------------------------------------------
+# 编译
+# ----------------------------------------------------------------------
+def _wider(a, b):
+    if 'float' in (a, b):
+        return 'float'
+    if 'int' in (a, b):
+        return 'int'
+    return 'bool'
+
+
+class _CodeGen(object):
+    """把一个函数的语法树翻译成 Python 源码（运算都写成 ops.xxx 调用或 Python 运算符）。"""
+
+    def __init__(self, library, function):
+        self.library = library
+        self.function = function
+        self.types = {}
+
+    def error(self, message, line=None):
+        return MdlError('%s::%s 第 %d 行：%s' % (self.function.module, self.function.name,
+                                                line or self.function.line, message))
+
+    def source(self):
+        function = self.function
+        args = []
+        for param_type, name, _default in function.params:
+            self.types[name] = param_type
+            args.append('v_' + name)
+        lines = ['def %s(%s):' % (function.py_name, ', '.join(args))]
+        returned = False
+        for statement in function.body:
+            kind = statement[0]
+            if returned:
+                raise self.error('return 后面不能再有语句', statement[-1])
+            if kind == 'return':
+                code, _type = self.expr(statement[1], statement[2])
+                lines.append('    return %s' % self.cast(code, _type, function.return_type))
+                returned = True
+            elif kind == 'declare':
+                _kind, var_type, name, value, line = statement
+                code, value_type = self.expr(value, line)
+                self.types[name] = var_type
+                lines.append('    v_%s = %s' % (name, self.cast(code, value_type, var_type)))
+            else:
+                _kind, name, value, line = statement
+                if name not in self.types:
+                    raise self.error('变量 %s 没有声明' % name, line)
+                code, value_type = self.expr(value, line)
+                lines.append('    v_%s = %s' % (name, self.cast(code, value_type, self.types[name])))
+        if not returned:
+            raise self.error('函数没有 return')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def cast(code, from_type, to_type):
+        if from_type == to_type or (to_type == 'float' and from_type == 'int'):
+            return code
+        if to_type == 'float':
+            return 'ops.to_float(%s)' % code
+        if to_type == 'int':
+            return 'ops.to_int(%s)' % code
+        return code
+
+    def expr(self, node, line):
+        kind = node[0]
+        if kind == 'num':
+            return repr(node[1]), node[2]
+        if kind == 'var':
+            if node[1] not in self.types:
+                raise self.error('变量 %s 没有声明' % node[1], line)
+            return 'v_' + node[1], self.types[node[1]]
+        if kind == 'un':
+            code, value_type = self.expr(node[2], line)
+            if node[1] == '!':
+                return 'ops.logical_not(%s)' % code, 'bool'
+            return '(-%s)' % code, value_type
+        if kind == 'cond':
+            condition, _type = self.expr(node[1], line)
+            yes, yes_type = self.expr(node[2], line)
+            no, no_type = self.expr(node[3], line)
+            return 'ops.where(%s, %s, %s)' % (condition, yes, no), _wider(yes_type, no_type)
+        if kind == 'bin':
+            op = node[1]
+            a, a_type = self.expr(node[2], line)
+            b, b_type = self.expr(node[3], line)
+            if op == '&&':
+                return 'ops.logical_and(%s, %s)' % (a, b), 'bool'
+            if op == '||':
+                return 'ops.logical_or(%s, %s)' % (a, b), 'bool'
+            if op in ('==', '!=', '<', '>', '<=', '>='):
+                return '(%s %s %s)' % (a, op, b), 'bool'
+            result_type = _wider(a_type, b_type)
+            if op == '/':
+                if result_type == 'int':
+                    return 'ops.idiv(%s, %s)' % (a, b), 'int'
+                return 'ops.div(%s, %s)' % (a, b), 'float'
+            if op == '%':
+                return 'ops.fmod(%s, %s)' % (a, b), result_type
+            return '(%s %s %s)' % (a, op, b), result_type
+        # 函数调用
+        _kind, name, args, call_line = node
+        codes = [self.expr(arg, call_line) for arg in args]
+        if name in ('float', 'double', 'int', 'bool'):
+            if len(codes) != 1:
+                raise self.error('%s() 只接受一个参数' % name, call_line)
+            target = 'float' if name == 'double' else name
+            return self.cast(codes[0][0], codes[0][1], target), target
+        builtin = _builtin_name(name)
+        if builtin is not None:
+            count, result_type = BUILTINS[builtin]
+            if len(codes) != count:
+                raise self.error('math::%s 需要 %d 个参数' % (builtin, count), call_line)
+            return 'ops.%s(%s)' % (builtin, ', '.join(c for c, _t in codes)), result_type or codes[0][1]
+        try:
+            callee = self.library.find(name, self.function.module)
+        except MdlError as exc:
+            raise self.error(str(exc), call_line)
+        if callee is None:
+            raise self.error('未知函数 %s' % name, call_line)
+        if len(codes) > len(callee.params):
+            raise self.error('%s 最多 %d 个参数' % (callee.name, len(callee.params)), call_line)
+        parts = [c for c, _t in codes]
+        for _type, param, default in callee.params[len(codes):]:
+            if default is None:
+                raise self.error('调用 %s 缺少参数 %s' % (callee.name, param), call_line)
+            parts.append(self.expr(default, call_line)[0])
+        self.library._require(callee, self.function)
+        return '%s(%s)' % (callee.py_name, ', '.join(parts)), callee.return_type
+
+
+class Kernel(object):
+    """编译好的内核：kernel(**输入) -> 结果。
+
+    numpy 后端：输入是数组或常数，按 numpy 规则广播，返回数组；
+    python 后端：输入是序列或常数，逐个样本计算，返回 array('d')。
+    """
+
+    def __init__(self, func, inputs, ops, source):
+        self.func = func
+        self.inputs = inputs          # [(名字, 默认值)]
+        self.ops = ops
+        self.source = source
+
+    def _arguments(self, values):
+        unknown = set(values) - {name for name, _default in self.inputs}
+        if unknown:
+            raise ValueError('内核没有这些输入: %s' % ', '.join(sorted(unknown)))
+        args = []
+        for name, default in self.inputs:
+            if name in values:
+                args.append(values[name])
+            elif default is not None:
+                args.append(default)
+            else:
+                raise ValueError('缺少输入 %s' % name)
+        return args
+
+    def __call__(self, **values):
+        args = self._arguments(values)
+        if self.ops.vectorized:
+            # 结果和输入广播后的形状一致（函数只用到常数时也一样），统一成 float64
+            np = self.ops.numpy
+            shape = np.broadcast(*args).shape if args else ()
+            return np.broadcast_to(np.asarray(self.func(*args), dtype=np.float64), shape)
+        lengths = {len(a) for a in args if hasattr(a, '__len__')}
+        if len(lengths) > 1:
+            raise ValueError('输入长度不一致: %s' % sorted(lengths))
+        if not lengths:
+            return array('d', [self.func(*args)])
+        n = lengths.pop()
+        columns = [a if hasattr(a, '__len__') else [a] * n for a in args]
+        func = self.func
+        return array('d', [func(*row) for row in zip(*columns)])
+
+
+class MdlLibrary(object):
+    """一组 .mdl 模块里的函数，按函数名和完整 id 都能查到。"""
+
+    def __init__(self):
+        self.functions = {}
+        self._by_name = {}            # 函数名 -> {完整 id: 函数}，不同模块可以有同名函数
+        self._deps = {}
+
+    def add_source(self, text, module='mdl::module'):
+        for function in parse_mdl(text, module):
+            self.functions[function.qualified_name] = function
+            self._by_name.setdefault(function.name, {})[function.qualified_name] = function
+        return self
+
+    def add_file(self, path, root=None):
+        if root:
+            rel = os.path.relpath(os.path.splitext(path)[0], root)
+            module = 'mdl::' + '::'.join(rel.split(os.sep))
+        else:
+            module = 'mdl::' + os.path.splitext(os.path.basename(path))[0]
+        with open(path, encoding='utf-8') as f:
+            return self.add_source(f.read(), module)
+
+    def find(self, name, module=None):
+        """按完整 id、id 的后半段（custom_graph_nodes::sampleNodeAdd）或函数名查找，找不到返回 None。
+
+        只给函数名时先找 module 里的同名函数（MDL 里函数内部的调用就是这样解析的）；
+        其余情况如果有不止一个模块的函数符合，抛出 MdlError，不会悄悄挑第一个。
+        """
+        name = name.lstrip(':')
+        if '::' in name:
+            qualified = name if name.startswith('mdl::') else 'mdl::' + name
+            if qualified in self.functions:
+                return self.functions[qualified]
+        elif module is not None and '%s::%s' % (module, name) in self.functions:
+            return self.functions['%s::%s' % (module, name)]
+        suffix = '::' + name
+        candidates = [f for f in self._by_name.get(name.rsplit('::', 1)[-1], {}).values()
+                      if '::' not in name or f.qualified_name.endswith(suffix)]
+        if len(candidates) > 1:
+            raise MdlError('函数名 %s 有歧义，请写完整 id：%s'
+                           % (name, ', '.join(sorted(f.qualified_name for f in candidates))))
+        return candidates[0] if candidates else None
+
+    def exported(self):
+        return [f for f in self.functions.values() if f.exported]
+
+    def _require(self, callee, caller):
+        self._deps.setdefault(caller.qualified_name, set()).add(callee.qualified_name)
+
+    def _function_sources(self, names):
+        """names 里的函数以及它们（递归）调用的函数的源码，被调用的在前。"""
+        done, order = set(), []
+
+        def visit(function, stack):
+            key = function.qualified_name
+            if key in done:
+                return
+            if key in stack:
+                raise MdlError('%s 递归调用了自己（MDL 不允许递归）' % function.name)
+            stack.add(key)
+            source = _CodeGen(self, function).source()
+            for dep in sorted(self._deps.get(key, ())):
+                visit(self.functions[dep], stack)
+            stack.discard(key)
+            done.add(key)
+            order.append(source)
+
+        for name in names:
+            visit(name, set())
+        return order
+
+    def _namespace(self, functions, ops):
+        namespace = {'ops': ops}
+        sources = self._function_sources(functions)
+        source = '\n\n'.join(sources)
+        exec(compile(source, '<mdl_eval>', 'exec'), namespace)
+        return namespace, source
+
+    def kernel(self, name, backend=None):
+        """把一个函数编译成内核，参数就是内核的输入（有默认值的参数可以不传）。"""
+        function = self.find(name)
+        if function is None:
+            raise KeyError('没有函数 %s' % name)
+        ops = get_ops(backend)
+        namespace, source = self._namespace([function], ops)
+        inputs = []
+        for _type, param, default in function.params:
+            value = None
+            if default is not None:
+                code, _t = _CodeGen(self, function).expr(default, function.line)
+                value = eval(code, dict(namespace))
+            inputs.append((param, value))
+        return Kernel(namespace[function.py_name], inputs, ops, source)
+
+
+def load_library(root=DEFAULT_ROOT):
+    """读取 root 下所有 .mdl（或单个 .mdl 文件）。"""
+    library = MdlLibrary()
+    if os.path.isfile(root):
+        return library.add_file(root)
+    for directory, _dirs, files in os.walk(root):
+        for name in sorted(files):
+            if name.endswith('.mdl'):
+                library.add_file(os.path.join(directory, name), root)
+    return library
+
+
+# ----------------------------------------------------------------------
+# 节点图
+# ----------------------------------------------------------------------
+class NodeGraph(object):
+    """用 MDL 函数搭的节点图，编译成一个融合内核。
+
+        graph = NodeGraph(library)
+        u, v = graph.input('u'), graph.input('v')
+        add = graph.node('sampleNodeAdd', x=u, y=v)
+        graph.output(graph.node('sampleNodeMult', x=add, y=0.5))
+        kernel = graph.compile()
+        result = kernel(u=us, v=vs)
+    """
+
+    class Ref(object):
+        __slots__ = ('name',)
+
+        def __init__(self, name):
+            self.name = name
+
+    def __init__(self, library):
+        self.library = library
+        self.inputs = []              # [(名字, 默认值)]
+        self.nodes = []               # [(名字, 函数, {参数: Ref 或常数})]
+        self._names = set()
+        self._output = None
+
+    def _claim(self, name):
+        if not re.match(r'^[A-Za-z_]\w*$', name) or name in self._names:
+            raise ValueError('名字 %r 不合法或重复' % name)
+        self._names.add(name)
+
+    def input(self, name, default=None):
+        self._claim(name)
+        self.inputs.append((name, default))
+        return NodeGraph.Ref(name)
+
+    def node(self, function, name=None, **args):
+        definition = self.library.find(function)
+        if definition is None:
+            raise KeyError('没有函数 %s' % function)
+        params = {param for _type, param, _default in definition.params}
+        unknown = set(args) - params
+        if unknown:
+            raise ValueError('%s 没有参数 %s' % (definition.name, ', '.join(sorted(unknown))))
+        for value in args.values():
+            if isinstance(value, NodeGraph.Ref) and value.name not in self._names:
+                raise ValueError('未知的输入 / 节点 %s' % value.name)
+        name = name or 'n%d_%s' % (len(self.nodes), definition.name)
+        self._claim(name)
+        self.nodes.append((name, definition, args))
+        return NodeGraph.Ref(name)
+
+    def output(self, ref):
+        self._output = ref
+        return ref
+
+    def compile(self, backend=None):
+        if not self.nodes:
+            raise ValueError('节点图是空的')
+        output = self._output or NodeGraph.Ref(self.nodes[-1][0])
+        ops = get_ops(backend)
+        namespace, source = self.library._namespace([definition for _n, definition, _a in self.nodes], ops)
+        # 节点按添加顺序就是拓扑顺序（只能引用已经存在的节点）
+        lines = ['def graph_kernel(%s):' % ', '.join('g_' + name for name, _default in self.inputs)]
+        for name, definition, args in self.nodes:
+            parts = []
+            for _type, param, default in definition.params:
+                if param in args:
+                    value = args[param]
+                    parts.append('g_' + value.name if isinstance(value, NodeGraph.Ref) else repr(value))
+                elif default is not None:
+                    parts.append(_CodeGen(self.library, definition).expr(default, definition.line)[0])
+                else:
+                    raise ValueError('节点 %s 缺少参数 %s' % (name, param))
+            lines.append('    g_%s = %s(%s)' % (name, definition.py_name, ', '.join(parts)))
+        lines.append('    return g_%s' % output.name)
+        graph_source = '\n'.join(lines)
+        exec(compile(graph_source, '<mdl_eval graph>', 'exec'), namespace)
+        return Kernel(namespace['graph_kernel'], list(self.inputs), ops, source + '\n\n' + graph_source)
+
+    @classmethod
+    def from_dict(cls, library, spec):
+        """graph.json 的内容 -> NodeGraph。"@名字" 引用输入或节点，其他值是常数。"""
+        graph = cls(library)
+        refs = {}
+        for name, default in spec.get('inputs', {}).items():
+            refs[name] = graph.input(name, default)
+        pending = dict(spec['nodes'])
+        while pending:
+            progressed = False
+            for name, node in list(pending.items()):
+                args = node.get('args', {})
+                refs_needed = [v[1:] for v in args.values() if isinstance(v, str) and v.startswith('@')]
+                if any(r not in refs for r in refs_needed):
+                    continue
+                values = {k: refs[v[1:]] if isinstance(v, str) and v.startswith('@') else v
+                          for k, v in args.items()}
+                refs[name] = graph.node(node['function'], name=name, **values)
+                del pending[name]
+                progressed = True
+            if not progressed:
+                raise ValueError('节点图有环或引用了不存在的节点: %s' % ', '.join(sorted(pending)))
+        if spec.get('output'):
+            graph.output(refs[spec['output']])
+        return graph
+
+
+# ----------------------------------------------------------------------
+# 求值
+# ----------------------------------------------------------------------
+def grid(width, height, ops=None):
+    """图片每个像素中心的 (u, v)，按行排列，范围 0..1。"""
+    ops = ops or get_ops()
+    if ops.vectorized:
+        np = ops.numpy
+        v, u = np.meshgrid((np.arange(height) + 0.5) / height, (np.arange(width) + 0.5) / width, indexing='ij')
+        return u.ravel(), v.ravel()
+    us = array('d', [(x + 0.5) / width for x in range(width)] * height)
+    vs = array('d', [(y + 0.5) / height for y in range(height) for _x in range(width)])
+    return us, vs
+
+
+def iter_tiles(kernel, inputs, tile_size=TILE_SIZE):
+    """按图块求值，逐块交出 (起始下标, 结果)。inputs 里的序列按块切片，常数原样传入。"""
+    lengths = {len(v) for v in inputs.values() if hasattr(v, '__len__')}
+    if len(lengths) > 1:
+        raise ValueError('输入长度不一致: %s' % sorted(lengths))
+    total = lengths.pop() if lengths else 1
+    for start in range(0, total, tile_size):
+        stop = min(start + tile_size, total)
+        tile = {k: v[start:stop] if hasattr(v, '__len__') else v for k, v in inputs.items()}
+        yield start, kernel(**tile)
+
+
+def evaluate(kernel, inputs, tile_size=TILE_SIZE):
+    """按图块求值并拼成一个结果（numpy 数组或 array('d')）。"""
+    parts = [result for _start, result in iter_tiles(kernel, inputs, tile_size)]
+    if kernel.ops.vectorized:
+        np = kernel.ops.numpy
+        return np.concatenate([np.atleast_1d(p) for p in parts])
+    result = array('d')
+    for part in parts:
+        result.extend(part)
+    return result
+
+
+def write_pgm(path, values, width, height, low=0.0, high=1.0):
+    """把 [low, high] 的数值写成 8 位灰度 PGM，超出范围的截断，nan 写成 0。"""
+    scale = 255.0 / (high - low) if high != low else 0.0
+    pixels = bytearray(width * height)
+    for i, value in enumerate(values):
+        if value == value:
+            pixels[i] = int(min(max((value - low) * scale, 0.0), 255.0) + 0.5)
+    with open(path, 'wb') as f:
+        f.write(b'P5\n%d %d\n255\n' % (width, height))
+        f.write(bytes(pixels))
+
+
+def compare(actual, expected, tolerance=1e-6):
+    """返回 (超出容差的样本数, 最大误差)。两边都是 nan 算相等。"""
+    bad = 0
+    worst = 0.0
+    for a, e in zip(actual, expected):
+        a, e = float(a), float(e)
+        if a != a and e != e:
+            continue
+        error = abs(a - e) if a == a and e == e else math.inf
+        if error > tolerance * max(1.0, abs(e)):
+            bad += 1
+        worst = max(worst, error)
+    return bad, worst
+
+
+def _bind_inputs(kernel, samples, seed, size):
+    """--samples：每个输入取 [0,1) 随机数；--size：前两个输入绑定到像素的 u、v。"""
+    names = [name for name, _default in kernel.inputs]
+    if size:
+        us, vs = grid(size, size, kernel.ops)
+        return dict(zip(names, (us, vs)))
+    if kernel.ops.vectorized:
+        rng = kernel.ops.numpy.random.default_rng(seed)
+        return {name: rng.random(samples) for name in names}
+    rng = random.Random(seed)
+    return {name: array('d', (rng.random() for _ in range(samples))) for name in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='MDL 节点函数的离线参考求值器')
+    parser.add_argument('--root', default=DEFAULT_ROOT, help='.mdl 目录或文件，默认 custom_graph 的 data/mdl')
+    parser.add_argument('--list', action='store_true', help='列出可用的函数')
+    parser.add_argument('--function', help='对单个函数求值（参数就是输入）')
+    parser.add_argument('--graph', help='节点图 JSON 文件')
+    parser.add_argument('--backend', choices=('numpy', 'python'), default=None, help='默认有 numpy 就用 numpy')
+    parser.add_argument('--samples', type=int, default=100000, help='随机样本数（没有 --size 时）')
+    parser.add_argument('--size', type=int, default=0, help='按 size x size 的图片求值，前两个输入是 u、v')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tile', type=int, default=TILE_SIZE, help='每块的样本数')
+    parser.add_argument('--preview', help='输出 PGM 预览图（需要 --size）')
+    parser.add_argument('--range', nargs=2, type=float, default=(0.0, 1.0), metavar=('LOW', 'HIGH'),
+                        help='预览图的数值范围')
+    parser.add_argument('--record', help='把输入和结果写成 JSON，作为回归测试的参考')
+    parser.add_argument('--expect', help='和 --record 写出的参考结果对比')
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    parser.add_argument('--source', action='store_true', help='打印生成的内核代码')
+    args = parser.parse_args(argv)
+
+    try:
+        library = load_library(args.root)
+        if args.list:
+            for function in sorted(library.exported(), key=lambda f: f.qualified_name):
+                print('%-60s %r' % (function.qualified_name, function))
+            return 0
+        if args.expect:
+            with open(args.expect, encoding='utf-8') as f:
+                reference = json.load(f)
+            spec = reference['graph']
+        elif args.graph:
+            with open(args.graph, encoding='utf-8') as f:
+                spec = json.load(f)
+        elif args.function:
+            function = library.find(args.function)
+            if function is None:
+                raise KeyError('没有函数 %s' % args.function)
+            spec = {'inputs': {p: None for _t, p, _d in function.params},
+                    'nodes': {'node': {'function': function.qualified_name,
+                                       'args': {p: '@' + p for _t, p, _d in function.params}}}}
+        else:
+            parser.error('需要 --list、--function、--graph 或 --expect')
+        kernel = NodeGraph.from_dict(library, spec).compile(args.backend)
+    except (OSError, ValueError, KeyError) as e:
+        print('[mdl_eval] %s' % e)
+        return 1
+    if args.source:
+        print(kernel.source)
+
+    if args.expect:
+        inputs = {name: reference['inputs'][name] for name, _default in kernel.inputs if name in reference['inputs']}
+        if kernel.ops.vectorized:
+            inputs = {k: kernel.ops.numpy.asarray(v, dtype='float64') for k, v in inputs.items()}
+    else:
+        inputs = _bind_inputs(kernel, args.samples, args.seed, args.size)
+    started = time.perf_counter()
+    result = evaluate(kernel, inputs, args.tile)
+    elapsed = time.perf_counter() - started
+    print('[mdl_eval] %s 后端, %d 个样本, %.3fs, %.2f M 样本/秒'
+          % (kernel.ops.name, len(result), elapsed, len(result) / max(elapsed, 1e-9) / 1e6))
+
+    if args.preview:
+        if not args.size:
+            parser.error('--preview 需要 --size')
+        write_pgm(args.preview, result, args.size, args.size, *args.range)
+        print('[mdl_eval] 预览图 %s' % args.preview)
+    if args.record:
+        with open(args.record, 'w', encoding='utf-8') as f:
+            json.dump({'graph': spec, 'inputs': {k: [float(x) for x in v] for k, v in inputs.items()},
+                       'output': [float(x) for x in result]}, f)
+        print('[mdl_eval] 参考结果写入 %s' % args.record)
+    if args.expect:
+        bad, worst = compare(result, reference['output'], args.tolerance)
+        print('[mdl_eval] 回归测试 %s：%d / %d 个样本超出容差，最大误差 %g'
+              % ('通过' if not bad else '失败', bad, len(result), worst))
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
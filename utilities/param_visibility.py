@@ -0,0 +1,858 @@
+# -*- coding: utf-8 -*-
+"""曝光参数的 visibleIf 条件：编译成 Python 函数，批量对参数预设求值，并检查矛盾 / 永远隐藏的参数
+
+MaxSDPlugins 计划里的“曝光参数添加开关按钮的设定关联”：一个开关（bool）或下拉框（int）
+控制其他参数显示 / 隐藏，靠的是 paraminput 的 visibleIf 表达式（JavaScript 写法），比如
+    input["use_detail"] && input["detail_mode"] == 2
+    input["color"].a > 0.5 || !input["simple"]
+几百个参数、几层开关嵌套以后，哪个预设下显示哪些参数、有没有永远出不来的参数，只能在 SD 里一个个点开看。
+
+这里不经过 SD：
+1. 从包里读出每个 graph 的 paraminput（identifier、类型、默认值、控件选项、visibleIf）；
+2. 解析 visibleIf，整个 graph 的所有条件编译成一个 Python 函数：输入一组参数值，
+   返回每个带条件参数的可见性。编译一次，之后每个预设只是一次函数调用。
+   装了 numpy 时还可以编译成向量化版本，一次算一整块预设（和 mdl_eval 共用运算后端）；
+3. 检查：
+   - 语法错误、引用了不存在的参数、对标量参数取分量（错误）；
+   - 永远隐藏：在它引用的参数的所有取值组合下条件都不成立（错误）；
+   - 条件恒为真、引用自己、和下拉框 / 开关不可能取到的值比较（警告）；
+   - 只有在控制它的参数被隐藏时才显示，界面上点不出来（警告）。
+   “所有取值组合”按参数类型取：开关取 true / false，下拉框取全部选项，
+   数值参数取条件里出现的每个比较常数以及它两侧的值（再加默认值）。条件只是“参数和常数比较”时这是穷举，
+   参数之间做算术再比较的写法只是抽样。每个条件只和它（递归）引用的参数有关，所以逐个条件组合即可，
+   不需要整个预设矩阵；
+4. 预设表（CSV / .npy，格式同 sbs_variations）：逐行求出可见性，列出“给隐藏参数设了值”的行；
+   --matrix 对所有开关 / 下拉框的全部组合求值（完整预设矩阵，数值参数取默认值）。
+
+命令行用法：
+    python -m utilities.param_visibility material.sbs                    检查
+    python -m utilities.param_visibility material.sbs --list --source    列出条件和生成的代码
+    python -m utilities.param_visibility material.sbs --presets presets.csv -o visibility.csv
+    python -m utilities.param_visibility material.sbs --matrix --backend numpy
+"""
+
+import argparse
+import csv
+import itertools
+import math
+import re
+import sys
+import time
+from collections import namedtuple
+
+from utilities.mdl_eval import PythonOps, get_ops
+from utilities.sbs_stream import iter_events
+from utilities.sbs_variations import NAME_COLUMN, iter_csv_chunks, iter_numpy_chunks
+
+
+MAX_COMBINATIONS = 100000
+MATRIX_CHUNK = 4096
+MAX_MATRIX_ROWS = 10000000
+
+# paraminput 的 <type v=".."/> -> (值类型, 分量数)；没有默认值时用它判断类型
+PARAM_TYPES = {
+    4: ('bool', 1), 16: ('int', 1), 32: ('int', 2), 64: ('int', 3), 128: ('int', 4),
+    256: ('float', 1), 512: ('float', 2), 1024: ('float', 3), 2048: ('float', 4), 16384: ('string', 1),
+}
+_COMPONENT_NAMES = {'x': 0, 'y': 1, 'z': 2, 'w': 3, 'r': 0, 'g': 1, 'b': 2, 'a': 3}
+_COMPARISONS = ('==', '!=', '===', '!==', '<', '>', '<=', '>=')
+
+Issue = namedtuple('Issue', 'level graph identifier message')
+
+
+class VisibilityError(ValueError):
+    """visibleIf 写错了，或者引用了不存在的参数。"""
+
+
+# ----------------------------------------------------------------------
+# 词法 / 语法分析
+# ----------------------------------------------------------------------
+_TOKEN = re.compile(r'''
+    (?P<skip>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<number>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<op>===|!==|&&|\|\||==|!=|<=|>=|[-+*/%<>!?:()\[\].])
+''', re.X)
+
+
+def tokenize(text):
+    """返回 [(种类, 文本, 位置), ...]，最后是 ('eof', '', 长度)。"""
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise VisibilityError('第 %d 个字符：无法识别的字符 %r' % (pos + 1, text[pos]))
+        if m.lastgroup != 'skip':
+            tokens.append((m.lastgroup, m.group(), pos))
+        pos = m.end()
+    tokens.append(('eof', '', len(text)))
+    return tokens
+
+
+class _Parser(object):
+    # 二元运算符优先级（数字越大越先算），和 JavaScript 一致
+    BINARY = {'||': 1, '&&': 2, '==': 3, '!=': 3, '===': 3, '!==': 3, '<': 4, '>': 4, '<=': 4, '>=': 4,
+              '+': 5, '-': 5, '*': 6, '/': 6, '%': 6}
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        if token[0] != 'eof':
+            self.pos += 1
+        return token
+
+    def error(self, message, token=None):
+        token = token or self.peek()
+        return VisibilityError('第 %d 个字符：%s（在 %r 附近）' % (token[2] + 1, message, token[1]))
+
+    def expect(self, text):
+        token = self.next()
+        if token[1] != text:
+            raise self.error('这里应该是 %r' % text, token)
+        return token
+
+    def accept(self, text):
+        if self.peek()[1] == text and self.peek()[0] != 'string':
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self):
+        node = self.parse_expression()
+        if self.peek()[0] != 'eof':
+            raise self.error('表达式后面有多余的内容')
+        return node
+
+    def parse_expression(self):
+        condition = self.parse_binary(1)
+        if self.accept('?'):
+            yes = self.parse_expression()
+            self.expect(':')
+            no = self.parse_expression()
+            return ('cond', condition, yes, no)
+        return condition
+
+    def parse_binary(self, level):
+        left = self.parse_unary()
+        while True:
+            token = self.peek()
+            precedence = self.BINARY.get(token[1]) if token[0] == 'op' else None
+            if precedence is None or precedence < level:
+                return left
+            self.next()
+            left = ('bin', token[1], left, self.parse_binary(precedence + 1))
+
+    def parse_unary(self):
+        if self.peek()[0] == 'op' and self.peek()[1] in ('-', '!', '+'):
+            op = self.next()[1]
+            operand = self.parse_unary()
+            return operand if op == '+' else ('un', op, operand)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.next()
+        kind, text = token[0], token[1]
+        if kind == 'number':
+            is_float = any(c in text for c in '.eE')
+            return ('num', float(text) if is_float else int(text))
+        if kind == 'string':
+            return ('str', re.sub(r'\\(.)', r'\1', text[1:-1]))
+        if text in ('true', 'false'):
+            return ('num', text == 'true')
+        if text == '(' and kind == 'op':
+            value = self.parse_expression()
+            self.expect(')')
+            return value
+        if text == 'input':
+            if self.accept('['):
+                name = self.next()
+                if name[0] != 'string':
+                    raise self.error('input[...] 里应该是带引号的参数 identifier', name)
+                self.expect(']')
+                identifier = name[1][1:-1]
+            else:
+                self.expect('.')
+                name = self.next()
+                if name[0] != 'name':
+                    raise self.error('input. 后面应该是参数 identifier', name)
+                identifier = name[1]
+            return self.parse_component(('ref', identifier, None))
+        raise self.error('不支持的表达式', token)
+
+    def parse_component(self, ref):
+        # input["color"].a / input["color"][3]：取向量参数的一个分量
+        if self.accept('.'):
+            name = self.next()
+            if name[1] not in _COMPONENT_NAMES:
+                raise self.error('分量只能是 x y z w / r g b a', name)
+            return ('ref', ref[1], _COMPONENT_NAMES[name[1]])
+        if self.accept('['):
+            index = self.next()
+            if index[0] != 'number' or not index[1].isdigit():
+                raise self.error('分量下标应该是整数', index)
+            self.expect(']')
+            return ('ref', ref[1], int(index[1]))
+        return ref
+
+
+def parse_visible_if(text):
+    """解析一个 visibleIf 表达式，返回语法树（元组）。写错时抛出 VisibilityError。"""
+    return _Parser(text).parse()
+
+
+def _walk(node):
+    yield node
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            for item in _walk(child):
+                yield item
+
+
+def references(node):
+    """表达式引用的 [(identifier, 分量或 None), ...]，按出现顺序去重。"""
+    seen = []
+    for item in _walk(node):
+        if item[0] == 'ref' and item[1:] not in seen:
+            seen.append(item[1:])
+    return seen
+
+
+def comparisons(node):
+    """“参数 比较 常数”的三元组 [(identifier, 分量, 常数), ...]，用来决定检查时取哪些值。"""
+    found = []
+    for item in _walk(node):
+        if item[0] == 'bin' and item[1] in _COMPARISONS:
+            a, b = item[2], item[3]
+            if a[0] == 'ref' and b[0] in ('num', 'str'):
+                found.append((a[1], a[2], b[1]))
+            elif b[0] == 'ref' and a[0] in ('num', 'str'):
+                found.append((b[1], b[2], a[1]))
+    return found
+
+
+# ----------------------------------------------------------------------
+# 参数描述
+# ----------------------------------------------------------------------
+def is_boolean(node):
+    """表达式的结果一定是 true / false（比较、!、两边都是布尔的 && ||）：生成代码时不用再套 bool()。"""
+    kind = node[0]
+    if kind == 'num':
+        return isinstance(node[1], bool)
+    if kind == 'un':
+        return node[1] == '!'
+    if kind == 'bin':
+        if node[1] in _COMPARISONS:
+            return True
+        return node[1] in ('&&', '||') and is_boolean(node[2]) and is_boolean(node[3])
+    if kind == 'cond':
+        return is_boolean(node[2]) and is_boolean(node[3])
+    return False
+
+
+def _truthy(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no')
+    return bool(value)
+
+
+class ParamSpec(object):
+    """一个曝光参数：类型、默认值、控件选项、visibleIf 文本。"""
+
+    __slots__ = ('graph', 'identifier', 'label', 'value_type', 'components', 'default', 'widget', 'options',
+                 'visible_if')
+
+    def __init__(self, graph, identifier, param_type=None, default=None, widget=None, options=None,
+                 visible_if=None, label=None):
+        self.graph = graph
+        self.identifier = identifier
+        self.label = label
+        self.widget = widget
+        self.options = dict(options or {})
+        self.visible_if = (visible_if or '').strip() or None
+        tag = default[0] if default else ''
+        if 'Bool' in tag:
+            self.value_type, self.components = 'bool', 1
+        elif 'String' in tag:
+            self.value_type, self.components = 'string', 1
+        elif 'Int' in tag or 'Float' in tag:
+            digits = re.search(r'(\d+)$', tag)
+            self.value_type = 'int' if 'Int' in tag else 'float'
+            self.components = int(digits.group(1)) if digits else 1
+        else:
+            self.value_type, self.components = PARAM_TYPES.get(param_type, ('image', 1))
+        self.default = None
+        if self.value_type != 'image':
+            self.default = self.parse(default[1] if default else None)
+
+    @classmethod
+    def from_event(cls, event):
+        return cls(event.graph, event.identifier, event.param_type, event.default, event.widget,
+                   event.options, event.visible_if, event.label)
+
+    def _zero(self):
+        if self.value_type == 'bool':
+            return False
+        if self.value_type == 'string':
+            return ''
+        zero = 0 if self.value_type == 'int' else 0.0
+        return zero if self.components == 1 else (zero,) * self.components
+
+    def parse(self, value):
+        """把预设表里的单元格（文本或数字）转换成参数值；空值返回默认值。不合法时抛出 ValueError。"""
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return self.default if self.default is not None else self._zero()
+        if self.value_type == 'bool':
+            return _truthy(value)
+        if self.value_type == 'string':
+            return str(value)
+        convert = float if self.value_type == 'float' else (lambda x: int(float(x)))
+        parts = value.split() if isinstance(value, str) else (list(value) if hasattr(value, '__len__') else [value])
+        if len(parts) != self.components:
+            raise ValueError('参数 %s 需要 %d 个分量，得到 %r' % (self.identifier, self.components, value))
+        return convert(parts[0]) if self.components == 1 else tuple(convert(p) for p in parts)
+
+    def enum_values(self):
+        """下拉框（combobox）的全部选项值；不是下拉框时返回 None。
+
+        选项写在 parameters 里，格式是 "值;标签;值;标签..."，只取值的位置，
+        标签本身是数字（比如 "0;2;1;4"）时也不会被当成值。
+        """
+        if self.value_type != 'int' or self.components != 1 or (self.widget or '').lower() != 'combobox':
+            return None
+        values = []
+        for item in (self.options.get('parameters') or '').split(';')[::2]:
+            try:
+                values.append(int(item.strip()))
+            except ValueError:
+                pass
+        return sorted(set(values)) or None
+
+    def _bound(self, name, component):
+        text = self.options.get(name)
+        if not text:
+            return None
+        parts = text.split()
+        try:
+            return float(parts[min(component, len(parts) - 1)])
+        except (ValueError, IndexError):
+            return None
+
+    def domain(self, constants):
+        """检查时取的值。constants 是 {分量或 None: {条件里和它比较的常数}}。"""
+        if self.value_type == 'bool':
+            return [False, True]
+        if self.value_type == 'string':
+            values = [self.default] + sorted({c for cs in constants.values() for c in cs if isinstance(c, str)})
+            return list(dict.fromkeys(values + ['\0']))
+        enum = self.enum_values()
+        if enum is not None:
+            return enum if self.default in enum else enum + [self.default]
+        default = self.default if self.components > 1 else (self.default,)
+        per_component = []
+        for component in range(self.components):
+            key = component if self.components > 1 else None
+            points = {default[component]}
+            numbers = [c for c in constants.get(key, ()) if not isinstance(c, str)]
+            if self.components > 1:
+                numbers += [c for c in constants.get(None, ()) if not isinstance(c, str)]
+            for name in ('min', 'max'):
+                bound = self._bound(name, component)
+                if bound is not None and numbers:
+                    points.add(bound)
+            for c in numbers:
+                step = 1 if self.value_type == 'int' else 1e-4 * max(1.0, abs(float(c)))
+                points.update((c - step, c, c + step))
+            if self.value_type == 'int':
+                points = {int(math.floor(p)) for p in points} | {int(math.ceil(p)) for p in points}
+            per_component.append(sorted(points))
+        if self.components == 1:
+            return per_component[0]
+        return [tuple(values) for values in itertools.product(*per_component)]
+
+
+# ----------------------------------------------------------------------
+# 编译
+# ----------------------------------------------------------------------
+class _CodeGen(object):
+    """语法树 -> Python 表达式源码。v 是参数值序列（按 graph 里参数的顺序），ops 是运算后端。"""
+
+    def __init__(self, index, specs, vectorized):
+        self.index = index
+        self.specs = specs
+        self.vectorized = vectorized
+
+    def expr(self, node):
+        kind = node[0]
+        if kind in ('num', 'str'):
+            return repr(node[1])
+        if kind == 'ref':
+            i = self.index.get(node[1])
+            if i is None:
+                raise VisibilityError('引用了不存在的参数 %r' % node[1])
+            if node[2] is None:
+                return 'v[%d]' % i
+            spec = self.specs[i]
+            if spec.value_type in ('bool', 'string', 'image') or node[2] >= spec.components:
+                raise VisibilityError('参数 %r 是 %s%d，没有第 %d 个分量'
+                                      % (node[1], spec.value_type, spec.components, node[2] + 1))
+            if spec.components == 1:
+                return 'v[%d]' % i
+            return ('v[%d][:, %d]' if self.vectorized else 'v[%d][%d]') % (i, node[2])
+        if kind == 'un':
+            operand = self.expr(node[2])
+            if node[1] == '!':
+                return ('ops.logical_not(%s)' if self.vectorized else '(not %s)') % operand
+            return '(-%s)' % operand
+        if kind == 'bin':
+            op, a, b = node[1], self.expr(node[2]), self.expr(node[3])
+            if op in ('&&', '||'):
+                word = 'and' if op == '&&' else 'or'
+                if self.vectorized:
+                    return 'ops.logical_%s(%s, %s)' % (word, a, b)
+                return '(%s %s %s)' % (a, word, b)
+            if op == '/':
+                return 'ops.div(%s, %s)' % (a, b)
+            if op == '%':
+                return 'ops.fmod(%s, %s)' % (a, b)
+            return '(%s %s %s)' % (a, {'===': '==', '!==': '!='}.get(op, op), b)
+        condition, yes, no = self.expr(node[1]), self.expr(node[2]), self.expr(node[3])
+        if self.vectorized:
+            return 'ops.where(%s, %s, %s)' % (condition, yes, no)
+        return '(%s if %s else %s)' % (yes, condition, no)
+
+
+class VisibilityProgram(object):
+    """一个 graph 的全部 visibleIf，编译好的版本。
+
+    specs:        graph 里全部参数（ParamSpec），顺序就是参数值序列 v 的顺序
+    conditional:  有合法条件的参数 identifier，顺序就是可见性结果的顺序
+    errors:       {identifier: 错误信息}，这些参数的条件无法编译，按 SD 的做法当作一直显示
+    """
+
+    def __init__(self, graph, specs, backend='python'):
+        self.graph = graph
+        self.specs = list(specs)
+        self.index = {spec.identifier: i for i, spec in enumerate(self.specs)}
+        self.ops = get_ops(backend)
+        self.vectorized = self.ops.vectorized
+        self.trees = {}
+        self.errors = {}
+        python = _CodeGen(self.index, self.specs, False)
+        vector = _CodeGen(self.index, self.specs, True)
+        python_code = {}
+        vector_code = {}
+        for spec in self.specs:
+            if not spec.visible_if:
+                continue
+            try:
+                tree = parse_visible_if(spec.visible_if)
+                code = python.expr(tree)
+                python_code[spec.identifier] = code if is_boolean(tree) else 'bool(%s)' % code
+                if self.vectorized:
+                    vector_code[spec.identifier] = vector.expr(tree)
+                self.trees[spec.identifier] = tree
+            except VisibilityError as e:
+                self.errors[spec.identifier] = str(e)
+        self.conditional = [spec.identifier for spec in self.specs if spec.identifier in self.trees]
+        self.defaults = tuple(spec.default for spec in self.specs)
+
+        # 逐个条件的函数（检查、出错时的回退用）和整个 graph 融合的函数（批量求值用）
+        namespace = {'ops': PythonOps}
+        self.functions = {identifier: eval('lambda v: %s' % python_code[identifier], dict(namespace))
+                          for identifier in self.conditional}
+        lines = ['def visibility(v):', '    return (']
+        lines.extend('        %s,  # %s' % (python_code[i], i) for i in self.conditional)
+        lines.append('    )')
+        self.source = '\n'.join(lines)
+        exec(compile(self.source, '<visibleIf %s>' % graph, 'exec'), namespace)
+        self._fused = namespace['visibility']
+        self._vector = None
+        if self.vectorized:
+            lines = ['def visibility(v):', '    return [']
+            lines.extend('        %s,  # %s' % (vector_code[i], i) for i in self.conditional)
+            lines.append('    ]')
+            self.vector_source = '\n'.join(lines)
+            namespace = {'ops': self.ops}
+            exec(compile(self.vector_source, '<visibleIf %s numpy>' % graph, 'exec'), namespace)
+            self._vector = namespace['visibility']
+
+    # ------------------------------------------------------------------
+    # 求值
+    # ------------------------------------------------------------------
+    def evaluate_row(self, values):
+        """一组参数值（顺序同 specs）-> 每个带条件参数的可见性（顺序同 conditional）。
+
+        表达式在某一行上出错（比如字符串和数字比大小）时，只有出错的那个条件算隐藏。
+        """
+        try:
+            return self._fused(values)
+        except (TypeError, ValueError, IndexError):
+            result = []
+            for identifier in self.conditional:
+                try:
+                    result.append(self.functions[identifier](values))
+                except (TypeError, ValueError, IndexError):
+                    result.append(False)
+            return tuple(result)
+
+    def evaluate(self, rows):
+        """批量求值：rows 是参数值序列的列表。
+
+        python 后端返回 [可见性元组, ...]；numpy 后端返回 bool 数组，形状 (行数, 带条件参数数)。
+        """
+        if not self.vectorized:
+            evaluate_row = self.evaluate_row
+            return [evaluate_row(row) for row in rows]
+        return self.evaluate_columns(self.columns(rows), len(rows))
+
+    def columns(self, rows):
+        """行 -> 列（numpy 数组）：数值参数是 float64，向量参数是 (行数, 分量) 的二维数组。"""
+        np = self.ops.numpy
+        columns = []
+        for i, spec in enumerate(self.specs):
+            values = [row[i] for row in rows]
+            if spec.value_type in ('string', 'image'):
+                columns.append(np.array(values, dtype=object))
+            else:
+                columns.append(np.array(values, dtype=np.float64))
+        return columns
+
+    def evaluate_columns(self, columns, n):
+        np = self.ops.numpy
+        result = np.ones((n, len(self.conditional)), dtype=bool)
+        for j, value in enumerate(self._vector(columns)):
+            mask = np.asarray(value, dtype=bool)
+            if mask.ndim == 2:
+                mask = mask.all(axis=1)
+            result[:, j] = mask
+        return result
+
+    # ------------------------------------------------------------------
+    # 检查
+    # ------------------------------------------------------------------
+    def _closure(self, identifier):
+        # 这个条件（递归）依赖的全部参数：控制参数自己有条件时，把它的控制参数也算进来
+        todo = [identifier]
+        seen = []
+        while todo:
+            current = todo.pop()
+            for ref, _component in references(self.trees[current]) if current in self.trees else ():
+                if ref not in seen:
+                    seen.append(ref)
+                    todo.append(ref)
+        return seen
+
+    def _constants(self):
+        constants = {}
+        for tree in self.trees.values():
+            for identifier, component, value in comparisons(tree):
+                constants.setdefault(identifier, {}).setdefault(component, set()).add(value)
+        return constants
+
+    def check(self, max_combinations=MAX_COMBINATIONS):
+        """返回 [Issue, ...]。"""
+        issues = [Issue('error', self.graph, identifier, message) for identifier, message in self.errors.items()]
+        constants = self._constants()
+        domains = {}
+        position = {identifier: j for j, identifier in enumerate(self.conditional)}
+        for identifier in self.conditional:
+            tree = self.trees[identifier]
+            refs = [ref for ref, _component in references(tree)]
+            if identifier in refs:
+                issues.append(Issue('warning', self.graph, identifier, '条件引用了参数自己'))
+            for ref, _component, value in comparisons(tree):
+                allowed = self.specs[self.index[ref]].enum_values()
+                if self.specs[self.index[ref]].value_type == 'bool':
+                    allowed = [0, 1]
+                if allowed is not None and not isinstance(value, str) and value not in allowed:
+                    issues.append(Issue('warning', self.graph, identifier,
+                                        '和 %s 比较的值 %r 不在它的可选值 %s 里' % (ref, value, allowed)))
+
+            # 1. 条件本身只和它直接引用的参数有关：穷举它们就知道是否永远隐藏 / 恒为真
+            function = self.functions[identifier]
+            direct = list(dict.fromkeys(refs))
+            combos = self._combinations(direct, domains, constants, max_combinations)
+            if combos is None:
+                issues.append(Issue('info', self.graph, identifier,
+                                    '引用的参数组合超过 %d 种，跳过检查' % max_combinations))
+                continue
+            ever_visible = False
+            always_visible = True
+            for row in combos:
+                if self._visible(identifier, row, function):
+                    ever_visible = True
+                else:
+                    always_visible = False
+                if ever_visible and not always_visible:
+                    break
+            if not ever_visible:
+                issues.append(Issue('error', self.graph, identifier,
+                                    '永远隐藏：%s 在所有取值组合下都不成立' % self.specs[self.index[identifier]].visible_if))
+                continue
+            if always_visible and refs:
+                issues.append(Issue('warning', self.graph, identifier, '条件恒为真，可以去掉'))
+
+            # 2. 控制参数自己也有条件时，要找到一种组合：它显示，并且控制它的参数也都显示。
+            #    这要把控制参数（递归）引用的参数也算进来，找到一种就停
+            controllers = [ref for ref in direct if ref in position and ref != identifier]
+            if not controllers:
+                continue
+            combos = self._combinations(self._closure(identifier), domains, constants, max_combinations)
+            if combos is None:
+                continue
+            if not any(self._visible(identifier, row, function)
+                       and all(self._visible(ref, row) for ref in controllers) for row in combos):
+                issues.append(Issue('warning', self.graph, identifier,
+                                    '只有在控制它的参数（%s）被隐藏时才显示，界面上点不出来' % ', '.join(controllers)))
+        return issues
+
+    def _visible(self, identifier, row, function=None):
+        try:
+            return (function or self.functions[identifier])(row)
+        except (TypeError, ValueError, IndexError):
+            return False
+
+    def _combinations(self, identifiers, domains, constants, limit):
+        """这些参数全部取值组合的行（其余参数取默认值），逐行产出、共用一个列表；组合数超过 limit 时返回 None。"""
+        total = 1
+        for identifier in identifiers:
+            if identifier not in domains:
+                domains[identifier] = self.specs[self.index[identifier]].domain(constants.get(identifier, {}))
+            total *= len(domains[identifier])
+        if total > limit:
+            return None
+        slots = [self.index[identifier] for identifier in identifiers]
+        row = list(self.defaults)
+
+        def rows():
+            for combo in itertools.product(*(domains[identifier] for identifier in identifiers)):
+                for slot, value in zip(slots, combo):
+                    row[slot] = value
+                yield row
+        return rows()
+
+    # ------------------------------------------------------------------
+    # 预设
+    # ------------------------------------------------------------------
+    def bind(self, columns):
+        """预设表列名 -> 参数下标（name 列为 None）。列名可以是 identifier 或 graph/identifier。"""
+        indices = []
+        for column in columns:
+            name = column[len(self.graph) + 1:] if column.startswith(self.graph + '/') else column
+            if column == NAME_COLUMN:
+                indices.append(None)
+            elif name in self.index:
+                indices.append(self.index[name])
+            else:
+                raise ValueError('graph %s 里没有参数 %r' % (self.graph, column))
+        return indices
+
+    def rows_from_table(self, indices, table):
+        """预设表的行（单元格列表）-> 参数值序列；同时返回每行设置过的参数下标集合。"""
+        rows = []
+        touched = []
+        for cells in table:
+            row = list(self.defaults)
+            changed = set()
+            for index, cell in zip(indices, cells):
+                if index is None or (isinstance(cell, str) and not cell.strip()):
+                    continue
+                value = self.specs[index].parse(cell)
+                row[index] = value
+                if value != self.defaults[index]:
+                    changed.add(index)
+            rows.append(row)
+            touched.append(changed)
+        return rows, touched
+
+    def matrix_controllers(self):
+        """完整预设矩阵用到的参数和它们的取值：被条件引用的开关和下拉框（全部取值）。
+
+        数值参数在矩阵里保持默认值：它们和常数比较的边界已经由 check() 逐个条件穷举过了，
+        放进矩阵只会让组合数爆炸。
+        """
+        controllers = []
+        for tree in self.trees.values():
+            for ref, _component in references(tree):
+                if ref in self.index and ref not in controllers:
+                    controllers.append(ref)
+        result = []
+        for ref in controllers:
+            spec = self.specs[self.index[ref]]
+            if spec.value_type == 'bool' or spec.enum_values() is not None:
+                result.append((ref, spec.domain({})))
+        return result
+
+    def matrix_size(self):
+        size = 1
+        for _ref, values in self.matrix_controllers():
+            size *= len(values)
+        return size
+
+    def iter_matrix(self, chunk_size=MATRIX_CHUNK):
+        """逐块产出完整预设矩阵的行（参数值序列），内存只占一块。"""
+        controllers = self.matrix_controllers()
+        slots = [self.index[ref] for ref, _values in controllers]
+        chunk = []
+        for combo in itertools.product(*(values for _ref, values in controllers)):
+            row = list(self.defaults)
+            for slot, value in zip(slots, combo):
+                row[slot] = value
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def read_graphs(path):
+    """流式读取一个包，返回 {graph identifier: [ParamSpec, ...]}（按文件里的顺序）。"""
+    graphs = {}
+    for event in iter_events(path, kinds={'paraminput'}):
+        graphs.setdefault(event.graph, []).append(ParamSpec.from_event(event))
+    return graphs
+
+
+def load_programs(path, backend='python', graph=None):
+    """编译包里每个带 visibleIf 的 graph，返回 [VisibilityProgram, ...]。"""
+    programs = []
+    for identifier, specs in read_graphs(path).items():
+        if graph is not None and identifier != graph:
+            continue
+        if any(spec.visible_if for spec in specs):
+            programs.append(VisibilityProgram(identifier, specs, backend))
+    return programs
+
+
+# ----------------------------------------------------------------------
+# 命令行
+# ----------------------------------------------------------------------
+def run_presets(program, chunks, writer=None, report=20):
+    """对预设表逐块求值。返回 (行数, 给隐藏参数设了值的行数, 用时秒)。"""
+    started = time.perf_counter()
+    total = flagged = 0
+    position = {program.index[i]: j for j, i in enumerate(program.conditional)}
+    if writer is not None:
+        writer.writerow(['row', NAME_COLUMN] + program.conditional)
+    for columns, table in chunks:
+        indices = program.bind(columns)
+        name_column = indices.index(None) if None in indices else None
+        rows, touched = program.rows_from_table(indices, table)
+        visibility = program.evaluate(rows)
+        for offset, (cells, changed) in enumerate(zip(table, touched)):
+            visible = visibility[offset]
+            row_number = total + offset + 1
+            hidden = [program.specs[i].identifier for i in sorted(changed)
+                      if i in position and not visible[position[i]]]
+            name = str(cells[name_column]).strip() if name_column is not None else ''
+            if hidden:
+                flagged += 1
+                if flagged <= report:
+                    print('[param_visibility] 第 %d 行%s：给隐藏的参数设了值 %s'
+                          % (row_number, '（%s）' % name if name else '', ', '.join(hidden)))
+            if writer is not None:
+                writer.writerow([row_number, name] + [int(bool(v)) for v in visible])
+        total += len(table)
+    return total, flagged, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='检查曝光参数的 visibleIf，并对参数预设批量求可见性')
+    parser.add_argument('package', help='.sbs 包')
+    parser.add_argument('--graph', help='只处理这个 graph')
+    parser.add_argument('--backend', choices=('python', 'numpy'), default='python', help='批量求值的后端')
+    parser.add_argument('--list', action='store_true', help='列出每个参数的 visibleIf')
+    parser.add_argument('--source', action='store_true', help='打印生成的 Python 代码')
+    parser.add_argument('--presets', help='预设表：.csv 或 .npy（表头是参数 identifier）')
+    parser.add_argument('--columns', help='.npy 普通二维数组的列名，逗号分隔')
+    parser.add_argument('-o', '--output', help='把每行预设的可见性写成 CSV')
+    parser.add_argument('--matrix', action='store_true', help='对所有开关 / 下拉框的全部组合求值')
+    parser.add_argument('--max-rows', type=int, default=MAX_MATRIX_ROWS, help='完整预设矩阵最多的组合数')
+    parser.add_argument('--max-combinations', type=int, default=MAX_COMBINATIONS,
+                        help='检查单个条件时最多尝试的组合数')
+    args = parser.parse_args(argv)
+
+    try:
+        programs = load_programs(args.package, args.backend, args.graph)
+    except (OSError, ValueError) as e:
+        print('[param_visibility] %s' % e)
+        return 1
+    if not programs:
+        print('[param_visibility] %s 里没有 visibleIf 条件' % args.package)
+        return 0
+    if args.presets and len(programs) > 1:
+        print('[param_visibility] 有多个 graph 带 visibleIf，请用 --graph 指定: %s'
+              % ', '.join(p.graph for p in programs))
+        return 1
+
+    errors = 0
+    for program in programs:
+        print('[param_visibility] graph %s: %d 个参数, %d 个带 visibleIf, %d 个开关 / 下拉框控制参数'
+              % (program.graph, len(program.specs), len(program.trees) + len(program.errors),
+                 len(program.matrix_controllers())))
+        if args.list:
+            for spec in program.specs:
+                if spec.visible_if:
+                    print('    %-24s %s' % (spec.identifier, spec.visible_if))
+        if args.source:
+            print(program.vector_source if program.vectorized else program.source)
+        started = time.perf_counter()
+        issues = program.check(args.max_combinations)
+        for issue in issues:
+            label = {'error': '错误', 'warning': '警告', 'info': '提示'}[issue.level]
+            print('%s %s/%s: %s' % (label, issue.graph, issue.identifier, issue.message))
+        errors += sum(1 for issue in issues if issue.level == 'error')
+        print('[param_visibility] 检查用时 %.1f ms, %d 个问题' % ((time.perf_counter() - started) * 1000, len(issues)))
+
+        if args.matrix and program.matrix_size() > args.max_rows:
+            print('[param_visibility] 完整预设矩阵有 %d 种组合，超过 --max-rows %d，跳过'
+                  % (program.matrix_size(), args.max_rows))
+        elif args.matrix:
+            started = time.perf_counter()
+            rows = 0
+            seen = [False] * len(program.conditional)
+            for chunk in program.iter_matrix():
+                visibility = program.evaluate(chunk)
+                rows += len(chunk)
+                if program.vectorized:
+                    seen = [a or bool(b) for a, b in zip(seen, visibility.any(axis=0))]
+                else:
+                    seen = [a or any(column) for a, column in zip(seen, zip(*visibility))]
+            never = [identifier for identifier, visible in zip(program.conditional, seen) if not visible]
+            print('[param_visibility] 完整预设矩阵 %d 种组合, 用时 %.1f ms（%s 后端）%s'
+                  % (rows, (time.perf_counter() - started) * 1000, args.backend,
+                     '，数值参数取默认值时从不显示: %s' % ', '.join(never) if never else ''))
+
+    if args.presets:
+        program = programs[0]
+        if args.presets.lower().endswith('.npy'):
+            columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+            chunks = iter_numpy_chunks(args.presets, columns)
+        else:
+            chunks = iter_csv_chunks(args.presets)
+        output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else None
+        try:
+            total, flagged, elapsed = run_presets(program, chunks, csv.writer(output) if output else None)
+        except (OSError, ValueError) as e:
+            print('[param_visibility] 预设表读取失败: %s' % e)
+            return 1
+        finally:
+            if output is not None:
+                output.close()
+        print('[param_visibility] %d 个预设, %d 个给隐藏参数设了值, 用时 %.1f ms, %.0f 个/秒'
+              % (total, flagged, elapsed * 1000, total / max(elapsed, 1e-9)))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""两个版本 .sbs 包的结构化对比（Merkle 哈希，只深入变化的部分）
+
+整个包只有一行 XML，用 git diff / 文本对比工具看材质改动基本没法看。
+这里按包的结构逐层比较：
+
+    包 ─┬─ dependency（按 uid）
+        └─ graph（按 identifier）─┬─ paraminput（按 identifier）
+                                  └─ compNode（按 uid）─┬─ 连接
+                                                        └─ 参数（按 name）
+
+做法（Merkle 树）：
+1. 叶子：每个 compNode / paraminput / dependency 按它的原始字节算一个哈希；
+   graph 自身的属性（去掉所有节点和 paraminput 以后剩下的字节：输出、baseParameters、GUI 注释等）也算一个；
+   graph 的哈希由这些子哈希再算一次，包的根哈希由所有 graph 和 dependency 的哈希再算一次。
+2. 对比两个版本时先比根哈希，一样就结束；再比 graph 哈希，只有不一样的 graph 才比较节点哈希；
+   只有哈希不一样的节点才真正去解析它的参数和连接。
+   所以耗时和“改了多少”成正比，而不是和包的大小成正比。
+3. 哈希树缓存在包旁边的 `xxx.sbs.merkle` 里（包的 mtime / 大小变了会自动重建），
+   反复和同一个基线版本比较时，基线那一侧几乎不花时间。
+
+结果按 新增 / 删除 / 修改 列出节点、连接和参数。节点哈希变了、但定义 / 位置 / 连接 / 参数 / 输出
+都没变的（比如只改了 dynamicValue 函数图或 GUILayout 里的其他内容），标为“其他内容有变化”，不会漏报。
+
+命令行用法：
+    git show HEAD:Materials/wood.sbs > wood_old.sbs
+    python -m utilities.sbs_diff wood_old.sbs Materials/wood.sbs
+    python -m utilities.sbs_diff wood_old.sbs Materials/wood.sbs --json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+from utilities.sbs_files import atomic_write
+from utilities.sbs_index import mapped_package
+from utilities.sbs_stream import iter_bytes_events, iter_events
+
+
+CACHE_SUFFIX = '.merkle'
+CACHE_VERSION = 2
+
+
+def _hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _combine(prefix, hashes):
+    # 由子哈希算父哈希：按 key 排序，和子元素在文件里的顺序无关
+    return ['%s:%s:%s' % (prefix, key, hashes[key]) for key in sorted(hashes)]
+
+
+def cache_path_for(package_path):
+    return package_path + CACHE_SUFFIX
+
+
+# ----------------------------------------------------------------------
+# 哈希树
+# ----------------------------------------------------------------------
+def build_tree(package_path):
+    """流式扫描一遍包，算出整棵哈希树。
+
+    返回的 dict（也就是缓存文件的内容）：
+        root:         包的根哈希
+        dependencies: {uid: {'filename', 'hash'}}
+        graphs:       {identifier: {'hash', 'attributes', 'paraminputs': {id: hash},
+                                    'nodes': {uid: [hash, start, end]}}}
+    graph 的 hash 由 attributes（graph 自身字节的哈希）和所有 paraminput / 节点的哈希得出。
+    """
+    st = os.stat(package_path)
+    dependencies = {}
+    graphs = {}
+    current = None
+    own = None          # graph 自身字节（跳过节点和 paraminput）的增量哈希
+    pos = 0
+    kinds = {'dependency', 'graph_start', 'paraminput', 'compnode', 'graph_end'}
+    with mapped_package(package_path) as data:
+        for event in iter_events(package_path, kinds=kinds):
+            kind = event.kind
+            if kind in ('compnode', 'paraminput'):
+                own.update(data[pos:event.start])
+                pos = event.end
+                if kind == 'compnode':
+                    current['nodes'][event.uid] = [_hash(data[event.start:event.end]),
+                                                   event.start, event.end]
+                else:
+                    current['paraminputs'][event.identifier] = _hash(data[event.start:event.end])
+            elif kind == 'graph_start':
+                current = {'paraminputs': {}, 'nodes': {}}
+                own = hashlib.blake2b(digest_size=16)
+                pos = event.start
+            elif kind == 'graph_end':
+                own.update(data[pos:event.end])
+                current['attributes'] = own.hexdigest()
+                parts = ['a:%s' % current['attributes']]
+                parts += _combine('p', current['paraminputs'])
+                parts += _combine('n', {uid: v[0] for uid, v in current['nodes'].items()})
+                current['hash'] = _hash('\n'.join(parts).encode('utf-8'))
+                graphs[event.identifier] = current
+                current = None
+            elif kind == 'dependency':
+                dependencies[event.uid] = {'filename': event.filename,
+                                           'hash': _hash(data[event.start:event.end])}
+    parts = _combine('d', {uid: d['hash'] for uid, d in dependencies.items()})
+    parts += _combine('g', {name: g['hash'] for name, g in graphs.items()})
+    return {'version': CACHE_VERSION, 'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+            'root': _hash('\n'.join(parts).encode('utf-8')),
+            'dependencies': dependencies, 'graphs': graphs}
+
+
+def load_tree(package_path, use_cache=True):
+    """读取缓存的哈希树；缓存不存在或过期时重建并保存。"""
+    cache_path = cache_path_for(package_path)
+    st = os.stat(package_path)
+    if use_cache:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                tree = json.load(f)
+            if (tree.get('version') == CACHE_VERSION and tree.get('mtime_ns') == st.st_mtime_ns
+                    and tree.get('size') == st.st_size):
+                return tree
+        except (OSError, ValueError):
+            pass
+    tree = build_tree(package_path)
+    if use_cache:
+        try:
+            atomic_write(cache_path, json.dumps(tree, separators=(',', ':')).encode('utf-8'))
+        except OSError as e:
+            print('[sbs_diff] 无法写入缓存 %s: %s' % (cache_path, e))
+    return tree
+
+
+# ----------------------------------------------------------------------
+# 对比
+# ----------------------------------------------------------------------
+def _diff_keys(old, new):
+    """比较两个 {key: hash} 字典，返回 (新增, 删除, 哈希变化) 三个有序列表。"""
+    added = sorted(k for k in new if k not in old)
+    removed = sorted(k for k in old if k not in new)
+    modified = sorted(k for k in new if k in old and old[k] != new[k])
+    return added, removed, modified
+
+
+def _parse_node(data, start, end):
+    # 单独一个 <compNode> 不在 graph 里，解析器认不出来；套一层假的 <graph><compNodes> 再解析
+    wrapped = b'<graph><compNodes>' + data[start:end] + b'</compNodes></graph>'
+    for event in iter_bytes_events(wrapped, kinds={'compnode'}):
+        return event
+    raise ValueError('无法解析节点字节范围 [%d, %d)' % (start, end))
+
+
+def diff_nodes(old_event, new_event):
+    """比较同一个 uid 的两个节点，只列出真正变化的部分。"""
+    change = {}
+    if old_event.definition != new_event.definition:
+        change['definition'] = [old_event.definition, new_event.definition]
+    if old_event.pos != new_event.pos:
+        change['position'] = [old_event.pos, new_event.pos]
+    old_conns, new_conns = set(old_event.connections), set(new_event.connections)
+    if old_conns != new_conns:
+        change['connections'] = {'added': sorted(new_conns - old_conns, key=str),
+                                 'removed': sorted(old_conns - new_conns, key=str)}
+    params = {}
+    for name in sorted(set(old_event.params) | set(new_event.params)):
+        before, after = old_event.params.get(name), new_event.params.get(name)
+        if before != after:
+            params[name] = [before[1] if before else None, after[1] if after else None]
+    if params:
+        change['params'] = params
+    if old_event.outputs != new_event.outputs:
+        change['outputs'] = [old_event.outputs, new_event.outputs]
+    return change
+
+
+def diff_packages(old_path, new_path, use_cache=True):
+    """对比两个包，返回结构化的差异 dict；两边完全一样时返回 {}。"""
+    old_tree, new_tree = load_tree(old_path, use_cache), load_tree(new_path, use_cache)
+    if old_tree['root'] == new_tree['root']:
+        return {}
+    result = {}
+
+    old_deps = {uid: d['hash'] for uid, d in old_tree['dependencies'].items()}
+    new_deps = {uid: d['hash'] for uid, d in new_tree['dependencies'].items()}
+    added, removed, modified = _diff_keys(old_deps, new_deps)
+    if added or removed or modified:
+        def name(tree, uid):
+            return '%s (uid %s)' % (tree['dependencies'][uid]['filename'], uid)
+        result['dependencies'] = {'added': [name(new_tree, uid) for uid in added],
+                                  'removed': [name(old_tree, uid) for uid in removed],
+                                  'modified': [name(new_tree, uid) for uid in modified]}
+
+    old_graphs, new_graphs = old_tree['graphs'], new_tree['graphs']
+    added, removed, modified = _diff_keys({k: v['hash'] for k, v in old_graphs.items()},
+                                          {k: v['hash'] for k, v in new_graphs.items()})
+    graphs = {'added': added, 'removed': removed, 'modified': {}}
+    if modified:
+        with mapped_package(old_path) as old_data, mapped_package(new_path) as new_data:
+            for identifier in modified:
+                graphs['modified'][identifier] = _diff_graph(
+                    old_graphs[identifier], new_graphs[identifier], old_data, new_data)
+    if added or removed or modified:
+        result['graphs'] = graphs
+    return result
+
+
+def _diff_graph(old_graph, new_graph, old_data, new_data):
+    change = {}
+    added, removed, modified = _diff_keys(old_graph['paraminputs'], new_graph['paraminputs'])
+    if added or removed or modified:
+        change['paraminputs'] = {'added': added, 'removed': removed, 'modified': modified}
+
+    old_nodes, new_nodes = old_graph['nodes'], new_graph['nodes']
+    added, removed, modified = _diff_keys({uid: v[0] for uid, v in old_nodes.items()},
+                                          {uid: v[0] for uid, v in new_nodes.items()})
+    node_changes = {}
+    for uid in modified:
+        # 只有哈希变了的节点才解析
+        _h, start, end = old_nodes[uid]
+        old_event = _parse_node(old_data, start, end)
+        _h, start, end = new_nodes[uid]
+        new_event = _parse_node(new_data, start, end)
+        # 哈希变了就一定报告；diff_nodes 没建模的部分（dynamicValue、GUILayout 里的其他内容等）记为 other
+        node_changes[uid] = diff_nodes(old_event, new_event) or {'other': 'modified'}
+    if added or removed or node_changes:
+        change['nodes'] = {'added': added, 'removed': removed, 'modified': node_changes}
+    if old_graph['attributes'] != new_graph['attributes']:
+        # graph 自身的属性（输出、baseParameters、GUI 注释等）
+        change['attributes'] = 'modified'
+    return change
+
+
+def format_diff(result):
+    """把差异 dict 转成便于阅读的多行文本。"""
+    if not result:
+        return '两个包的结构完全一致'
+    lines = []
+    deps = result.get('dependencies')
+    if deps:
+        lines.append('dependencies:')
+        for label, sign in (('added', '+'), ('removed', '-'), ('modified', '~')):
+            for item in deps[label]:
+                lines.append('  %s %s' % (sign, item))
+    graphs = result.get('graphs', {})
+    for identifier in graphs.get('added', ()):
+        lines.append('+ graph %s' % identifier)
+    for identifier in graphs.get('removed', ()):
+        lines.append('- graph %s' % identifier)
+    for identifier, change in sorted(graphs.get('modified', {}).items()):
+        lines.append('~ graph %s' % identifier)
+        if 'attributes' in change:
+            lines.append('    graph 属性（输出 / baseParameters / 注释等）有变化')
+        params = change.get('paraminputs')
+        if params:
+            for label, sign in (('added', '+'), ('removed', '-'), ('modified', '~')):
+                for item in params[label]:
+                    lines.append('    %s paraminput %s' % (sign, item))
+        nodes = change.get('nodes')
+        if not nodes:
+            continue
+        for uid in nodes['added']:
+            lines.append('    + node %s' % uid)
+        for uid in nodes['removed']:
+            lines.append('    - node %s' % uid)
+        for uid, node_change in sorted(nodes['modified'].items()):
+            lines.append('    ~ node %s' % uid)
+            if 'definition' in node_change:
+                lines.append('        definition: %s -> %s' % tuple(node_change['definition']))
+            if 'position' in node_change:
+                lines.append('        position: %s -> %s' % tuple(node_change['position']))
+            conns = node_change.get('connections')
+            if conns:
+                for conn in conns['added']:
+                    lines.append('        + connection %s <- %s/%s' % tuple(conn))
+                for conn in conns['removed']:
+                    lines.append('        - connection %s <- %s/%s' % tuple(conn))
+            for name, (before, after) in sorted(node_change.get('params', {}).items()):
+                lines.append('        param %s: %s -> %s' % (name, before, after))
+            if 'outputs' in node_change:
+                lines.append('        outputs 有变化')
+            if 'other' in node_change:
+                lines.append('        其他内容（dynamicValue / GUI 等）有变化')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='.sbs 包结构化对比（Merkle 哈希）')
+    parser.add_argument('old', help='旧版本（基线）')
+    parser.add_argument('new', help='新版本')
+    parser.add_argument('--json', action='store_true', help='输出 JSON')
+    parser.add_argument('--no-cache', action='store_true', help='不读写 .merkle 缓存')
+    args = parser.parse_args(argv)
+
+    try:
+        result = diff_packages(args.old, args.new, use_cache=not args.no_cache)
+    except (OSError, ValueError) as e:
+        print('[sbs_diff] 对比失败: %s' % e)
+        return 2
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=1))
+    else:
+        print(format_diff(result))
+    return 1 if result else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""批处理工具共用的文件操作：查找包、原子写入。"""
+
+import os
+import tempfile
+
+
+def iter_packages(paths, extensions=('.sbs',)):
+    """展开命令行参数：文件直接返回，目录递归查找所有 .sbs。"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def atomic_write(path, data):
+    """原子写文件：同目录下写临时文件 -> flush + fsync -> os.replace 覆盖原文件。
+
+    os.replace 在同一个磁盘分区内是原子操作，别的进程要么看到旧文件，要么看到新文件。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+""".sbs 包的“字节偏移索引”（sidecar 文件）
+
+问题：包里有几百个 graph 时，想打开其中一个（比如 processor），
+如果每次都从头解析，前面所有 graph 都要白白读一遍。
+
+做法：
+1. 第一次用 sbs_stream 流式扫描整个包，记录每个 <graph> / <dependency> / <resource>
+   在文件里的字节范围 [start, end)。
+2. 把结果存成一个很小的 JSON 文件，放在包旁边：`xxx.sbs.idx`。
+3. 之后想读某个 graph，直接 mmap（内存映射）文件，切出那一段字节单独解析即可，
+   耗时只和这个 graph 的大小有关，和整个包有多大无关。
+
+索引什么时候会失效？
+- 包文件的修改时间（mtime）或大小变了
+- 包头里的 fileUID / versionUID 和索引里记录的不一致
+出现以上任一情况，load_index() 会自动重建索引。
+
+命令行用法：
+    python -m utilities.sbs_index SDFiles/Bilibili_HuangJuanLr/BatchMergeGraphSample.sbs
+    python -m utilities.sbs_index xxx.sbs --graph processor
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+from utilities.sbs_stream import iter_bytes_events, iter_events
+
+
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+
+# 包头只在文件最前面，读 4KB 足够拿到 fileUID / versionUID
+_HEADER_READ_SIZE = 4096
+_FILE_UID_RE = re.compile(br'<fileUID v="([^"]*)"/>')
+_VERSION_UID_RE = re.compile(br'<versionUID v="([^"]*)"/>')
+
+
+def index_path_for(package_path):
+    """包对应的索引文件路径：在原文件名后面加 .idx。"""
+    return package_path + INDEX_SUFFIX
+
+
+def read_header_uids(package_path):
+    """只读文件开头的一小段，取出 (fileUID, versionUID)。"""
+    with open(package_path, 'rb') as f:
+        head = f.read(_HEADER_READ_SIZE)
+    file_uid = _FILE_UID_RE.search(head)
+    version_uid = _VERSION_UID_RE.search(head)
+    return (file_uid.group(1).decode('utf-8') if file_uid else None,
+            version_uid.group(1).decode('utf-8') if version_uid else None)
+
+
+class PackageIndex(object):
+    """一个包的字节偏移索引。
+
+    属性:
+        package_path: 包文件路径
+        file_uid / version_uid: 包头信息
+        mtime_ns / size: 建索引时文件的修改时间和大小，用来判断索引是否过期
+        graphs: [{'identifier', 'uid', 'start', 'end'}, ...]
+        dependencies: [{'uid', 'filename', 'start', 'end'}, ...]
+        resources: [{'identifier', 'uid', 'type', 'start', 'end'}, ...]
+    """
+
+    def __init__(self, package_path, file_uid, version_uid, mtime_ns, size,
+                 graphs, dependencies, resources):
+        self.package_path = package_path
+        self.file_uid = file_uid
+        self.version_uid = version_uid
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.graphs = graphs
+        self.dependencies = dependencies
+        self.resources = resources
+        self._graph_lookup = None
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def find_graph(self, key):
+        """按 graph 的 identifier 或 uid 查找，找不到返回 None。"""
+        if self._graph_lookup is None:
+            lookup = {}
+            for entry in self.graphs:
+                # 同名 graph（不同文件夹里）只保留第一个；用 uid 可以精确定位
+                lookup.setdefault(entry['identifier'], entry)
+                lookup.setdefault(entry['uid'], entry)
+            self._graph_lookup = lookup
+        return self._graph_lookup.get(key)
+
+    def find_dependency(self, uid):
+        for entry in self.dependencies:
+            if entry['uid'] == uid:
+                return entry
+        return None
+
+    def is_fresh(self):
+        """索引是否仍然对应磁盘上的包文件。"""
+        try:
+            st = os.stat(self.package_path)
+        except OSError:
+            return False
+        if st.st_mtime_ns != self.mtime_ns or st.st_size != self.size:
+            return False
+        return read_header_uids(self.package_path) == (self.file_uid, self.version_uid)
+
+    # ------------------------------------------------------------------
+    # 读写 sidecar 文件
+    # ------------------------------------------------------------------
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'fileUID': self.file_uid,
+            'versionUID': self.version_uid,
+            'mtime_ns': self.mtime_ns,
+            'size': self.size,
+            'graphs': self.graphs,
+            'dependencies': self.dependencies,
+            'resources': self.resources,
+        }
+
+    @classmethod
+    def from_dict(cls, package_path, data):
+        return cls(package_path, data['fileUID'], data['versionUID'], data['mtime_ns'],
+                   data['size'], data['graphs'], data['dependencies'], data['resources'])
+
+    def save(self, index_path=None):
+        """写入 sidecar 文件。先写临时文件再替换，避免写到一半被其他进程读到。"""
+        index_path = index_path or index_path_for(self.package_path)
+        tmp_path = index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+
+
+def build_index(package_path, save=True):
+    """流式扫描整个包，生成索引（默认同时写入 sidecar 文件）。"""
+    st = os.stat(package_path)
+    file_uid = version_uid = None
+    graphs = []
+    dependencies = []
+    resources = []
+    kinds = {'package', 'dependency', 'resource', 'graph_end'}
+    for event in iter_events(package_path, kinds=kinds):
+        kind = event.kind
+        if kind == 'graph_end':
+            graphs.append({'identifier': event.identifier, 'uid': event.uid,
+                           'start': event.start, 'end': event.end})
+        elif kind == 'dependency':
+            dependencies.append({'uid': event.uid, 'filename': event.filename,
+                                 'start': event.start, 'end': event.end})
+        elif kind == 'resource':
+            resources.append({'identifier': event.identifier, 'uid': event.uid,
+                              'type': event.res_type, 'start': event.start, 'end': event.end})
+        elif kind == 'package':
+            file_uid, version_uid = event.file_uid, event.version_uid
+    index = PackageIndex(package_path, file_uid, version_uid, st.st_mtime_ns, st.st_size,
+                         graphs, dependencies, resources)
+    if save:
+        try:
+            index.save()
+        except OSError as e:
+            # 只读目录之类的情况：索引照样能用，只是下次还得重建
+            print('[sbs_index] 无法写入索引 %s: %s' % (index_path_for(package_path), e))
+    return index
+
+
+def load_index(package_path, rebuild=True):
+    """读取包的索引；索引不存在、损坏或过期时自动重建。
+
+    参数:
+        rebuild (bool): 为 False 时，索引不可用直接返回 None，而不是重建。
+    """
+    index_path = index_path_for(package_path)
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == INDEX_VERSION:
+            index = PackageIndex.from_dict(package_path, data)
+            if index.is_fresh():
+                return index
+    except (OSError, ValueError, KeyError):
+        pass
+    if not rebuild:
+        return None
+    return build_index(package_path)
+
+
+@contextmanager
+def mapped_package(package_path):
+    """以只读方式内存映射包文件，用法：
+
+        with mapped_package(path) as data:
+            piece = data[start:end]
+    """
+    with open(package_path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield data
+        finally:
+            data.close()
+
+
+def read_graph_bytes(package_path, key, index=None):
+    """只读出某个 graph 的 XML 字节（按 identifier 或 uid 查找）。找不到时抛出 KeyError。"""
+    index = index or load_index(package_path)
+    entry = index.find_graph(key)
+    if entry is None:
+        raise KeyError('包 %s 中没有 graph: %s' % (package_path, key))
+    with mapped_package(package_path) as data:
+        return data[entry['start']:entry['end']]
+
+
+def read_graph_events(package_path, key, kinds=None, index=None):
+    """只解析某一个 graph，返回它的事件列表（字节偏移已换算回整个文件的位置）。"""
+    index = index or load_index(package_path)
+    entry = index.find_graph(key)
+    if entry is None:
+        raise KeyError('包 %s 中没有 graph: %s' % (package_path, key))
+    with mapped_package(package_path) as data:
+        piece = data[entry['start']:entry['end']]
+    events = iter_bytes_events(piece, kinds=kinds)
+    offset = entry['start']
+    if offset:
+        events = [_shift(event, offset) for event in events]
+    return events
+
+
+def _shift(event, offset):
+    # 切片里的偏移是相对切片开头的，加上切片起点才是文件里的真实位置
+    fields = event._fields
+    if 'end' in fields:
+        return event._replace(start=event.start + offset, end=event.end + offset)
+    if 'start' in fields:
+        return event._replace(start=event.start + offset)
+    return event
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='为 .sbs 包建立 / 查看字节偏移索引')
+    parser.add_argument('paths', nargs='+', help='.sbs 文件路径')
+    parser.add_argument('--graph', help='只读取并统计这个 graph（identifier 或 uid）')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有索引，强制重建')
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        index = build_index(path) if args.rebuild else load_index(path)
+        if args.graph:
+            try:
+                events = read_graph_events(path, args.graph, kinds={'compnode'}, index=index)
+            except KeyError as e:
+                print('[sbs_index] %s' % e.args[0])
+                continue
+            print('%s :: %s  节点数 %d' % (path, args.graph, len(events)))
+            continue
+        print('%s  graphs=%d dependencies=%d resources=%d'
+              % (path, len(index.graphs), len(index.dependencies), len(index.resources)))
+        for entry in index.graphs:
+            print('    %-32s [%d, %d)' % (entry['identifier'], entry['start'], entry['end']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
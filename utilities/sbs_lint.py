@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""包检查（查错功能）：可插拔规则 + 每个文件只流式读一遍
+
+MaxSDPlugins 计划里的几项检查：
+- 默认输出分辨率
+- 三面映射（triplanar）的输入设置
+- 输出的 Identifier 和 Usage 是否一致
+- 输出 3 个通道（RGB）时提示，避免 Unity 索引错误
+
+如果每项检查各自把包完整读一遍，规则越多越慢。这里的做法是：
+1. 每条规则声明自己关心哪些事件（interests），例如 ('graphoutput',)。
+2. 引擎把所有规则关心的事件合在一起，只调用一次 sbs_stream.iter_events，
+   读到一个事件就分发给关心它的规则。10 条规则和 1 条规则读文件的次数一样，都是 1 次。
+3. 多个文件用进程池并行检查。
+4. 结果可以输出成 JSON 或 SARIF（CI 系统通用的静态检查格式），方便在 CI 里卡住有问题的提交。
+
+自定义规则（写在任意模块里，import 之后就会被注册）：
+
+    @register_rule
+    class MyRule(Rule):
+        id = 'my-rule'
+        description = '说明'
+        interests = ('compnode',)
+
+        def on_compnode(self, event, report):
+            if ...:
+                report(self, '问题描述', graph=event.graph, node=event.uid, offset=event.start)
+
+命令行用法：
+    python -m utilities.sbs_lint D:/Materials --format sarif -o lint.sarif
+    python -m utilities.sbs_lint a.sbs --rules output-usage,rgb-output --set output-resolution.expected="11 11"
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities.sbs_files import iter_packages
+from utilities.sbs_stream import NODE_INSTANCE, iter_events
+
+
+LEVEL_ERROR = 'error'
+LEVEL_WARNING = 'warning'
+LEVEL_NOTE = 'note'
+_LEVEL_ORDER = {LEVEL_NOTE: 0, LEVEL_WARNING: 1, LEVEL_ERROR: 2}
+# 读取 / 解析失败的文件报告成这条“规则”的问题，它不在 RULES 里，不能被关闭
+PARSE_ERROR_RULE = 'parse-error'
+
+RULES = {}
+
+
+def register_rule(cls):
+    """类装饰器：把规则登记到 RULES 里，id 不能重复。"""
+    if not cls.id:
+        raise ValueError('规则 %s 没有 id' % cls.__name__)
+    if cls.id in RULES and RULES[cls.id] is not cls:
+        raise ValueError('规则 id 重复: %s' % cls.id)
+    RULES[cls.id] = cls
+    return cls
+
+
+class Rule(object):
+    """规则基类。
+
+    子类需要设置:
+        id:          规则名，例如 'rgb-output'
+        description: 一句话说明
+        level:       默认严重程度 error / warning / note
+        interests:   关心的事件 kind 元组，对每个 kind 实现 on_<kind>(event, report) 方法
+        options:     可以通过 --set <id>.<key>=<value> 修改的参数及默认值
+
+    可选实现:
+        begin_file(path):  开始检查一个新文件前调用，用于清空上一个文件留下的状态
+        end_file(report):  一个文件读完后调用，适合做“整个 graph 读完才能判断”的检查
+    """
+
+    id = ''
+    description = ''
+    level = LEVEL_WARNING
+    interests = ()
+    options = {}
+
+    def __init__(self, **options):
+        unknown = set(options) - set(self.options)
+        if unknown:
+            raise ValueError('规则 %s 没有参数: %s' % (self.id, ', '.join(sorted(unknown))))
+        self.config = dict(self.options)
+        self.config.update(options)
+
+    def begin_file(self, path):
+        pass
+
+    def end_file(self, report):
+        pass
+
+
+def _normalize_name(name):
+    return (name or '').replace('_', '').replace(' ', '').lower()
+
+
+# ----------------------------------------------------------------------
+# 内置规则
+# ----------------------------------------------------------------------
+@register_rule
+class OutputResolutionRule(Rule):
+    """graph 的 baseParameters 里应当设置默认输出分辨率 outputsize。
+
+    outputsize 的值是 log2，例如 "11 11" 表示 2048x2048。
+    """
+
+    id = 'output-resolution'
+    description = 'graph 需要设置默认输出分辨率（baseParameters/outputsize）'
+    interests = ('graph_end',)
+    options = {'expected': None}
+
+    def on_graph_end(self, event, report):
+        value = event.base_params.get('outputsize')
+        expected = self.config['expected']
+        if value is None:
+            report(self, 'graph "%s" 没有设置默认输出分辨率' % event.identifier,
+                   graph=event.identifier, offset=event.start)
+        elif expected and value[1] != expected:
+            report(self, 'graph "%s" 默认输出分辨率为 %s，期望 %s' % (event.identifier, value[1], expected),
+                   graph=event.identifier, offset=event.start)
+
+
+@register_rule
+class TriplanarInputRule(Rule):
+    """三面映射（triplanar）实例节点必须连接输入，否则输出是空的。"""
+
+    id = 'triplanar-input'
+    description = 'triplanar 节点需要连接输入'
+    level = LEVEL_ERROR
+    interests = ('compnode',)
+    options = {'keyword': 'triplanar'}
+
+    def on_compnode(self, event, report):
+        if event.node_kind != NODE_INSTANCE:
+            return
+        if self.config['keyword'] not in (event.definition or '').lower():
+            return
+        if not event.connections:
+            report(self, 'triplanar 节点 %s 没有连接任何输入' % event.uid,
+                   graph=event.graph, node=event.uid, offset=event.start)
+
+
+@register_rule
+class OutputUsageRule(Rule):
+    """graph 输出的 Identifier 应该和它的 Usage 对应（忽略大小写和下划线）。
+
+    例如 identifier "basecolor" 的 usage 应是 "baseColor"；不一致时引擎导出贴图容易对错通道。
+    """
+
+    id = 'output-usage'
+    description = '输出的 Identifier 与 Usage 不一致'
+    interests = ('graphoutput',)
+
+    def on_graphoutput(self, event, report):
+        if not event.usages:
+            report(self, '输出 "%s" 没有设置 Usage' % event.identifier,
+                   graph=event.graph, node=event.uid)
+            return
+        names = [_normalize_name(name) for name, _components in event.usages]
+        if _normalize_name(event.identifier) not in names:
+            report(self, '输出 "%s" 的 Usage 是 %s' % (event.identifier,
+                                                     ', '.join(n for n, _c in event.usages)),
+                   graph=event.graph, node=event.uid)
+
+
+@register_rule
+class RgbOutputRule(Rule):
+    """输出只有 RGB 3 个通道时提示：Unity 按 RGBA 取通道，3 通道贴图容易索引错位。"""
+
+    id = 'rgb-output'
+    description = '输出为 3 通道（RGB），Unity 中可能索引错误'
+    interests = ('graphoutput',)
+
+    def on_graphoutput(self, event, report):
+        for name, components in event.usages:
+            if components == 'RGB':
+                report(self, '输出 "%s"（usage %s）只有 RGB 3 个通道' % (event.identifier, name),
+                       graph=event.graph, node=event.uid)
+
+
+@register_rule
+class DanglingConnectionRule(Rule):
+    """连接指向了 graph 里不存在的节点（通常是手改 XML 或合并冲突留下的）。"""
+
+    id = 'dangling-connection'
+    description = '连接引用了不存在的节点'
+    level = LEVEL_ERROR
+    interests = ('compnode', 'graph_end')
+
+    def begin_file(self, path):
+        self._uids = set()
+        self._links = []
+
+    def on_compnode(self, event, report):
+        self._uids.add(event.uid)
+        for identifier, ref, _ref_output in event.connections:
+            if ref is not None:
+                self._links.append((event.uid, identifier, ref, event.start))
+
+    def on_graph_end(self, event, report):
+        for node, identifier, ref, offset in self._links:
+            if ref not in self._uids:
+                report(self, '节点 %s 的输入 %s 连接到不存在的节点 %s' % (node, identifier, ref),
+                       graph=event.identifier, node=node, offset=offset)
+        self._uids = set()
+        self._links = []
+
+
+# ----------------------------------------------------------------------
+# 引擎
+# ----------------------------------------------------------------------
+class LintEngine(object):
+    """把一组规则组合起来，对每个文件只读一遍。
+
+    参数:
+        rule_ids: 要启用的规则 id 列表，None 表示全部
+        settings: {rule_id: {option: value}}
+    """
+
+    def __init__(self, rule_ids=None, settings=None):
+        settings = settings or {}
+        ids = list(RULES) if rule_ids is None else list(rule_ids)
+        missing = [rule_id for rule_id in ids if rule_id not in RULES]
+        if missing:
+            raise ValueError('未知的规则: %s' % ', '.join(missing))
+        self.rules = [RULES[rule_id](**settings.get(rule_id, {})) for rule_id in ids]
+        # 分发表：事件 kind -> 关心它的处理函数列表
+        self.dispatch = {}
+        for rule in self.rules:
+            for kind in rule.interests:
+                self.dispatch.setdefault(kind, []).append(getattr(rule, 'on_' + kind))
+        self.kinds = frozenset(self.dispatch)
+
+    def check_file(self, path):
+        """检查一个文件，返回问题列表（每条是一个 dict）。"""
+        findings = []
+
+        def report(rule, message, graph=None, node=None, offset=None, level=None):
+            findings.append({'rule': rule.id, 'level': level or rule.level, 'path': path,
+                             'graph': graph, 'node': node, 'offset': offset, 'message': message})
+
+        for rule in self.rules:
+            rule.begin_file(path)
+        dispatch = self.dispatch
+        for event in iter_events(path, kinds=self.kinds):
+            for handler in dispatch[event.kind]:
+                handler(event, report)
+        for rule in self.rules:
+            rule.end_file(report)
+        return findings
+
+
+_worker_engine = None
+
+
+def _init_worker(rule_ids, settings):
+    global _worker_engine
+    _worker_engine = LintEngine(rule_ids, settings)
+
+
+def _check_job(path):
+    try:
+        return _worker_engine.check_file(path)
+    except (OSError, ValueError) as e:
+        return [{'rule': PARSE_ERROR_RULE, 'level': LEVEL_ERROR, 'path': path, 'graph': None,
+                 'node': None, 'offset': None, 'message': str(e)}]
+
+
+def lint_paths(paths, rule_ids=None, settings=None, workers=None):
+    """检查一批文件（文件多时用进程池），按文件顺序返回全部问题。"""
+    paths = list(paths)
+    if workers == 1 or len(paths) < 2:
+        _init_worker(rule_ids, settings)
+        results = [_check_job(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(rule_ids, settings)) as pool:
+            results = list(pool.map(_check_job, paths, chunksize=8))
+    return [finding for findings in results for finding in findings]
+
+
+# ----------------------------------------------------------------------
+# 输出
+# ----------------------------------------------------------------------
+def to_sarif(findings, rule_ids=None):
+    """转换为 SARIF 2.1.0（GitHub / Azure DevOps / GitLab 等 CI 都能直接识别）。"""
+    ids = list(RULES) if rule_ids is None else list(rule_ids)
+    driver_rules = [{'id': rule_id,
+                     'shortDescription': {'text': RULES[rule_id].description},
+                     'defaultConfiguration': {'level': RULES[rule_id].level}} for rule_id in ids]
+    # 结果里的每个 ruleId 都要在 rules 里声明，否则有的 SARIF 工具会拒收或显示成未知规则
+    driver_rules.append({'id': PARSE_ERROR_RULE,
+                         'shortDescription': {'text': '文件无法读取或不是合法的 XML'},
+                         'defaultConfiguration': {'level': LEVEL_ERROR}})
+    results = []
+    for f in findings:
+        location = {'physicalLocation': {'artifactLocation': {'uri': f['path'].replace(os.sep, '/')}}}
+        if f['offset'] is not None:
+            location['physicalLocation']['region'] = {'byteOffset': f['offset']}
+        logical = [name for name in (f['graph'], f['node']) if name]
+        if logical:
+            location['logicalLocations'] = [{'fullyQualifiedName': '/'.join(logical)}]
+        results.append({'ruleId': f['rule'], 'level': f['level'],
+                        'message': {'text': f['message']}, 'locations': [location]})
+    return {
+        '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+        'version': '2.1.0',
+        'runs': [{'tool': {'driver': {'name': 'sbs_lint', 'rules': driver_rules}},
+                  'results': results}],
+    }
+
+
+def _parse_settings(items):
+    # --set output-resolution.expected="11 11"  ->  {'output-resolution': {'expected': '11 11'}}
+    settings = {}
+    for item in items or ():
+        key, sep, value = item.partition('=')
+        rule_id, dot, option = key.partition('.')
+        if not sep or not dot:
+            raise ValueError('--set 的格式应为 <规则id>.<参数>=<值>: %s' % item)
+        settings.setdefault(rule_id, {})[option] = value
+    return settings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='.sbs 包检查（单次流式读取，多规则）')
+    parser.add_argument('paths', nargs='*', help='.sbs 文件或目录')
+    parser.add_argument('--rules', help='逗号分隔的规则 id，默认全部启用')
+    parser.add_argument('--set', action='append', metavar='RULE.KEY=VALUE', help='修改规则参数')
+    parser.add_argument('--format', choices=('text', 'json', 'sarif'), default='text')
+    parser.add_argument('-o', '--output', help='结果写入文件，默认打印到屏幕')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fail-on', choices=(LEVEL_ERROR, LEVEL_WARNING, LEVEL_NOTE), default=LEVEL_ERROR,
+                        help='出现该级别及以上问题时返回非 0（CI 用）')
+    parser.add_argument('--list-rules', action='store_true', help='列出所有规则')
+    args = parser.parse_args(argv)
+
+    if args.list_rules:
+        for rule_id, cls in sorted(RULES.items()):
+            print('%-22s %-8s %s' % (rule_id, cls.level, cls.description))
+        return 0
+    rule_ids = args.rules.split(',') if args.rules else None
+    try:
+        settings = _parse_settings(args.set)
+        LintEngine(rule_ids, settings)  # 先在主进程里检查规则名和参数是否正确
+    except ValueError as e:
+        parser.error(str(e))
+
+    findings = lint_paths(iter_packages(args.paths), rule_ids, settings, args.workers)
+
+    if args.format == 'text':
+        lines = ['%s: %s [%s] %s%s' % (f['path'], f['level'], f['rule'],
+                                       ('%s: ' % f['graph']) if f['graph'] else '', f['message'])
+                 for f in findings]
+        lines.append('[sbs_lint] 共 %d 个问题' % len(findings))
+        text = '\n'.join(lines)
+    elif args.format == 'json':
+        text = json.dumps(findings, ensure_ascii=False, indent=1)
+    else:
+        text = json.dumps(to_sarif(findings, rule_ids), ensure_ascii=False, indent=1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    threshold = _LEVEL_ORDER[args.fail_on]
+    failed = any(_LEVEL_ORDER.get(f['level'], 2) >= threshold for f in findings)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""按字节范围就地修改 .sbs 里的属性值（MaxSDPlugins 计划：统一修改 frame 类的 A 值）
+
+批量改几个数字（比如所有 frame 的 GUI 颜色 alpha、某些 constantValueFloat4 的值）时，
+把整个包解析成 DOM 再写回去既慢，又会把无关的字节也改掉（属性顺序、转义、空白），
+版本管理里一看整个文件都变了。
+
+本工具的做法：
+1. 流式扫描一遍（expat），遇到要改的元素时，用 CurrentByteIndex 找到它的开始标签，
+   在原始字节里定位目标属性值的精确字节范围；
+2. 只替换这些字节范围，其他字节原样拷贝，所以输出除了改动处和原文件逐字节相同；
+3. 用 sbs_files.atomic_write 原子写入；值没有变化的文件不写。
+4. 文件里连目标标签都没有时直接跳过解析（一次 mmap 查找），多文件走进程池，
+   一分钟可以处理几千个包。
+
+选择器写法（从后往前匹配元素路径，不需要从根写起）：
+    frameData/color                     <frameData> 的直接子元素 <color>
+    GUIObject//color                    <GUIObject> 里任意深度的 <color>
+    paraminput/defaultValue/constantValueFloat4
+
+命令行用法：
+    python -m utilities.sbs_patch D:/Materials --frame-alpha 0.25
+    python -m utilities.sbs_patch a.sbs --set "paraminput/defaultValue/constantValueFloat4@v=1 1 1 1"
+    python -m utilities.sbs_patch D:/Materials --frame-alpha 0.25 --dry-run
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.parsers import expat
+
+from utilities.sbs_files import atomic_write, iter_packages
+from utilities.sbs_index import mapped_package
+from utilities.sbs_stream import DEFAULT_CHUNK_SIZE
+
+
+# frame（带框的注释）的颜色，v 属性是 "r g b a"。只有 frame 的 GUIObject 有 <frameData>，
+# 普通注释、pin 等其他 GUIObject 里的 <color> 不会被匹配到
+FRAME_COLOR_SELECTOR = 'GUIObject/frameData/color'
+
+STATUS_PATCHED = 'patched'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_FAILED = 'failed'
+
+
+class Patch(object):
+    """一条修改规则：哪些元素（selector）的哪个属性（attribute），怎么改（transform）。
+
+    transform 是可调用对象（SetValue / SetComponent 等）：传入旧值字符串，返回新值字符串；
+    返回 None 或原值表示这一处不改。
+    """
+
+    def __init__(self, selector, attribute, transform, description=None):
+        self.selector = selector
+        self.attribute = attribute
+        self.transform = transform
+        self.description = description or '%s@%s' % (selector, attribute)
+        segments = selector.split('//')
+        names = [segment.split('/') for segment in segments]
+        if not all(name for segment in names for name in segment):
+            raise ValueError('选择器格式错误: %r' % selector)
+        self.tag = names[-1][-1]
+        # 把选择器翻译成匹配 "a/b/c" 形式元素路径的正则
+        pattern = '(?:/[^/]+)*/'.join('/'.join(re.escape(n) for n in segment) for segment in names)
+        self._path_re = re.compile('(?:^|/)%s$' % pattern)
+        self._attr_re = re.compile(br'\s' + re.escape(attribute.encode('ascii'))
+                                   + br'\s*=\s*(["\'])(.*?)\1', re.S)
+
+    def matches(self, path):
+        return self._path_re.search(path) is not None
+
+
+class SetValue(object):
+    """transform：整个属性值换成 text。
+
+    transform 写成类而不是闭包，是为了能被 pickle 传给进程池（Windows 上子进程是 spawn 出来的）。
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def __call__(self, _old):
+        return self.text
+
+
+class SetComponent(object):
+    """transform：只换空格分隔的第 index 个分量（从 0 开始），例如 "r g b a" 的 alpha 是 3。"""
+
+    def __init__(self, index, text):
+        self.index = index
+        self.text = text
+
+    def __call__(self, old):
+        parts = old.split()
+        if self.index >= len(parts):
+            return None
+        parts[self.index] = self.text
+        return ' '.join(parts)
+
+
+def frame_alpha_patch(alpha):
+    """统一修改 frame 颜色的 A 值。"""
+    return Patch(FRAME_COLOR_SELECTOR, 'v', SetComponent(3, alpha), 'frame alpha = %s' % alpha)
+
+
+def _escape(text, quote):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return text.replace(quote, '&quot;' if quote == '"' else '&apos;')
+
+
+def find_spans(data, patches, chunk_size=DEFAULT_CHUNK_SIZE):
+    """流式扫描 data（bytes 或 mmap），返回需要替换的 [(start, end, 新字节), ...]，按位置排序。"""
+    by_tag = {}
+    for patch in patches:
+        by_tag.setdefault(patch.tag, []).append(patch)
+    spans = []
+    stack = []
+    parser = expat.ParserCreate()
+
+    def start_element(name, attrs):
+        stack.append(name)
+        candidates = by_tag.get(name)
+        if not candidates:
+            return
+        path = '/'.join(stack)
+        tag_start = parser.CurrentByteIndex
+        tag_end = data.find(b'>', tag_start)
+        for patch in candidates:
+            old = attrs.get(patch.attribute)
+            if old is None or not patch.matches(path):
+                continue
+            new = patch.transform(old)
+            if new is None or new == old:
+                continue
+            match = patch._attr_re.search(data, tag_start, tag_end)
+            if match is None:
+                continue
+            quote = match.group(1).decode('ascii')
+            spans.append((match.start(2), match.end(2), _escape(new, quote).encode('utf-8')))
+
+    def end_element(_name):
+        stack.pop()
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    try:
+        for offset in range(0, len(data), chunk_size):
+            parser.Parse(data[offset:offset + chunk_size], False)
+        parser.Parse(b'', True)
+    except expat.ExpatError as e:
+        raise ValueError('解析失败: %s' % e)
+    spans.sort()
+    return spans
+
+
+def apply_spans(data, spans):
+    """把 spans 替换进 data，其余字节原样保留。"""
+    pieces = []
+    cursor = 0
+    for start, end, new in spans:
+        pieces.append(data[cursor:start])
+        pieces.append(new)
+        cursor = end
+    pieces.append(data[cursor:])
+    return b''.join(pieces)
+
+
+def patch_file(path, patches, dry_run=False):
+    """修改一个包，返回替换的位置数；0 表示没有需要改的地方（文件不会被写）。"""
+    with mapped_package(path) as data:
+        # 连目标标签都没有的文件不用解析
+        if not any(data.find(b'<' + patch.tag.encode('ascii')) >= 0 for patch in patches):
+            return 0
+        spans = find_spans(data, patches)
+        if not spans or dry_run:
+            return len(spans)
+        patched = apply_spans(data, spans)
+    # mmap 关闭之后再替换文件（Windows 上被映射的文件不能被 os.replace 覆盖）
+    atomic_write(path, patched)
+    return len(spans)
+
+
+_worker_patches = None
+
+
+def _init_worker(patches):
+    global _worker_patches
+    _worker_patches = patches
+
+
+def _run_one(path, dry_run):
+    try:
+        count = patch_file(path, _worker_patches, dry_run)
+    except (OSError, ValueError) as e:
+        return path, STATUS_FAILED, 0, str(e)
+    return path, STATUS_PATCHED if count else STATUS_UNCHANGED, count, ''
+
+
+def run_batch(paths, patches, workers=None, dry_run=False, progress=True):
+    """并行修改所有包，返回 {状态: 数量}。只打印有改动或失败的文件。"""
+    paths = list(paths)
+    counts = {STATUS_PATCHED: 0, STATUS_UNCHANGED: 0, STATUS_FAILED: 0}
+    if not paths:
+        return counts
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    replaced = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(patches,)) as pool:
+        futures = [pool.submit(_run_one, path, dry_run) for path in paths]
+        for future in as_completed(futures):
+            path, status, count, message = future.result()
+            counts[status] += 1
+            replaced += count
+            if progress and status != STATUS_UNCHANGED:
+                print('%-9s %s  %s' % (status, path, message or '%d 处' % count))
+    elapsed = time.perf_counter() - started
+    if progress:
+        print('[sbs_patch] %d 个文件, 替换 %d 处, 用时 %.2fs (%.0f 文件/分钟), %d 进程: %s%s'
+              % (len(paths), replaced, elapsed, len(paths) * 60.0 / max(elapsed, 1e-6), workers,
+                 ', '.join('%s=%d' % item for item in sorted(counts.items())),
+                 '（dry-run，未写入）' if dry_run else ''))
+    return counts
+
+
+def _parse_set(text):
+    # "selector@attr=value"
+    target, sep, value = text.partition('=')
+    selector, at, attribute = target.partition('@')
+    if not sep or not at or not selector or not attribute:
+        raise argparse.ArgumentTypeError('格式应为 SELECTOR@ATTR=VALUE: %r' % text)
+    try:
+        return Patch(selector, attribute, SetValue(value), '%s = %s' % (target, value))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按字节范围就地修改 .sbs 属性值')
+    parser.add_argument('paths', nargs='+', help='.sbs 文件或目录')
+    parser.add_argument('--frame-alpha', metavar='A', help='统一设置 frame 颜色的 alpha，例如 0.25')
+    parser.add_argument('--set', dest='sets', action='append', default=[], type=_parse_set,
+                        metavar='SELECTOR@ATTR=VALUE', help='把匹配元素的属性设为 VALUE，可重复')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认等于 CPU 核数')
+    parser.add_argument('--dry-run', action='store_true', help='只统计会改几处，不写文件')
+    args = parser.parse_args(argv)
+
+    patches = list(args.sets)
+    if args.frame_alpha is not None:
+        patches.append(frame_alpha_patch(args.frame_alpha))
+    if not patches:
+        parser.error('至少需要 --frame-alpha 或 --set 之一')
+    counts = run_batch(iter_packages(args.paths), patches, args.workers, args.dry_run)
+    return 1 if counts[STATUS_FAILED] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
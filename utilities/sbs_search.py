@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""整个包库的倒排索引 + 查询命令行：节点定义、曝光参数、依赖、graph 在哪里被用到
+
+日常的问题，比如：
+    哪些包实例化了 rgba_merge.sbs？
+    哪些 graph 曝光了 hue 参数？
+    sbs::compositing::uniform 在哪里被设成了 alpha = 0？
+以前只能在几个 G 的单行 XML 里 grep。本工具把库里每个包流式扫描一遍，
+建立“词 -> 出现位置（包、graph、节点）”的倒排索引，存进库根目录的 SQLite 文件 .sbs_search.sqlite：
+
+- terms 表是词典：(字段, 值) -> 整数 id，比如 ('def', 'sbs::compositing::uniform')、('param', 'hue')。
+- postings 表是倒排表：(词 id, 包 id, graph, 节点 uid, 附加值)，按 (词 id, 包 id) 建索引。
+  查询时先在词典里按值（或通配符）找到词 id，再按索引取出倒排表，和包的数量无关。
+
+字段：
+    def       节点定义：原子节点是 sbs::compositing::xxx，实例节点是 pkg:///rgba_merge（去掉 ?dependency=）
+    instance  实例节点引用的依赖文件名（小写，只取文件名，比如 rgba_merge.sbs）
+    dep       包声明的依赖文件名（同上；附加值是完整的 filename）
+    param     曝光参数 identifier（附加值是标签）
+    output    graph 输出 identifier（附加值是 Usage）
+    graph     graph identifier
+    value     节点参数：“定义#参数名”，附加值是参数值文本，用 --where 按值过滤
+
+和 duplicate_subgraphs 一样：扫描走进程池，只有 mtime / 大小变化的包才重新扫描，删除的包移出索引。
+
+命令行用法：
+    python -m utilities.sbs_search D:/Materials --instance rgba_merge.sbs
+    python -m utilities.sbs_search D:/Materials --param hue --packages
+    python -m utilities.sbs_search D:/Materials --node sbs::compositing::uniform --where "outputcolor.a=0"
+    python -m utilities.sbs_search D:/Materials --node "*::blend" --count --no-update
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities.sbs_files import iter_packages
+from utilities.sbs_stream import iter_events, parse_dependency_uid
+
+
+DB_NAME = '.sbs_search.sqlite'
+DB_VERSION = 1
+FIELDS = ('def', 'instance', 'dep', 'param', 'output', 'graph', 'value')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS packages (id INTEGER PRIMARY KEY, path TEXT UNIQUE, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, field TEXT, value TEXT, UNIQUE (field, value));
+CREATE TABLE IF NOT EXISTS postings (term INTEGER, package INTEGER, graph TEXT, node TEXT, detail TEXT);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (term, package);
+CREATE INDEX IF NOT EXISTS postings_package ON postings (package);
+"""
+
+Hit = namedtuple('Hit', 'path graph node field term detail')
+
+
+def dependency_name(filename):
+    """sbs://../Library/RGBA_Merge.sbs -> rgba_merge.sbs：只比较文件名，不区分大小写（Windows 习惯）。"""
+    name = filename.split('://', 1)[-1].replace('\\', '/')
+    return name.rsplit('/', 1)[-1].lower()
+
+
+def scan_package(path):
+    """流式读取一个包，返回倒排记录 [(字段, 值, graph, 节点 uid, 附加值), ...]。"""
+    rows = []
+    dependencies = {}
+    kinds = {'dependency', 'graph_start', 'paraminput', 'graphoutput', 'compnode'}
+    for event in iter_events(path, kinds=kinds):
+        kind = event.kind
+        if kind == 'compnode':
+            graph, node = event.graph, event.uid
+            definition = event.definition or ''
+            dep_uid = parse_dependency_uid(definition)
+            if dep_uid is not None:
+                definition = definition.split('?', 1)[0]
+                if dep_uid in dependencies:
+                    rows.append(('instance', dependency_name(dependencies[dep_uid]), graph, node,
+                                 dependencies[dep_uid]))
+            rows.append(('def', definition, graph, node, None))
+            for name, (_tag, value) in event.params.items():
+                rows.append(('value', '%s#%s' % (definition, name), graph, node, value))
+        elif kind == 'paraminput':
+            rows.append(('param', event.identifier, event.graph, event.uid, event.label))
+        elif kind == 'graphoutput':
+            usages = ' '.join('%s:%s' % usage for usage in event.usages)
+            rows.append(('output', event.identifier, event.graph, event.uid, usages or None))
+        elif kind == 'graph_start':
+            rows.append(('graph', event.identifier, event.identifier, event.uid, None))
+        else:
+            dependencies[event.uid] = event.filename
+            rows.append(('dep', dependency_name(event.filename), '', event.uid, event.filename))
+    return rows
+
+
+def _scan_job(args):
+    # 进程池里运行：出错时返回错误信息而不是抛异常，避免一个坏文件中断整批
+    rel_path, abs_path = args
+    try:
+        st = os.stat(abs_path)
+        return rel_path, st.st_mtime_ns, st.st_size, scan_package(abs_path), None
+    except (OSError, ValueError) as e:
+        return rel_path, None, None, None, str(e)
+
+
+# ----------------------------------------------------------------------
+# --where 条件：参数名[.分量] 运算符 值
+# ----------------------------------------------------------------------
+_WHERE = re.compile(r'^\s*([\w]+)(?:\.([rgbaxyzw]))?\s*(==|=|!=|<=|>=|<|>)\s*(.*?)\s*$')
+_COMPONENTS = {'r': 0, 'g': 1, 'b': 2, 'a': 3, 'x': 0, 'y': 1, 'z': 2, 'w': 3}
+_COMPARE = {
+    '=': lambda a, b: a == b, '==': lambda a, b: a == b, '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b, '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+}
+
+
+def parse_where(text):
+    """把 "outputcolor.a=0" 解析成 (参数名, 判断函数)。判断函数接收参数值文本，返回 True / False。
+
+    值是数字时按数字比较（"1" 和 "1.0" 相等），否则按文本比较；.r/.g/.b/.a（或 .x/.y/.z/.w）取向量的一个分量。
+    动态值（函数图驱动的参数）没有常量文本，永远不匹配。
+    """
+    match = _WHERE.match(text)
+    if not match:
+        raise ValueError('无法解析条件 %r，应写成 参数名[.分量] 运算符 值，如 outputcolor.a=0' % text)
+    name, component, op, expected = match.groups()
+    compare = _COMPARE[op]
+    index = _COMPONENTS[component] if component else None
+    try:
+        number = float(expected)
+    except ValueError:
+        number = None
+        if op not in ('=', '==', '!='):
+            raise ValueError('%s 只能用于数字' % op)
+
+    def predicate(value):
+        if value is None:
+            return False
+        if index is not None:
+            parts = value.split()
+            if index >= len(parts):
+                return False
+            value = parts[index]
+        if number is not None:
+            try:
+                return compare(float(value), number)
+            except ValueError:
+                return False
+        return compare(value, expected)
+
+    return name, predicate
+
+
+def _is_pattern(value):
+    return any(c in value for c in '*?[')
+
+
+class SearchIndex(object):
+    """持久化的倒排索引（SQLite）。"""
+
+    def __init__(self, root, db_path=None):
+        self.root = os.path.abspath(root)
+        self.db_path = db_path or os.path.join(self.root, DB_NAME)
+        self.db = sqlite3.connect(self.db_path)
+        self.db.executescript(_SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != DB_VERSION:
+            # 记录的字段变了，旧数据全部作废
+            self.db.executescript('DELETE FROM packages; DELETE FROM terms; DELETE FROM postings;')
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(DB_VERSION),))
+            self.db.commit()
+        self._terms = None
+
+    def close(self):
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+    def update(self, workers=None):
+        """同步磁盘上的包：新增 / 变化的重新扫描，删除的移出索引。
+
+        返回 (重新扫描数, 未变化数, 删除数, [(路径, 错误), ...])
+        """
+        known = {path: (mtime_ns, size) for path, mtime_ns, size
+                 in self.db.execute('SELECT path, mtime_ns, size FROM packages')}
+        seen = set()
+        jobs = []
+        unchanged = 0
+        for abs_path in iter_packages([self.root]):
+            rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, '/')
+            seen.add(rel_path)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            if known.get(rel_path) == (st.st_mtime_ns, st.st_size):
+                unchanged += 1
+                continue
+            jobs.append((rel_path, abs_path))
+
+        removed = [path for path in known if path not in seen]
+        with self.db:
+            for rel_path in removed:
+                self._forget(rel_path)
+
+        errors = []
+        if len(jobs) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self._store_results(pool.map(_scan_job, jobs, chunksize=16), errors)
+        else:
+            self._store_results((_scan_job(job) for job in jobs), errors)
+        return len(jobs) - len(errors), unchanged, len(removed), errors
+
+    def _forget(self, rel_path):
+        row = self.db.execute('SELECT id FROM packages WHERE path = ?', (rel_path,)).fetchone()
+        if row is not None:
+            self.db.execute('DELETE FROM postings WHERE package = ?', row)
+            self.db.execute('DELETE FROM packages WHERE id = ?', row)
+
+    def _term_id(self, field, value):
+        if self._terms is None:
+            self._terms = {(f, v): i for i, f, v in self.db.execute('SELECT id, field, value FROM terms')}
+        key = (field, value)
+        term = self._terms.get(key)
+        if term is None:
+            term = self.db.execute('INSERT INTO terms (field, value) VALUES (?, ?)', key).lastrowid
+            self._terms[key] = term
+        return term
+
+    def _store_results(self, results, errors):
+        # 一边收结果一边写库，每 200 个包提交一次，中途中断时已完成的部分不会丢
+        pending = 0
+        for rel_path, mtime_ns, size, rows, error in results:
+            self._forget(rel_path)
+            if error is not None:
+                errors.append((rel_path, error))
+            else:
+                package = self.db.execute('INSERT INTO packages (path, mtime_ns, size) VALUES (?, ?, ?)',
+                                          (rel_path, mtime_ns, size)).lastrowid
+                term_id = self._term_id
+                self.db.executemany('INSERT INTO postings VALUES (?, ?, ?, ?, ?)',
+                                    ((term_id(field, value), package, graph, node, detail)
+                                     for field, value, graph, node, detail in rows))
+            pending += 1
+            if pending >= 200:
+                self.db.commit()
+                pending = 0
+        self.db.commit()
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def terms(self, field, pattern):
+        """词典里匹配的词：[(id, 值), ...]。pattern 可以带 * ? [] 通配符（区分大小写）。"""
+        if field not in FIELDS:
+            raise ValueError('未知字段 %s，可选: %s' % (field, ', '.join(FIELDS)))
+        if field in ('dep', 'instance'):
+            pattern = dependency_name(pattern)
+        op = 'GLOB' if _is_pattern(pattern) else '='
+        return self.db.execute('SELECT id, value FROM terms WHERE field = ? AND value %s ?' % op,
+                               (field, pattern)).fetchall()
+
+    def search(self, field, pattern, where=None, packages=None, limit=None):
+        """逐条返回命中的 Hit。
+
+        where 是 parse_where 的结果，只对 value 字段有意义（pattern 是“定义#参数名”）；
+        packages 是包路径集合，只返回这些包里的命中（用于多个条件取交集）。
+        """
+        terms = dict(self.terms(field, pattern))
+        if not terms:
+            return
+        predicate = where[1] if where else None
+        query = ('SELECT packages.path, graph, node, term, detail FROM postings '
+                 'JOIN packages ON packages.id = postings.package WHERE term IN (%s) ORDER BY term, package'
+                 % ','.join('?' * len(terms)))
+        count = 0
+        for path, graph, node, term, detail in self.db.execute(query, list(terms)):
+            if packages is not None and path not in packages:
+                continue
+            if predicate is not None and not predicate(detail):
+                continue
+            yield Hit(path, graph, node, field, terms[term], detail)
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+    def package_counts(self, field, pattern):
+        """{包路径: 命中次数}，只走索引不取附加值，适合很宽的词（比如所有 blend 节点）。"""
+        terms = [term for term, _value in self.terms(field, pattern)]
+        if not terms:
+            return {}
+        query = ('SELECT packages.path, COUNT(*) FROM postings JOIN packages ON packages.id = postings.package '
+                 'WHERE term IN (%s) GROUP BY package' % ','.join('?' * len(terms)))
+        return dict(self.db.execute(query, terms).fetchall())
+
+    def stats(self):
+        return {'packages': self.db.execute('SELECT COUNT(*) FROM packages').fetchone()[0],
+                'terms': self.db.execute('SELECT COUNT(*) FROM terms').fetchone()[0],
+                'postings': self.db.execute('SELECT COUNT(*) FROM postings').fetchone()[0]}
+
+
+def build_queries(args):
+    """命令行参数 -> [(字段, 模式, where), ...]，多个条件按包取交集。"""
+    queries = []
+    for field, attr in (('instance', 'instance'), ('dep', 'dependency'), ('param', 'param'),
+                        ('output', 'output'), ('graph', 'graph')):
+        for pattern in getattr(args, attr) or ():
+            queries.append((field, pattern, None))
+    for text in args.term or ():
+        field, sep, pattern = text.partition('=')
+        if not sep:
+            raise ValueError('--term 应写成 字段=值: %r' % text)
+        queries.append((field, pattern, None))
+    # 节点参数条件放在最后：它们要落在同一个节点上，而不只是同一个包里
+    if args.where:
+        for text in args.where:
+            where = parse_where(text)
+            queries.append(('value', '%s#%s' % (args.node or '*', where[0]), where))
+    elif args.node:
+        queries.append(('def', args.node, None))
+    return queries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='包库倒排索引：查节点定义、参数、依赖、graph 在哪里被用到')
+    parser.add_argument('root', help='包库根目录')
+    parser.add_argument('--db', help='索引路径，默认 <root>/%s' % DB_NAME)
+    parser.add_argument('--workers', type=int, default=None, help='重新扫描时的进程数')
+    parser.add_argument('--no-update', action='store_true', help='不同步磁盘，直接查询现有索引')
+    parser.add_argument('--instance', action='append', metavar='FILE', help='实例化了这个依赖的节点，如 rgba_merge.sbs')
+    parser.add_argument('--dependency', action='append', metavar='FILE', help='声明了这个依赖的包')
+    parser.add_argument('--param', action='append', metavar='ID', help='曝光了这个参数的 graph')
+    parser.add_argument('--output', action='append', metavar='ID', help='有这个输出的 graph')
+    parser.add_argument('--graph', action='append', metavar='ID', help='有这个 identifier 的 graph')
+    parser.add_argument('--node', metavar='DEFINITION', help='节点定义，如 sbs::compositing::uniform 或 "*::blend"')
+    parser.add_argument('--where', action='append', metavar='COND', help='节点参数值条件，如 "outputcolor.a=0"')
+    parser.add_argument('--term', action='append', metavar='FIELD=VALUE', help='直接按字段查询：%s' % ', '.join(FIELDS))
+    parser.add_argument('--packages', action='store_true', help='只列出包和命中次数')
+    parser.add_argument('--count', action='store_true', help='只输出命中总数')
+    parser.add_argument('--limit', type=int, default=200, help='最多列出多少条命中')
+    args = parser.parse_args(argv)
+
+    try:
+        queries = build_queries(args)
+    except ValueError as e:
+        print('[sbs_search] %s' % e)
+        return 2
+    index = SearchIndex(args.root, args.db)
+    try:
+        errors = []
+        if not args.no_update:
+            started = time.perf_counter()
+            rescanned, unchanged, removed, errors = index.update(args.workers)
+            print('[sbs_search] 重新扫描 %d, 未变化 %d, 已删除 %d, 用时 %.2fs'
+                  % (rescanned, unchanged, removed, time.perf_counter() - started))
+            for rel_path, error in errors:
+                print('[sbs_search] 扫描失败 %s: %s' % (rel_path, error))
+        if not queries:
+            stats = index.stats()
+            print('[sbs_search] %(packages)d 个包, %(terms)d 个词, %(postings)d 条倒排记录' % stats)
+            return 1 if errors else 0
+
+        started = time.perf_counter()
+        try:
+            # 多个条件：先按包取交集（参数值条件按节点取交集），再列出最后一个条件在这些包里的命中
+            packages = nodes = None
+            for field, pattern, where in queries[:-1]:
+                if where:
+                    found = {(hit.path, hit.graph, hit.node) for hit in index.search(field, pattern, where)}
+                    nodes = found if nodes is None else nodes & found
+                    found = {key[0] for key in found}
+                else:
+                    found = set(index.package_counts(field, pattern))
+                packages = found if packages is None else packages & found
+            field, pattern, where = queries[-1]
+            if (args.packages or args.count) and where is None:
+                counts = index.package_counts(field, pattern)
+                if packages is not None:
+                    counts = {path: n for path, n in counts.items() if path in packages}
+                hits = None
+            else:
+                limit = None if args.packages or args.count else args.limit
+                hits = index.search(field, pattern, where, packages, None if nodes else limit)
+                if nodes is not None:
+                    hits = (hit for hit in hits if (hit.path, hit.graph, hit.node) in nodes)
+                hits = list(hits)[:limit]
+                counts = {}
+                for hit in hits:
+                    counts[hit.path] = counts.get(hit.path, 0) + 1
+        except ValueError as e:
+            print('[sbs_search] %s' % e)
+            return 2
+        elapsed = time.perf_counter() - started
+
+        if args.packages:
+            for path, n in sorted(counts.items()):
+                print('%6d  %s' % (n, path))
+        elif not args.count:
+            for hit in hits:
+                detail = '  %s' % hit.detail if hit.detail else ''
+                print('%s :: %s  %s  %s=%s%s' % (hit.path, hit.graph or '-', hit.node, hit.field, hit.term, detail))
+            if len(hits) >= args.limit:
+                print('...（只列出前 %d 条，用 --limit 调整）' % args.limit)
+        print('[sbs_search] %d 条命中, %d 个包, 查询用时 %.1f ms'
+              % (sum(counts.values()), len(counts), elapsed * 1000))
+    finally:
+        index.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""材质变体批量生成（模板编译 + 填槽，不经过 SD）
+
+README 里的“Generating variations of existing materials”，在 SD 里的写法是
+Part1 示例那样对每个节点 setPropertyValue(SDValueFloat.sNew(...))，生成 1 万个变体要好几个小时。
+
+这里把问题变成纯字节操作：
+1. 编译（一次）：流式读取基础包，找出每个曝光参数（paraminput）默认值 <constantValueXXX v="..."/>
+   里 v 属性值的字节范围（“槽”），把包切成 “固定片段 + 槽 + 固定片段 + 槽 ...”。
+   图像输入（彩色 / 灰度）的默认值只是占位，不算可填的参数。包自己的 <fileUID> 也是一个槽。
+2. 生成（N 次）：每个变体 = 按参数表的一行把槽填上新值，再把片段拼起来写成新包。
+   每个变体都有自己的 fileUID（由基础包的 fileUID 和输出文件名算出，重新生成同一个变体时不变），
+   否则 SD 会把所有变体当成同一个包。
+   不需要解析 XML，单个变体的耗时基本就是写文件的耗时。
+3. 参数表是 CSV（表头是参数 identifier）或 NumPy 数组（.npy，结构化数组的字段名是 identifier；
+   普通二维数组用 --columns 指定列名）。参数表按块读取、按块分给进程池，
+   同时在途的块数有上限，所以内存占用和变体总数无关。
+
+表头写法：
+    hue,saturation,luminosity            只有一个 graph 有这些参数时，直接写 identifier
+    processor/hue                        多个 graph 有同名参数时，写 graph/identifier
+    basecolor                            多分量参数的单元格写 "r g b a"（空格分隔）
+    name                                 可选，输出文件名（不含扩展名）；不写则用 基础包名_行号
+单元格留空表示这一行保留默认值。输出文件名（不区分大小写）和前面的行重复时，这一行算失败，不会覆盖。
+
+命令行用法：
+    python -m utilities.sbs_variations SDFiles/Bilibili_HuangJuanLr/BatchMergeGraphSample.sbs variants.csv -o out/
+    python -m utilities.sbs_variations base.sbs table.npy --columns hue,saturation,luminosity -o out/
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from utilities.sbs_index import mapped_package
+from utilities.sbs_stream import IMAGE_PARAM_TYPES, iter_events
+
+
+NAME_COLUMN = 'name'
+ROWS_PER_TASK = 256
+
+_DEFAULT_VALUE_RE = re.compile(br'<defaultValue><(constantValue\w+) v="([^"]*)"')
+# 包自己的 fileUID 在 <dependencies> / <content> 之前；依赖里的 fileUID 不算
+_FILE_UID_RE = re.compile(br'<fileUID v="([^"]*)"')
+_HEADER_END_RE = re.compile(br'<dependencies|<content')
+_COMPONENTS_RE = re.compile(r'(\d+)$')
+
+
+class Slot(object):
+    """一个可填的槽：某个 paraminput 默认值的 v 属性。"""
+
+    __slots__ = ('graph', 'identifier', 'tag', 'components', 'default')
+
+    def __init__(self, graph, identifier, tag, default):
+        self.graph = graph
+        self.identifier = identifier
+        self.tag = tag
+        match = _COMPONENTS_RE.search(tag)
+        self.components = int(match.group(1)) if match and 'String' not in tag else 1
+        self.default = default
+
+    def format(self, value):
+        """把一个参数值（数字、序列或字符串）格式化成 v 属性的文本。值不合法时抛出 ValueError。"""
+        if isinstance(value, str):
+            parts = value.split() if 'String' not in self.tag else [value]
+        elif hasattr(value, '__len__'):
+            parts = list(value)
+        else:
+            parts = [value]
+        if 'String' in self.tag:
+            return _escape(str(parts[0]))
+        if len(parts) != self.components:
+            raise ValueError('参数 %s 需要 %d 个分量，得到 %r' % (self.identifier, self.components, value))
+        if 'Float' in self.tag:
+            return ' '.join('%.9g' % float(p) for p in parts)
+        if 'Bool' in self.tag:
+            return ' '.join('1' if _truthy(p) else '0' for p in parts)
+        return ' '.join('%d' % int(float(p)) for p in parts)
+
+
+def _escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+
+def _truthy(value):
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no')
+    return bool(value)
+
+
+class VariationTemplate(object):
+    """编译好的模板：pieces 比 slots 多一个，变体 = pieces[0] + 值0 + pieces[1] + 值1 + ...
+
+    uid_slot 是包 fileUID 所在的槽下标（没有时为 None），它不对应参数表的列。
+    只保存 bytes 和少量元数据，可以直接传给子进程。
+    """
+
+    def __init__(self, name, pieces, slots, uid_slot=None):
+        self.name = name
+        self.pieces = pieces
+        self.slots = slots
+        self.uid_slot = uid_slot
+        self.columns = {}
+        counts = {}
+        params = [(i, slot) for i, slot in enumerate(slots) if i != uid_slot]
+        for i, slot in params:
+            self.columns['%s/%s' % (slot.graph, slot.identifier)] = i
+            counts[slot.identifier] = counts.get(slot.identifier, 0) + 1
+        for i, slot in params:
+            if counts[slot.identifier] == 1:
+                self.columns[slot.identifier] = i
+
+    @classmethod
+    def compile(cls, package_path):
+        """流式读取基础包，找出包的 fileUID 和所有（非图像）paraminput 默认值的字节槽。"""
+        pieces = []
+        slots = []
+        cursor = 0
+        uid_slot = None
+        with mapped_package(package_path) as data:
+            header = _HEADER_END_RE.search(data)
+            match = _FILE_UID_RE.search(data, 0, header.start() if header else len(data))
+            if match is not None:
+                pieces.append(data[cursor:match.start(1)])
+                uid_slot = len(slots)
+                slots.append(Slot(None, 'fileUID', 'fileUID', match.group(1).decode('utf-8')))
+                cursor = match.end(1)
+            for event in iter_events(package_path, kinds={'paraminput'}):
+                if event.param_type in IMAGE_PARAM_TYPES:
+                    continue
+                match = _DEFAULT_VALUE_RE.search(data, event.start, event.end)
+                if match is None:
+                    continue
+                tag = match.group(1).decode('ascii')
+                pieces.append(data[cursor:match.start(2)])
+                slots.append(Slot(event.graph, event.identifier, tag, match.group(2).decode('utf-8')))
+                cursor = match.end(2)
+            pieces.append(data[cursor:])
+        name = os.path.splitext(os.path.basename(package_path))[0]
+        return cls(name, pieces, slots, uid_slot)
+
+    def bind(self, columns):
+        """把参数表的列名换成槽下标；未知列名抛出 ValueError。name 列返回 None。"""
+        indices = []
+        for column in columns:
+            if column == NAME_COLUMN:
+                indices.append(None)
+            elif column in self.columns:
+                indices.append(self.columns[column])
+            else:
+                raise ValueError('基础包里没有曝光参数 %r，可用的有: %s'
+                                 % (column, ', '.join(sorted(self.columns))))
+        return indices
+
+    def variant_uid(self, filename):
+        """变体的 fileUID：由基础包的 fileUID 和输出文件名确定，格式和 SD 一样带花括号。"""
+        base = self.slots[self.uid_slot].default if self.uid_slot is not None else self.name
+        return '{%s}' % uuid.uuid5(uuid.NAMESPACE_URL, '%s/%s' % (base, filename))
+
+    def render(self, values, filename=None):
+        """values: {槽下标: 已格式化的文本}，返回变体包的 bytes。给出 filename 时换上变体自己的 fileUID。"""
+        if filename is not None and self.uid_slot is not None:
+            values = dict(values)
+            values[self.uid_slot] = self.variant_uid(filename)
+        pieces = self.pieces
+        out = [pieces[0]]
+        for i, slot in enumerate(self.slots):
+            text = values.get(i)
+            out.append(text.encode('utf-8') if text is not None else slot.default.encode('utf-8'))
+            out.append(pieces[i + 1])
+        return b''.join(out)
+
+
+# ----------------------------------------------------------------------
+# 参数表读取（按块）
+# ----------------------------------------------------------------------
+def iter_csv_chunks(path, chunk_size=ROWS_PER_TASK):
+    """产出 (列名列表, [行, ...])，每块 chunk_size 行，行是单元格列表。"""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        columns = [c.strip() for c in next(reader)]
+        chunk = []
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield columns, chunk
+                chunk = []
+        if chunk:
+            yield columns, chunk
+
+
+def iter_numpy_chunks(path, columns=None, chunk_size=ROWS_PER_TASK):
+    """读取 .npy（mmap 方式，不整个读进内存），产出和 iter_csv_chunks 一样的块。"""
+    try:
+        import numpy
+    except ImportError:
+        raise ValueError('读取 .npy 参数表需要安装 numpy')
+    table = numpy.load(path, mmap_mode='r')
+    if table.dtype.names:
+        names = list(table.dtype.names)
+        for start in range(0, len(table), chunk_size):
+            block = table[start:start + chunk_size]
+            yield names, [[row[name] for name in names] for row in block]
+        return
+    if table.ndim != 2 or not columns or len(columns) != table.shape[1]:
+        raise ValueError('普通二维数组需要用 --columns 给出 %s 个列名'
+                         % (table.shape[1] if table.ndim == 2 else '与列数相同'))
+    for start in range(0, len(table), chunk_size):
+        yield columns, table[start:start + chunk_size].tolist()
+
+
+# ----------------------------------------------------------------------
+# 生成
+# ----------------------------------------------------------------------
+_worker_template = None
+
+
+def _init_worker(template):
+    global _worker_template
+    _worker_template = template
+
+
+def variant_filenames(template, columns, rows, first_row):
+    """每一行的输出文件名：name 列的值，没有就用 基础包名_行号。"""
+    try:
+        name_column = columns.index(NAME_COLUMN)
+    except ValueError:
+        name_column = None
+    filenames = []
+    for offset, row in enumerate(rows):
+        name = None
+        if name_column is not None and name_column < len(row):
+            name = os.path.basename(str(row[name_column]).strip())
+        filenames.append((name or '%s_%05d' % (template.name, first_row + offset)) + '.sbs')
+    return filenames
+
+
+def _render_chunk(args):
+    """子进程里运行：生成一块变体并写盘，返回 (成功数, [(行号, 错误), ...])。
+
+    filenames 和 rows 一一对应，主进程已经去掉了重名的行（对应位置为 None）。
+    """
+    out_dir, columns, first_row, rows, filenames = args
+    template = _worker_template
+    indices = template.bind(columns)
+    written = 0
+    errors = []
+    for offset, (row, filename) in enumerate(zip(rows, filenames)):
+        if filename is None:
+            continue
+        row_number = first_row + offset
+        values = {}
+        try:
+            for index, cell in zip(indices, row):
+                if index is None or (isinstance(cell, str) and not cell.strip()):
+                    continue
+                values[index] = template.slots[index].format(cell)
+            # 输出都是新文件，直接写；不用 atomic_write，省掉每个文件一次 fsync
+            with open(os.path.join(out_dir, filename), 'wb') as f:
+                f.write(template.render(values, filename))
+            written += 1
+        except (OSError, ValueError, TypeError) as e:
+            errors.append((row_number, str(e)))
+    return written, errors
+
+
+def generate(template, chunks, out_dir, workers=None, progress=True):
+    """按参数表的块并行生成变体，返回 (成功数, [(行号, 错误), ...], 用时秒)。
+
+    同时在途的块数不超过 workers * 2，参数表再大内存也不会涨（只多记一份已用的文件名）。
+    输出文件名重复的行记为失败，不会覆盖前面的变体。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    written = 0
+    errors = []
+    in_flight = []
+    first_row = 0
+    used = {}                       # 小写文件名 -> 第一次出现的行号（Windows 上文件名不区分大小写）
+
+    def collect(future):
+        nonlocal written
+        count, chunk_errors = future.result()
+        written += count
+        errors.extend(chunk_errors)
+        if progress:
+            elapsed = time.perf_counter() - started
+            print('[sbs_variations] 已生成 %d 个变体, %.0f 个/秒' % (written, written / max(elapsed, 1e-6)))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template,)) as pool:
+        for columns, rows in chunks:
+            if first_row == 0:
+                template.bind(columns)      # 先在主进程里检查列名，出错立即停止
+            filenames = variant_filenames(template, columns, rows, first_row)
+            for offset, filename in enumerate(filenames):
+                row_number = first_row + offset
+                previous = used.setdefault(filename.lower(), row_number)
+                if previous != row_number:
+                    errors.append((row_number, '输出文件名 %s 和第 %d 行重复' % (filename, previous)))
+                    filenames[offset] = None
+            in_flight.append(pool.submit(_render_chunk, (out_dir, columns, first_row, rows, filenames)))
+            first_row += len(rows)
+            if len(in_flight) >= workers * 2:
+                collect(in_flight.pop(0))
+        for future in in_flight:
+            collect(future)
+    return written, errors, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='按参数表批量生成材质变体包')
+    parser.add_argument('base', help='基础 .sbs 包')
+    parser.add_argument('table', nargs='?', help='参数表：.csv 或 .npy')
+    parser.add_argument('-o', '--output', default='variants', help='输出目录')
+    parser.add_argument('--columns', help='.npy 普通二维数组的列名，逗号分隔')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认等于 CPU 核数')
+    parser.add_argument('--list', action='store_true', help='只列出基础包里可填的参数')
+    args = parser.parse_args(argv)
+
+    try:
+        template = VariationTemplate.compile(args.base)
+    except (OSError, ValueError) as e:
+        print('[sbs_variations] 基础包读取失败: %s' % e)
+        return 1
+    if args.list or not args.table:
+        for column, index in sorted(template.columns.items()):
+            slot = template.slots[index]
+            print('%-30s %-22s 默认 %s' % (column, slot.tag, slot.default))
+        return 0
+
+    if args.table.lower().endswith('.npy'):
+        columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+        chunks = iter_numpy_chunks(args.table, columns)
+    else:
+        chunks = iter_csv_chunks(args.table)
+    try:
+        written, errors, elapsed = generate(template, chunks, args.output, args.workers)
+    except (OSError, ValueError) as e:
+        print('[sbs_variations] 生成失败: %s' % e)
+        return 1
+    for row_number, error in errors[:20]:
+        print('[sbs_variations] 第 %d 行失败: %s' % (row_number, error))
+    print('[sbs_variations] 共 %d 个变体写入 %s, 失败 %d, 用时 %.2fs, %.0f 个/秒'
+          % (written, args.output, len(errors), elapsed, written / max(elapsed, 1e-6)))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,599 @@
+# -*- coding: utf-8 -*-
+"""Designer 日志分析：把多行 traceback 合并成一条错误，跨机器去重，提取插件加载 / 失败事件
+
+SD 的日志（log.txt）每行一条消息，格式是 [级别][序号][频道]内容（见 docs/报错查看方法,md）：
+    [MSG][904][Python]Loaded plugin 'node_align_tools'
+    [ERR][905][Python]Traceback (most recent call last):
+    [ERR][909][Python]  File "C:/.../sdplugins\\PluginBasics.py", line 10, in <module>
+    [ERR][911][Python]from sd.api.uimgr import SDUIMgr  # 用于操作UI
+    [ERR][915][Python]ModuleNotFoundError
+    [ERR][917][Python]No module named 'sd.api.uimgr'
+    [WRN][918][Python]Failed to load plugin 'PluginBasics', error: 'Failed to load. Check console for details.'
+一个 Python 异常被拆成了很多行 [ERR]，几百台机器的日志靠人眼看根本看不过来。
+
+本工具：
+- 逐行流式读取（二进制按行迭代），一次只在内存里保留当前这一个 traceback，内存占用和日志大小无关；
+- 把 traceback 的各行合并成一条错误：异常类型、异常信息、出错的文件 / 行号 / 函数（最内层那一帧）；
+- 错误指纹 = 异常类型 + 信息 + 每一帧的“目录/文件名:行号:函数”，安装路径、用户名不同的机器上
+  同一个错误的指纹相同，所以能跨机器去重；
+- 提取插件事件：Loaded plugin / Failed to load plugin，失败事件关联到紧挨在它前面的 traceback；
+  加载耗时：行首带时间戳的日志按时间戳算（秒），没有时间戳时用和上一个插件事件之间的日志序号差
+  代替（序号差越大，说明中间做的事越多）；
+- 结果存进 SQLite（默认 <日志目录>/.sd_logs.sqlite），按指纹、文件、插件、机器建了索引，
+  查询不用再读日志。每个日志文件记录读到的字节位置，再次运行只读新增的部分；
+  日志被 SD 重新启动时覆盖（开头的内容变了）会自动从头重读。
+
+日志目录里每台机器一个子目录时（logs/PC-001/log.txt），子目录名就是机器名；否则用文件名。
+
+命令行用法：
+    python -m utilities.sd_log D:/logs                          导入（增量）并打印汇总
+    python -m utilities.sd_log D:/logs --plugin PluginBasics    某个插件的加载 / 失败记录
+    python -m utilities.sd_log D:/logs --error 3fa2c1           某个错误的 traceback 和出现在哪些机器
+    python -m utilities.sd_log D:/logs --file PluginBasics.py   出错位置在某个文件里的错误
+    python -m utilities.sd_log log.txt --follow                 SD 运行时边写边读
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from utilities.sbs_files import iter_packages
+
+
+DB_NAME = '.sd_logs.sqlite'
+DB_VERSION = 2
+LOG_EXTENSIONS = ('.txt', '.log')
+# 一个 traceback 最多保留多少行异常信息，防止异常的 repr 特别长时占用太多内存
+MAX_TAIL_LINES = 50
+# traceback 还没结束时，中间夹杂的其他频道的行超过这个数就认为它已经结束了
+MAX_FOREIGN_LINES = 50
+# 插件失败事件只关联在它前面这么多条消息以内结束的 traceback
+CAUSE_WINDOW = 3
+# 判断日志是否被覆盖时，比较开头和上次读到的位置之前各这么多字节
+HEAD_BYTES = 256
+
+_LINE = re.compile(r'^(?:(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d(?:[.,]\d+)?)\s*)?'
+                   r'\[(MSG|WRN|ERR|DBG|INF|FTL)\]\[(\d+)\]\[([^\]]*)\](.*)$')
+_FRAME = re.compile(r'^\s*File "(.*)", line (\d+)(?:, in (.*))?$')
+_EXCEPTION = re.compile(r'^([A-Za-z_][\w.]*)(?::\s*(.*))?$')
+_ADDRESS = re.compile(r'0x[0-9a-fA-F]+')
+_LOADED = re.compile(r"Loaded plugin '([^']+)'")
+_FAILED = re.compile(r"Failed to load plugin '([^']+)'(?:, error: '(.*)')?")
+_CHAINED = ('During handling of the above exception, another exception occurred:',
+            'The above exception was the direct cause of the following exception:')
+
+Record = namedtuple('Record', 'level seq channel text timestamp')
+Failure = namedtuple('Failure', 'fingerprint channel exc_type message file line func frames seq line_no')
+PluginEvent = namedtuple('PluginEvent', 'plugin status seq line_no seconds lines detail fingerprint')
+
+
+def parse_line(line):
+    """'[ERR][905][Python]xxx' -> Record；不是这种格式的行（多行消息的续行）返回 None。"""
+    m = _LINE.match(line)
+    if m is None:
+        return None
+    timestamp, level, seq, channel, text = m.groups()
+    return Record(level, int(seq), channel, text, timestamp)
+
+
+def _parse_timestamp(text):
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace(',', '.').replace('T', ' ')).timestamp()
+    except ValueError:
+        return None
+
+
+def short_path(path):
+    """只保留“目录/文件名”：不同机器的安装路径、用户名不同，不能参与去重。"""
+    return '/'.join(path.replace('\\', '/').split('/')[-2:])
+
+
+def fingerprint(channel, exc_type, message, frames):
+    parts = [channel, exc_type, _ADDRESS.sub('0x?', message)]
+    parts.extend('%s:%s:%s' % frame for frame in frames)
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _make_failure(channel, tail, frames, seq, line_no):
+    lines = [text.strip() for text in tail if text.strip()]
+    exc_type, message = '', ' '.join(lines)
+    if lines:
+        m = _EXCEPTION.match(lines[0])
+        # SD 会把 "ModuleNotFoundError: No module named x" 拆成两行，两种写法都要认
+        if m is not None and (m.group(2) is not None or len(lines) > 1):
+            exc_type = m.group(1)
+            message = m.group(2) if m.group(2) is not None else ' '.join(lines[1:])
+    frames = tuple(frames)
+    file, line, func = frames[-1] if frames else ('', 0, '')
+    return Failure(fingerprint(channel, exc_type, message, frames), channel, exc_type, message,
+                   file, line, func, frames, seq, line_no)
+
+
+class _Traceback(object):
+    __slots__ = ('channel', 'seq', 'line_no', 'offset', 'frames', 'tail', 'expect_source',
+                 'chained', 'foreign')
+
+    def __init__(self, channel, seq, line_no, offset):
+        self.channel = channel
+        self.seq = seq
+        self.line_no = line_no
+        self.offset = offset
+        self.frames = []
+        self.tail = []
+        self.expect_source = False
+        self.chained = False
+        self.foreign = 0
+
+
+class LogParser(object):
+    """逐行喂入日志，返回解析出的 Failure / PluginEvent。状态只有当前这一个 traceback。
+
+    用法：
+        parser = LogParser()
+        for line_no, (offset, line) in enumerate(lines, 1):
+            for event in parser.feed(line, line_no, offset):
+                ...
+        events = parser.flush()        # 文件读完：结束还没结束的 traceback
+    """
+
+    def __init__(self):
+        self._tb = None
+        self._last = None              # 最后一个 Record（给续行用）
+        self._last_failure = None
+        self._since_failure = 0
+        self._plugin_seq = None
+        self._plugin_time = None
+
+    @property
+    def pending_offset(self):
+        """正在拼接的 traceback 从哪个字节开始；没有时为 None。增量读取时从这里续读，不会把它拆成两半。"""
+        return self._tb.offset if self._tb is not None else None
+
+    def feed(self, line, line_no, offset=0):
+        events = []
+        record = parse_line(line)
+        if record is None:
+            if self._last is None:
+                return events
+            # 续行：当成和上一行同级别、同频道的消息
+            record = self._last._replace(text=line, timestamp=None)
+        else:
+            self._last = record
+        tb = self._tb
+        if tb is not None:
+            if record.channel != tb.channel:
+                tb.foreign += 1
+                if tb.foreign > MAX_FOREIGN_LINES or (record.level == 'ERR' and record.text.startswith(
+                        'Traceback (most recent call last)')):
+                    self._close(events)
+                    tb = None
+            elif record.level == 'ERR' and not record.text.startswith('Traceback (most recent call last)'):
+                self._extend(tb, record.text)
+                return events
+            elif record.level == 'ERR' and tb.chained:
+                # 链式异常：前一个异常的帧作废，只留最后抛出的那个
+                tb.frames, tb.tail, tb.chained = [], [], False
+                return events
+            else:
+                self._close(events)
+                tb = None
+        if record.level == 'ERR':
+            if record.text.startswith('Traceback (most recent call last)'):
+                self._tb = _Traceback(record.channel, record.seq, line_no, offset)
+                return events
+            self._emit(events, _make_failure(record.channel, [record.text], (), record.seq, line_no))
+        else:
+            self._since_failure += 1
+        self._plugin_event(events, record, line_no)
+        return events
+
+    def flush(self):
+        events = []
+        self._close(events)
+        return events
+
+    def _extend(self, tb, text):
+        stripped = text.strip()
+        m = _FRAME.match(text)
+        if m is not None:
+            path, line, func = m.groups()
+            tb.frames.append((short_path(path), int(line), func or ''))
+            tb.tail = []
+            tb.expect_source = True
+        elif stripped in _CHAINED:
+            tb.chained = True
+        elif tb.expect_source:
+            tb.expect_source = False        # 帧后面那一行是出错的源码
+        elif stripped and not stripped.strip('^~ '):
+            pass                            # SyntaxError 的 ^ 指示行
+        elif len(tb.tail) < MAX_TAIL_LINES:
+            tb.tail.append(text)
+
+    def _close(self, events):
+        tb, self._tb = self._tb, None
+        if tb is not None:
+            self._emit(events, _make_failure(tb.channel, tb.tail, tb.frames, tb.seq, tb.line_no))
+
+    def _emit(self, events, failure):
+        events.append(failure)
+        self._last_failure = failure
+        self._since_failure = 0
+
+    def _plugin_event(self, events, record, line_no):
+        m = _LOADED.search(record.text)
+        status = 'loaded'
+        if m is None:
+            m = _FAILED.search(record.text)
+            status = 'failed'
+            if m is None:
+                return
+        now = _parse_timestamp(record.timestamp)
+        seconds = now - self._plugin_time if now is not None and self._plugin_time is not None else None
+        lines = record.seq - self._plugin_seq if self._plugin_seq is not None else None
+        cause = None
+        if status == 'failed' and self._last_failure is not None and self._since_failure <= CAUSE_WINDOW:
+            cause = self._last_failure.fingerprint
+        detail = (m.group(2) or '') if status == 'failed' else ''
+        events.append(PluginEvent(m.group(1), status, record.seq, line_no, seconds, lines, detail, cause))
+        self._plugin_seq = record.seq
+        if now is not None:
+            self._plugin_time = now
+
+
+def iter_events(path, start=0, line_no=0, final=True):
+    """流式解析一个日志文件，逐个交出 Failure / PluginEvent。
+
+    start / line_no：从哪个字节、第几行之后开始读（增量读取用）。
+    final=False 时（文件还在被写）：最后一行不完整的不读，还没结束的 traceback 也不交出。
+    读完后生成器的返回值是 (下次续读的字节位置, 对应的行号)。
+    traceback 没结束时续读位置停在它开头，下次会从那里重新读；所以这期间其他频道产生的事件也先扣住，
+    等 traceback 结束再一起交出，否则 --follow 下次续读时会重复交出它们。
+    """
+    parser = LogParser()
+    offset = start
+    safe = (start, line_no)
+    held = []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        for raw in f:
+            if not raw.endswith(b'\n') and not final:
+                break
+            line_no += 1
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            held.extend(parser.feed(line, line_no, offset))
+            line_start, offset = offset, offset + len(raw)
+            pending = parser.pending_offset
+            if pending is None:
+                safe = (offset, line_no)
+            elif pending == line_start:
+                # 这一行开始了新的 traceback：扣住的事件都在它前面，续读位置移到它开头
+                safe = (line_start, line_no - 1)
+            else:
+                continue                    # traceback 还没结束，事件继续扣住
+            for event in held:
+                yield event
+            held = []
+    if final:
+        for event in held + parser.flush():
+            yield event
+        safe = (offset, line_no)
+    return safe
+
+
+def machine_for(path, root):
+    """日志按 <根目录>/<机器名>/.../log.txt 存放时取机器名，否则用不带扩展名的文件名。"""
+    rel = os.path.relpath(path, root).replace(os.sep, '/') if root else os.path.basename(path)
+    parts = rel.split('/')
+    if len(parts) > 1 and parts[0] != '..':
+        return parts[0]
+    return os.path.splitext(parts[-1])[0]
+
+
+def _signature(path, start, end):
+    """文件 [start, end) 这段字节的哈希。"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.blake2b(f.read(end - start), digest_size=8).hexdigest()
+
+
+def _head(path):
+    return _signature(path, 0, HEAD_BYTES)
+
+
+def _tail(path, offset):
+    """上次读到的位置之前的一段。SD 每次启动都先写同样的开头，只比开头分不出日志被覆盖过。"""
+    return _signature(path, max(offset - HEAD_BYTES, 0), offset)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS logs (
+    path TEXT PRIMARY KEY, machine TEXT, head TEXT, tail TEXT, offset INTEGER, line_no INTEGER);
+CREATE TABLE IF NOT EXISTS failures (
+    fingerprint TEXT PRIMARY KEY, channel TEXT, exc_type TEXT, message TEXT,
+    file TEXT, line INTEGER, func TEXT, frames TEXT);
+CREATE TABLE IF NOT EXISTS occurrences (fingerprint TEXT, path TEXT, machine TEXT, seq INTEGER, line_no INTEGER);
+CREATE TABLE IF NOT EXISTS plugin_events (
+    path TEXT, machine TEXT, plugin TEXT, status TEXT, seq INTEGER, line_no INTEGER,
+    seconds REAL, lines INTEGER, detail TEXT, fingerprint TEXT);
+CREATE INDEX IF NOT EXISTS occurrences_fingerprint ON occurrences (fingerprint);
+CREATE INDEX IF NOT EXISTS occurrences_path ON occurrences (path);
+CREATE INDEX IF NOT EXISTS occurrences_machine ON occurrences (machine);
+CREATE INDEX IF NOT EXISTS failures_file ON failures (file);
+CREATE INDEX IF NOT EXISTS plugin_events_plugin ON plugin_events (plugin);
+CREATE INDEX IF NOT EXISTS plugin_events_path ON plugin_events (path);
+"""
+
+
+class LogStore(object):
+    """日志汇总库（SQLite）：去重后的错误、每次出现的位置、插件事件。"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript(_SCHEMA)
+        version = self.db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != DB_VERSION:
+            # 解析规则或表结构变了，指纹不再可比，全部重新导入
+            self.db.executescript('DROP TABLE logs; DROP TABLE failures; DROP TABLE occurrences; '
+                                  'DROP TABLE plugin_events;')
+            self.db.executescript(_SCHEMA)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(DB_VERSION),))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    # 导入
+    # ------------------------------------------------------------------
+    def ingest(self, paths, root=None, machine=None, final=True):
+        """增量导入日志文件 / 目录。返回 (读取的文件数, 未变化的文件数, 新事件数, [(路径, 错误), ...])"""
+        read = unchanged = events = 0
+        errors = []
+        if root is None and paths and os.path.isdir(paths[0]):
+            root = paths[0]
+        for path in iter_packages(paths, extensions=LOG_EXTENSIONS):
+            try:
+                count = self.ingest_file(path, machine or machine_for(path, root), final)
+            except (OSError, UnicodeError) as e:
+                errors.append((path, str(e)))
+                continue
+            if count is None:
+                unchanged += 1
+            else:
+                read += 1
+                events += count
+        return read, unchanged, events, errors
+
+    def ingest_file(self, path, machine, final=True):
+        """导入一个日志文件里新增的部分。文件没有变化时返回 None，否则返回新事件数。"""
+        key = os.path.abspath(path)
+        size = os.path.getsize(path)
+        head = _head(path)
+        row = self.db.execute('SELECT head, tail, offset, line_no FROM logs WHERE path = ?', (key,)).fetchone()
+        start, line_no = 0, 0
+        if row is not None:
+            known_head, known_tail, offset, known_line = row
+            if known_head == head and offset <= size and known_tail == _tail(path, offset):
+                if offset == size:
+                    return None
+                start, line_no = offset, known_line
+            else:
+                self._forget(key)       # SD 重新启动时日志会被覆盖，从头再读
+
+        failures, occurrences, plugins = [], [], []
+        count = 0
+        events = iter_events(path, start, line_no, final)
+        while True:
+            try:
+                event = next(events)
+            except StopIteration as stop:
+                offset, line_no = stop.value
+                break
+            count += 1
+            if isinstance(event, Failure):
+                failures.append((event.fingerprint, event.channel, event.exc_type, event.message,
+                                 event.file, event.line, event.func,
+                                 '\n'.join('%s:%s:%s' % frame for frame in event.frames)))
+                occurrences.append((event.fingerprint, key, machine, event.seq, event.line_no))
+            else:
+                plugins.append((key, machine) + tuple(event))
+            if len(occurrences) + len(plugins) >= 5000:
+                self._write(failures, occurrences, plugins)
+                failures, occurrences, plugins = [], [], []
+        self._write(failures, occurrences, plugins)
+        self.db.execute('INSERT OR REPLACE INTO logs VALUES (?, ?, ?, ?, ?, ?)',
+                        (key, machine, head, _tail(path, offset), offset, line_no))
+        self.db.commit()
+        return count
+
+    def _write(self, failures, occurrences, plugins):
+        self.db.executemany('INSERT OR IGNORE INTO failures VALUES (?, ?, ?, ?, ?, ?, ?, ?)', failures)
+        self.db.executemany('INSERT INTO occurrences VALUES (?, ?, ?, ?, ?)', occurrences)
+        self.db.executemany('INSERT INTO plugin_events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', plugins)
+
+    def _forget(self, key):
+        self.db.execute('DELETE FROM logs WHERE path = ?', (key,))
+        self.db.execute('DELETE FROM occurrences WHERE path = ?', (key,))
+        self.db.execute('DELETE FROM plugin_events WHERE path = ?', (key,))
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def failures(self, file=None, machine=None, limit=20):
+        """去重后的错误，按影响的机器数、出现次数排序。
+
+        返回 [{'fingerprint', 'exc_type', 'message', 'file', 'line', 'func', 'count', 'machines'}, ...]
+        """
+        where, args = [], []
+        if file:
+            where.append('f.file LIKE ?')
+            args.append('%' + file)
+        if machine:
+            where.append('o.machine = ?')
+            args.append(machine)
+        query = ('SELECT f.fingerprint, f.exc_type, f.message, f.file, f.line, f.func, '
+                 'COUNT(*), COUNT(DISTINCT o.machine) FROM occurrences o JOIN failures f USING (fingerprint) '
+                 '%s GROUP BY f.fingerprint ORDER BY COUNT(DISTINCT o.machine) DESC, COUNT(*) DESC LIMIT ?'
+                 % ('WHERE ' + ' AND '.join(where) if where else ''))
+        keys = ('fingerprint', 'exc_type', 'message', 'file', 'line', 'func', 'count', 'machines')
+        return [dict(zip(keys, row)) for row in self.db.execute(query, args + [limit])]
+
+    def failure(self, prefix):
+        """按指纹（可以只写开头几位）查一个错误：完整的帧列表和每次出现的位置。找不到返回 None。"""
+        row = self.db.execute('SELECT fingerprint, channel, exc_type, message, frames FROM failures '
+                              'WHERE fingerprint >= ? AND fingerprint < ? ORDER BY fingerprint LIMIT 1',
+                              (prefix, prefix + '\uffff')).fetchone()
+        if row is None:
+            return None
+        fingerprint_, channel, exc_type, message, frames = row
+        occurrences = self.db.execute('SELECT machine, path, seq, line_no FROM occurrences '
+                                      'WHERE fingerprint = ? ORDER BY machine, path, line_no',
+                                      (fingerprint_,)).fetchall()
+        plugins = [r[0] for r in self.db.execute(
+            'SELECT DISTINCT plugin FROM plugin_events WHERE fingerprint = ?', (fingerprint_,))]
+        return {'fingerprint': fingerprint_, 'channel': channel, 'exc_type': exc_type, 'message': message,
+                'frames': [frame for frame in frames.split('\n') if frame], 'occurrences': occurrences,
+                'plugins': plugins}
+
+    def plugins(self):
+        """每个插件的加载统计：[(插件, 成功次数, 失败次数, 失败的机器数, 平均序号差, 平均秒数), ...]"""
+        return self.db.execute(
+            "SELECT plugin, SUM(status = 'loaded'), SUM(status = 'failed'), "
+            "COUNT(DISTINCT CASE WHEN status = 'failed' THEN machine END), AVG(lines), AVG(seconds) "
+            "FROM plugin_events GROUP BY plugin ORDER BY SUM(status = 'failed') DESC, plugin").fetchall()
+
+    def plugin_events(self, plugin, machine=None):
+        """某个插件的全部事件：[(机器, 状态, 序号, 行号, 秒数, 详情, 原因指纹), ...]"""
+        query = ('SELECT machine, status, seq, line_no, seconds, detail, fingerprint FROM plugin_events '
+                 'WHERE plugin = ?')
+        args = [plugin]
+        if machine:
+            query += ' AND machine = ?'
+            args.append(machine)
+        return self.db.execute(query + ' ORDER BY machine, path, line_no', args).fetchall()
+
+    def totals(self):
+        """(日志数, 机器数, 错误出现次数, 不同错误数, 插件失败次数)"""
+        logs, machines = self.db.execute('SELECT COUNT(*), COUNT(DISTINCT machine) FROM logs').fetchone()
+        occurrences = self.db.execute('SELECT COUNT(*) FROM occurrences').fetchone()[0]
+        distinct = self.db.execute('SELECT COUNT(DISTINCT fingerprint) FROM occurrences').fetchone()[0]
+        failed = self.db.execute("SELECT COUNT(*) FROM plugin_events WHERE status = 'failed'").fetchone()[0]
+        return logs, machines, occurrences, distinct, failed
+
+
+def _location(file, line, func):
+    if not file:
+        return ''
+    return '%s:%s%s' % (file, line, ' in %s' % func if func else '')
+
+
+def _print_summary(store, args):
+    logs, machines, occurrences, distinct, failed = store.totals()
+    print('%d 个日志 / %d 台机器，错误 %d 次（%d 种），插件加载失败 %d 次'
+          % (logs, machines, occurrences, distinct, failed))
+    print()
+    print('%-16s %6s %6s  %s' % ('指纹', '机器', '次数', '错误'))
+    for f in store.failures(args.file, args.machine, args.limit):
+        title = '%s: %s' % (f['exc_type'], f['message']) if f['exc_type'] else f['message']
+        print('%-16s %6d %6d  %s' % (f['fingerprint'], f['machines'], f['count'], title[:100]))
+        location = _location(f['file'], f['line'], f['func'])
+        if location:
+            print('%30s%s' % ('', location))
+    if args.file:
+        return
+    print()
+    print('%-28s %6s %6s %8s %10s' % ('插件', '加载', '失败', '失败机器', '平均序号差'))
+    for plugin, loaded, failed, machines, lines, _seconds in store.plugins():
+        print('%-28s %6d %6d %8d %10s' % (plugin, loaded, failed, machines, '%.0f' % lines if lines else '-'))
+
+
+def _print_failure(store, prefix):
+    failure = store.failure(prefix)
+    if failure is None:
+        print('[sd_log] 没有指纹以 %s 开头的错误' % prefix)
+        return 1
+    print('%s  [%s] %s: %s' % (failure['fingerprint'], failure['channel'], failure['exc_type'] or '(无类型)',
+                               failure['message']))
+    for frame in failure['frames']:
+        print('    %s' % frame)
+    if failure['plugins']:
+        print('导致插件加载失败: %s' % ', '.join(failure['plugins']))
+    print('出现 %d 次：' % len(failure['occurrences']))
+    for machine, path, seq, line_no in failure['occurrences']:
+        print('    %-16s %s:%d  [%d]' % (machine, path, line_no, seq))
+    return 0
+
+
+def _print_plugin(store, plugin, machine):
+    rows = store.plugin_events(plugin, machine)
+    if not rows:
+        print('[sd_log] 没有插件 %s 的记录' % plugin)
+        return 1
+    for machine_, status, seq, line_no, seconds, detail, cause in rows:
+        timing = '%.2fs' % seconds if seconds is not None else ''
+        print('%-16s %-7s [%d] 第 %d 行 %s %s%s'
+              % (machine_, status, seq, line_no, timing, detail, '  错误 %s' % cause if cause else ''))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Designer 日志分析：traceback 合并、跨机器去重、插件加载事件')
+    parser.add_argument('paths', nargs='*', help='日志文件或目录（目录下每台机器一个子目录）')
+    parser.add_argument('--db', help='汇总库路径，默认 <第一个目录>/%s' % DB_NAME)
+    parser.add_argument('--machine', help='导入时：指定机器名；查询时：只看这台机器')
+    parser.add_argument('--no-update', action='store_true', help='不读日志，只查询已有的汇总库')
+    parser.add_argument('--follow', action='store_true', help='导入后继续等待日志追加（Ctrl+C 结束）')
+    parser.add_argument('--interval', type=float, default=1.0, help='--follow 时的检查间隔（秒）')
+    parser.add_argument('--error', metavar='FINGERPRINT', help='显示某个错误的详情')
+    parser.add_argument('--plugin', help='显示某个插件的加载 / 失败记录')
+    parser.add_argument('--file', help='只看出错位置在这个文件里的错误（如 PluginBasics.py）')
+    parser.add_argument('--limit', type=int, default=20, help='最多列出多少种错误')
+    args = parser.parse_args(argv)
+
+    db_path = args.db
+    if db_path is None:
+        first = args.paths[0] if args.paths else '.'
+        db_path = os.path.join(first if os.path.isdir(first) else os.path.dirname(first) or '.', DB_NAME)
+    store = LogStore(db_path)
+    try:
+        errors = []
+        if args.paths and not args.no_update:
+            started = time.perf_counter()
+            read, unchanged, events, errors = store.ingest(args.paths, machine=args.machine, final=not args.follow)
+            print('[sd_log] 读取 %d 个日志, 未变化 %d, 新事件 %d, 用时 %.2fs'
+                  % (read, unchanged, events, time.perf_counter() - started))
+            for path, error in errors:
+                print('[sd_log] 读取失败 %s: %s' % (path, error))
+        if args.follow:
+            try:
+                while True:
+                    time.sleep(args.interval)
+                    before = store.totals()
+                    store.ingest(args.paths, machine=args.machine, final=False)
+                    after = store.totals()
+                    if after[2] > before[2] or after[4] > before[4]:
+                        print('[sd_log] 新增错误 %d 次，插件失败 %d 次' % (after[2] - before[2], after[4] - before[4]))
+            except KeyboardInterrupt:
+                pass
+        if args.error:
+            return _print_failure(store, args.error)
+        if args.plugin:
+            return _print_plugin(store, args.plugin, args.machine)
+        _print_summary(store, args)
+    finally:
+        store.close()
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""utilities 的回归测试（只用标准库 unittest，不依赖 SD）
+
+在仓库根目录运行：
+    python -m unittest discover -s utilities/tests -t .
+    python -m pytest utilities/tests          （装了 pytest 时）
+"""
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""mdl_eval：不同模块的同名函数不能互相覆盖，只给函数名且有歧义时要报错；
+出界的输入两套后端都得到 nan / inf，不抛异常。"""
+
+import math
+import unittest
+
+from utilities.mdl_eval import MdlError, MdlLibrary, NodeGraph, PythonOps, _numpy_ops, evaluate
+
+_inf, _nan = math.inf, math.nan
+# (运算, 参数, 期望结果)，期望和 numpy 一致
+_EDGE_CASES = [
+    ('asin', (2.0,), _nan), ('acos', (-3.0,), _nan), ('sin', (_inf,), _nan), ('tan', (-_inf,), _nan),
+    ('pow', (0.0, -1.0), _inf), ('pow', (-0.0, -1.0), -_inf), ('pow', (-8.0, 1.0 / 3), _nan),
+    ('pow', (10.0, 400.0), _inf), ('pow', (-10.0, 401.0), -_inf), ('exp', (1000.0,), _inf),
+    ('floor', (_nan,), _nan), ('ceil', (_inf,), _inf), ('frac', (_inf,), _nan), ('round', (-_inf,), -_inf),
+    ('fmod', (_inf, 1.0), _nan), ('sign', (_nan,), _nan), ('sqrt', (-1.0,), _nan), ('log', (0.0,), -_inf),
+    ('min', (_nan, 1.0), _nan), ('min', (1.0, _nan), _nan), ('max', (1.0, _nan), _nan),
+    ('to_int', (_inf,), 0), ('to_int', (_nan,), 0), ('to_int', (-2.7,), -2), ('idiv', (1.0, 0.0), 0),
+]
+
+
+def _library():
+    library = MdlLibrary()
+    library.add_source('export float scale(float x) { return x * 10.0; }', 'mdl::a')
+    library.add_source('export float scale(float x) { return x * 2.0; }\n'
+                       'export float twice(float x) { return scale(x); }', 'mdl::b')
+    library.add_source('export float both(float u) { return a::scale(b::scale(u)); }', 'mdl::c')
+    return library
+
+
+class CrossModuleNameTest(unittest.TestCase):
+    def test_qualified_calls_keep_their_module(self):
+        kernel = _library().kernel('c::both', backend='python')
+        self.assertEqual(list(kernel(u=[1.0, 3.0])), [20.0, 60.0])
+
+    def test_unqualified_call_prefers_own_module(self):
+        kernel = _library().kernel('b::twice', backend='python')
+        self.assertEqual(list(kernel(x=[1.0])), [2.0])
+
+    def test_node_graph_with_same_named_functions(self):
+        graph = NodeGraph(_library())
+        u = graph.input('u')
+        graph.output(graph.node('a::scale', x=graph.node('b::scale', x=u)))
+        self.assertEqual(list(graph.compile(backend='python')(u=[1.0])), [20.0])
+
+    def test_ambiguous_short_name_raises(self):
+        library = _library()
+        with self.assertRaises(MdlError):
+            library.find('scale')
+        self.assertIs(library.find('twice'), library.functions['mdl::b::twice'])
+
+
+class EdgeInputTest(unittest.TestCase):
+    def assertSameValue(self, actual, expected, case):
+        actual = float(actual)
+        if expected != expected:
+            self.assertTrue(actual != actual, '%s: %r 不是 nan' % (case, actual))
+        else:
+            self.assertEqual(actual, expected, case)
+
+    def test_python_ops_do_not_raise(self):
+        for name, args, expected in _EDGE_CASES:
+            self.assertSameValue(getattr(PythonOps, name)(*args), expected, (name, args))
+
+    @unittest.skipUnless(_numpy_ops(), '没有安装 numpy')
+    def test_backends_agree(self):
+        ops = _numpy_ops()
+        np = ops.numpy
+        with np.errstate(all='ignore'):
+            for name, args, _expected in _EDGE_CASES:
+                expected = getattr(PythonOps, name)(*args)
+                actual = getattr(ops, name)(*[np.asarray([a]) for a in args])
+                self.assertSameValue(np.asarray(actual).ravel()[0], expected, (name, args))
+
+    def test_out_of_domain_sample_does_not_abort_evaluate(self):
+        library = MdlLibrary()
+        library.add_source('export float f(float x) { return asin(x) + exp(x * 1000.0); }', 'mdl::edge')
+        result = evaluate(library.kernel('edge::f', backend='python'), {'x': [0.0, 2.0]})
+        self.assertEqual(result[0], 1.0)
+        self.assertTrue(result[1] != result[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
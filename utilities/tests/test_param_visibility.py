@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""param_visibility：下拉框选项 "值;标签;..." 里只有值的位置算选项值。"""
+
+import unittest
+
+from utilities.param_visibility import ParamSpec
+
+
+def _combobox(parameters):
+    return ParamSpec('g', 'mode', default=('constantValueInt1', '0'), widget='combobox',
+                     options={'parameters': parameters})
+
+
+class EnumValuesTest(unittest.TestCase):
+    def test_numeric_labels_are_not_values(self):
+        self.assertEqual(_combobox('0;2;1;4;3;8').enum_values(), [0, 1, 3])
+
+    def test_text_labels(self):
+        self.assertEqual(_combobox('0;Off;1;Simple, fast;2;Detailed').enum_values(), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""sbs_diff：节点哈希变了但没建模的部分（dynamicValue、GUILayout 里的 docked 等）变化时也要报告。"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from utilities import sbs_diff
+
+_PACKAGE = ('<?xml version="1.0" encoding="UTF-8"?><package><identifier v="Diff"/>'
+            '<formatVersion v="1.1.0.202302"/><content><graph><identifier v="material"/><uid v="1"/>'
+            '<attributes><label v="%(label)s"/></attributes><compNodes>'
+            '<compNode><uid v="10"/><GUILayout><gpos v="0 0 0"/><docked v="%(docked)s"/></GUILayout>'
+            '<compImplementation><compFilter><filter v="uniform"/><parameters><parameter>'
+            '<name v="outputsize"/><relativeTo v="0"/><paramValue><dynamicValue><treestamp v="%(stamp)s"/>'
+            '</dynamicValue></paramValue></parameter></parameters></compFilter></compImplementation></compNode>'
+            '<compNode><uid v="11"/><GUILayout><gpos v="100 0 0"/></GUILayout>'
+            '<compImplementation><compFilter><filter v="hsl"/><parameters/></compFilter></compImplementation>'
+            '</compNode></compNodes></graph></content></package>')
+
+
+class EmptyNodeDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='sbs_diff_test_')
+        self.old = self._write('old.sbs', label='Material', docked='0', stamp='1')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _write(self, name, **values):
+        path = os.path.join(self.workdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(_PACKAGE % values)
+        return path
+
+    def _graph_change(self, **values):
+        new = self._write('new.sbs', **values)
+        result = sbs_diff.diff_packages(self.old, new, use_cache=False)
+        return result['graphs']['modified']['material']
+
+    def test_unmodelled_child_change_is_reported(self):
+        change = self._graph_change(label='Material', docked='1', stamp='1')
+        self.assertEqual(change['nodes']['modified'], {'10': {'other': 'modified'}})
+        self.assertNotIn('attributes', change)
+
+    def test_dynamic_value_change_is_reported(self):
+        change = self._graph_change(label='Material', docked='0', stamp='2')
+        self.assertEqual(list(change['nodes']['modified']), ['10'])
+        self.assertIn('其他内容', sbs_diff.format_diff({'graphs': {'modified': {'material': change}}}))
+
+    def test_graph_attribute_change_only(self):
+        change = self._graph_change(label='Renamed', docked='0', stamp='1')
+        self.assertEqual(change, {'attributes': 'modified'})
+
+    def test_identical_packages(self):
+        new = self._write('new.sbs', label='Material', docked='0', stamp='1')
+        self.assertEqual(sbs_diff.diff_packages(self.old, new), {})
+        self.assertTrue(os.path.exists(sbs_diff.cache_path_for(new)))
+
+
+if __name__ == '__main__':
+    unittest.main()
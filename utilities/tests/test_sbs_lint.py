@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""sbs_lint：SARIF 结果里的每个 ruleId（包括 parse-error）都在 tool.driver.rules 里声明。"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from utilities.sbs_lint import PARSE_ERROR_RULE, lint_paths, to_sarif
+
+
+class SarifTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='sbs_lint_test_')
+        self.path = os.path.join(self.workdir, 'broken.sbs')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('<package><content>')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_parse_error_rule_is_declared(self):
+        findings = lint_paths([self.path], workers=1)
+        self.assertEqual([f['rule'] for f in findings], [PARSE_ERROR_RULE])
+        for rule_ids in (None, ['output-resolution']):
+            run = to_sarif(findings, rule_ids)['runs'][0]
+            declared = {rule['id'] for rule in run['tool']['driver']['rules']}
+            self.assertTrue({result['ruleId'] for result in run['results']} <= declared)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""sbs_patch：--frame-alpha 只改 frame 的颜色，注释等其他 GUIObject 的 <color> 和其余字节原样保留。"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from utilities.sbs_patch import frame_alpha_patch, patch_file
+
+_PACKAGE = '''<?xml version="1.0" encoding="UTF-8"?>
+<package>
+ <content>
+  <graph>
+   <identifier v="main"/>
+   <GUIObjects>
+    <GUIObject>
+     <type v="COMMENT"/>
+     <GUILayout>
+      <gpos v="-400 -80 0"/>
+      <size v="448 288"/>
+     </GUILayout>
+     <title v="Frame"/>
+     <frameData>
+      <color  v='0.2 0.3 0.4 1'/>
+     </frameData>
+    </GUIObject>
+    <GUIObject>
+     <type v="COMMENT"/>
+     <GUILayout>
+      <gpos v="96 -80 0"/>
+     </GUILayout>
+     <color v="0.9 0.9 0.1 1"/>
+     <title v="Just a comment"/>
+    </GUIObject>
+   </GUIObjects>
+  </graph>
+ </content>
+</package>
+'''
+
+
+class FrameAlphaTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='sbs_patch_test_')
+        self.path = os.path.join(self.workdir, 'frames.sbs')
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(_PACKAGE)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_only_frame_color_changes(self):
+        self.assertEqual(patch_file(self.path, [frame_alpha_patch('0.25')]), 1)
+        with open(self.path, 'rb') as f:
+            patched = f.read()
+        expected = _PACKAGE.replace("v='0.2 0.3 0.4 1'", "v='0.2 0.3 0.4 0.25'").encode('utf-8')
+        self.assertEqual(patched, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""sd_log：--follow 增量读取时，traceback 没结束期间其他频道的事件不能重复交出；
+日志被同样开头的新会话覆盖后要从头重新导入。"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from utilities import sd_log
+
+_PENDING = ('[INF][100][Core]Starting\n'
+            '[ERR][101][Python]Traceback (most recent call last):\n'
+            '[ERR][102][Python]  File "C:/plugins/bar/__init__.py", line 3, in <module>\n'
+            '[ERR][103][Python]    import bar\n'
+            "[INF][104][Plugins]Loaded plugin 'Foo'\n")
+_CLOSE = ('[ERR][105][Python]ImportError: No module named bar\n'
+          '[INF][106][Python]Reloading plugins\n')
+
+
+def _read(path, start, line_no, final):
+    events = []
+    generator = sd_log.iter_events(path, start, line_no, final)
+    while True:
+        try:
+            events.append(next(generator))
+        except StopIteration as stop:
+            return events, stop.value
+
+
+class FollowModeTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='sd_log_test_')
+        self.path = os.path.join(self.workdir, 'log.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _append(self, text):
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def test_events_during_pending_traceback_are_emitted_once(self):
+        self._append(_PENDING)
+        first, (offset, line_no) = _read(self.path, 0, 0, final=False)
+        self._append(_CLOSE)
+        second, _end = _read(self.path, offset, line_no, final=False)
+        plugins = [(e.plugin, e.seq) for e in first + second if isinstance(e, sd_log.PluginEvent)]
+        failures = [e for e in first + second if isinstance(e, sd_log.Failure)]
+        self.assertEqual(plugins, [('Foo', 104)])
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0].exc_type, 'ImportError')
+
+    def test_follow_matches_single_read(self):
+        self._append(_PENDING)
+        first, (offset, line_no) = _read(self.path, 0, 0, final=False)
+        self._append(_CLOSE)
+        second, _end = _read(self.path, offset, line_no, final=True)
+        whole, _end = _read(self.path, 0, 0, final=True)
+        self.assertEqual(first + second, whole)
+
+
+_BANNER = ''.join('[INF][%d][Core]Substance Designer 14.0.0 starting, loading module %d\n' % (i, i)
+                  for i in range(8))
+_OLD_SESSION = _BANNER + ''.join("[INF][%d][Plugins]Loaded plugin 'Old%d'\n" % (10 + i, i) for i in range(5))
+_NEW_SESSION = (_BANNER + "[INF][10][Plugins]Loading plugin 'PluginBasics'\n"
+                '[ERR][11][Python]Traceback (most recent call last):\n'
+                '[ERR][12][Python]  File "C:/plugins/PluginBasics/__init__.py", line 7, in <module>\n'
+                '[ERR][13][Python]    import foo\n'
+                "[ERR][14][Python]ModuleNotFoundError: No module named 'foo'\n"
+                "[INF][15][Python]Failed to load plugin 'PluginBasics'\n"
+                + ''.join('[INF][%d][Core]Session running %d\n' % (16 + i, i) for i in range(5)))
+
+
+class OverwrittenLogTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix='sd_log_test_')
+        self.path = os.path.join(self.workdir, 'log.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _write(self, text):
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def _failures(self, db_name, *sessions):
+        store = sd_log.LogStore(os.path.join(self.workdir, db_name))
+        try:
+            for text in sessions:
+                self._write(text)
+                store.ingest_file(self.path, 'PC-001')
+            failures = [(f['exc_type'], f['file'], f['line'], f['count']) for f in store.failures()]
+            return failures, store.plugin_events('Old0')
+        finally:
+            store.close()
+
+    def test_overwritten_log_with_same_banner_is_read_again(self):
+        self.assertGreater(len(_NEW_SESSION), len(_OLD_SESSION))
+        incremental, old_events = self._failures('incremental.sqlite', _OLD_SESSION, _NEW_SESSION)
+        fresh, _events = self._failures('fresh.sqlite', _NEW_SESSION)
+        self.assertEqual(incremental, fresh)
+        self.assertEqual(len(fresh), 1)
+        self.assertEqual(fresh[0][0], 'ModuleNotFoundError')
+        self.assertEqual(old_events, [])
+
+
+if __name__ == '__main__':
+    unittest.main()